@@ -17,6 +17,7 @@ from app.models import (  # noqa: F401
     care_task_screening_audit_log,
     care_task_triage_audit_log,
     care_task_triage_review,
+    clinical_chat_job,
     clinical_document,
     document_chunk,
     emergency_episode,
@@ -0,0 +1,86 @@
+"""add clinical_chat_jobs table
+
+Revision ID: a6c9e2f4b183
+Revises: d8c3f2e1a445
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c9e2f4b183"
+down_revision: Union[str, None] = "d8c3f2e1a445"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cola persistente del chat asincrono: cualquier worker/nodo reclama
+    # trabajos por prioridad y los encolados sobreviven a reinicios.
+    op.create_table(
+        "clinical_chat_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.String(length=40), nullable=False),
+        sa.Column("care_task_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="2"),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("worker_id", sa.String(length=80), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("message_id", sa.Integer(), nullable=True),
+        sa.Column("agent_run_id", sa.Integer(), nullable=True),
+        sa.Column("workflow_name", sa.String(length=80), nullable=True),
+        sa.Column("response_mode", sa.String(length=20), nullable=True),
+        sa.Column("tool_mode", sa.String(length=20), nullable=True),
+        sa.Column("quality_status", sa.String(length=20), nullable=True),
+        sa.Column("llm_used", sa.Boolean(), nullable=True),
+        sa.Column("error", sa.String(length=240), nullable=True),
+        sa.ForeignKeyConstraint(["care_task_id"], ["care_tasks.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_clinical_chat_jobs_id"), "clinical_chat_jobs", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_clinical_chat_jobs_job_id"), "clinical_chat_jobs", ["job_id"], unique=True
+    )
+    op.create_index(
+        op.f("ix_clinical_chat_jobs_care_task_id"),
+        "clinical_chat_jobs",
+        ["care_task_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_clinical_chat_jobs_status_priority",
+        "clinical_chat_jobs",
+        ["status", "priority", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    # Elimina la cola persistente; el chat asincrono vuelve a no tener estado.
+    op.drop_index("ix_clinical_chat_jobs_status_priority", table_name="clinical_chat_jobs")
+    op.drop_index(op.f("ix_clinical_chat_jobs_care_task_id"), table_name="clinical_chat_jobs")
+    op.drop_index(op.f("ix_clinical_chat_jobs_job_id"), table_name="clinical_chat_jobs")
+    op.drop_index(op.f("ix_clinical_chat_jobs_id"), table_name="clinical_chat_jobs")
+    op.drop_table("clinical_chat_jobs")
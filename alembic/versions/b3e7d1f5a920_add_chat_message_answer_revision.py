@@ -0,0 +1,41 @@
+"""add answer revision fields to care_task_chat_messages
+
+Revision ID: b3e7d1f5a920
+Revises: a6c9e2f4b183
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e7d1f5a920"
+down_revision: Union[str, None] = "a6c9e2f4b183"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Respuesta especulativa: la extractiva se persiste como revision 1
+    # provisional y el refinamiento LLM la reemplaza con una nueva revision.
+    op.add_column(
+        "care_task_chat_messages",
+        sa.Column("answer_revision", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "care_task_chat_messages",
+        sa.Column(
+            "answer_status",
+            sa.String(length=16),
+            nullable=False,
+            server_default="final",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("care_task_chat_messages", "answer_status")
+    op.drop_column("care_task_chat_messages", "answer_revision")
@@ -1,13 +1,16 @@
 """
 Endpoints de CareTask - CRUD en paralelo para el pivot de dominio.
 """
-from typing import List, Optional
+from typing import List, Optional, cast
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user_optional
 from app.core.database import get_db
+from app.models.care_task import CareTask
+from app.models.care_task_chat_message import CareTaskChatMessage
 from app.models.user import User
 from app.schemas.acne_rosacea_protocol import (
     AcneRosaceaDifferentialRecommendation,
@@ -74,6 +77,7 @@ from app.schemas.clinical_chat import (
     CareTaskClinicalChatMemoryResponse,
     CareTaskClinicalChatMessageRequest,
     CareTaskClinicalChatPublicResponse,
+    ChatAnswerStatus,
 )
 from app.schemas.critical_ops_protocol import (
     CareTaskCriticalOpsProtocolResponse,
@@ -220,8 +224,12 @@ from app.services.anisakis_support_protocol_service import AnisakisSupportProtoc
 from app.services.cardio_risk_support_service import CardioRiskSupportService
 from app.services.care_task_service import CareTaskService
 from app.services.chest_xray_support_service import ChestXRaySupportService
-from app.services.clinical_chat_async_service import ClinicalChatAsyncService
+from app.services.clinical_chat_async_service import (
+    ClinicalChatAsyncService,
+    ClinicalChatQueueFullError,
+)
 from app.services.clinical_chat_service import ClinicalChatService
+from app.services.clinical_chat_stream_service import ClinicalChatStreamService
 from app.services.critical_ops_protocol_service import CriticalOpsProtocolService
 from app.services.endocrinology_support_protocol_service import EndocrinologySupportProtocolService
 from app.services.epidemiology_support_protocol_service import EpidemiologySupportProtocolService
@@ -309,6 +317,63 @@ def _sanitize_public_chat_answer(answer: str) -> str:
     )
 
 
+def _build_public_chat_response(
+    task: CareTask,
+    result: tuple,
+) -> CareTaskClinicalChatPublicResponse:
+    (
+        message,
+        _agent_run_id,
+        _workflow_name,
+        interpretability_trace,
+        response_mode,
+        tool_mode,
+        quality_metrics,
+        _tool_policy_decision,
+        _security_findings,
+    ) = result
+    refinement_job_id = next(
+        (
+            str(item).split("=", 1)[1]
+            for item in (interpretability_trace or [])
+            if str(item).startswith("answer_refinement_job_id=")
+        ),
+        None,
+    )
+    return CareTaskClinicalChatPublicResponse(
+        care_task_id=task.id,
+        message_id=message.id,
+        session_id=message.session_id,
+        response_mode=response_mode,
+        tool_mode=tool_mode,
+        answer=_sanitize_public_chat_answer(message.assistant_answer),
+        matched_domains=list(message.matched_domains or []),
+        effective_specialty=message.effective_specialty,
+        knowledge_sources=list(message.knowledge_sources or []),
+        extracted_facts=list(message.extracted_facts or []),
+        interpretability_trace=list(interpretability_trace or []),
+        quality_metrics=quality_metrics,
+        answer_revision=int(getattr(message, "answer_revision", None) or 1),
+        answer_status=cast(
+            ChatAnswerStatus, getattr(message, "answer_status", None) or "final"
+        ),
+        refinement_job_id=refinement_job_id,
+        non_diagnostic_warning=(
+            "Soporte operativo no diagnostico. Requiere validacion humana y protocolo local."
+        ),
+    )
+
+
+def _build_chat_revision_event(message: CareTaskChatMessage) -> dict:
+    return {
+        "message_id": message.id,
+        "answer": _sanitize_public_chat_answer(message.assistant_answer),
+        "answer_revision": int(message.answer_revision or 1),
+        "answer_status": str(message.answer_status or "final"),
+        "knowledge_sources": list(message.knowledge_sources or []),
+    }
+
+
 @router.post("/", response_model=CareTaskResponse, status_code=status.HTTP_201_CREATED)
 def create_care_task(task: CareTaskCreate, db: Session = Depends(get_db)):
     """Crea un nuevo CareTask con validacion de prioridad clinica."""
@@ -419,38 +484,47 @@ def create_care_task_chat_message(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CareTask no encontrado")
     payload = payload.model_copy(update={"pipeline_relaxed_mode": False})
 
-    (
-        message,
-        _agent_run_id,
-        _workflow_name,
-        _interpretability_trace,
-        response_mode,
-        tool_mode,
-        quality_metrics,
-        _tool_policy_decision,
-        _security_findings,
-    ) = ClinicalChatService.create_message(
+    result = ClinicalChatService.create_message(
         db=db,
         care_task=task,
         payload=payload,
         authenticated_user=current_user,
     )
-    return CareTaskClinicalChatPublicResponse(
-        care_task_id=task.id,
-        message_id=message.id,
-        session_id=message.session_id,
-        response_mode=response_mode,
-        tool_mode=tool_mode,
-        answer=_sanitize_public_chat_answer(message.assistant_answer),
-        matched_domains=list(message.matched_domains or []),
-        effective_specialty=message.effective_specialty,
-        knowledge_sources=list(message.knowledge_sources or []),
-        extracted_facts=list(message.extracted_facts or []),
-        interpretability_trace=list(_interpretability_trace or []),
-        quality_metrics=quality_metrics,
-        non_diagnostic_warning=(
-            "Soporte operativo no diagnostico. Requiere validacion humana y protocolo local."
-        ),
+    return _build_public_chat_response(task, result)
+
+
+@router.post("/{task_id}/chat/messages/stream")
+def stream_care_task_chat_message(
+    task_id: int,
+    payload: CareTaskClinicalChatMessageRequest,
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_current_user_optional),
+):
+    """
+    Variante en streaming (SSE) del turno de chat clinico.
+
+    Emite eventos `stage` del pipeline y `token` con los fragmentos del LLM a
+    medida que llegan; `message` trae la respuesta publica final ya persistida.
+    """
+    task = CareTaskService.get_care_task_by_id(db, task_id)
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CareTask no encontrado")
+    payload = payload.model_copy(update={"pipeline_relaxed_mode": False})
+
+    events = ClinicalChatStreamService.stream_message(
+        bind=db.get_bind(),
+        care_task_id=task_id,
+        payload=payload,
+        user_id=current_user.id if current_user is not None else None,
+        render_result=lambda care_task, result: _build_public_chat_response(
+            care_task, result
+        ).model_dump(mode="json"),
+        render_revision=_build_chat_revision_event,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -476,11 +550,18 @@ def create_care_task_chat_message_async(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CareTask no encontrado")
     payload = payload.model_copy(update={"pipeline_relaxed_mode": False})
 
-    job = ClinicalChatAsyncService.enqueue_job(
-        care_task_id=task.id,
-        payload=payload,
-        authenticated_user=current_user,
-    )
+    try:
+        job = ClinicalChatAsyncService.enqueue_job(
+            care_task_id=task.id,
+            payload=payload,
+            authenticated_user=current_user,
+        )
+    except ClinicalChatQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Cola de chat asincrono llena. Reintenta mas tarde.",
+            headers={"Retry-After": str(exc.retry_after_seconds)},
+        ) from exc
     return CareTaskClinicalChatAsyncCreateResponse(
         care_task_id=task.id,
         job_id=str(job["job_id"]),
@@ -520,6 +601,10 @@ def get_care_task_chat_message_async_status(
         quality_status=job.get("quality_status"),
         llm_used=job.get("llm_used"),
         error=job.get("error"),
+        priority=job.get("priority"),
+        attempts=job.get("attempts"),
+        queue_wait_ms=job.get("queue_wait_ms"),
+        run_ms=job.get("run_ms"),
     )
 
 
@@ -546,6 +631,30 @@ def list_care_task_chat_messages(
     )
 
 
+@router.get(
+    "/{task_id}/chat/messages/{message_id}",
+    response_model=CareTaskClinicalChatHistoryItemResponse,
+)
+def get_care_task_chat_message(
+    task_id: int,
+    message_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    Devuelve un mensaje de chat con su revision actual.
+
+    Con respuesta especulativa el cliente consulta aqui hasta que
+    `answer_status` deja de ser `provisional`.
+    """
+    message = ClinicalChatService.get_message(db, care_task_id=task_id, message_id=message_id)
+    if message is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mensaje de chat no encontrado para el CareTask indicado.",
+        )
+    return message
+
+
 @router.get(
     "/{task_id}/chat/memory",
     response_model=CareTaskClinicalChatMemoryResponse,
@@ -27,6 +27,7 @@ class Settings(BaseSettings):
     LOGIN_WINDOW_MINUTES: int = 5
     LOGIN_BLOCK_MINUTES: int = 10
     AI_TRIAGE_MODE: str = "rules"
+    AGENT_METRICS_SNAPSHOT_TTL_SECONDS: float = 15.0
     CLINICAL_CHAT_WEB_ENABLED: bool = True
     CLINICAL_CHAT_WEB_TIMEOUT_SECONDS: int = 6
     CLINICAL_CHAT_WEB_STRICT_WHITELIST: bool = True
@@ -65,21 +66,43 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_CHUNK_DECONTEXTUALIZE: bool = True
     CLINICAL_CHAT_CHUNK_DECONTEXT_MAX_PREFIX_CHARS: int = 180
     CLINICAL_CHAT_REQUIRE_VALIDATED_INTERNAL_SOURCES: bool = True
+    CLINICAL_CHAT_STREAM_HEARTBEAT_SECONDS: int = 15
+    CLINICAL_CHAT_ASYNC_WORKERS: int = 2
+    CLINICAL_CHAT_ASYNC_MAX_QUEUED_JOBS: int = 200
+    CLINICAL_CHAT_ASYNC_RETRY_AFTER_SECONDS: int = 5
+    CLINICAL_CHAT_ASYNC_POLL_SECONDS: float = 2.0
+    CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS: int = 600
+    CLINICAL_CHAT_ASYNC_MAX_ATTEMPTS: int = 2
+    CLINICAL_CHAT_ASYNC_JOB_TTL_MINUTES: int = 120
+    CLINICAL_CHAT_ASYNC_RESUME_ON_STARTUP: bool = True
+    CLINICAL_CHAT_SPECULATIVE_ANSWER_ENABLED: bool = False
+    CLINICAL_CHAT_SPECULATIVE_STREAM_WAIT_SECONDS: float = 60.0
     CLINICAL_CHAT_LLM_ENABLED: bool = False
     CLINICAL_CHAT_LLM_PROVIDER: str = "ollama"
     CLINICAL_CHAT_LLM_BASE_URL: str = "http://127.0.0.1:11434"
+    CLINICAL_CHAT_LLM_BACKEND_URLS: str = ""
+    CLINICAL_CHAT_LLM_BACKEND_MAX_CONCURRENCY: int = 2
+    CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE: int = 16
+    CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS: float = 20.0
     CLINICAL_CHAT_LLM_API_KEY: str = ""
     CLINICAL_CHAT_LLM_MODEL: str = "llama3.2:3b"
     CLINICAL_CHAT_LLM_TIMEOUT_SECONDS: int = 9
+    CLINICAL_CHAT_LLM_ANSWER_CACHE_ENABLED: bool = True
+    CLINICAL_CHAT_LLM_ANSWER_CACHE_TTL_SECONDS: int = 1800
+    CLINICAL_CHAT_LLM_ANSWER_CACHE_MAX_ENTRIES: int = 512
+    CLINICAL_CHAT_LLM_ANSWER_CACHE_NEAR_MATCH_ENABLED: bool = False
+    CLINICAL_CHAT_LLM_ANSWER_CACHE_NEAR_MATCH_MIN_SIMILARITY: float = 0.95
     CLINICAL_CHAT_LLM_MAX_OUTPUT_TOKENS: int = 80
     CLINICAL_CHAT_LLM_MAX_INPUT_TOKENS: int = 320
     CLINICAL_CHAT_LLM_PROMPT_MARGIN_TOKENS: int = 80
+    CLINICAL_CHAT_LLM_TOKENIZER_PATH: str = ""
     CLINICAL_CHAT_LLM_TEMPERATURE: float = 0.1
     CLINICAL_CHAT_LLM_NUM_CTX: int = 896
     CLINICAL_CHAT_LLM_TOP_P: float = 0.9
     CLINICAL_CHAT_LLM_MAX_DIALOGUE_TURNS: int = 3
     CLINICAL_CHAT_LLM_MAX_CONTEXT_UTILIZATION_RATIO: float = 0.40
     CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED: bool = True
+    CLINICAL_CHAT_LLM_STABLE_PROMPT_PREFIX_ENABLED: bool = True
     CLINICAL_CHAT_LLM_REWRITE_ENABLED: bool = True
     CLINICAL_CHAT_LLM_QUALITY_GATES_ENABLED: bool = True
     CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_ENABLED: bool = True
@@ -130,11 +153,21 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_SVM_DOMAIN_EPOCHS: int = 12
     CLINICAL_CHAT_SVM_DOMAIN_MIN_CONFIDENCE: float = 0.10
     CLINICAL_CHAT_SVM_DOMAIN_RERANK_WHEN_MATH_UNCERTAIN_ONLY: bool = True
+    CLINICAL_CHAT_DOMAIN_MODEL_REGISTRY_DIR: str = ""
+    CLINICAL_CHAT_DOMAIN_MODEL_REGISTRY_WARMUP: bool = True
+    CLINICAL_CHAT_ANALYZER_PARALLEL_ENABLED: bool = True
+    CLINICAL_CHAT_ANALYZER_MAX_WORKERS: int = 8
+    CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS: int = 1500
+    CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS: int = 3000
     CLINICAL_CHAT_RAG_ENABLED: bool = False
     CLINICAL_CHAT_RAG_MAX_CHUNKS: int = 2
     CLINICAL_CHAT_RAG_VECTOR_WEIGHT: float = 0.5
     CLINICAL_CHAT_RAG_KEYWORD_WEIGHT: float = 0.5
     CLINICAL_CHAT_RAG_EMBEDDING_MODEL: str = "nomic-embed-text"
+    CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE: int = 32
+    CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT: int = 4
+    CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH: str = ".ollama_cache/embeddings.sqlite3"
+    CLINICAL_CHAT_RAG_EMBEDDING_CACHE_MAX_ENTRIES: int = 500000
     CLINICAL_CHAT_RAG_ENABLE_GATEKEEPER: bool = True
     CLINICAL_CHAT_RAG_EXTRACTIVE_FALLBACK_ENABLED: bool = True
     CLINICAL_CHAT_RAG_EXTRACTIVE_FALLBACK_MAX_ITEMS: int = 5
@@ -147,6 +180,9 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_QUERY_CACHE_ENABLED: bool = True
     CLINICAL_CHAT_RAG_QUERY_CACHE_TTL_SECONDS: int = 300
     CLINICAL_CHAT_RAG_QUERY_CACHE_MAX_ENTRIES: int = 256
+    CLINICAL_CHAT_RAG_QUERY_CACHE_BACKEND: str = "memory"
+    CLINICAL_CHAT_RAG_QUERY_CACHE_REDIS_URL: str = ""
+    CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS: int = 5
     CLINICAL_CHAT_RAG_DISCOURSE_COHERENCE_ENABLED: bool = True
     CLINICAL_CHAT_RAG_DISCOURSE_MIN_SCORE: float = 0.24
     CLINICAL_CHAT_RAG_DISCOURSE_MAX_SATELLITE_RATIO: float = 0.60
@@ -173,6 +209,9 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_MAX_TOTAL_LATENCY_MS: int = 3000
     CLINICAL_CHAT_RAG_LLM_MIN_REMAINING_BUDGET_MS: int = 700
     CLINICAL_CHAT_RAG_PARALLEL_HYBRID_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_MULTI_QUERY_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_MULTI_INTENT_PARALLEL_BACKENDS: bool = True
+    CLINICAL_CHAT_RAG_MULTI_INTENT_MAX_WORKERS: int = 4
     CLINICAL_CHAT_RAG_FAITHFULNESS_MIN_RATIO: float = 0.20
     CLINICAL_CHAT_RAG_CONTEXT_MIN_RATIO: float = 0.08
     CLINICAL_CHAT_RAG_ADAPTIVE_K_ENABLED: bool = True
@@ -185,12 +224,17 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_COMPRESS_MAX_CHARS: int = 280
     CLINICAL_CHAT_RAG_CONTEXT_PACKS_ENABLED: bool = True
     CLINICAL_CHAT_RAG_CONTEXT_PACK_RADIUS: int = 1
+    CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_DOCUMENTS: int = 256
+    CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_TTL_SECONDS: int = 300
     CLINICAL_CHAT_RAG_CONTEXT_TOP_SENTENCES_PER_CHUNK: int = 2
     CLINICAL_CHAT_RAG_CONTEXT_MAX_SENTENCES_TOTAL: int = 8
     CLINICAL_CHAT_RAG_CONTEXT_MIN_SENTENCE_RELEVANCE: float = 0.20
     CLINICAL_CHAT_RAG_CONTEXT_EMPTY_ON_LOW_RELEVANCE: bool = True
     CLINICAL_CHAT_RAG_FTS_CANDIDATE_ENABLED: bool = True
     CLINICAL_CHAT_RAG_FTS_CANDIDATE_POOL: int = 88
+    CLINICAL_CHAT_RAG_FTS_REBUILD_ON_REQUEST: bool = False
+    CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS: int = 2000
+    CLINICAL_CHAT_RAG_FTS_WARMUP_ON_STARTUP: bool = True
     CLINICAL_CHAT_RAG_SKIP_DOMAIN_SEARCH_TOKENS_OVER: int = 12
     CLINICAL_CHAT_RAG_DETERMINISTIC_ROUTING_ENABLED: bool = True
     CLINICAL_CHAT_RAG_DETERMINISTIC_COMPLEX_MIN_TOKENS: int = 10
@@ -204,6 +248,8 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_WILDCARD_ENABLED: bool = True
     CLINICAL_CHAT_RAG_WILDCARD_MAX_EXPANSIONS: int = 16
     CLINICAL_CHAT_RAG_KGRAM_SIZE: int = 3
+    CLINICAL_CHAT_RAG_WILDCARD_INDEX_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_WILDCARD_INDEX_INLINE_MAX_TERMS: int = 50000
     CLINICAL_CHAT_RAG_KGRAM_JACCARD_MIN: float = 0.18
     CLINICAL_CHAT_RAG_SOUNDEX_ENABLED: bool = True
     CLINICAL_CHAT_RAG_CONTEXTUAL_SPELL_ENABLED: bool = True
@@ -211,6 +257,9 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_VOCAB_CACHE_ENABLED: bool = True
     CLINICAL_CHAT_RAG_VOCAB_CACHE_MAX_TERMS: int = 120000
     CLINICAL_CHAT_RAG_VOCAB_CACHE_TTL_SECONDS: int = 600
+    CLINICAL_CHAT_RAG_SPELL_INDEX_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_SPELL_INDEX_PREFIX_LENGTH: int = 7
+    CLINICAL_CHAT_RAG_SPELL_BIGRAM_MAX_ENTRIES: int = 250000
     CLINICAL_CHAT_RAG_POSTINGS_CACHE_ENABLED: bool = True
     CLINICAL_CHAT_RAG_POSTINGS_CACHE_MAX_ENTRIES: int = 4000
     CLINICAL_CHAT_RAG_POSTINGS_CACHE_TTL_SECONDS: int = 600
@@ -259,11 +308,33 @@ class Settings(BaseSettings):
     CLINICAL_CHAT_RAG_LSI_BLEND: float = 0.20
     CLINICAL_CHAT_RAG_LSI_MAX_VOCAB_TERMS: int = 600
     CLINICAL_CHAT_RAG_LSI_MIN_DOCS: int = 4
+    CLINICAL_CHAT_RAG_LSI_MODEL_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_LSI_MODEL_DIR: str = ".rag_index/lsi"
+    CLINICAL_CHAT_RAG_LSI_MODEL_VOCAB_TERMS: int = 3000
+    CLINICAL_CHAT_RAG_LSI_MODEL_MIN_DF: int = 2
+    CLINICAL_CHAT_RAG_LSI_MODEL_PER_SPECIALTY: bool = False
+    CLINICAL_CHAT_RAG_LSI_MODEL_MIN_SPECIALTY_DOCS: int = 200
     CLINICAL_CHAT_RAG_SKIP_POINTERS_ENABLED: bool = True
     CLINICAL_CHAT_RAG_SKIP_POINTERS_MIN_LIST: int = 96
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR: str = ".rag_index/vectors"
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_ENABLED: bool = False
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES: int = 20000
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST: int = 256
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE: int = 16
+    CLINICAL_CHAT_RAG_VECTOR_INDEX_COMPACT_DEAD_RATIO: float = 0.25
+    CLINICAL_CHAT_RAG_TERM_STATS_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_TERM_STATS_PATH: str = ".rag_index/term_stats.sqlite3"
+    CLINICAL_CHAT_RAG_TERM_STATS_GLOBAL_ENABLED: bool = False
+    CLINICAL_CHAT_RAG_POSTINGS_STORE_ENABLED: bool = True
+    CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR: str = ".rag_index/postings"
+    CLINICAL_CHAT_RAG_POSTINGS_STORE_BLOCK_SIZE: int = 128
+    CLINICAL_CHAT_RAG_LIGHT_CANDIDATES_ENABLED: bool = True
     CLINICAL_CHAT_RAG_RETRIEVER_BACKEND: str = "legacy"
     CLINICAL_CHAT_RAG_LLAMAINDEX_CANDIDATE_POOL: int = 120
     CLINICAL_CHAT_RAG_CHROMA_CANDIDATE_POOL: int = 200
+    CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR: str = ".rag_index/llamaindex"
+    CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR: str = ".rag_index/chroma"
     CLINICAL_CHAT_RAG_ELASTIC_URL: str = "http://127.0.0.1:9200"
     CLINICAL_CHAT_RAG_ELASTIC_INDEX: str = "clinical_chunks"
     CLINICAL_CHAT_RAG_ELASTIC_TIMEOUT_SECONDS: int = 2
@@ -311,6 +382,8 @@ class Settings(BaseSettings):
     def validate_security_baseline(self):
         if self.AI_TRIAGE_MODE not in {"rules", "hybrid"}:
             raise ValueError("AI_TRIAGE_MODE debe ser 'rules' o 'hybrid'.")
+        if not (0.0 <= self.AGENT_METRICS_SNAPSHOT_TTL_SECONDS <= 3600.0):
+            raise ValueError("AGENT_METRICS_SNAPSHOT_TTL_SECONDS debe estar entre 0 y 3600.")
         if self.CLINICAL_CHAT_WEB_TIMEOUT_SECONDS < 1:
             raise ValueError("CLINICAL_CHAT_WEB_TIMEOUT_SECONDS debe ser >= 1.")
         if self.CLINICAL_CHAT_WEB_STRICT_WHITELIST and not self.CLINICAL_CHAT_WEB_ALLOWED_DOMAINS:
@@ -407,8 +480,57 @@ class Settings(BaseSettings):
             )
         if self.CLINICAL_CHAT_LLM_PROVIDER not in {"ollama", "llama_cpp"}:
             raise ValueError("CLINICAL_CHAT_LLM_PROVIDER debe ser 'ollama' o 'llama_cpp'.")
+        if not (1 <= self.CLINICAL_CHAT_STREAM_HEARTBEAT_SECONDS <= 120):
+            raise ValueError("CLINICAL_CHAT_STREAM_HEARTBEAT_SECONDS debe estar entre 1 y 120.")
+        if not (1 <= self.CLINICAL_CHAT_ASYNC_WORKERS <= 32):
+            raise ValueError("CLINICAL_CHAT_ASYNC_WORKERS debe estar entre 1 y 32.")
+        if not (1 <= self.CLINICAL_CHAT_ASYNC_MAX_QUEUED_JOBS <= 100000):
+            raise ValueError("CLINICAL_CHAT_ASYNC_MAX_QUEUED_JOBS debe estar entre 1 y 100000.")
+        if not (1 <= self.CLINICAL_CHAT_ASYNC_RETRY_AFTER_SECONDS <= 300):
+            raise ValueError("CLINICAL_CHAT_ASYNC_RETRY_AFTER_SECONDS debe estar entre 1 y 300.")
+        if not (0.05 <= self.CLINICAL_CHAT_ASYNC_POLL_SECONDS <= 60.0):
+            raise ValueError("CLINICAL_CHAT_ASYNC_POLL_SECONDS debe estar entre 0.05 y 60.")
+        if not (10 <= self.CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS <= 86400):
+            raise ValueError("CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS debe estar entre 10 y 86400.")
+        if not (1 <= self.CLINICAL_CHAT_ASYNC_MAX_ATTEMPTS <= 10):
+            raise ValueError("CLINICAL_CHAT_ASYNC_MAX_ATTEMPTS debe estar entre 1 y 10.")
+        if not (1 <= self.CLINICAL_CHAT_ASYNC_JOB_TTL_MINUTES <= 10080):
+            raise ValueError("CLINICAL_CHAT_ASYNC_JOB_TTL_MINUTES debe estar entre 1 y 10080.")
+        if not (0.0 <= self.CLINICAL_CHAT_SPECULATIVE_STREAM_WAIT_SECONDS <= 600.0):
+            raise ValueError(
+                "CLINICAL_CHAT_SPECULATIVE_STREAM_WAIT_SECONDS debe estar entre 0 y 600."
+            )
         if self.CLINICAL_CHAT_LLM_TIMEOUT_SECONDS < 2:
             raise ValueError("CLINICAL_CHAT_LLM_TIMEOUT_SECONDS debe ser >= 2.")
+        for backend_url in self.CLINICAL_CHAT_LLM_BACKEND_URLS.split(","):
+            if backend_url.strip() and not backend_url.strip().startswith(
+                ("http://", "https://")
+            ):
+                raise ValueError(
+                    "CLINICAL_CHAT_LLM_BACKEND_URLS debe ser una lista de URLs http(s) "
+                    "separadas por comas."
+                )
+        if not (1 <= self.CLINICAL_CHAT_LLM_BACKEND_MAX_CONCURRENCY <= 64):
+            raise ValueError("CLINICAL_CHAT_LLM_BACKEND_MAX_CONCURRENCY debe estar entre 1 y 64.")
+        if not (0 <= self.CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE <= 1000):
+            raise ValueError("CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE debe estar entre 0 y 1000.")
+        if not (0.0 <= self.CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS <= 300.0):
+            raise ValueError(
+                "CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS debe estar entre 0 y 300."
+            )
+        if not (30 <= self.CLINICAL_CHAT_LLM_ANSWER_CACHE_TTL_SECONDS <= 86400):
+            raise ValueError(
+                "CLINICAL_CHAT_LLM_ANSWER_CACHE_TTL_SECONDS debe estar entre 30 y 86400."
+            )
+        if not (16 <= self.CLINICAL_CHAT_LLM_ANSWER_CACHE_MAX_ENTRIES <= 10000):
+            raise ValueError(
+                "CLINICAL_CHAT_LLM_ANSWER_CACHE_MAX_ENTRIES debe estar entre 16 y 10000."
+            )
+        if not (0.80 <= self.CLINICAL_CHAT_LLM_ANSWER_CACHE_NEAR_MATCH_MIN_SIMILARITY <= 1.0):
+            raise ValueError(
+                "CLINICAL_CHAT_LLM_ANSWER_CACHE_NEAR_MATCH_MIN_SIMILARITY "
+                "debe estar entre 0.80 y 1.0."
+            )
         if not (0 <= self.CLINICAL_CHAT_LLM_MAX_DIALOGUE_TURNS <= 10):
             raise ValueError("CLINICAL_CHAT_LLM_MAX_DIALOGUE_TURNS debe estar entre 0 y 10.")
         if not (0.20 <= self.CLINICAL_CHAT_LLM_MAX_CONTEXT_UTILIZATION_RATIO <= 0.80):
@@ -433,6 +555,12 @@ class Settings(BaseSettings):
             raise ValueError("CLINICAL_CHAT_LLM_MAX_INPUT_TOKENS debe ser >= 256.")
         if self.CLINICAL_CHAT_LLM_PROMPT_MARGIN_TOKENS < 32:
             raise ValueError("CLINICAL_CHAT_LLM_PROMPT_MARGIN_TOKENS debe ser >= 32.")
+        tokenizer_path = self.CLINICAL_CHAT_LLM_TOKENIZER_PATH.strip()
+        if tokenizer_path and not tokenizer_path.lower().endswith(".json"):
+            raise ValueError(
+                "CLINICAL_CHAT_LLM_TOKENIZER_PATH debe apuntar a un tokenizer.json local "
+                "o quedar vacio."
+            )
         if self.CLINICAL_CHAT_LLM_NUM_CTX < 512:
             raise ValueError("CLINICAL_CHAT_LLM_NUM_CTX debe ser >= 512.")
         if self.CLINICAL_CHAT_LLM_NUM_CTX <= (
@@ -565,6 +693,21 @@ class Settings(BaseSettings):
             raise ValueError("CLINICAL_CHAT_SVM_DOMAIN_EPOCHS debe estar entre 1 y 100.")
         if not (0 <= self.CLINICAL_CHAT_SVM_DOMAIN_MIN_CONFIDENCE <= 1):
             raise ValueError("CLINICAL_CHAT_SVM_DOMAIN_MIN_CONFIDENCE debe estar entre 0 y 1.")
+        if not (1 <= self.CLINICAL_CHAT_ANALYZER_MAX_WORKERS <= 32):
+            raise ValueError("CLINICAL_CHAT_ANALYZER_MAX_WORKERS debe estar entre 1 y 32.")
+        if not (10 <= self.CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS <= 60000):
+            raise ValueError(
+                "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS debe estar entre 10 y 60000."
+            )
+        if not (
+            self.CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS
+            <= self.CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS
+            <= 120000
+        ):
+            raise ValueError(
+                "CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS debe estar entre "
+                "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS y 120000."
+            )
         if not (1 <= self.CLINICAL_CHAT_RAG_MAX_CHUNKS <= 20):
             raise ValueError("CLINICAL_CHAT_RAG_MAX_CHUNKS debe estar entre 1 y 20.")
         if not (0 <= self.CLINICAL_CHAT_RAG_FAITHFULNESS_MIN_RATIO <= 1):
@@ -593,6 +736,14 @@ class Settings(BaseSettings):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_QUERY_CACHE_MAX_ENTRIES debe estar entre 16 y 10000."
             )
+        if self.CLINICAL_CHAT_RAG_QUERY_CACHE_BACKEND not in {"memory", "redis"}:
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_QUERY_CACHE_BACKEND debe ser 'memory' o 'redis'."
+            )
+        if not (0 <= self.CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS <= 3600):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS debe estar entre 0 y 3600."
+            )
         if not (0 <= self.CLINICAL_CHAT_RAG_DISCOURSE_MIN_SCORE <= 1):
             raise ValueError("CLINICAL_CHAT_RAG_DISCOURSE_MIN_SCORE debe estar entre 0 y 1.")
         if not (0 <= self.CLINICAL_CHAT_RAG_DISCOURSE_MAX_SATELLITE_RATIO <= 1):
@@ -686,6 +837,14 @@ class Settings(BaseSettings):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_CONTEXT_PACK_RADIUS debe estar entre 0 y 3."
             )
+        if not (0 <= self.CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_DOCUMENTS <= 100000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_DOCUMENTS debe estar entre 0 y 100000."
+            )
+        if not (1 <= self.CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_TTL_SECONDS <= 86400):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_TTL_SECONDS debe estar entre 1 y 86400."
+            )
         if self.CLINICAL_CHAT_RAG_CONTEXT_COMPRESS_MODE not in {"overlap", "extractive"}:
             raise ValueError(
                 "CLINICAL_CHAT_RAG_CONTEXT_COMPRESS_MODE debe ser 'overlap' o 'extractive'."
@@ -706,6 +865,10 @@ class Settings(BaseSettings):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_FTS_CANDIDATE_POOL debe estar entre 20 y 4000."
             )
+        if not (0 <= self.CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS <= 1000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS debe estar entre 0 y 1000000."
+            )
         if not (4 <= self.CLINICAL_CHAT_RAG_SKIP_DOMAIN_SEARCH_TOKENS_OVER <= 200):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_SKIP_DOMAIN_SEARCH_TOKENS_OVER debe estar entre 4 y 200."
@@ -741,6 +904,14 @@ class Settings(BaseSettings):
             )
         if not (2 <= self.CLINICAL_CHAT_RAG_KGRAM_SIZE <= 4):
             raise ValueError("CLINICAL_CHAT_RAG_KGRAM_SIZE debe estar entre 2 y 4.")
+        if not (1 <= self.CLINICAL_CHAT_RAG_MULTI_INTENT_MAX_WORKERS <= 16):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_MULTI_INTENT_MAX_WORKERS debe estar entre 1 y 16."
+            )
+        if not (0 <= self.CLINICAL_CHAT_RAG_WILDCARD_INDEX_INLINE_MAX_TERMS <= 5000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_WILDCARD_INDEX_INLINE_MAX_TERMS debe estar entre 0 y 5000000."
+            )
         if not (0.05 <= self.CLINICAL_CHAT_RAG_KGRAM_JACCARD_MIN <= 0.95):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_KGRAM_JACCARD_MIN debe estar entre 0.05 y 0.95."
@@ -757,6 +928,14 @@ class Settings(BaseSettings):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_VOCAB_CACHE_TTL_SECONDS debe estar entre 30 y 86400."
             )
+        if not (4 <= self.CLINICAL_CHAT_RAG_SPELL_INDEX_PREFIX_LENGTH <= 16):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_SPELL_INDEX_PREFIX_LENGTH debe estar entre 4 y 16."
+            )
+        if not (0 <= self.CLINICAL_CHAT_RAG_SPELL_BIGRAM_MAX_ENTRIES <= 5000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_SPELL_BIGRAM_MAX_ENTRIES debe estar entre 0 y 5000000."
+            )
         if not (100 <= self.CLINICAL_CHAT_RAG_POSTINGS_CACHE_MAX_ENTRIES <= 200000):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_POSTINGS_CACHE_MAX_ENTRIES debe estar entre 100 y 200000."
@@ -869,10 +1048,57 @@ class Settings(BaseSettings):
             )
         if not (2 <= self.CLINICAL_CHAT_RAG_LSI_MIN_DOCS <= 200):
             raise ValueError("CLINICAL_CHAT_RAG_LSI_MIN_DOCS debe estar entre 2 y 200.")
+        if not self.CLINICAL_CHAT_RAG_LSI_MODEL_DIR.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_LSI_MODEL_DIR no puede estar vacio.")
+        if not (64 <= self.CLINICAL_CHAT_RAG_LSI_MODEL_VOCAB_TERMS <= 8000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_LSI_MODEL_VOCAB_TERMS debe estar entre 64 y 8000."
+            )
+        if not (1 <= self.CLINICAL_CHAT_RAG_LSI_MODEL_MIN_DF <= 1000):
+            raise ValueError("CLINICAL_CHAT_RAG_LSI_MODEL_MIN_DF debe estar entre 1 y 1000.")
+        if not (10 <= self.CLINICAL_CHAT_RAG_LSI_MODEL_MIN_SPECIALTY_DOCS <= 1000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_LSI_MODEL_MIN_SPECIALTY_DOCS debe estar entre 10 y 1000000."
+            )
         if not (16 <= self.CLINICAL_CHAT_RAG_SKIP_POINTERS_MIN_LIST <= 4096):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_SKIP_POINTERS_MIN_LIST debe estar entre 16 y 4096."
             )
+        if not self.CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR no puede estar vacio.")
+        if not (1000 <= self.CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES <= 10000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES debe estar entre 1000 y "
+                "10000000."
+            )
+        if not (4 <= self.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST <= 65536):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST debe estar entre 4 y 65536."
+            )
+        if not (1 <= self.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE <= 4096):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE debe estar entre 1 y 4096."
+            )
+        if (
+            self.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE
+            > self.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST
+        ):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE no puede superar "
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST."
+            )
+        if not (0.05 <= self.CLINICAL_CHAT_RAG_VECTOR_INDEX_COMPACT_DEAD_RATIO <= 0.95):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_VECTOR_INDEX_COMPACT_DEAD_RATIO debe estar entre 0.05 y 0.95."
+            )
+        if not self.CLINICAL_CHAT_RAG_TERM_STATS_PATH.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_TERM_STATS_PATH no puede estar vacio.")
+        if not self.CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR no puede estar vacio.")
+        if not (16 <= self.CLINICAL_CHAT_RAG_POSTINGS_STORE_BLOCK_SIZE <= 4096):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_POSTINGS_STORE_BLOCK_SIZE debe estar entre 16 y 4096."
+            )
         if self.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND not in {
             "legacy",
             "llamaindex",
@@ -891,6 +1117,10 @@ class Settings(BaseSettings):
             raise ValueError(
                 "CLINICAL_CHAT_RAG_CHROMA_CANDIDATE_POOL debe estar entre 20 y 2000."
             )
+        if not self.CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR no puede estar vacio.")
+        if not self.CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR no puede estar vacio.")
         if not self.CLINICAL_CHAT_RAG_ELASTIC_URL.strip():
             raise ValueError("CLINICAL_CHAT_RAG_ELASTIC_URL no puede estar vacio.")
         if not self.CLINICAL_CHAT_RAG_ELASTIC_INDEX.strip():
@@ -917,6 +1147,16 @@ class Settings(BaseSettings):
             raise ValueError("La suma de pesos RAG debe ser mayor que 0.")
         if not self.CLINICAL_CHAT_RAG_EMBEDDING_MODEL.strip():
             raise ValueError("CLINICAL_CHAT_RAG_EMBEDDING_MODEL no puede estar vacio.")
+        if not (1 <= self.CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE <= 512):
+            raise ValueError("CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE debe estar entre 1 y 512.")
+        if not (1 <= self.CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT <= 32):
+            raise ValueError("CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT debe estar entre 1 y 32.")
+        if not self.CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH.strip():
+            raise ValueError("CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH no puede estar vacio.")
+        if not (0 <= self.CLINICAL_CHAT_RAG_EMBEDDING_CACHE_MAX_ENTRIES <= 50000000):
+            raise ValueError(
+                "CLINICAL_CHAT_RAG_EMBEDDING_CACHE_MAX_ENTRIES debe estar entre 0 y 50000000."
+            )
         if not self.CLINICAL_CHAT_GUARDRAILS_CONFIG_PATH.strip():
             raise ValueError("CLINICAL_CHAT_GUARDRAILS_CONFIG_PATH no puede estar vacio.")
         if self.ENVIRONMENT != "development":
@@ -58,6 +58,7 @@ def init_db():
     from app.models.agent_run import AgentRun, AgentStep  # noqa: F401
     from app.models.auth_session import AuthSession  # noqa: F401
     from app.models.care_task_chat_message import CareTaskChatMessage  # noqa: F401
+    from app.models.clinical_chat_job import ClinicalChatJob  # noqa: F401
     from app.models.clinical_document import ClinicalDocument  # noqa: F401
     from app.models.clinical_knowledge_source import ClinicalKnowledgeSource  # noqa: F401
     from app.models.clinical_knowledge_source_validation import (  # noqa: F401
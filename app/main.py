@@ -22,7 +22,15 @@ from app.api import (
     tasks_router,
 )
 from app.core.config import settings
+from app.core.database import engine
 from app.metrics.agent_metrics import register_agent_metrics
+from app.metrics.chat_job_metrics import register_chat_job_metrics
+from app.metrics.llm_gateway_metrics import register_llm_gateway_metrics
+from app.metrics.rag_cache_metrics import register_rag_cache_metrics
+from app.services.clinical_analyzer_engine import ClinicalAnalyzerEngine
+from app.services.clinical_chat_async_service import ClinicalChatAsyncService
+from app.services.clinical_chat_service import ClinicalChatService
+from app.services.rag_fts_index import FTSIndexManager
 
 logger.remove()
 logger_format = (
@@ -39,7 +47,29 @@ async def lifespan(_: FastAPI):
     """Hooks de ciclo de vida de la aplicacion."""
     logger.info(f"Iniciando {settings.APP_NAME}...")
     logger.info("Documentacion disponible en /docs")
+    if settings.CLINICAL_CHAT_DOMAIN_MODEL_REGISTRY_WARMUP:
+        try:
+            timings = ClinicalChatService.warm_up_domain_models()
+            logger.info(f"Clasificadores de dominio listos: {timings}")
+        except Exception as exc:  # pragma: no cover - el chat reentrena bajo demanda
+            logger.warning(f"Precalentamiento de clasificadores fallido: {exc}")
+    if (
+        settings.CLINICAL_CHAT_RAG_FTS_WARMUP_ON_STARTUP
+        and settings.CLINICAL_CHAT_RAG_FTS_CANDIDATE_ENABLED
+        and FTSIndexManager.is_supported(engine)
+    ):
+        # Valida (y si hace falta reconstruye) el indice FTS sin bloquear el arranque.
+        FTSIndexManager.schedule_rebuild(engine)
+    if settings.CLINICAL_CHAT_ASYNC_RESUME_ON_STARTUP:
+        try:
+            pending = ClinicalChatAsyncService.resume_pending_jobs()
+            if pending:
+                logger.info(f"Chat asincrono: {pending} trabajos pendientes reanudados")
+        except Exception as exc:  # pragma: no cover - el pool arranca con el primer encolado
+            logger.warning(f"No se pudieron reanudar trabajos de chat asincrono: {exc}")
     yield
+    ClinicalChatAsyncService.shutdown(timeout=2.0)
+    ClinicalAnalyzerEngine.shutdown()
     logger.info(f"Cerrando {settings.APP_NAME}...")
 
 
@@ -88,6 +118,9 @@ app.add_middleware(
 )
 
 register_agent_metrics()
+register_rag_cache_metrics()
+register_chat_job_metrics()
+register_llm_gateway_metrics()
 instrumentator = Instrumentator(
     should_group_status_codes=False,
     should_ignore_untemplated=True,
@@ -0,0 +1,74 @@
+from prometheus_client import Gauge
+
+from app.services.clinical_chat_async_service import ClinicalChatAsyncService
+
+CLINICAL_CHAT_JOBS_QUEUED = Gauge(
+    "clinical_chat_jobs_queued",
+    "Trabajos de chat asincrono en cola (todos los nodos).",
+)
+CLINICAL_CHAT_JOBS_RUNNING = Gauge(
+    "clinical_chat_jobs_running",
+    "Trabajos de chat asincrono en ejecucion (todos los nodos).",
+)
+CLINICAL_CHAT_JOB_WORKERS = Gauge(
+    "clinical_chat_job_workers",
+    "Workers de chat asincrono vivos en este proceso.",
+)
+CLINICAL_CHAT_JOBS_REJECTED_TOTAL = Gauge(
+    "clinical_chat_jobs_rejected_total",
+    "Trabajos rechazados por backpressure (cola llena) en este proceso.",
+)
+CLINICAL_CHAT_JOBS_COMPLETED_TOTAL = Gauge(
+    "clinical_chat_jobs_completed_total",
+    "Trabajos de chat asincrono completados por este proceso.",
+)
+CLINICAL_CHAT_JOBS_FAILED_TOTAL = Gauge(
+    "clinical_chat_jobs_failed_total",
+    "Trabajos de chat asincrono fallidos en este proceso.",
+)
+CLINICAL_CHAT_JOB_WAIT_MS_AVG = Gauge(
+    "clinical_chat_job_wait_ms_avg",
+    "Espera media en cola (ms) de los trabajos reclamados por este proceso.",
+)
+CLINICAL_CHAT_JOB_WAIT_MS_MAX = Gauge(
+    "clinical_chat_job_wait_ms_max",
+    "Espera maxima en cola (ms) de los trabajos reclamados por este proceso.",
+)
+CLINICAL_CHAT_JOB_RUN_MS_AVG = Gauge(
+    "clinical_chat_job_run_ms_avg",
+    "Duracion media de ejecucion (ms) de los trabajos de este proceso.",
+)
+CLINICAL_CHAT_JOB_RUN_MS_MAX = Gauge(
+    "clinical_chat_job_run_ms_max",
+    "Duracion maxima de ejecucion (ms) de los trabajos de este proceso.",
+)
+
+_REGISTERED = False
+
+
+def _read_snapshot_value(key: str, nested: str | None = None) -> float:
+    try:
+        snapshot = ClinicalChatAsyncService.metrics_snapshot()
+        value = snapshot.get(key, 0) if nested is None else snapshot.get(key, {}).get(nested, 0)
+        return float(value or 0)
+    except Exception:
+        return 0.0
+
+
+def register_chat_job_metrics() -> None:
+    """Expone profundidad de cola y tiempos del chat asincrono en cada scrape."""
+    global _REGISTERED
+    if _REGISTERED:
+        return
+
+    CLINICAL_CHAT_JOBS_QUEUED.set_function(lambda: _read_snapshot_value("depth", "queued"))
+    CLINICAL_CHAT_JOBS_RUNNING.set_function(lambda: _read_snapshot_value("depth", "running"))
+    CLINICAL_CHAT_JOB_WORKERS.set_function(lambda: _read_snapshot_value("workers"))
+    CLINICAL_CHAT_JOBS_REJECTED_TOTAL.set_function(lambda: _read_snapshot_value("rejected"))
+    CLINICAL_CHAT_JOBS_COMPLETED_TOTAL.set_function(lambda: _read_snapshot_value("completed"))
+    CLINICAL_CHAT_JOBS_FAILED_TOTAL.set_function(lambda: _read_snapshot_value("failed"))
+    CLINICAL_CHAT_JOB_WAIT_MS_AVG.set_function(lambda: _read_snapshot_value("wait_ms_avg"))
+    CLINICAL_CHAT_JOB_WAIT_MS_MAX.set_function(lambda: _read_snapshot_value("wait_ms_max"))
+    CLINICAL_CHAT_JOB_RUN_MS_AVG.set_function(lambda: _read_snapshot_value("run_ms_avg"))
+    CLINICAL_CHAT_JOB_RUN_MS_MAX.set_function(lambda: _read_snapshot_value("run_ms_max"))
+    _REGISTERED = True
@@ -0,0 +1,52 @@
+from prometheus_client import Gauge
+
+from app.services.llm_gateway import shared_llm_gateway_stats
+
+LLM_GATEWAY_BACKENDS = Gauge(
+    "llm_gateway_backends",
+    "Backends LLM configurados en la pasarela.",
+)
+LLM_GATEWAY_BACKENDS_OPEN = Gauge(
+    "llm_gateway_backends_open",
+    "Backends LLM con el circuit breaker abierto.",
+)
+LLM_GATEWAY_IN_FLIGHT = Gauge(
+    "llm_gateway_in_flight",
+    "Peticiones LLM en curso sumando todos los backends.",
+)
+LLM_GATEWAY_CAPACITY = Gauge(
+    "llm_gateway_capacity",
+    "Peticiones LLM concurrentes admitidas sumando todos los backends.",
+)
+LLM_GATEWAY_WAITING = Gauge(
+    "llm_gateway_waiting",
+    "Peticiones LLM esperando hueco en la cola de la pasarela.",
+)
+LLM_GATEWAY_SHED_TOTAL = Gauge(
+    "llm_gateway_shed_total",
+    "Peticiones LLM rechazadas por falta de capacidad (desviadas al fallback).",
+)
+
+_REGISTERED = False
+
+
+def _read_gateway_value(key: str) -> float:
+    try:
+        return float(shared_llm_gateway_stats().get(key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def register_llm_gateway_metrics() -> None:
+    """Expone carga, cola y rechazos de la pasarela LLM en cada scrape."""
+    global _REGISTERED
+    if _REGISTERED:
+        return
+
+    LLM_GATEWAY_BACKENDS.set_function(lambda: _read_gateway_value("backends"))
+    LLM_GATEWAY_BACKENDS_OPEN.set_function(lambda: _read_gateway_value("backends_open"))
+    LLM_GATEWAY_IN_FLIGHT.set_function(lambda: _read_gateway_value("in_flight"))
+    LLM_GATEWAY_CAPACITY.set_function(lambda: _read_gateway_value("capacity"))
+    LLM_GATEWAY_WAITING.set_function(lambda: _read_gateway_value("waiting"))
+    LLM_GATEWAY_SHED_TOTAL.set_function(lambda: _read_gateway_value("shed_total"))
+    _REGISTERED = True
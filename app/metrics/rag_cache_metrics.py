@@ -0,0 +1,110 @@
+from collections.abc import Callable
+
+from prometheus_client import REGISTRY, Gauge
+from prometheus_client.core import CounterMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from app.services.llm_answer_cache import shared_llm_answer_cache_stats
+from app.services.rag_query_cache import shared_query_cache_stats
+
+
+def _read_query_cache_value(key: str) -> float:
+    try:
+        return float(shared_query_cache_stats().get(key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _read_llm_answer_cache_value(key: str) -> float:
+    try:
+        return float(shared_llm_answer_cache_stats().get(key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _CacheStatsCounter(Collector):
+    """Contador acumulado de un cache compartido, leido de sus estadisticas en cada scrape."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self._name = name
+        self._documentation = documentation
+        self._read = read
+
+    def collect(self) -> list[Metric]:
+        return [CounterMetricFamily(self._name, self._documentation, value=self._read())]
+
+
+RAG_QUERY_CACHE_HITS_TOTAL = _CacheStatsCounter(
+    "rag_query_cache_hits",
+    "Aciertos del cache compartido de respuestas RAG (exactos + subset_prune).",
+    lambda: _read_query_cache_value("hits"),
+)
+RAG_QUERY_CACHE_SUBSET_HITS_TOTAL = _CacheStatsCounter(
+    "rag_query_cache_subset_hits",
+    "Aciertos del cache RAG resueltos por subset_prune via indice invertido.",
+    lambda: _read_query_cache_value("hits_subset"),
+)
+RAG_QUERY_CACHE_MISSES_TOTAL = _CacheStatsCounter(
+    "rag_query_cache_misses",
+    "Fallos del cache compartido de respuestas RAG.",
+    lambda: _read_query_cache_value("misses"),
+)
+RAG_QUERY_CACHE_EVICTIONS_TOTAL = _CacheStatsCounter(
+    "rag_query_cache_evictions",
+    "Entradas desalojadas del cache RAG por limite de tamano (LRU).",
+    lambda: _read_query_cache_value("evictions"),
+)
+RAG_QUERY_CACHE_INVALIDATIONS_TOTAL = _CacheStatsCounter(
+    "rag_query_cache_invalidations",
+    "Invalidaciones completas del cache RAG por cambios en document_chunks.",
+    lambda: _read_query_cache_value("invalidations"),
+)
+RAG_QUERY_CACHE_ENTRIES = Gauge(
+    "rag_query_cache_entries",
+    "Entradas vivas en el cache compartido de respuestas RAG.",
+)
+LLM_ANSWER_CACHE_HITS_TOTAL = _CacheStatsCounter(
+    "llm_answer_cache_hits",
+    "Aciertos del cache de respuestas LLM (exactos + casi-coincidencia).",
+    lambda: _read_llm_answer_cache_value("hits"),
+)
+LLM_ANSWER_CACHE_NEAR_HITS_TOTAL = _CacheStatsCounter(
+    "llm_answer_cache_near_hits",
+    "Aciertos del cache LLM resueltos por similitud de embedding de la consulta.",
+    lambda: _read_llm_answer_cache_value("hits_near"),
+)
+LLM_ANSWER_CACHE_MISSES_TOTAL = _CacheStatsCounter(
+    "llm_answer_cache_misses",
+    "Fallos del cache de respuestas LLM.",
+    lambda: _read_llm_answer_cache_value("misses"),
+)
+LLM_ANSWER_CACHE_ENTRIES = Gauge(
+    "llm_answer_cache_entries",
+    "Entradas vivas en el cache de respuestas LLM.",
+)
+
+_COUNTERS: tuple[_CacheStatsCounter, ...] = (
+    RAG_QUERY_CACHE_HITS_TOTAL,
+    RAG_QUERY_CACHE_SUBSET_HITS_TOTAL,
+    RAG_QUERY_CACHE_MISSES_TOTAL,
+    RAG_QUERY_CACHE_EVICTIONS_TOTAL,
+    RAG_QUERY_CACHE_INVALIDATIONS_TOTAL,
+    LLM_ANSWER_CACHE_HITS_TOTAL,
+    LLM_ANSWER_CACHE_NEAR_HITS_TOTAL,
+    LLM_ANSWER_CACHE_MISSES_TOTAL,
+)
+
+_REGISTERED = False
+
+
+def register_rag_cache_metrics() -> None:
+    """Expone contadores de los caches RAG y LLM compartidos leyendolos en cada scrape."""
+    global _REGISTERED
+    if _REGISTERED:
+        return
+
+    for counter in _COUNTERS:
+        REGISTRY.register(counter)
+    RAG_QUERY_CACHE_ENTRIES.set_function(lambda: _read_query_cache_value("entries"))
+    LLM_ANSWER_CACHE_ENTRIES.set_function(lambda: _read_llm_answer_cache_value("entries"))
+    _REGISTERED = True
@@ -12,6 +12,7 @@ from app.models.care_task_scasest_audit_log import CareTaskScasestAuditLog
 from app.models.care_task_screening_audit_log import CareTaskScreeningAuditLog
 from app.models.care_task_triage_audit_log import CareTaskTriageAuditLog
 from app.models.care_task_triage_review import CareTaskTriageReview
+from app.models.clinical_chat_job import ClinicalChatJob
 from app.models.clinical_document import ClinicalDocument
 from app.models.clinical_knowledge_source import ClinicalKnowledgeSource
 from app.models.clinical_knowledge_source_validation import ClinicalKnowledgeSourceValidation
@@ -26,6 +27,7 @@ __all__ = [
     "Task",
     "CareTask",
     "CareTaskChatMessage",
+    "ClinicalChatJob",
     "ClinicalDocument",
     "ClinicalKnowledgeSource",
     "ClinicalKnowledgeSourceValidation",
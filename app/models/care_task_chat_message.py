@@ -46,6 +46,10 @@ class CareTaskChatMessage(Base):
     memory_facts_used = Column(JSON, nullable=False, default=list)
     patient_history_facts_used = Column(JSON, nullable=False, default=list)
     extracted_facts = Column(JSON, nullable=False, default=list)
+    # Respuesta especulativa: "provisional" (extractiva, refinamiento LLM pendiente),
+    # "refined" (revision generada por el LLM) o "final".
+    answer_revision = Column(Integer, nullable=False, default=1, server_default="1")
+    answer_status = Column(String(16), nullable=False, default="final", server_default="final")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True),
@@ -0,0 +1,59 @@
+"""
+Modelo persistente de trabajos de chat clinico asincrono.
+
+La cola vive en base de datos para que cualquier worker (de este proceso o de
+otro nodo) pueda reclamar un trabajo y para que los trabajos encolados
+sobrevivan a un reinicio. El reclamo es un compare-and-set sobre `status`.
+"""
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class ClinicalChatJob(Base):
+    """Turno de chat encolado con prioridad, estado y tiempos de ejecucion."""
+
+    __tablename__ = "clinical_chat_jobs"
+    __table_args__ = (Index("ix_clinical_chat_jobs_status_priority", "status", "priority", "id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(40), nullable=False, unique=True, index=True)
+    care_task_id = Column(
+        Integer,
+        ForeignKey("care_tasks.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    session_id = Column(String(64), nullable=False)
+    user_id = Column(Integer, nullable=True)
+    payload = Column(JSON, nullable=False)
+    # 0 = critica ... 3 = baja; menor valor se atiende antes.
+    priority = Column(Integer, nullable=False, default=2, server_default="2")
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    worker_id = Column(String(80), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    message_id = Column(Integer, nullable=True)
+    agent_run_id = Column(Integer, nullable=True)
+    workflow_name = Column(String(80), nullable=True)
+    response_mode = Column(String(20), nullable=True)
+    tool_mode = Column(String(20), nullable=True)
+    quality_status = Column(String(20), nullable=True)
+    llm_used = Column(Boolean, nullable=True)
+    error = Column(String(240), nullable=True)
+
+    def __repr__(self):
+        return (
+            f"ClinicalChatJob(job_id='{self.job_id}', status='{self.status}', "
+            f"priority={self.priority})"
+        )
@@ -9,6 +9,8 @@ from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
+ChatAnswerStatus = Literal["final", "provisional", "refined"]
+
 
 class ClinicalLocalEvidenceItem(BaseModel):
     """Evidencia local adjunta por el profesional para enriquecer el contexto."""
@@ -59,6 +61,9 @@ class CareTaskClinicalChatMessageRequest(BaseModel):
     interrogation_max_turns: int = Field(default=3, ge=1, le=10)
     interrogation_confidence_threshold: float = Field(default=0.93, ge=0.5, le=0.99)
     local_evidence: list[ClinicalLocalEvidenceItem] = Field(default_factory=list, max_length=5)
+    # Respuesta en dos fases: extractiva inmediata y revision LLM en segundo plano.
+    # None usa CLINICAL_CHAT_SPECULATIVE_ANSWER_ENABLED.
+    speculative_answer: bool | None = None
 
 
 class CareTaskClinicalChatHistoryItemResponse(BaseModel):
@@ -78,6 +83,8 @@ class CareTaskClinicalChatHistoryItemResponse(BaseModel):
     memory_facts_used: list[str]
     patient_history_facts_used: list[str]
     extracted_facts: list[str]
+    answer_revision: int = Field(default=1, ge=1)
+    answer_status: ChatAnswerStatus = "final"
     created_at: datetime
     updated_at: datetime
 
@@ -146,6 +153,9 @@ class CareTaskClinicalChatPublicResponse(BaseModel):
     extracted_facts: list[str]
     interpretability_trace: list[str]
     quality_metrics: CareTaskClinicalChatQualityMetrics
+    answer_revision: int = Field(default=1, ge=1)
+    answer_status: ChatAnswerStatus = "final"
+    refinement_job_id: str | None = None
     non_diagnostic_warning: str
 
 
@@ -183,6 +193,10 @@ class CareTaskClinicalChatAsyncStatusResponse(BaseModel):
     quality_status: Literal["ok", "attention", "degraded"] | None = None
     llm_used: bool | None = None
     error: str | None = None
+    priority: int | None = Field(default=None, ge=0, le=3)
+    attempts: int | None = Field(default=None, ge=0)
+    queue_wait_ms: int | None = Field(default=None, ge=0)
+    run_ms: int | None = Field(default=None, ge=0)
 
 
 class CareTaskClinicalChatMemoryResponse(BaseModel):
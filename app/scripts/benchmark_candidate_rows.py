@@ -0,0 +1,196 @@
+"""
+Benchmark de carga de candidatos: `DocumentChunk` ORM completo vs filas ligeras.
+
+Crea una BD SQLite sintetica (por defecto 50k chunks con embedding de 384 dims)
+y mide, para cada tamano de pool, tiempo (mejor de N) y pico de memoria
+(tracemalloc) de:
+
+- `orm`: `db.query(DocumentChunk)` con embedding y `ClinicalDocument` unido;
+- `light`: `load_candidate_rows` + hidratacion del top-k final.
+
+Uso:
+    ./venv/Scripts/python.exe -m app.scripts.benchmark_candidate_rows
+    ./venv/Scripts/python.exe -m app.scripts.benchmark_candidate_rows --pools 2000,50000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.clinical_document import ClinicalDocument
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_candidate_rows import hydrate_chunks, load_candidate_rows
+
+_WORDS = (
+    "sepsis lactato shock hipotension neutropenia fiebre oliguria creatinina potasio "
+    "disnea hipoxemia gasometria antibiotico hemocultivos vasopresor bundle triaje "
+    "dolor toracico troponina electrocardiograma anticoagulacion ictus glucemia"
+).split()
+_SPECIALTIES = ("emergency", "oncology", "nephrology", "sepsis", "pneumology")
+
+
+def _parse_sizes(raw: str) -> list[int]:
+    sizes = [int(item) for item in raw.split(",") if item.strip()]
+    if any(size <= 0 for size in sizes):
+        raise ValueError("Los tamanos deben ser positivos.")
+    return sizes
+
+
+def build_synthetic_db(
+    path: Path,
+    *,
+    chunks: int,
+    dim: int,
+    chunks_per_document: int = 50,
+    seed: int = 7,
+):
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    documents = max(1, chunks // max(1, chunks_per_document))
+    with engine.begin() as connection:
+        connection.execute(
+            insert(ClinicalDocument),
+            [
+                {
+                    "id": doc_id,
+                    "title": f"Motor operativo sintetico {doc_id}",
+                    "source_file": f"docs/bench/{doc_id}.md",
+                    "specialty": _SPECIALTIES[doc_id % len(_SPECIALTIES)],
+                    "content_hash": f"{doc_id:064d}",
+                }
+                for doc_id in range(1, documents + 1)
+            ],
+        )
+        batch: list[dict[str, object]] = []
+        for chunk_id in range(1, chunks + 1):
+            doc_id = 1 + (chunk_id - 1) % documents
+            body = " ".join(rng.choice(_WORDS) for _ in range(90))
+            batch.append(
+                {
+                    "id": chunk_id,
+                    "document_id": doc_id,
+                    "chunk_text": body,
+                    "chunk_index": (chunk_id - 1) // documents,
+                    "section_path": f"Seccion {chunk_id % 40} > Pasos",
+                    "tokens_count": 90,
+                    "chunk_embedding": array(
+                        "f", (rng.uniform(-1.0, 1.0) for _ in range(dim))
+                    ).tobytes(),
+                    "keywords": rng.sample(_WORDS, 5),
+                    "custom_questions": [f"Que hacer ante {rng.choice(_WORDS)}?"],
+                    "specialty": _SPECIALTIES[doc_id % len(_SPECIALTIES)],
+                    "content_type": "paragraph",
+                }
+            )
+            if len(batch) >= 2000:
+                connection.execute(insert(DocumentChunk), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(DocumentChunk), batch)
+    return engine
+
+
+def _measure(session_factory, fn, repeat: int) -> dict[str, float]:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        db = session_factory()
+        try:
+            started_at = time.perf_counter()
+            fn(db)
+            best = min(best, time.perf_counter() - started_at)
+        finally:
+            db.close()
+    # El pico de memoria se mide aparte: tracemalloc distorsiona los tiempos.
+    db = session_factory()
+    try:
+        tracemalloc.start()
+        fn(db)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        db.close()
+    return {"ms": round(best * 1000, 1), "peak_mb": round(peak_bytes / (1024 * 1024), 2)}
+
+
+def run_benchmark(
+    *,
+    chunks: int,
+    pools: list[int],
+    dim: int,
+    k: int,
+    repeat: int,
+    seed: int = 7,
+) -> list[dict[str, object]]:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = build_synthetic_db(Path(tmp_dir) / "bench.sqlite3", chunks=chunks, dim=dim)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        results: list[dict[str, object]] = []
+        try:
+            for pool in pools:
+                ids = sorted(rng.sample(range(1, chunks + 1), min(pool, chunks)))
+
+                def _orm(db, ids=ids):
+                    rows = db.query(DocumentChunk).filter(DocumentChunk.id.in_(ids)).all()
+                    return rows[:k]
+
+                def _light(db, ids=ids):
+                    rows = load_candidate_rows(db, specialty_filter=None, ids=ids)
+                    return hydrate_chunks(rows[:k])
+
+                orm_stats = _measure(session_factory, _orm, repeat)
+                light_stats = _measure(session_factory, _light, repeat)
+                entry: dict[str, object] = {
+                    "pool": len(ids),
+                    "orm_ms": orm_stats["ms"],
+                    "orm_peak_mb": orm_stats["peak_mb"],
+                    "light_ms": light_stats["ms"],
+                    "light_peak_mb": light_stats["peak_mb"],
+                }
+                if light_stats["ms"]:
+                    entry["speedup"] = round(orm_stats["ms"] / light_stats["ms"], 2)
+                if light_stats["peak_mb"]:
+                    entry["memory_ratio"] = round(orm_stats["peak_mb"] / light_stats["peak_mb"], 2)
+                results.append(entry)
+        finally:
+            engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de filas ligeras de candidatos")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--pools", type=str, default="500,5000,50000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    results = run_benchmark(
+        chunks=max(1, int(args.chunks)),
+        pools=_parse_sizes(args.pools),
+        dim=max(1, int(args.dim)),
+        k=max(1, int(args.k)),
+        repeat=max(1, int(args.repeat)),
+    )
+    print(
+        json.dumps(
+            {"chunks": int(args.chunks), "dim": int(args.dim), "results": results},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
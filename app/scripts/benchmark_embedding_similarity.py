@@ -0,0 +1,126 @@
+"""
+Micro-benchmark del motor de similitud coseno (NumPy vs Python puro).
+
+Uso:
+    ./venv/Scripts/python.exe -m app.scripts.benchmark_embedding_similarity
+    ./venv/Scripts/python.exe -m app.scripts.benchmark_embedding_similarity --sizes 1000,10000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from array import array
+
+from app.services import embedding_similarity
+
+
+def _parse_sizes(raw: str) -> list[int]:
+    sizes: list[int] = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        value = int(item)
+        if value <= 0:
+            raise ValueError("Los tamanos deben ser positivos.")
+        sizes.append(value)
+    return sizes
+
+
+def _time_call(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started_at = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def run_benchmark(
+    *,
+    sizes: list[int],
+    dim: int,
+    k: int,
+    repeat: int,
+    python_max: int,
+    seed: int = 7,
+) -> list[dict[str, float | int | None]]:
+    rng = random.Random(seed)
+    query = [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+    results: list[dict[str, float | int | None]] = []
+    for size in sizes:
+        rows = [[rng.uniform(-1.0, 1.0) for _ in range(dim)] for _ in range(size)]
+        # Buffer contiguo equivalente a concatenar `chunk_embedding`.
+        buffer = b"".join(array("f", row).tobytes() for row in rows)
+        entry: dict[str, float | int | None] = {"candidates": size, "dim": dim, "k": k}
+        numpy_ms: float | None = None
+
+        if embedding_similarity.numpy_available():
+            matrix = embedding_similarity.as_candidate_matrix(buffer, dim=dim)
+            elapsed = _time_call(
+                lambda matrix=matrix: embedding_similarity.cosine_top_k(query, matrix, k),
+                repeat,
+            )
+            numpy_ms = round(elapsed * 1000, 3)
+            entry["numpy_ms"] = numpy_ms
+            entry["numpy_candidates_per_s"] = round(size / elapsed, 1) if elapsed else 0.0
+        else:
+            entry["numpy_ms"] = None
+
+        if size <= python_max:
+            elapsed = _time_call(
+                lambda rows=rows: embedding_similarity.cosine_top_k(
+                    query,
+                    rows,
+                    k,
+                    prefer_numpy=False,
+                ),
+                repeat,
+            )
+            python_ms = round(elapsed * 1000, 3)
+            entry["python_ms"] = python_ms
+            entry["python_candidates_per_s"] = round(size / elapsed, 1) if elapsed else 0.0
+            if numpy_ms:
+                entry["speedup"] = round(python_ms / numpy_ms, 1)
+        else:
+            entry["python_ms"] = None
+        results.append(entry)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de similitud coseno de embeddings")
+    parser.add_argument("--sizes", type=str, default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--python-max",
+        type=int,
+        default=100000,
+        help="Tamano maximo para medir tambien el camino Python puro.",
+    )
+    args = parser.parse_args()
+    results = run_benchmark(
+        sizes=_parse_sizes(args.sizes),
+        dim=max(1, int(args.dim)),
+        k=max(1, int(args.k)),
+        repeat=max(1, int(args.repeat)),
+        python_max=max(0, int(args.python_max)),
+    )
+    print(
+        json.dumps(
+            {
+                "numpy_available": embedding_similarity.numpy_available(),
+                "results": results,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
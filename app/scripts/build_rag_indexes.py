@@ -0,0 +1,170 @@
+"""
+Construye o sincroniza los indices RAG persistentes fuera del camino de peticion.
+
+Uso:
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --vector
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --vector --full-rebuild
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --term-stats
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --lsi
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --postings
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --chroma --llamaindex
+    ./venv/Scripts/python.exe -m app.scripts.build_rag_indexes --fts --full-rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.chroma_retriever import ChromaRetriever
+from app.services.llamaindex_retriever import LlamaIndexRetriever
+from app.services.rag_fts_index import FTSIndexManager
+from app.services.rag_lsi_model import LSIModel
+from app.services.rag_postings_store import PostingsStore
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_term_stats_index import TermStatsIndex
+from app.services.rag_vector_index import ChunkVectorIndex
+
+
+def build_vector_index(*, db, model: str, full_rebuild: bool) -> dict[str, object]:
+    index = ChunkVectorIndex.get_shared(model)
+    stats: dict[str, object] = dict(index.sync_from_db(db, full_rebuild=full_rebuild))
+    stats["describe"] = index.describe()
+    return stats
+
+
+def build_term_stats_index(*, db, full_rebuild: bool) -> dict[str, object]:
+    index = TermStatsIndex.get_shared()
+    stats: dict[str, object] = dict(index.sync_from_db(db, full_rebuild=full_rebuild))
+    stats["describe"] = index.describe()
+    return stats
+
+
+def build_lsi_model(*, db) -> dict[str, object]:
+    if not LSIModel.is_available():
+        return {"skipped": "numpy_unavailable"}
+    zone_weights = HybridRetriever()._build_zone_weights()
+    return LSIModel.get_shared().fit_from_db(db, zone_weights=zone_weights)
+
+
+def build_postings_store(*, db) -> dict[str, object]:
+    store = PostingsStore.get_shared()
+    stats: dict[str, object] = dict(store.build_from_db(db))
+    stats["describe"] = store.describe()
+    return stats
+
+
+def build_fts_index(*, db, full_rebuild: bool) -> dict[str, object]:
+    bind = db.get_bind()
+    if not FTSIndexManager.is_supported(bind):
+        return {"skipped": "non_sqlite_backend"}
+    ready, trace = FTSIndexManager.ensure(bind, allow_rebuild=True, force=full_rebuild)
+    stats: dict[str, object] = {"ready": ready, **trace}
+    stats["describe"] = FTSIndexManager.describe(bind)
+    return stats
+
+
+def build_external_vector_store(
+    retriever_cls, *, db, model: str, full_rebuild: bool
+) -> dict[str, object]:
+    return dict(retriever_cls.sync_from_db(db, model=model, full_rebuild=full_rebuild))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Construccion de indices RAG persistentes")
+    parser.add_argument(
+        "--vector",
+        action="store_true",
+        help="Sincroniza el indice vectorial (matriz float32 memory-mapped).",
+    )
+    parser.add_argument(
+        "--term-stats",
+        action="store_true",
+        help="Sincroniza el indice de estadisticas de terminos (TF por zona, DF/CF).",
+    )
+    parser.add_argument(
+        "--lsi",
+        action="store_true",
+        help="Reajusta el modelo LSI persistido (SVD truncada sobre todo el corpus).",
+    )
+    parser.add_argument(
+        "--postings",
+        action="store_true",
+        help="Reconstruye el indice invertido comprimido (postings con skips y block-max).",
+    )
+    parser.add_argument(
+        "--fts",
+        action="store_true",
+        help="Valida el indice FTS5 de candidatos y lo reconstruye si hace falta (SQLite).",
+    )
+    parser.add_argument(
+        "--chroma",
+        action="store_true",
+        help="Sincroniza la coleccion persistente de Chroma (backend chroma).",
+    )
+    parser.add_argument(
+        "--llamaindex",
+        action="store_true",
+        help="Sincroniza el indice persistente de LlamaIndex (backend llamaindex).",
+    )
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="Descarta los indices seleccionados y los reconstruye desde cero.",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="",
+        help="Modelo de embeddings (por defecto CLINICAL_CHAT_RAG_EMBEDDING_MODEL).",
+    )
+    args = parser.parse_args()
+    build_all = not (
+        args.vector
+        or args.term_stats
+        or args.lsi
+        or args.postings
+        or args.fts
+        or args.chroma
+        or args.llamaindex
+    )
+    backend = settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND
+    model = str(args.model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL)
+
+    summary: dict[str, object] = {}
+    db = SessionLocal()
+    try:
+        if args.vector or build_all:
+            summary["vector"] = build_vector_index(
+                db=db,
+                model=model,
+                full_rebuild=bool(args.full_rebuild),
+            )
+        if args.term_stats or build_all:
+            summary["term_stats"] = build_term_stats_index(
+                db=db,
+                full_rebuild=bool(args.full_rebuild),
+            )
+        if args.lsi or build_all:
+            summary["lsi"] = build_lsi_model(db=db)
+        if args.postings or build_all:
+            summary["postings"] = build_postings_store(db=db)
+        if args.fts or build_all:
+            summary["fts"] = build_fts_index(db=db, full_rebuild=bool(args.full_rebuild))
+        # Las colecciones externas solo se construyen por defecto si su backend esta activo.
+        if args.chroma or (build_all and backend == "chroma"):
+            summary["chroma"] = build_external_vector_store(
+                ChromaRetriever, db=db, model=model, full_rebuild=bool(args.full_rebuild)
+            )
+        if args.llamaindex or (build_all and backend == "llamaindex"):
+            summary["llamaindex"] = build_external_vector_store(
+                LlamaIndexRetriever, db=db, model=model, full_rebuild=bool(args.full_rebuild)
+            )
+    finally:
+        db.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
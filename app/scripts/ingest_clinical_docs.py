@@ -16,11 +16,18 @@ from typing import Any
 from sqlalchemy.exc import OperationalError
 
 from app.core.chunking import DocumentParser
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.models.clinical_document import ClinicalDocument
 from app.models.document_chunk import DocumentChunk
+from app.services.chroma_retriever import ChromaRetriever
 from app.services.document_ingestion_service import DocumentIngestionPipeline
 from app.services.embedding_service import OllamaEmbeddingService
+from app.services.llamaindex_retriever import LlamaIndexRetriever
+from app.services.rag_postings_store import PostingsStore
+from app.services.rag_query_cache import invalidate_shared_query_cache
+from app.services.rag_term_stats_index import TermStatsIndex
+from app.services.rag_vector_index import ChunkVectorIndex
 
 DEFAULT_SPECIALTY_MAP: dict[str, str] = {
     "docs/40_": "pneumology",
@@ -287,6 +294,76 @@ def normalize_source_paths_in_db(*, db=None) -> dict[str, int]:
             db.close()
 
 
+def sync_vector_index(
+    *,
+    db=None,
+    model: str | None = None,
+    full_rebuild: bool = False,
+) -> dict[str, int]:
+    """Sincroniza el indice vectorial persistente con los chunks guardados."""
+    if not settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ENABLED:
+        return {"rows_added": 0, "rows_removed": 0, "rows_total": 0, "disabled": 1}
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        index = ChunkVectorIndex.get_shared(model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL)
+        return index.sync_from_db(db, full_rebuild=full_rebuild)
+    finally:
+        if owns_session:
+            db.close()
+
+
+def sync_term_stats_index(*, db=None, full_rebuild: bool = False) -> dict[str, int]:
+    """Sincroniza el indice de estadisticas de terminos (TF por zona, DF/CF globales)."""
+    if not settings.CLINICAL_CHAT_RAG_TERM_STATS_ENABLED:
+        return {"rows_added": 0, "rows_removed": 0, "rows_total": 0, "disabled": 1}
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        return TermStatsIndex.get_shared().sync_from_db(db, full_rebuild=full_rebuild)
+    finally:
+        if owns_session:
+            db.close()
+
+
+def build_postings_store(*, db=None) -> dict[str, int]:
+    """Reconstruye el indice invertido comprimido usado para generar candidatos."""
+    if not settings.CLINICAL_CHAT_RAG_POSTINGS_STORE_ENABLED:
+        return {"terms": 0, "docs": 0, "disabled": 1}
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        return PostingsStore.get_shared().build_from_db(db)
+    finally:
+        if owns_session:
+            db.close()
+
+
+def sync_external_vector_store(
+    *,
+    db=None,
+    backend: str | None = None,
+    model: str | None = None,
+    full_rebuild: bool = False,
+) -> dict[str, int]:
+    """Sincroniza la coleccion persistente del backend `chroma` o `llamaindex`."""
+    backend = str(backend or settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND).strip().lower()
+    retrievers: dict[str, type[ChromaRetriever] | type[LlamaIndexRetriever]] = {
+        "chroma": ChromaRetriever,
+        "llamaindex": LlamaIndexRetriever,
+    }
+    retriever_cls = retrievers.get(backend)
+    if retriever_cls is None:
+        return {"rows_added": 0, "rows_removed": 0, "rows_total": 0, "disabled": 1}
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        return retriever_cls.sync_from_db(db, model=model, full_rebuild=full_rebuild)
+    finally:
+        if owns_session:
+            db.close()
+
+
 def _parse_specialty_map(raw_items: list[str]) -> dict[str, str]:
     parsed: dict[str, str] = {}
     for item in raw_items:
@@ -638,11 +715,15 @@ def run_ingestion(
                 db.flush()
 
                 chunks_saved_current = 0
-                for chunk in chunks:
-                    if skip_ollama_embeddings:
-                        embedding = embedding_service._fallback_vector(chunk.text)
-                    else:
-                        embedding, _trace = embedding_service.embed_text(chunk.text)
+                if skip_ollama_embeddings:
+                    chunk_embeddings = [
+                        embedding_service._fallback_vector(chunk.text) for chunk in chunks
+                    ]
+                else:
+                    chunk_embeddings, _trace = embedding_service.embed_batch(
+                        [chunk.text for chunk in chunks]
+                    )
+                for chunk, embedding in zip(chunks, chunk_embeddings, strict=True):
                     embedding_bytes = array("f", embedding).tobytes()
                     chunk_specialty = chunk.specialty or specialty
                     db_chunk = DocumentChunk(
@@ -688,6 +769,23 @@ def run_ingestion(
             if last_error:
                 raise last_error
 
+    vector_index_stats = sync_vector_index(model=embedding_service.model)
+    stats["vector_index_rows_added"] = int(vector_index_stats.get("rows_added", 0))
+    stats["vector_index_rows_updated"] = int(vector_index_stats.get("rows_updated", 0))
+    stats["vector_index_rows_removed"] = int(vector_index_stats.get("rows_removed", 0))
+    stats["vector_index_rows_total"] = int(vector_index_stats.get("rows_total", 0))
+    term_stats = sync_term_stats_index()
+    stats["term_stats_rows_added"] = int(term_stats.get("rows_added", 0))
+    stats["term_stats_rows_updated"] = int(term_stats.get("rows_updated", 0))
+    stats["term_stats_rows_removed"] = int(term_stats.get("rows_removed", 0))
+    external_stats = sync_external_vector_store(model=embedding_service.model)
+    stats["external_vector_store_rows_added"] = int(external_stats.get("rows_added", 0))
+    stats["external_vector_store_rows_updated"] = int(external_stats.get("rows_updated", 0))
+    stats["external_vector_store_rows_removed"] = int(external_stats.get("rows_removed", 0))
+    if stats["chunks_saved"] or stats["chunks_replaced"]:
+        postings_stats = build_postings_store()
+        stats["postings_store_terms"] = int(postings_stats.get("terms", 0))
+        invalidate_shared_query_cache()
     stats["quality_rejection_reason_counts"] = quality_rejection_reason_counts
     return stats
 
@@ -888,7 +986,10 @@ def main() -> None:
         f"pdf_pages_total={stats['pdf_pages_total']} "
         f"pdf_blocks_total={stats['pdf_blocks_total']} "
         f"pdf_blocks_filtered={stats['pdf_blocks_filtered']} "
-        f"pdf_parse_latency_ms_sum={stats['pdf_parse_latency_ms_sum']:.2f}"
+        f"pdf_parse_latency_ms_sum={stats['pdf_parse_latency_ms_sum']:.2f} "
+        f"vector_index_rows_added={stats['vector_index_rows_added']} "
+        f"vector_index_rows_removed={stats['vector_index_rows_removed']} "
+        f"vector_index_rows_total={stats['vector_index_rows_total']}"
     )
     print(_safe_console_text(summary))
     if rejection_reasons:
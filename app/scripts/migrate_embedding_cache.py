@@ -0,0 +1,76 @@
+"""
+Importa el cache legacy de embeddings (`<sha256>.json` por texto) al cache SQLite.
+
+Uso:
+    ./venv/Scripts/python.exe -m app.scripts.migrate_embedding_cache
+    ./venv/Scripts/python.exe -m app.scripts.migrate_embedding_cache --delete-source
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import OllamaEmbeddingService
+
+
+def migrate_json_cache(
+    *,
+    source_dir: Path,
+    target_path: Path,
+    model: str,
+    delete_source: bool = False,
+) -> dict[str, object]:
+    cache = EmbeddingCache(target_path)
+    try:
+        stats: dict[str, object] = dict(
+            cache.import_json_dir(source_dir, model=model, delete_source=delete_source)
+        )
+        stats["entries"] = len(cache)
+    finally:
+        cache.close()
+    stats["source_dir"] = str(source_dir)
+    stats["target_path"] = str(target_path)
+    stats["model"] = model
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migracion del cache JSON de embeddings a SQLite")
+    parser.add_argument(
+        "--source-dir",
+        type=str,
+        default=str(OllamaEmbeddingService.LEGACY_CACHE_DIR),
+        help="Directorio del cache legacy con un JSON por vector.",
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        default=settings.CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH,
+        help="Fichero SQLite destino.",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL,
+        help="Modelo al que pertenecen los vectores legacy (no se guardaba en el JSON).",
+    )
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Borra cada JSON tras importarlo correctamente.",
+    )
+    args = parser.parse_args()
+    stats = migrate_json_cache(
+        source_dir=Path(args.source_dir),
+        target_path=Path(args.target),
+        model=str(args.model),
+        delete_source=bool(args.delete_source),
+    )
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
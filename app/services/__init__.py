@@ -16,6 +16,7 @@ from app.services.chest_xray_support_service import ChestXRaySupportService
 from app.services.chroma_retriever import ChromaRetriever
 from app.services.clinical_chat_async_service import ClinicalChatAsyncService
 from app.services.clinical_chat_service import ClinicalChatService
+from app.services.clinical_chat_stream_service import ClinicalChatStreamService
 from app.services.clinical_context_service import ClinicalContextService
 from app.services.clinical_decision_psychology_service import ClinicalDecisionPsychologyService
 from app.services.clinical_flat_clustering_service import ClinicalFlatClusteringService
@@ -86,6 +87,7 @@ __all__ = [
     "ChromaRetriever",
     "ClinicalChatService",
     "ClinicalChatAsyncService",
+    "ClinicalChatStreamService",
     "ClinicalDecisionPsychologyService",
     "ClinicalFlatClusteringService",
     "ClinicalHierarchicalClusteringService",
@@ -1985,3 +1985,43 @@ class AgentRunService:
         db.commit()
         db.refresh(run)
         return run
+
+    @staticmethod
+    def record_care_task_clinical_chat_refinement(
+        db: Session,
+        *,
+        run: AgentRun,
+        refinement_input: dict[str, Any],
+        refinement_output: dict[str, Any],
+        refined: bool,
+        latency_ms: int,
+    ) -> AgentRun:
+        """Anade el refinamiento LLM de un turno especulativo a su corrida de chat."""
+        run_id = run.id
+        if run_id is None:
+            raise ValueError("La corrida de chat no esta persistida.")
+        _run, steps = AgentRunService.get_run_with_steps(db, run_id)
+        AgentRunService._build_trace_step(
+            db,
+            run_id=run_id,
+            step_order=max((int(step.step_order or 0) for step in steps), default=0) + 1,
+            step_name="clinical_chat_answer_refinement",
+            status="completed",
+            step_input=refinement_input,
+            step_output=refinement_output,
+            decision="llm_refined" if refined else "keep_extractive_answer",
+            fallback_used=not refined,
+            error_message=None,
+            step_cost_usd=0.0,
+            step_latency_ms=latency_ms,
+        )
+        chat_output = dict((run.run_output or {}).get("clinical_chat") or {})
+        if refined:
+            chat_output["answer"] = refinement_output.get("answer")
+        chat_output["answer_refinement"] = refinement_output
+        run.run_output = {**dict(run.run_output or {}), "clinical_chat": chat_output}
+        run.total_latency_ms = int(run.total_latency_ms or 0) + latency_ms
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        return run
@@ -1232,13 +1232,26 @@ class CareTaskService:
     @staticmethod
     def get_quality_scorecard(db: Session) -> dict[str, object]:
         """Devuelve scorecard unificado de calidad IA en dominios clinicos clave."""
-        triage_summary = CareTaskService.get_triage_audit_summary(db=db)
-        screening_summary = CareTaskService.get_screening_audit_summary(db=db)
-        medicolegal_summary = CareTaskService.get_medicolegal_audit_summary(db=db)
-        scasest_summary = CareTaskService.get_scasest_audit_summary(db=db)
-        cardio_risk_summary = CareTaskService.get_cardio_risk_audit_summary(db=db)
-        resuscitation_summary = CareTaskService.get_resuscitation_audit_summary(db=db)
+        return CareTaskService.build_quality_scorecard(
+            triage_summary=CareTaskService.get_triage_audit_summary(db=db),
+            screening_summary=CareTaskService.get_screening_audit_summary(db=db),
+            medicolegal_summary=CareTaskService.get_medicolegal_audit_summary(db=db),
+            scasest_summary=CareTaskService.get_scasest_audit_summary(db=db),
+            cardio_risk_summary=CareTaskService.get_cardio_risk_audit_summary(db=db),
+            resuscitation_summary=CareTaskService.get_resuscitation_audit_summary(db=db),
+        )
 
+    @staticmethod
+    def build_quality_scorecard(
+        *,
+        triage_summary: dict[str, float | int],
+        screening_summary: dict[str, float | int],
+        medicolegal_summary: dict[str, float | int],
+        scasest_summary: dict[str, float | int],
+        cardio_risk_summary: dict[str, float | int],
+        resuscitation_summary: dict[str, float | int],
+    ) -> dict[str, object]:
+        """Agrega el scorecard global a partir de resumenes de auditoria ya calculados."""
         domains = {
             "triage": CareTaskService._build_quality_domain_summary(
                 summary=triage_summary,
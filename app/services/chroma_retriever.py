@@ -1,16 +1,27 @@
 """
 Retriever opcional con Chroma para consultas RAG locales.
 
-Modo fail-safe: si `chromadb` no esta instalado o falla, devuelve vacio
-para permitir fallback al retriever legacy.
+Usa una coleccion persistente en disco (`CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR`)
+que la ingesta mantiene sincronizada con `document_chunks`; el camino de
+consulta solo ejecuta la busqueda por similitud. El cliente Chroma se abre una
+vez por proceso y por directorio.
+
+Modo fail-safe: si `chromadb` no esta instalado, la coleccion no existe o la
+consulta falla, devuelve vacio para permitir fallback al retriever legacy.
 """
 from __future__ import annotations
 
+import hashlib
 import logging
+import re
+import threading
 import time
+import zlib
 from array import array
+from pathlib import Path
 from typing import Any, Optional
 
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -20,9 +31,25 @@ from app.services.embedding_service import OllamaEmbeddingService
 logger = logging.getLogger(__name__)
 
 
+def chunk_row_checksum(blob: bytes | None, specialty: Any, section_path: Any) -> str:
+    """CRC32 del embedding y de los metadatos filtrables de un chunk."""
+    payload = b"\x1f".join(
+        (
+            blob or b"",
+            str(specialty or "").encode("utf-8"),
+            str(section_path or "").encode("utf-8"),
+        )
+    )
+    return f"{zlib.crc32(payload):08x}"
+
+
 class ChromaRetriever:
     """Recuperador semantico opcional con Chroma (local, OSS)."""
 
+    SYNC_BATCH_SIZE = 512
+    _clients: dict[str, Any] = {}
+    _clients_lock = threading.Lock()
+
     def __init__(self, embedding_service: Optional[OllamaEmbeddingService] = None):
         self.embedding_service = embedding_service or OllamaEmbeddingService()
 
@@ -34,6 +61,154 @@ class ChromaRetriever:
             return None, exc.__class__.__name__
         return chromadb, None
 
+    @staticmethod
+    def collection_name(model: str) -> str:
+        """Nombre de coleccion valido para Chroma (3-63 chars) derivado del modelo."""
+        model = str(model or "").strip() or "default"
+        slug = re.sub(r"[^a-zA-Z0-9]+", "_", model).strip("_")[:32] or "default"
+        digest = hashlib.sha1(model.encode("utf-8")).hexdigest()[:8]
+        return f"clinical_chunks_{slug}_{digest}"
+
+    @classmethod
+    def _get_client(cls, chromadb: Any) -> Any:
+        persist_dir = Path(settings.CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR).resolve()
+        cache_key = str(persist_dir)
+        with cls._clients_lock:
+            client = cls._clients.get(cache_key)
+            if client is None:
+                persist_dir.mkdir(parents=True, exist_ok=True)
+                client = chromadb.PersistentClient(path=cache_key)
+                cls._clients[cache_key] = client
+            return client
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._clients_lock:
+            cls._clients.clear()
+
+    @staticmethod
+    def _decode_embedding(blob: bytes | None) -> list[float]:
+        if not blob:
+            return []
+        embedding_array = array("f")
+        try:
+            embedding_array.frombytes(blob)
+        except (TypeError, ValueError):
+            return []
+        return embedding_array.tolist()
+
+    @staticmethod
+    def _indexed_checksums(collection: Any, *, page_size: int = 5000) -> dict[str, str]:
+        indexed: dict[str, str] = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            page_ids = list(page.get("ids") or [])
+            page_metadatas = list(page.get("metadatas") or [None] * len(page_ids))
+            for value, metadata in zip(page_ids, page_metadatas):
+                indexed[str(value)] = str((metadata or {}).get("checksum") or "")
+            if len(page_ids) < page_size:
+                return indexed
+            offset += page_size
+
+    @classmethod
+    def sync_from_db(
+        cls,
+        db: Session,
+        *,
+        model: Optional[str] = None,
+        full_rebuild: bool = False,
+    ) -> dict[str, int]:
+        """
+        Sincroniza la coleccion persistente con `document_chunks` de forma incremental.
+
+        Cada registro guarda en sus metadatos el checksum del chunk: se hace upsert
+        de los chunks nuevos o cambiados (SQLite reutiliza ids al re-ingestar) y se
+        borran los que ya no existen; `full_rebuild` descarta la coleccion.
+        """
+        stats = {
+            "rows_added": 0,
+            "rows_updated": 0,
+            "rows_removed": 0,
+            "rows_skipped": 0,
+            "rows_total": 0,
+        }
+        chromadb, import_error = cls._load_dependency()
+        if import_error:
+            stats["unavailable"] = 1
+            return stats
+        model_name = str(model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL)
+        name = cls.collection_name(model_name)
+        client = cls._get_client(chromadb)
+        if full_rebuild:
+            try:
+                client.delete_collection(name)
+            except Exception:
+                pass
+        collection = client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine", "embedding_model": model_name},
+        )
+
+        indexed = cls._indexed_checksums(collection)
+        db_ids = {
+            str(row[0]) for row in db.execute(text("SELECT id FROM document_chunks")).fetchall()
+        }
+        removed_ids = sorted(set(indexed) - db_ids)
+        for start in range(0, len(removed_ids), cls.SYNC_BATCH_SIZE):
+            collection.delete(ids=removed_ids[start : start + cls.SYNC_BATCH_SIZE])
+        stats["rows_removed"] = len(removed_ids)
+
+        dimension = 0
+        if indexed and len(removed_ids) < len(indexed):
+            sample = collection.peek(limit=1)
+            sample_embeddings = sample.get("embeddings")
+            if sample_embeddings is not None and len(sample_embeddings):
+                dimension = len(sample_embeddings[0])
+
+        stale_ids: list[str] = []
+        ids: list[str] = []
+        embeddings: list[list[float]] = []
+        metadatas: list[dict[str, str]] = []
+        statement = text(
+            "SELECT id, chunk_embedding, specialty, section_path "
+            "FROM document_chunks ORDER BY id"
+        )
+        for chunk_id, blob, specialty, section_path in db.execute(statement):
+            record_id = str(chunk_id)
+            checksum = chunk_row_checksum(blob, specialty, section_path)
+            previous = indexed.get(record_id)
+            if previous == checksum:
+                continue
+            embedding = cls._decode_embedding(blob)
+            if not embedding or (dimension and len(embedding) != dimension):
+                stats["rows_skipped"] += 1
+                if previous is not None:
+                    stale_ids.append(record_id)
+                continue
+            dimension = dimension or len(embedding)
+            ids.append(record_id)
+            embeddings.append(embedding)
+            metadatas.append(
+                {
+                    "chunk_id": record_id,
+                    "specialty": str(specialty or ""),
+                    "section_path": str(section_path or ""),
+                    "checksum": checksum,
+                }
+            )
+            stats["rows_added" if previous is None else "rows_updated"] += 1
+            if len(ids) >= cls.SYNC_BATCH_SIZE:
+                collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas)
+                ids, embeddings, metadatas = [], [], []
+        if ids:
+            collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas)
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+            stats["rows_removed"] += len(stale_ids)
+        stats["rows_total"] = int(collection.count())
+        return stats
+
     def search(
         self,
         query: str,
@@ -53,49 +228,18 @@ class ChromaRetriever:
         trace["chroma_available"] = "1"
 
         try:
-            candidate_pool = max(20, settings.CLINICAL_CHAT_RAG_CHROMA_CANDIDATE_POOL)
-            query_builder = db.query(DocumentChunk)
-            if specialty_filter:
-                query_builder = query_builder.filter(DocumentChunk.specialty == specialty_filter)
-            candidates = (
-                query_builder.order_by(DocumentChunk.id.desc()).limit(candidate_pool).all()
-            )
-            trace["chroma_candidates"] = str(len(candidates))
-            if not candidates:
+            name = self.collection_name(self.embedding_service.model)
+            trace["chroma_collection"] = name
+            client = self._get_client(chromadb)
+            try:
+                collection = client.get_collection(name)
+            except Exception:
+                collection = None
+            collection_size = int(collection.count()) if collection is not None else 0
+            trace["chroma_collection_size"] = str(collection_size)
+            if collection_size == 0:
                 trace["chroma_chunks_found"] = "0"
-                return [], trace
-
-            chunks_by_id: dict[str, DocumentChunk] = {}
-            prepared_rows: list[
-                tuple[str, list[float], str, dict[str, str], DocumentChunk]
-            ] = []
-
-            for chunk in candidates:
-                try:
-                    embedding_array = array("f")
-                    embedding_array.frombytes(chunk.chunk_embedding)
-                    if len(embedding_array) == 0:
-                        continue
-                    chunk_id = str(chunk.id)
-                    prepared_rows.append(
-                        (
-                            chunk_id,
-                            [float(value) for value in embedding_array],
-                            str(chunk.chunk_text or ""),
-                            {
-                                "chunk_id": chunk_id,
-                                "specialty": str(chunk.specialty or ""),
-                                "section_path": str(chunk.section_path or ""),
-                            },
-                            chunk,
-                        )
-                    )
-                except (TypeError, ValueError):
-                    continue
-
-            if not prepared_rows:
-                trace["chroma_chunks_found"] = "0"
-                trace["chroma_error"] = "empty_candidate_embeddings"
+                trace["chroma_error"] = "collection_not_built"
                 return [], trace
 
             query_vector, embedding_trace = self.embedding_service.embed_text(query)
@@ -105,57 +249,29 @@ class ChromaRetriever:
                 return [], trace
             query_dimension = len(query_vector)
 
-            ids: list[str] = []
-            embeddings: list[list[float]] = []
-            documents: list[str] = []
-            metadatas: list[dict[str, str]] = []
-            discarded_dimension_mismatch = 0
-            for chunk_id, embedding, document, metadata, chunk in prepared_rows:
-                if len(embedding) != query_dimension:
-                    discarded_dimension_mismatch += 1
-                    continue
-                ids.append(chunk_id)
-                embeddings.append(embedding)
-                documents.append(document)
-                metadatas.append(metadata)
-                chunks_by_id[chunk_id] = chunk
-
-            if not ids:
-                trace["chroma_chunks_found"] = "0"
-                trace["chroma_error"] = "dimension_mismatch_all_candidates"
-                trace["chroma_query_dimension"] = str(query_dimension)
-                trace["chroma_discarded_dimension_mismatch"] = str(discarded_dimension_mismatch)
-                return [], trace
-
-            client = chromadb.Client()
-            collection = client.create_collection(
-                name=f"clinical_chat_runtime_{int(time.time_ns())}",
-                metadata={"hnsw:space": "cosine"},
-            )
-            collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas,
-            )
-            n_results = max(1, min(k, len(ids)))
+            # Se piden algunos vecinos extra para absorber chunks borrados desde
+            # la ultima sincronizacion sin quedarse por debajo de k.
+            pool = max(20, settings.CLINICAL_CHAT_RAG_CHROMA_CANDIDATE_POOL)
+            n_results = max(1, min(collection_size, max(k, min(pool, k * 2))))
             query_result = collection.query(
                 query_embeddings=[query_vector],
                 n_results=n_results,
-                include=["distances", "metadatas"],
+                where={"specialty": specialty_filter} if specialty_filter else None,
+                include=["distances"],
             )
 
-            result_ids = []
+            result_ids: list[Any] = []
             if isinstance(query_result.get("ids"), list) and query_result["ids"]:
                 result_ids = query_result["ids"][0]
-            distances = []
+            distances: list[Any] = []
             if isinstance(query_result.get("distances"), list) and query_result["distances"]:
                 distances = query_result["distances"][0]
 
-            result: list[DocumentChunk] = []
+            ranked: list[tuple[int, float]] = []
             for idx, raw_id in enumerate(result_ids):
-                chunk = chunks_by_id.get(str(raw_id))
-                if chunk is None:
+                try:
+                    chunk_id = int(raw_id)
+                except (TypeError, ValueError):
                     continue
                 distance = 1.0
                 if idx < len(distances):
@@ -163,9 +279,28 @@ class ChromaRetriever:
                         distance = float(distances[idx])
                     except (TypeError, ValueError):
                         distance = 1.0
-                score = 1.0 / (1.0 + max(0.0, distance))
+                ranked.append((chunk_id, 1.0 / (1.0 + max(0.0, distance))))
+
+            chunks_by_id: dict[int, DocumentChunk] = {}
+            if ranked:
+                rows = (
+                    db.query(DocumentChunk)
+                    .filter(DocumentChunk.id.in_([chunk_id for chunk_id, _ in ranked]))
+                    .all()
+                )
+                chunks_by_id = {
+                    chunk.id: chunk for chunk in rows if chunk.id is not None
+                }
+
+            result: list[DocumentChunk] = []
+            for chunk_id, score in ranked:
+                chunk = chunks_by_id.get(chunk_id)
+                if chunk is None:
+                    continue
                 setattr(chunk, "_rag_score", score)
                 result.append(chunk)
+                if len(result) >= k:
+                    break
 
             latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
             trace.update(
@@ -174,7 +309,7 @@ class ChromaRetriever:
                     "chroma_latency_ms": str(latency_ms),
                     "chroma_metric": "cosine",
                     "chroma_query_dimension": str(query_dimension),
-                    "chroma_discarded_dimension_mismatch": str(discarded_dimension_mismatch),
+                    "chroma_stale_ids": str(len(ranked) - len(chunks_by_id)),
                 }
             )
             return result, trace
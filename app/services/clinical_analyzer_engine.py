@@ -0,0 +1,177 @@
+"""
+Motor de ejecucion concurrente para los analizadores por turno del chat clinico.
+
+Objetivo:
+- lanzar en paralelo analizadores independientes sobre un pool acotado
+- aplicar presupuesto de latencia por etapa (desde que arranca) y por turno
+- degradar a payload por defecto (y dejarlo trazado) cuando una etapa no llega
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+class SkippedStageTrace(dict):
+    """Traza de una etapa omitida: cualquier clave ausente se reporta como `skipped`."""
+
+    def __missing__(self, key: str) -> str:
+        return "skipped"
+
+
+@dataclass(frozen=True)
+class AnalyzerStage:
+    """Etapa independiente del turno: nombre estable y callable sin argumentos."""
+
+    name: str
+    run: Callable[[], dict[str, Any]]
+
+
+class ClinicalAnalyzerEngine:
+    """Ejecuta etapas independientes con deadline por etapa y por turno."""
+
+    _executor: ThreadPoolExecutor | None = None
+    _executor_workers = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        workers = int(settings.CLINICAL_CHAT_ANALYZER_MAX_WORKERS)
+        with cls._lock:
+            if cls._executor is None or cls._executor_workers != workers:
+                if cls._executor is not None:
+                    cls._executor.shutdown(wait=False)
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix="clinical-analyzer",
+                )
+                cls._executor_workers = workers
+            return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False)
+            cls._executor = None
+            cls._executor_workers = 0
+
+    @staticmethod
+    def skipped_payload(stage_name: str, reason: str) -> dict[str, Any]:
+        """Payload neutro para etapas fuera de plazo o con error."""
+        return {
+            "enabled": False,
+            "skipped": True,
+            "skip_reason": reason,
+            "probabilities": [],
+            "trace": SkippedStageTrace(),
+            "memory_facts": [f"analyzer_skipped:{stage_name}:{reason}"],
+        }
+
+    @staticmethod
+    def _timed(
+        stage: AnalyzerStage,
+        timings: dict[str, float],
+        starts: dict[str, float] | None = None,
+        started: threading.Event | None = None,
+    ) -> dict[str, Any]:
+        started_at = time.perf_counter()
+        if starts is not None:
+            starts[stage.name] = started_at
+        if started is not None:
+            started.set()
+        try:
+            return stage.run()
+        finally:
+            timings[stage.name] = (time.perf_counter() - started_at) * 1000.0
+
+    @classmethod
+    def run_stages(
+        cls,
+        stages: list[AnalyzerStage],
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, str]]:
+        """
+        Ejecuta las etapas y devuelve (resultados por nombre, traza del motor).
+
+        Las etapas que superan su deadline o fallan se sustituyen por
+        `skipped_payload`; el hilo en curso no se interrumpe (Python no lo
+        permite), pero su resultado se descarta. El deadline de etapa corre
+        desde que la etapa arranca: el tiempo en cola del pool (compartido
+        entre turnos concurrentes) solo consume el presupuesto del turno.
+        """
+        parallel = bool(settings.CLINICAL_CHAT_ANALYZER_PARALLEL_ENABLED) and len(stages) > 1
+        stage_budget = float(settings.CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS) / 1000.0
+        turn_budget = float(settings.CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS) / 1000.0
+        turn_started_at = time.perf_counter()
+        timings: dict[str, float] = {}
+        results: dict[str, dict[str, Any]] = {}
+        statuses: dict[str, str] = {}
+
+        if not parallel:
+            # Modo secuencial: mismo orden historico, sin deadlines aplicables.
+            for stage in stages:
+                try:
+                    results[stage.name] = cls._timed(stage, timings)
+                    statuses[stage.name] = "ok"
+                except Exception as exc:
+                    logger.warning(f"Analizador {stage.name} fallido: {exc}")
+                    results[stage.name] = cls.skipped_payload(stage.name, "error")
+                    statuses[stage.name] = "error"
+        else:
+            executor = cls._get_executor()
+            submitted_at = time.perf_counter()
+            starts: dict[str, float] = {}
+            started_events = {stage.name: threading.Event() for stage in stages}
+            futures: list[tuple[AnalyzerStage, Future]] = [
+                (
+                    stage,
+                    executor.submit(cls._timed, stage, timings, starts, started_events[stage.name]),
+                )
+                for stage in stages
+            ]
+            turn_deadline = submitted_at + turn_budget
+            for stage, future in futures:
+                started_events[stage.name].wait(
+                    timeout=max(0.0, turn_deadline - time.perf_counter())
+                )
+                stage_started_at = starts.get(stage.name, turn_deadline)
+                stage_deadline = min(stage_started_at + stage_budget, turn_deadline)
+                try:
+                    results[stage.name] = future.result(
+                        timeout=max(0.0, stage_deadline - time.perf_counter())
+                    )
+                    statuses[stage.name] = "ok"
+                except FutureTimeoutError:
+                    future.cancel()
+                    results[stage.name] = cls.skipped_payload(stage.name, "timeout")
+                    statuses[stage.name] = "timeout"
+                except Exception as exc:
+                    logger.warning(f"Analizador {stage.name} fallido: {exc}")
+                    results[stage.name] = cls.skipped_payload(stage.name, "error")
+                    statuses[stage.name] = "error"
+
+        turn_ms = (time.perf_counter() - turn_started_at) * 1000.0
+        skipped = [name for name, status in statuses.items() if status != "ok"]
+        trace = {
+            "analyzer_engine_mode": "parallel" if parallel else "sequential",
+            "analyzer_turn_ms": f"{turn_ms:.1f}",
+            "analyzer_stage_budget_ms": str(int(settings.CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS)),
+            "analyzer_turn_budget_ms": str(int(settings.CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS)),
+            "analyzer_skipped": ",".join(skipped) if skipped else "none",
+        }
+        for stage in stages:
+            elapsed = timings.get(stage.name)
+            trace[f"analyzer_{stage.name}_status"] = statuses[stage.name]
+            trace[f"analyzer_{stage.name}_ms"] = (
+                f"{elapsed:.1f}" if elapsed is not None else "pending"
+            )
+        return results, trace
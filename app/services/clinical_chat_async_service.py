@@ -2,35 +2,89 @@
 Servicio asincrono de chat clinico para ejecucion en segundo plano.
 
 Objetivo: evitar bloquear el request HTTP cuando el LLM local tarda mas de lo
-esperado en CPU. El endpoint asincrono encola la solicitud y un worker local
+esperado en CPU. El endpoint asincrono encola la solicitud y un pool de workers
 la procesa con persistencia normal de mensajes.
+
+La cola vive en la tabla `clinical_chat_jobs`: cualquier worker de cualquier
+nodo reclama el siguiente trabajo por prioridad clinica (critica antes que
+rutina) con un compare-and-set sobre `status`, y los trabajos encolados
+sobreviven a un reinicio. Cuando la cola supera su limite se rechazan nuevos
+trabajos (salvo criticos) con `ClinicalChatQueueFullError` en vez de acumular
+esperas que nunca cumpliran el SLA.
 """
 from __future__ import annotations
 
-import queue
+import logging
+import os
+import socket
 import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Any, Literal
 from uuid import uuid4
 
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.models.care_task import CareTask
+from app.models.clinical_chat_job import ClinicalChatJob
 from app.models.user import User
 from app.schemas.clinical_chat import CareTaskClinicalChatMessageRequest
 from app.services.clinical_chat_service import ClinicalChatService
 
+logger = logging.getLogger(__name__)
+
 AsyncJobStatus = Literal["queued", "running", "completed", "failed"]
 
+# Menor valor se atiende antes; "critical" nunca se rechaza por backpressure.
+JOB_PRIORITY_BY_CLINICAL_PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+_DEFAULT_JOB_PRIORITY = JOB_PRIORITY_BY_CLINICAL_PRIORITY["medium"]
+_CLAIM_CANDIDATES = 5
+
+
+class ClinicalChatQueueFullError(RuntimeError):
+    """La cola asincrona esta llena; el cliente debe reintentar mas tarde."""
+
+    def __init__(self, *, queued: int, limit: int, retry_after_seconds: int):
+        super().__init__(f"Cola de chat asincrono llena ({queued}/{limit}).")
+        self.queued = queued
+        self.limit = limit
+        self.retry_after_seconds = retry_after_seconds
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    # SQLite devuelve datetimes naive; todo se guarda en UTC.
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _elapsed_ms(start: datetime | None, end: datetime | None) -> int | None:
+    start, end = _as_utc(start), _as_utc(end)
+    if start is None or end is None:
+        return None
+    return max(0, int((end - start).total_seconds() * 1000))
+
 
 class ClinicalChatAsyncService:
-    """Cola local en memoria para procesamiento asincrono de chat clinico."""
+    """Cola persistente con prioridades y pool de workers para chat clinico."""
 
-    _jobs: dict[str, dict[str, Any]] = {}
-    _jobs_lock = threading.Lock()
-    _job_queue: queue.Queue[str] = queue.Queue()
-    _worker_thread: threading.Thread | None = None
-    _max_jobs: int = 500
-    _ttl_minutes: int = 120
+    _session_factory: Callable[[], Session] = SessionLocal
+    _workers: list[threading.Thread] = []
+    _workers_lock = threading.Lock()
+    _wakeup = threading.Semaphore(0)
+    _stop_event = threading.Event()
+    _last_maintenance_monotonic: float = 0.0
+    _stats_lock = threading.Lock()
+    _stats: dict[str, float] = {}
 
     @classmethod
     def enqueue_job(
@@ -41,91 +95,299 @@ class ClinicalChatAsyncService:
         authenticated_user: User | None,
     ) -> dict[str, Any]:
         """Registra un trabajo y lo encola para ejecucion en segundo plano."""
-        session_id = cls._safe_session_id(payload.session_id)
-        job_id = f"chatjob-{uuid4().hex[:20]}"
-        now = datetime.now(timezone.utc)
-        job_record: dict[str, Any] = {
-            "job_id": job_id,
-            "care_task_id": care_task_id,
-            "session_id": session_id,
-            "payload": payload.model_dump(),
-            "user_id": authenticated_user.id if authenticated_user is not None else None,
-            "status": "queued",
-            "created_at": now,
-            "updated_at": now,
-            "message_id": None,
-            "agent_run_id": None,
-            "workflow_name": None,
-            "response_mode": None,
-            "tool_mode": None,
-            "quality_status": None,
-            "llm_used": None,
-            "error": None,
-        }
-        job_record["payload"]["session_id"] = session_id
+        return cls._enqueue(
+            care_task_id=care_task_id,
+            payload=payload,
+            authenticated_user=authenticated_user,
+            refine_message_id=None,
+            refine_agent_run_id=None,
+        )
 
-        with cls._jobs_lock:
-            cls._cleanup_jobs_locked(now=now)
-            cls._jobs[job_id] = job_record
+    @classmethod
+    def enqueue_refinement(
+        cls,
+        *,
+        care_task_id: int,
+        message_id: int,
+        agent_run_id: int,
+        payload: CareTaskClinicalChatMessageRequest,
+        authenticated_user: User | None,
+    ) -> dict[str, Any]:
+        """
+        Encola el refinamiento LLM de un mensaje provisional (respuesta especulativa).
+
+        El worker no repite el turno: parte del contexto guardado en la corrida
+        `agent_run_id`, solo genera y verifica con LLM, y guarda el resultado
+        como nueva revision del mismo `CareTaskChatMessage`.
+        """
+        return cls._enqueue(
+            care_task_id=care_task_id,
+            payload=payload,
+            authenticated_user=authenticated_user,
+            refine_message_id=message_id,
+            refine_agent_run_id=agent_run_id,
+        )
+
+    @classmethod
+    def _enqueue(
+        cls,
+        *,
+        care_task_id: int,
+        payload: CareTaskClinicalChatMessageRequest,
+        authenticated_user: User | None,
+        refine_message_id: int | None,
+        refine_agent_run_id: int | None,
+    ) -> dict[str, Any]:
+        session_id = cls._safe_session_id(payload.session_id)
+        payload_data = payload.model_dump(mode="json")
+        payload_data["session_id"] = session_id
+        if refine_message_id is not None:
+            payload_data["refine_message_id"] = int(refine_message_id)
+            payload_data["refine_agent_run_id"] = refine_agent_run_id
+        now = _utcnow()
+        db = cls._session_factory()
+        try:
+            cls._run_maintenance(db, now=now, force=False)
+            clinical_priority = (
+                db.query(CareTask.clinical_priority).filter(CareTask.id == care_task_id).scalar()
+            )
+            priority = JOB_PRIORITY_BY_CLINICAL_PRIORITY.get(
+                str(clinical_priority or "").lower(), _DEFAULT_JOB_PRIORITY
+            )
+            limit = int(settings.CLINICAL_CHAT_ASYNC_MAX_QUEUED_JOBS)
+            queued = (
+                db.query(func.count(ClinicalChatJob.id))
+                .filter(ClinicalChatJob.status == "queued")
+                .scalar()
+                or 0
+            )
+            if queued >= limit and priority > 0:
+                cls._bump_stats(rejected=1)
+                raise ClinicalChatQueueFullError(
+                    queued=int(queued),
+                    limit=limit,
+                    retry_after_seconds=int(settings.CLINICAL_CHAT_ASYNC_RETRY_AFTER_SECONDS),
+                )
+            job = ClinicalChatJob(
+                job_id=f"chatjob-{uuid4().hex[:20]}",
+                care_task_id=care_task_id,
+                session_id=session_id,
+                user_id=authenticated_user.id if authenticated_user is not None else None,
+                payload=payload_data,
+                priority=priority,
+                status="queued",
+                attempts=0,
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(job)
+            db.commit()
+            view = cls._public_job_view(job)
+        finally:
+            db.close()
 
-        cls._ensure_worker_started()
-        cls._job_queue.put(job_id)
-        return cls._public_job_view(job_record)
+        cls._bump_stats(enqueued=1)
+        cls._ensure_workers_started()
+        cls._wakeup.release()
+        return view
 
     @classmethod
     def get_job_status(cls, *, job_id: str) -> dict[str, Any] | None:
         """Devuelve estado actual del trabajo o None si no existe."""
-        with cls._jobs_lock:
-            record = cls._jobs.get(job_id)
-            if record is None:
+        db = cls._session_factory()
+        try:
+            job = db.query(ClinicalChatJob).filter(ClinicalChatJob.job_id == job_id).first()
+            if job is None:
                 return None
-            return cls._public_job_view(record)
+            return cls._public_job_view(job)
+        finally:
+            db.close()
 
     @classmethod
-    def _ensure_worker_started(cls) -> None:
-        if cls._worker_thread and cls._worker_thread.is_alive():
-            return
-        with cls._jobs_lock:
-            if cls._worker_thread and cls._worker_thread.is_alive():
-                return
-            cls._worker_thread = threading.Thread(
-                target=cls._worker_loop,
-                name="clinical-chat-async-worker",
-                daemon=True,
+    def resume_pending_jobs(cls) -> int:
+        """
+        Arranca el pool si hay trabajos pendientes de un proceso anterior.
+
+        Devuelve cuantos trabajos quedaban en cola (o en ejecucion con lease
+        vencido, que se reencolan).
+        """
+        db = cls._session_factory()
+        try:
+            if not inspect(db.get_bind()).has_table(ClinicalChatJob.__tablename__):
+                return 0
+            cls._run_maintenance(db, now=_utcnow(), force=True)
+            pending = (
+                db.query(func.count(ClinicalChatJob.id))
+                .filter(ClinicalChatJob.status == "queued")
+                .scalar()
+                or 0
             )
-            cls._worker_thread.start()
+        finally:
+            db.close()
+        if pending:
+            cls._ensure_workers_started()
+            for _ in range(min(int(pending), len(cls._workers))):
+                cls._wakeup.release()
+        return int(pending)
 
     @classmethod
-    def _worker_loop(cls) -> None:
-        while True:
-            job_id = cls._job_queue.get()
+    def shutdown(cls, *, timeout: float = 5.0) -> None:
+        """Detiene el pool; los trabajos en curso terminan o vencen su lease."""
+        with cls._workers_lock:
+            workers = list(cls._workers)
+            cls._stop_event.set()
+            for _ in workers:
+                cls._wakeup.release()
+        deadline = time.monotonic() + max(0.0, timeout)
+        for worker in workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        with cls._workers_lock:
+            cls._workers = [worker for worker in cls._workers if worker.is_alive()]
+            cls._stop_event = threading.Event()
+            cls._wakeup = threading.Semaphore(0)
+
+    @classmethod
+    def metrics_snapshot(cls) -> dict[str, Any]:
+        """Profundidad de cola por estado (BD compartida) y tiempos de este proceso."""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        snapshot: dict[str, Any] = {
+            "workers": sum(1 for worker in cls._workers if worker.is_alive()),
+            "enqueued": int(stats.get("enqueued", 0)),
+            "rejected": int(stats.get("rejected", 0)),
+            "completed": int(stats.get("completed", 0)),
+            "failed": int(stats.get("failed", 0)),
+            "requeued": int(stats.get("requeued", 0)),
+            "wait_ms_avg": cls._average(stats, "wait_ms"),
+            "wait_ms_max": float(stats.get("wait_ms_max", 0.0)),
+            "run_ms_avg": cls._average(stats, "run_ms"),
+            "run_ms_max": float(stats.get("run_ms_max", 0.0)),
+        }
+        depth = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        db = cls._session_factory()
+        try:
+            rows = (
+                db.query(ClinicalChatJob.status, func.count(ClinicalChatJob.id))
+                .group_by(ClinicalChatJob.status)
+                .all()
+            )
+            for status_value, count in rows:
+                depth[str(status_value)] = int(count)
+        except Exception as exc:
+            logger.debug("No se pudo leer la profundidad de la cola de chat: %s", exc)
+        finally:
+            db.close()
+        snapshot["depth"] = depth
+        return snapshot
+
+    @classmethod
+    def _ensure_workers_started(cls) -> None:
+        target = int(settings.CLINICAL_CHAT_ASYNC_WORKERS)
+        with cls._workers_lock:
+            cls._workers = [worker for worker in cls._workers if worker.is_alive()]
+            base_id = f"{socket.gethostname()}:{os.getpid()}"
+            while len(cls._workers) < target:
+                worker_id = f"{base_id}:{uuid4().hex[:6]}"
+                worker = threading.Thread(
+                    target=cls._worker_loop,
+                    kwargs={"worker_id": worker_id, "stop_event": cls._stop_event},
+                    name=f"clinical-chat-async-worker-{len(cls._workers)}",
+                    daemon=True,
+                )
+                worker.start()
+                cls._workers.append(worker)
+
+    @classmethod
+    def _worker_loop(cls, *, worker_id: str, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                job_id = cls._claim_next_job(worker_id=worker_id)
+            except Exception as exc:
+                logger.warning("Fallo al reclamar trabajo de chat asincrono: %s", exc)
+                job_id = None
+            if job_id is None:
+                # El sondeo recoge trabajos encolados por otros nodos o procesos.
+                cls._wakeup.acquire(timeout=float(settings.CLINICAL_CHAT_ASYNC_POLL_SECONDS))
+                continue
             try:
                 cls._execute_job(job_id=job_id)
             except Exception as exc:  # pragma: no cover - guardia final
                 cls._mark_failed(job_id=job_id, error=f"worker_unhandled:{type(exc).__name__}")
-            finally:
-                cls._job_queue.task_done()
+
+    @classmethod
+    def _claim_next_job(cls, *, worker_id: str) -> str | None:
+        """Reclama el siguiente trabajo por prioridad; seguro entre workers y nodos."""
+        now = _utcnow()
+        lease_until = now + timedelta(seconds=int(settings.CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS))
+        db = cls._session_factory()
+        try:
+            cls._run_maintenance(db, now=now, force=False)
+            candidates = (
+                db.query(ClinicalChatJob.id, ClinicalChatJob.job_id)
+                .filter(ClinicalChatJob.status == "queued")
+                .order_by(ClinicalChatJob.priority.asc(), ClinicalChatJob.id.asc())
+                .limit(_CLAIM_CANDIDATES)
+                .all()
+            )
+            for row_id, job_id in candidates:
+                claimed = (
+                    db.query(ClinicalChatJob)
+                    .filter(ClinicalChatJob.id == row_id, ClinicalChatJob.status == "queued")
+                    .update(
+                        {
+                            ClinicalChatJob.status: "running",
+                            ClinicalChatJob.worker_id: worker_id,
+                            ClinicalChatJob.attempts: ClinicalChatJob.attempts + 1,
+                            ClinicalChatJob.started_at: now,
+                            ClinicalChatJob.lease_expires_at: lease_until,
+                            ClinicalChatJob.updated_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed == 1:
+                    return str(job_id)
+            return None
+        finally:
+            db.close()
 
     @classmethod
     def _execute_job(cls, *, job_id: str) -> None:
-        with cls._jobs_lock:
-            record = cls._jobs.get(job_id)
-            if record is None:
+        db = cls._session_factory()
+        try:
+            job = db.query(ClinicalChatJob).filter(ClinicalChatJob.job_id == job_id).first()
+            if job is None:
                 return
-            record["status"] = "running"
-            record["updated_at"] = datetime.now(timezone.utc)
-            payload_data = dict(record.get("payload") or {})
-            care_task_id = int(record["care_task_id"])
-            user_id = record.get("user_id")
+            payload_data = dict(job.payload or {})
+            care_task_id = job.care_task_id
+            user_id = job.user_id
+            claim = (job.worker_id, int(job.attempts or 0))
+            cls._observe("wait_ms", _elapsed_ms(job.created_at, job.started_at))
+        finally:
+            db.close()
+        if care_task_id is None:
+            cls._mark_failed(job_id=job_id, error="care_task_not_found")
+            return
 
+        refine_message_id = payload_data.pop("refine_message_id", None)
+        refine_agent_run_id = payload_data.pop("refine_agent_run_id", None)
         try:
             payload = CareTaskClinicalChatMessageRequest(**payload_data)
         except Exception as exc:
             cls._mark_failed(job_id=job_id, error=f"invalid_payload:{type(exc).__name__}")
             return
+        refine_kwargs: dict[str, Any] = {}
+        if refine_message_id is None:
+            # El turno ya corre en segundo plano: no hay latencia que adelantar.
+            payload = payload.model_copy(update={"speculative_answer": False})
+        else:
+            refine_kwargs["refine_message_id"] = int(refine_message_id)
+            if refine_agent_run_id is not None:
+                refine_kwargs["refine_agent_run_id"] = int(refine_agent_run_id)
 
         try:
-            db = SessionLocal()
+            db = cls._session_factory()
             try:
                 care_task = db.query(CareTask).filter(CareTask.id == care_task_id).first()
                 if care_task is None:
@@ -147,12 +409,17 @@ class ClinicalChatAsyncService:
                     quality_metrics,
                     _tool_policy_decision,
                     _security_findings,
-                ) = ClinicalChatService.create_message(
+                ) = cls._create_message_holding_lease(
+                    job_id=job_id,
+                    claim=claim,
                     db=db,
                     care_task=care_task,
                     payload=payload,
                     authenticated_user=user,
+                    **refine_kwargs,
                 )
+                message_id = int(message.id)
+                message_session_id = str(message.session_id)
             finally:
                 db.close()
         except Exception as exc:
@@ -163,70 +430,249 @@ class ClinicalChatAsyncService:
             str(item).strip() == "llm_used=true"
             for item in (interpretability_trace or [])
         )
-        with cls._jobs_lock:
-            record = cls._jobs.get(job_id)
-            if record is None:
+        cls._finish_job(
+            job_id=job_id,
+            values={
+                ClinicalChatJob.status: "completed",
+                ClinicalChatJob.message_id: message_id,
+                ClinicalChatJob.session_id: message_session_id,
+                ClinicalChatJob.agent_run_id: int(agent_run_id),
+                ClinicalChatJob.workflow_name: str(workflow_name),
+                ClinicalChatJob.response_mode: str(response_mode),
+                ClinicalChatJob.tool_mode: str(tool_mode),
+                ClinicalChatJob.quality_status: str(
+                    quality_metrics.get("quality_status") or "degraded"
+                ),
+                ClinicalChatJob.llm_used: bool(llm_used),
+                ClinicalChatJob.error: None,
+            },
+        )
+
+    @classmethod
+    def _create_message_holding_lease(
+        cls,
+        *,
+        job_id: str,
+        claim: tuple[str | None, int],
+        **create_kwargs: Any,
+    ) -> tuple[Any, ...]:
+        """
+        Ejecuta el turno renovando el lease del reclamo mientras dura.
+
+        Un turno LLM lento no debe parecer abandonado: si el lease venciera, el
+        mantenimiento lo reencolaria y otro worker repetiria `create_message`,
+        persistiendo un mensaje duplicado.
+        """
+        with cls._lease_heartbeat(job_id=job_id, claim=claim):
+            return ClinicalChatService.create_message(**create_kwargs)
+
+    @classmethod
+    @contextmanager
+    def _lease_heartbeat(cls, *, job_id: str, claim: tuple[str | None, int]) -> Iterator[None]:
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(
+            target=cls._renew_lease_until_stopped,
+            kwargs={"job_id": job_id, "claim": claim, "stop_event": stop_event},
+            name="clinical-chat-async-lease",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            heartbeat.join(timeout=5.0)
+
+    @classmethod
+    def _renew_lease_until_stopped(
+        cls,
+        *,
+        job_id: str,
+        claim: tuple[str | None, int],
+        stop_event: threading.Event,
+    ) -> None:
+        worker_id, attempts = claim
+        lease_seconds = int(settings.CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS)
+        # Tres renovaciones por lease: un fallo puntual de BD no lo deja vencer.
+        interval = max(0.05, lease_seconds / 3)
+        while not stop_event.wait(interval):
+            now = _utcnow()
+            db = cls._session_factory()
+            try:
+                renewed = (
+                    db.query(ClinicalChatJob)
+                    .filter(
+                        ClinicalChatJob.job_id == job_id,
+                        ClinicalChatJob.status == "running",
+                        ClinicalChatJob.worker_id == worker_id,
+                        ClinicalChatJob.attempts == attempts,
+                    )
+                    .update(
+                        {
+                            ClinicalChatJob.lease_expires_at: now
+                            + timedelta(seconds=lease_seconds),
+                            ClinicalChatJob.updated_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.warning("No se pudo renovar el lease del trabajo %s: %s", job_id, exc)
+                continue
+            finally:
+                db.close()
+            if renewed != 1:
+                # El reclamo ya no es de este worker: no se prolonga un lease ajeno.
                 return
-            record["status"] = "completed"
-            record["updated_at"] = datetime.now(timezone.utc)
-            record["message_id"] = int(message.id)
-            record["session_id"] = str(message.session_id)
-            record["agent_run_id"] = int(agent_run_id)
-            record["workflow_name"] = str(workflow_name)
-            record["response_mode"] = str(response_mode)
-            record["tool_mode"] = str(tool_mode)
-            record["quality_status"] = str(quality_metrics.get("quality_status") or "degraded")
-            record["llm_used"] = bool(llm_used)
-            record["error"] = None
 
     @classmethod
     def _mark_failed(cls, *, job_id: str, error: str) -> None:
-        with cls._jobs_lock:
-            record = cls._jobs.get(job_id)
-            if record is None:
+        cls._finish_job(
+            job_id=job_id,
+            values={ClinicalChatJob.status: "failed", ClinicalChatJob.error: error[:240]},
+        )
+
+    @classmethod
+    def _finish_job(cls, *, job_id: str, values: dict[Any, Any]) -> None:
+        now = _utcnow()
+        db = cls._session_factory()
+        try:
+            job = db.query(ClinicalChatJob).filter(ClinicalChatJob.job_id == job_id).first()
+            if job is None:
                 return
-            record["status"] = "failed"
-            record["updated_at"] = datetime.now(timezone.utc)
-            record["error"] = error[:240]
-
-    @classmethod
-    def _cleanup_jobs_locked(cls, *, now: datetime) -> None:
-        threshold = now - timedelta(minutes=cls._ttl_minutes)
-        stale_ids: list[str] = []
-        for job_id, record in cls._jobs.items():
-            created_at = record.get("created_at")
-            if isinstance(created_at, datetime) and created_at < threshold:
-                stale_ids.append(job_id)
-        for job_id in stale_ids:
-            cls._jobs.pop(job_id, None)
-        if len(cls._jobs) <= cls._max_jobs:
+            started_at = job.started_at
+            # Solo el reclamo vigente cierra el trabajo: si el lease vencio y otro
+            # worker lo reencolo, este resultado tardio no pisa el nuevo intento.
+            updated = (
+                db.query(ClinicalChatJob)
+                .filter(
+                    ClinicalChatJob.id == job.id,
+                    ClinicalChatJob.status == "running",
+                    ClinicalChatJob.worker_id == job.worker_id,
+                    ClinicalChatJob.attempts == job.attempts,
+                )
+                .update(
+                    {
+                        **values,
+                        ClinicalChatJob.finished_at: now,
+                        ClinicalChatJob.lease_expires_at: None,
+                        ClinicalChatJob.updated_at: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        if updated != 1:
+            return
+        status_value = values.get(ClinicalChatJob.status)
+        cls._bump_stats(**{"completed" if status_value == "completed" else "failed": 1})
+        cls._observe("run_ms", _elapsed_ms(started_at, now))
+
+    @classmethod
+    def _run_maintenance(cls, db: Session, *, now: datetime, force: bool) -> None:
+        """Reencola leases vencidos y purga trabajos terminados fuera de TTL."""
+        poll_seconds = float(settings.CLINICAL_CHAT_ASYNC_POLL_SECONDS)
+        monotonic_now = time.monotonic()
+        if not force and monotonic_now - cls._last_maintenance_monotonic < poll_seconds:
             return
-        # Proteccion por cardinalidad: elimina los mas antiguos.
-        ordered = sorted(
-            cls._jobs.items(),
-            key=lambda item: item[1].get("created_at") or datetime.now(timezone.utc),
+        cls._last_maintenance_monotonic = monotonic_now
+        max_attempts = int(settings.CLINICAL_CHAT_ASYNC_MAX_ATTEMPTS)
+        expired = (
+            ClinicalChatJob.status == "running",
+            ClinicalChatJob.lease_expires_at < now,
+        )
+        requeued = (
+            db.query(ClinicalChatJob)
+            .filter(*expired, ClinicalChatJob.attempts < max_attempts)
+            .update(
+                {
+                    ClinicalChatJob.status: "queued",
+                    ClinicalChatJob.worker_id: None,
+                    ClinicalChatJob.lease_expires_at: None,
+                    ClinicalChatJob.updated_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        abandoned = (
+            db.query(ClinicalChatJob)
+            .filter(*expired, ClinicalChatJob.attempts >= max_attempts)
+            .update(
+                {
+                    ClinicalChatJob.status: "failed",
+                    ClinicalChatJob.error: "lease_expired",
+                    ClinicalChatJob.finished_at: now,
+                    ClinicalChatJob.lease_expires_at: None,
+                    ClinicalChatJob.updated_at: now,
+                },
+                synchronize_session=False,
+            )
         )
-        overflow = len(cls._jobs) - cls._max_jobs
-        for job_id, _ in ordered[:overflow]:
-            cls._jobs.pop(job_id, None)
+        threshold = now - timedelta(minutes=int(settings.CLINICAL_CHAT_ASYNC_JOB_TTL_MINUTES))
+        (
+            db.query(ClinicalChatJob)
+            .filter(
+                ClinicalChatJob.status.in_(("completed", "failed")),
+                ClinicalChatJob.finished_at < threshold,
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if requeued or abandoned:
+            cls._bump_stats(requeued=int(requeued or 0), failed=int(abandoned or 0))
+            logger.warning(
+                "Chat asincrono: %s trabajos reencolados y %s fallidos por lease vencido.",
+                requeued,
+                abandoned,
+            )
+
+    @classmethod
+    def _bump_stats(cls, **increments: int) -> None:
+        with cls._stats_lock:
+            for key, value in increments.items():
+                cls._stats[key] = cls._stats.get(key, 0) + value
+
+    @classmethod
+    def _observe(cls, name: str, value_ms: int | None) -> None:
+        if value_ms is None:
+            return
+        with cls._stats_lock:
+            cls._stats[f"{name}_sum"] = cls._stats.get(f"{name}_sum", 0.0) + value_ms
+            cls._stats[f"{name}_count"] = cls._stats.get(f"{name}_count", 0) + 1
+            cls._stats[f"{name}_max"] = max(cls._stats.get(f"{name}_max", 0.0), value_ms)
+
+    @staticmethod
+    def _average(stats: dict[str, float], name: str) -> float:
+        count = stats.get(f"{name}_count", 0)
+        if not count:
+            return 0.0
+        return round(float(stats.get(f"{name}_sum", 0.0)) / count, 3)
 
     @classmethod
-    def _public_job_view(cls, record: dict[str, Any]) -> dict[str, Any]:
+    def _public_job_view(cls, job: ClinicalChatJob) -> dict[str, Any]:
         return {
-            "job_id": str(record["job_id"]),
-            "care_task_id": int(record["care_task_id"]),
-            "session_id": str(record["session_id"]),
-            "status": str(record["status"]),
-            "created_at": record["created_at"],
-            "updated_at": record["updated_at"],
-            "message_id": record.get("message_id"),
-            "agent_run_id": record.get("agent_run_id"),
-            "workflow_name": record.get("workflow_name"),
-            "response_mode": record.get("response_mode"),
-            "tool_mode": record.get("tool_mode"),
-            "quality_status": record.get("quality_status"),
-            "llm_used": record.get("llm_used"),
-            "error": record.get("error"),
+            "job_id": str(job.job_id),
+            "care_task_id": job.care_task_id,
+            "session_id": str(job.session_id),
+            "status": str(job.status),
+            "created_at": _as_utc(job.created_at),
+            "updated_at": _as_utc(job.updated_at),
+            "message_id": job.message_id,
+            "agent_run_id": job.agent_run_id,
+            "workflow_name": job.workflow_name,
+            "response_mode": job.response_mode,
+            "tool_mode": job.tool_mode,
+            "quality_status": job.quality_status,
+            "llm_used": job.llm_used,
+            "error": job.error,
+            "priority": job.priority,
+            "attempts": int(job.attempts or 0),
+            "queue_wait_ms": _elapsed_ms(job.created_at, job.started_at),
+            "run_ms": _elapsed_ms(job.started_at, job.finished_at),
         }
 
     @staticmethod
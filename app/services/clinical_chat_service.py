@@ -7,11 +7,12 @@ import hashlib
 import json
 import math
 import re
+import time
 import unicodedata
 from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Protocol
 from urllib.error import URLError
 from urllib.parse import quote_plus, urlparse
 from urllib.request import Request, urlopen
@@ -35,6 +36,8 @@ from app.security.audit import audit_chat_security
 from app.security.dangerous_tools import assess_tool_risk
 from app.security.external_content import ExternalContentSecurity
 from app.services.agent_run_service import AgentRunService
+from app.services.clinical_analyzer_engine import AnalyzerStage, ClinicalAnalyzerEngine
+from app.services.clinical_chat_stream_events import emit_stream_event
 from app.services.clinical_decision_psychology_service import (
     ClinicalDecisionPsychologyService,
 )
@@ -61,6 +64,16 @@ from app.services.sepsis_protocol_service import SepsisProtocolService
 from app.services.web_link_analysis_service import WebLinkAnalysisService
 
 
+class _DomainModelService(Protocol):
+    """Clasificador de dominio con artefactos ajustados y cacheados por catalogo."""
+
+    @classmethod
+    def fitted_model(
+        cls, *, domain_catalog: list[dict[str, object]]
+    ) -> tuple[dict[str, Any], bool]:
+        ...
+
+
 class ClinicalChatService:
     """Motor de chat operativo con memoria incremental y trazabilidad."""
 
@@ -1241,6 +1254,23 @@ class ClinicalChatService:
     def _domain_by_key(cls) -> dict[str, dict[str, object]]:
         return {str(item["key"]): item for item in cls._DOMAIN_CATALOG}
 
+    @classmethod
+    def warm_up_domain_models(cls) -> dict[str, float]:
+        """Entrena (o carga del registro) los clasificadores de dominio; ms por modelo."""
+        timings: dict[str, float] = {}
+        services: tuple[type[_DomainModelService], ...] = (
+            ClinicalVectorClassificationService,
+            ClinicalFlatClusteringService,
+            ClinicalHierarchicalClusteringService,
+            ClinicalSVMDomainService,
+            ClinicalNaiveBayesService,
+        )
+        for service in services:
+            started_at = time.perf_counter()
+            service.fitted_model(domain_catalog=cls._DOMAIN_CATALOG)
+            timings[service.__name__] = round((time.perf_counter() - started_at) * 1000, 2)
+        return timings
+
     @classmethod
     def _infer_specialty_from_query(cls, query: str) -> str:
         normalized_query = cls._normalize(query)
@@ -2126,6 +2156,126 @@ class ClinicalChatService:
             .all()
         )
 
+    @staticmethod
+    def get_message(
+        db: Session,
+        *,
+        care_task_id: int,
+        message_id: int,
+    ) -> CareTaskChatMessage | None:
+        return (
+            db.query(CareTaskChatMessage)
+            .filter(
+                CareTaskChatMessage.id == message_id,
+                CareTaskChatMessage.care_task_id == care_task_id,
+            )
+            .first()
+        )
+
+    @staticmethod
+    def _speculative_answer_applies(
+        *,
+        payload: CareTaskClinicalChatMessageRequest,
+        response_mode: str,
+        interrogatory_short_circuit: bool,
+    ) -> bool:
+        """
+        Decide si el turno responde primero con la via extractiva.
+
+        Solo tiene sentido cuando el turno normal llamaria al LLM: modo clinico
+        con RAG y LLM activos y sin modos que ya fuerzan la via extractiva.
+        """
+        requested = payload.speculative_answer
+        if requested is None:
+            requested = settings.CLINICAL_CHAT_SPECULATIVE_ANSWER_ENABLED
+        return bool(
+            requested
+            and response_mode == "clinical"
+            and not interrogatory_short_circuit
+            and settings.CLINICAL_CHAT_RAG_ENABLED
+            and settings.CLINICAL_CHAT_LLM_ENABLED
+            and not settings.CLINICAL_CHAT_RAG_FORCE_EXTRACTIVE_ONLY
+            and not settings.CLINICAL_CHAT_RAG_FACT_ONLY_MODE_ENABLED
+        )
+
+    @staticmethod
+    def _schedule_answer_refinement(
+        db: Session,
+        *,
+        message: CareTaskChatMessage,
+        agent_run_id: int | None,
+        payload: CareTaskClinicalChatMessageRequest,
+        authenticated_user: User | None,
+    ) -> list[str]:
+        """Encola el refinamiento LLM; si no se puede, la extractiva queda como final."""
+        # Import diferido: clinical_chat_async_service importa este modulo.
+        from app.services.clinical_chat_async_service import ClinicalChatAsyncService
+
+        try:
+            if agent_run_id is None:
+                raise ValueError("Corrida de chat sin persistir.")
+            job = ClinicalChatAsyncService.enqueue_refinement(
+                care_task_id=int(message.care_task_id),
+                message_id=int(message.id),
+                agent_run_id=agent_run_id,
+                payload=payload.model_copy(update={"session_id": message.session_id}),
+                authenticated_user=authenticated_user,
+            )
+        except Exception as exc:
+            message.answer_status = "final"
+            db.commit()
+            db.refresh(message)
+            return [f"answer_refinement_error={type(exc).__name__}"]
+        emit_stream_event(
+            "stage",
+            {"stage": "refinement_queued", "job_id": str(job["job_id"])},
+        )
+        return [f"answer_refinement_job_id={job['job_id']}"]
+
+    @staticmethod
+    def _store_answer_revision(
+        db: Session,
+        *,
+        care_task_id: int,
+        message_id: int,
+        answer_fields: dict[str, Any],
+        llm_refined: bool,
+        lock_key: str,
+        lock_owner: str,
+    ) -> CareTaskChatMessage:
+        """
+        Guarda el resultado del refinamiento sobre el mensaje provisional.
+
+        Sin respuesta LLM (caida, presupuesto) se conserva la extractiva y el
+        mensaje pasa a `final`. Un reintento sobre un mensaje ya cerrado no
+        lo modifica.
+        """
+        with SessionWriteLock.acquire(
+            lock_key=lock_key,
+            owner=lock_owner,
+            timeout_seconds=2.5,
+            stale_after_seconds=20.0,
+        ):
+            message = ClinicalChatService.get_message(
+                db,
+                care_task_id=care_task_id,
+                message_id=message_id,
+            )
+            if message is None:
+                raise ValueError("Mensaje a refinar no encontrado.")
+            if message.answer_status != "provisional":
+                return message
+            if llm_refined:
+                for field_name, value in answer_fields.items():
+                    setattr(message, field_name, value)
+                message.answer_revision = int(message.answer_revision or 1) + 1
+                message.answer_status = "refined"
+            else:
+                message.answer_status = "final"
+            db.commit()
+            db.refresh(message)
+        return message
+
     @classmethod
     def _build_patient_summary(
         cls,
@@ -3798,6 +3948,370 @@ class ClinicalChatService:
         required_matches = 2 if available_references >= 2 else 1
         return len(matched_references) >= required_matches
 
+    @classmethod
+    def _verify_llm_answer(
+        cls,
+        *,
+        llm_answer: str | None,
+        llm_trace: dict[str, Any],
+        rag_trace: dict[str, Any],
+        safe_query: str,
+        response_mode: str,
+        effective_specialty: str,
+        matched_domains: list[str],
+        knowledge_sources: list[dict[str, str]],
+        endpoint_recommendations: list[dict[str, Any]],
+        pipeline_relaxed_mode: bool,
+        interrogatory_short_circuit: bool,
+        contract_assessment: dict[str, Any],
+        logic_assessment: dict[str, Any],
+        interpretability_trace: list[str],
+    ) -> str | None:
+        """
+        Reescribe y valida la respuesta LLM del turno.
+
+        Devuelve None cuando no supera los controles (calidad, grounding,
+        validacion RAG, contrato o abstencion logica) y debe usarse la via
+        estructurada. Anota las decisiones en `llm_trace` y en la traza.
+        """
+        should_attempt_llm_rewrite = (
+            settings.CLINICAL_CHAT_LLM_REWRITE_ENABLED
+            and not settings.CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED
+            and response_mode == "clinical"
+            and bool(llm_answer)
+            and llm_trace.get("llm_used") == "true"
+            and llm_trace.get("llm_provider") == settings.CLINICAL_CHAT_LLM_PROVIDER
+            and not llm_trace.get("llm_chat_error")
+        )
+        if should_attempt_llm_rewrite:
+            initial_actionable = cls._is_actionable_llm_answer(
+                answer=str(llm_answer or ""),
+                response_mode=response_mode,
+            )
+            initial_grounded = cls._has_source_grounding_in_answer(
+                answer=str(llm_answer or ""),
+                knowledge_sources=knowledge_sources,
+            )
+            rag_validation_status = str(rag_trace.get("rag_validation_status", "valid"))
+            initial_rag_valid = rag_validation_status == "valid"
+            if not initial_actionable or not initial_grounded or not initial_rag_valid:
+                rewritten_answer, rewrite_trace = (
+                    LLMChatProvider.rewrite_clinical_answer_with_verification(
+                        query=safe_query,
+                        draft_answer=str(llm_answer or ""),
+                        effective_specialty=effective_specialty,
+                        matched_domains=matched_domains,
+                        knowledge_sources=knowledge_sources,
+                        endpoint_results=endpoint_recommendations,
+                    )
+                )
+                llm_trace.update(rewrite_trace)
+                interpretability_trace.append(
+                    "llm_rewrite_attempted=1"
+                    f";initial_actionable={1 if initial_actionable else 0}"
+                    f";initial_grounded={1 if initial_grounded else 0}"
+                    f";initial_rag_valid={1 if initial_rag_valid else 0}"
+                )
+                if rewritten_answer:
+                    llm_answer = rewritten_answer
+            else:
+                llm_trace["llm_rewrite_status"] = "skipped_not_needed"
+
+        if (
+            response_mode == "clinical"
+            and bool(llm_answer)
+            and llm_trace.get("llm_origin") == "rag_orchestrator"
+            and not pipeline_relaxed_mode
+            and str(rag_trace.get("rag_validation_status", "valid")) != "valid"
+        ):
+            interpretability_trace.append("llm_quality_gate=rag_validation_warning_fallback")
+            llm_answer = None
+
+        should_apply_llm_quality_gate = (
+            settings.CLINICAL_CHAT_LLM_QUALITY_GATES_ENABLED
+            and not settings.CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED
+            and not pipeline_relaxed_mode
+            and bool(llm_answer)
+            and llm_trace.get("llm_used") == "true"
+            and "llm_latency_ms" in llm_trace
+        )
+        if should_apply_llm_quality_gate and not cls._is_actionable_llm_answer(
+            answer=str(llm_answer or ""),
+            response_mode=response_mode,
+        ):
+            interpretability_trace.append("llm_quality_gate=short_or_generic_fallback")
+            llm_answer = None
+        elif (
+            should_apply_llm_quality_gate
+            and response_mode == "clinical"
+            and not cls._has_source_grounding_in_answer(
+                answer=str(llm_answer or ""),
+                knowledge_sources=knowledge_sources,
+            )
+        ):
+            interpretability_trace.append("llm_quality_gate=missing_source_grounding_fallback")
+            llm_answer = None
+
+        if (
+            response_mode == "clinical"
+            and bool(llm_answer)
+            and not interrogatory_short_circuit
+            and not pipeline_relaxed_mode
+            and bool(contract_assessment.get("force_structured_fallback"))
+        ):
+            interpretability_trace.append("contract_guard=forced_structured_fallback")
+            if (
+                llm_trace.get("llm_used") == "true"
+                and "clinical_answer_quality_gate=final_structured_fallback"
+                not in interpretability_trace
+            ):
+                interpretability_trace.append(
+                    "clinical_answer_quality_gate=final_structured_fallback"
+                )
+            llm_answer = None
+
+        if (
+            response_mode == "clinical"
+            and bool(llm_answer)
+            and not interrogatory_short_circuit
+            and not pipeline_relaxed_mode
+            and bool(logic_assessment.get("abstention_required"))
+        ):
+            interpretability_trace.append("logic_abstention_guard=forced_structured_fallback")
+            if (
+                llm_trace.get("llm_used") == "true"
+                and "clinical_answer_quality_gate=final_structured_fallback"
+                not in interpretability_trace
+            ):
+                interpretability_trace.append(
+                    "clinical_answer_quality_gate=final_structured_fallback"
+                )
+            llm_answer = None
+        return llm_answer
+
+    @classmethod
+    def _refine_provisional_answer(
+        cls,
+        db: Session,
+        *,
+        care_task: CareTask,
+        payload: CareTaskClinicalChatMessageRequest,
+        message_id: int,
+        agent_run_id: int | None,
+    ) -> tuple[
+        CareTaskChatMessage,
+        int,
+        str,
+        list[str],
+        str,
+        str,
+        dict[str, float | str],
+        str,
+        list[dict[str, str]],
+    ]:
+        """
+        Segunda fase de la respuesta especulativa: solo generacion y verificacion LLM.
+
+        El contexto del turno (historial, dominios, fuentes, evaluaciones y
+        hallazgos de seguridad) sale de la corrida original, sin repetir la
+        auditoria, la busqueda web ni los analizadores. El refinamiento se
+        registra como un paso mas de esa misma corrida.
+        """
+        started_at = time.perf_counter()
+        run = None
+        if agent_run_id is not None:
+            run, _steps = AgentRunService.get_run_with_steps(db, agent_run_id)
+        run_input = dict(run.run_input or {}) if run is not None else {}
+        care_task_id = care_task.id
+        if (
+            run is None
+            or agent_run_id is None
+            or care_task_id is None
+            or run_input.get("care_task_id") != care_task_id
+        ):
+            raise ValueError("Corrida de chat a refinar no encontrada.")
+        chat_input = dict(run_input.get("chat_input") or {})
+        snapshot = dict((run.run_output or {}).get("clinical_chat") or {})
+        context = dict(snapshot.get("refinement_context") or {})
+        safe_query = str(context.get("safe_query") or payload.query)
+        effective_query = str(context.get("effective_query") or safe_query)
+        recent_dialogue = list(context.get("recent_dialogue") or [])
+        response_mode = str(snapshot.get("response_mode") or "clinical")
+        tool_mode = str(snapshot.get("tool_mode") or "chat")
+        effective_specialty = str(chat_input.get("effective_specialty") or "general")
+        pipeline_relaxed_mode = bool(chat_input.get("pipeline_relaxed_mode"))
+        matched_domains = [str(item) for item in snapshot.get("matched_domains") or []]
+        matched_endpoints = [str(item) for item in snapshot.get("matched_endpoints") or []]
+        knowledge_sources = list(snapshot.get("knowledge_sources") or [])
+        web_sources = list(snapshot.get("web_sources") or [])
+        endpoint_recommendations = list(snapshot.get("endpoint_recommendations") or [])
+        memory_facts_used = [str(item) for item in snapshot.get("memory_facts_used") or []]
+        patient_history_facts_used = [
+            str(item) for item in snapshot.get("patient_history_facts_used") or []
+        ]
+        patient_summary = snapshot.get("patient_summary")
+        interpretability_trace = ["answer_strategy=speculative_refinement"]
+
+        emit_stream_event("stage", {"stage": "generation"})
+        rag_answer, rag_trace = RAGOrchestrator(db=db).process_query_with_rag(
+            query=effective_query,
+            response_mode=response_mode,
+            effective_specialty=effective_specialty,
+            tool_mode=tool_mode,
+            matched_domains=matched_domains,
+            matched_endpoints=matched_endpoints,
+            memory_facts_used=memory_facts_used,
+            patient_summary=patient_summary,
+            patient_history_facts_used=patient_history_facts_used,
+            knowledge_sources=knowledge_sources,
+            web_sources=web_sources,
+            recent_dialogue=recent_dialogue,
+            endpoint_results=endpoint_recommendations,
+            care_task_id=care_task_id,
+            pipeline_relaxed_mode=pipeline_relaxed_mode,
+        )
+        llm_trace: dict[str, Any] = {
+            str(key): str(value)
+            for key, value in rag_trace.items()
+            if isinstance(key, str) and key.startswith("llm_")
+        }
+        llm_answer: str | None = None
+        if rag_answer and llm_trace.get("llm_used") == "true":
+            llm_answer = rag_answer
+            llm_trace.setdefault("llm_origin", "rag_orchestrator")
+        elif str(llm_trace.get("llm_error") or "").strip():
+            interpretability_trace.append("llm_second_pass_skipped=rag_llm_failure")
+        elif str(rag_trace.get("rag_status") or "") == "failed_retrieval":
+            interpretability_trace.append("llm_second_pass_skipped=rag_failed_retrieval")
+        else:
+            llm_answer, llm_trace = LLMChatProvider.generate_answer(
+                query=safe_query,
+                response_mode=response_mode,
+                effective_specialty=effective_specialty,
+                tool_mode=tool_mode,
+                matched_domains=matched_domains,
+                matched_endpoints=matched_endpoints,
+                memory_facts_used=memory_facts_used,
+                patient_summary=patient_summary,
+                patient_history_facts_used=patient_history_facts_used,
+                knowledge_sources=knowledge_sources,
+                web_sources=web_sources,
+                recent_dialogue=recent_dialogue,
+                endpoint_results=endpoint_recommendations,
+            )
+            if llm_trace.get("llm_used") != "true":
+                llm_answer = None
+
+        emit_stream_event("stage", {"stage": "quality"})
+        llm_answer = cls._verify_llm_answer(
+            llm_answer=llm_answer,
+            llm_trace=llm_trace,
+            rag_trace=rag_trace,
+            safe_query=safe_query,
+            response_mode=response_mode,
+            effective_specialty=effective_specialty,
+            matched_domains=matched_domains,
+            knowledge_sources=knowledge_sources,
+            endpoint_recommendations=endpoint_recommendations,
+            pipeline_relaxed_mode=pipeline_relaxed_mode,
+            interrogatory_short_circuit=False,
+            contract_assessment=dict(snapshot.get("contract_assessment") or {}),
+            logic_assessment=dict(snapshot.get("logic_assessment") or {}),
+            interpretability_trace=interpretability_trace,
+        )
+        guardrails_trace: dict[str, str] = {}
+        answer = ""
+        if llm_answer:
+            answer, guardrails_trace = NeMoGuardrailsService.apply_output_guardrails(
+                query=safe_query,
+                answer=llm_answer,
+                response_mode=response_mode,
+                effective_specialty=effective_specialty,
+                tool_mode=tool_mode,
+                knowledge_sources=knowledge_sources,
+                web_sources=web_sources,
+            )
+            answer = cls._sanitize_final_answer_text(answer)
+        # Mismo control final que el turno sincrono; si no lo supera se
+        # conserva la respuesta extractiva ya entregada.
+        should_apply_final_clinical_quality_gate = (
+            bool(answer)
+            and response_mode == "clinical"
+            and not pipeline_relaxed_mode
+            and guardrails_trace.get("guardrails_status")
+            in {"skipped_disabled", "skipped_empty_answer"}
+        )
+        if should_apply_final_clinical_quality_gate and not (
+            cls._is_actionable_llm_answer(answer=answer, response_mode=response_mode)
+            and cls._has_source_grounding_in_answer(
+                answer=answer,
+                knowledge_sources=knowledge_sources,
+            )
+        ):
+            interpretability_trace.append("clinical_answer_quality_gate=keep_extractive_answer")
+            answer = ""
+        llm_refined = bool(answer)
+
+        message = cls._store_answer_revision(
+            db,
+            care_task_id=care_task_id,
+            message_id=message_id,
+            answer_fields={"assistant_answer": answer},
+            llm_refined=llm_refined,
+            lock_key=f"care-task:{care_task_id}:session:{cls._safe_session_id(payload.session_id)}",
+            lock_owner=f"chat-refinement:{uuid4().hex[:10]}",
+        )
+        quality_metrics = cls._build_quality_metrics(
+            query=safe_query,
+            answer=str(message.assistant_answer or ""),
+            matched_domains=matched_domains,
+            knowledge_sources=knowledge_sources,
+            web_sources=web_sources,
+        )
+        interpretability_trace.extend(
+            [
+                f"groundedness={quality_metrics['groundedness']}",
+                f"quality_status={quality_metrics['quality_status']}",
+            ]
+        )
+        for key, value in rag_trace.items():
+            if key == "rag_sources":
+                continue
+            if isinstance(value, list):
+                rendered_value = ",".join(str(item) for item in value[:6]) if value else "none"
+            else:
+                rendered_value = str(value)
+            interpretability_trace.append(f"{key}={rendered_value}")
+        interpretability_trace.extend([f"{key}={value}" for key, value in llm_trace.items()])
+        interpretability_trace.extend([f"{key}={value}" for key, value in guardrails_trace.items()])
+        interpretability_trace.append(f"answer_status={message.answer_status}")
+        interpretability_trace.append(f"answer_revision={message.answer_revision}")
+        run = AgentRunService.record_care_task_clinical_chat_refinement(
+            db,
+            run=run,
+            refinement_input={"message_id": message_id, "query": safe_query},
+            refinement_output={
+                "answer": message.assistant_answer,
+                "answer_status": message.answer_status,
+                "answer_revision": message.answer_revision,
+                "quality_metrics": quality_metrics,
+                "interpretability_trace": interpretability_trace,
+            },
+            refined=llm_refined,
+            latency_ms=round((time.perf_counter() - started_at) * 1000),
+        )
+        return (
+            message,
+            agent_run_id,
+            str(run.workflow_name),
+            interpretability_trace,
+            response_mode,
+            tool_mode,
+            quality_metrics,
+            str(chat_input.get("tool_policy_decision") or "allowed"),
+            list(snapshot.get("security_findings") or []),
+        )
+
     @classmethod
     def create_message(
         cls,
@@ -3806,6 +4320,8 @@ class ClinicalChatService:
         care_task: CareTask,
         payload: CareTaskClinicalChatMessageRequest,
         authenticated_user: User | None,
+        refine_message_id: int | None = None,
+        refine_agent_run_id: int | None = None,
     ) -> tuple[
         CareTaskChatMessage,
         int,
@@ -3817,6 +4333,14 @@ class ClinicalChatService:
         str,
         list[dict[str, str]],
     ]:
+        if refine_message_id is not None:
+            return cls._refine_provisional_answer(
+                db,
+                care_task=care_task,
+                payload=payload,
+                message_id=refine_message_id,
+                agent_run_id=refine_agent_run_id,
+            )
         session_id = cls._safe_session_id(payload.session_id)
         safe_query, prompt_injection_signals = cls._sanitize_user_query(payload.query)
         effective_specialty = cls._resolve_effective_specialty(
@@ -3948,56 +4472,81 @@ class ClinicalChatService:
         if not policy_decision.allowed:
             extracted_facts.append(f"tool_policy:{policy_decision.reason_code}")
 
-        math_assessment = ClinicalMathInferenceService.analyze_query(
-            query=safe_query,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-            extracted_facts=extracted_facts,
-            memory_facts_used=memory_facts_used,
-        )
-        vector_assessment = ClinicalVectorClassificationService.analyze_query(
-            query=safe_query,
-            domain_catalog=cls._DOMAIN_CATALOG,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-        )
-        cluster_assessment = ClinicalFlatClusteringService.analyze_query(
-            query=safe_query,
-            domain_catalog=cls._DOMAIN_CATALOG,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-        )
-        hcluster_assessment = ClinicalHierarchicalClusteringService.analyze_query(
-            query=safe_query,
-            domain_catalog=cls._DOMAIN_CATALOG,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-        )
-        svm_domain_assessment = ClinicalSVMDomainService.analyze_query(
-            query=safe_query,
-            domain_catalog=cls._DOMAIN_CATALOG,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-        )
-        naive_bayes_assessment = ClinicalNaiveBayesService.analyze_query(
-            query=safe_query,
-            domain_catalog=cls._DOMAIN_CATALOG,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-        )
-        risk_pipeline_assessment = ClinicalRiskPipelineService.analyze_query(
-            query=safe_query,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-            extracted_facts=extracted_facts,
-        )
-        svm_assessment = ClinicalSVMTriageService.analyze_query(
-            query=safe_query,
-            matched_domains=matched_domains,
-            effective_specialty=effective_specialty,
-            extracted_facts=extracted_facts,
-            memory_facts_used=memory_facts_used,
+        # Analizadores independientes: solo leen consulta/dominios/hechos del turno.
+        analyzer_facts = list(extracted_facts)
+        domain_analyzer_kwargs: dict[str, Any] = {
+            "query": safe_query,
+            "domain_catalog": cls._DOMAIN_CATALOG,
+            "matched_domains": matched_domains,
+            "effective_specialty": effective_specialty,
+        }
+        analyzer_results, analyzer_trace = ClinicalAnalyzerEngine.run_stages(
+            [
+                AnalyzerStage(
+                    "math",
+                    lambda: ClinicalMathInferenceService.analyze_query(
+                        query=safe_query,
+                        matched_domains=matched_domains,
+                        effective_specialty=effective_specialty,
+                        extracted_facts=analyzer_facts,
+                        memory_facts_used=memory_facts_used,
+                    ),
+                ),
+                AnalyzerStage(
+                    "vector",
+                    lambda: ClinicalVectorClassificationService.analyze_query(
+                        **domain_analyzer_kwargs
+                    ),
+                ),
+                AnalyzerStage(
+                    "cluster",
+                    lambda: ClinicalFlatClusteringService.analyze_query(**domain_analyzer_kwargs),
+                ),
+                AnalyzerStage(
+                    "hcluster",
+                    lambda: ClinicalHierarchicalClusteringService.analyze_query(
+                        **domain_analyzer_kwargs
+                    ),
+                ),
+                AnalyzerStage(
+                    "svm_domain",
+                    lambda: ClinicalSVMDomainService.analyze_query(**domain_analyzer_kwargs),
+                ),
+                AnalyzerStage(
+                    "naive_bayes",
+                    lambda: ClinicalNaiveBayesService.analyze_query(**domain_analyzer_kwargs),
+                ),
+                AnalyzerStage(
+                    "risk_pipeline",
+                    lambda: ClinicalRiskPipelineService.analyze_query(
+                        query=safe_query,
+                        matched_domains=matched_domains,
+                        effective_specialty=effective_specialty,
+                        extracted_facts=analyzer_facts,
+                    ),
+                ),
+                AnalyzerStage(
+                    "svm_triage",
+                    lambda: ClinicalSVMTriageService.analyze_query(
+                        query=safe_query,
+                        matched_domains=matched_domains,
+                        effective_specialty=effective_specialty,
+                        extracted_facts=analyzer_facts,
+                        memory_facts_used=memory_facts_used,
+                    ),
+                ),
+            ]
         )
+        math_assessment = analyzer_results["math"]
+        vector_assessment = analyzer_results["vector"]
+        cluster_assessment = analyzer_results["cluster"]
+        hcluster_assessment = analyzer_results["hcluster"]
+        svm_domain_assessment = analyzer_results["svm_domain"]
+        naive_bayes_assessment = analyzer_results["naive_bayes"]
+        risk_pipeline_assessment = analyzer_results["risk_pipeline"]
+        svm_assessment = analyzer_results["svm_triage"]
+        if analyzer_trace["analyzer_skipped"] != "none":
+            extracted_facts.append(f"analizadores_omitidos:{analyzer_trace['analyzer_skipped']}")
         matched_domain_records = cls._apply_math_domain_rerank(
             matched_domain_records=matched_domain_records,
             math_assessment=math_assessment,
@@ -4378,6 +4927,7 @@ class ClinicalChatService:
             f"requested_tool_mode={requested_tool_mode}",
             f"tool_mode={tool_mode}",
             f"tool_policy_decision={'allowed' if policy_decision.allowed else 'denied'}",
+            *[f"{key}={value}" for key, value in analyzer_trace.items()],
             f"tool_policy_reason={policy_decision.reason_code}",
             f"tool_risk_level={risk_assessment.risk_level}",
             "tool_risk_categories="
@@ -4633,6 +5183,14 @@ class ClinicalChatService:
             interpretability_trace.append(
                 f"rag_enabled={1 if settings.CLINICAL_CHAT_RAG_ENABLED else 0}"
             )
+        speculative_phase = cls._speculative_answer_applies(
+            payload=payload,
+            response_mode=response_mode,
+            interrogatory_short_circuit=interrogatory_short_circuit,
+        )
+        llm_deferred = False
+        if speculative_phase:
+            interpretability_trace.append("answer_strategy=speculative_extractive")
 
         if interrogatory_short_circuit:
             llm_answer = cls._render_clarifying_question_answer(
@@ -4658,6 +5216,7 @@ class ClinicalChatService:
             }
             guardrails_trace = {"guardrails_status": "skipped_interrogatory"}
         elif response_mode == "clinical" and settings.CLINICAL_CHAT_RAG_ENABLED:
+            emit_stream_event("stage", {"stage": "retrieval"})
             rag_answer, rag_trace = RAGOrchestrator(db=db).process_query_with_rag(
                 query=effective_query,
                 response_mode=response_mode,
@@ -4674,6 +5233,11 @@ class ClinicalChatService:
                 endpoint_results=endpoint_recommendations,
                 care_task_id=care_task.id,
                 pipeline_relaxed_mode=pipeline_relaxed_mode,
+                speculative_extractive=speculative_phase,
+            )
+            llm_deferred = (
+                str(rag_trace.get("rag_llm_skipped_reason") or "")
+                == "speculative_extractive_phase"
             )
             rag_sources = rag_trace.get("rag_sources")
             rag_extractive_llm_failure = (
@@ -4876,7 +5440,13 @@ class ClinicalChatService:
                 interpretability_trace.append("llm_second_pass_skipped=rag_failed_retrieval")
             elif rag_failed_generation_with_llm_failure:
                 interpretability_trace.append("llm_second_pass_skipped=rag_failed_generation")
+            elif speculative_phase:
+                llm_deferred = True
+                interpretability_trace.append(
+                    "llm_second_pass_skipped=speculative_extractive_phase"
+                )
             else:
+                emit_stream_event("stage", {"stage": "generation"})
                 llm_answer, llm_trace = LLMChatProvider.generate_answer(
                     query=safe_query,
                     response_mode=response_mode,
@@ -4893,122 +5463,22 @@ class ClinicalChatService:
                     endpoint_results=endpoint_recommendations,
                 )
 
-        should_attempt_llm_rewrite = (
-            settings.CLINICAL_CHAT_LLM_REWRITE_ENABLED
-            and
-            not settings.CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED
-            and
-            response_mode == "clinical"
-            and bool(llm_answer)
-            and llm_trace.get("llm_used") == "true"
-            and llm_trace.get("llm_provider") == settings.CLINICAL_CHAT_LLM_PROVIDER
-            and not llm_trace.get("llm_chat_error")
-        )
-        if should_attempt_llm_rewrite:
-            initial_actionable = cls._is_actionable_llm_answer(
-                answer=str(llm_answer or ""),
-                response_mode=response_mode,
-            )
-            initial_grounded = cls._has_source_grounding_in_answer(
-                answer=str(llm_answer or ""),
-                knowledge_sources=knowledge_sources,
-            )
-            rag_validation_status = str(rag_trace.get("rag_validation_status", "valid"))
-            initial_rag_valid = rag_validation_status == "valid"
-            if not initial_actionable or not initial_grounded or not initial_rag_valid:
-                rewritten_answer, rewrite_trace = (
-                    LLMChatProvider.rewrite_clinical_answer_with_verification(
-                        query=safe_query,
-                        draft_answer=str(llm_answer or ""),
-                        effective_specialty=effective_specialty,
-                        matched_domains=matched_domains,
-                        knowledge_sources=knowledge_sources,
-                        endpoint_results=endpoint_recommendations,
-                    )
-                )
-                llm_trace.update(rewrite_trace)
-                interpretability_trace.append(
-                    "llm_rewrite_attempted=1"
-                    f";initial_actionable={1 if initial_actionable else 0}"
-                    f";initial_grounded={1 if initial_grounded else 0}"
-                    f";initial_rag_valid={1 if initial_rag_valid else 0}"
-                )
-                if rewritten_answer:
-                    llm_answer = rewritten_answer
-            else:
-                llm_trace["llm_rewrite_status"] = "skipped_not_needed"
-
-        if (
-            response_mode == "clinical"
-            and bool(llm_answer)
-            and llm_trace.get("llm_origin") == "rag_orchestrator"
-            and not pipeline_relaxed_mode
-            and str(rag_trace.get("rag_validation_status", "valid")) != "valid"
-        ):
-            interpretability_trace.append("llm_quality_gate=rag_validation_warning_fallback")
-            llm_answer = None
-
-        should_apply_llm_quality_gate = (
-            settings.CLINICAL_CHAT_LLM_QUALITY_GATES_ENABLED
-            and not settings.CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED
-            and not pipeline_relaxed_mode
-            and
-            bool(llm_answer)
-            and llm_trace.get("llm_used") == "true"
-            and "llm_latency_ms" in llm_trace
-        )
-        if should_apply_llm_quality_gate and not cls._is_actionable_llm_answer(
-            answer=str(llm_answer or ""),
+        llm_answer = cls._verify_llm_answer(
+            llm_answer=llm_answer,
+            llm_trace=llm_trace,
+            rag_trace=rag_trace,
+            safe_query=safe_query,
             response_mode=response_mode,
-        ):
-            interpretability_trace.append("llm_quality_gate=short_or_generic_fallback")
-            llm_answer = None
-        elif (
-            should_apply_llm_quality_gate
-            and response_mode == "clinical"
-            and not cls._has_source_grounding_in_answer(
-                answer=str(llm_answer or ""),
-                knowledge_sources=knowledge_sources,
-            )
-        ):
-            interpretability_trace.append("llm_quality_gate=missing_source_grounding_fallback")
-            llm_answer = None
-
-        if (
-            response_mode == "clinical"
-            and bool(llm_answer)
-            and not interrogatory_short_circuit
-            and not pipeline_relaxed_mode
-            and bool(contract_assessment.get("force_structured_fallback"))
-        ):
-            interpretability_trace.append("contract_guard=forced_structured_fallback")
-            if (
-                llm_trace.get("llm_used") == "true"
-                and "clinical_answer_quality_gate=final_structured_fallback"
-                not in interpretability_trace
-            ):
-                interpretability_trace.append(
-                    "clinical_answer_quality_gate=final_structured_fallback"
-                )
-            llm_answer = None
-
-        if (
-            response_mode == "clinical"
-            and bool(llm_answer)
-            and not interrogatory_short_circuit
-            and not pipeline_relaxed_mode
-            and bool(logic_assessment.get("abstention_required"))
-        ):
-            interpretability_trace.append("logic_abstention_guard=forced_structured_fallback")
-            if (
-                llm_trace.get("llm_used") == "true"
-                and "clinical_answer_quality_gate=final_structured_fallback"
-                not in interpretability_trace
-            ):
-                interpretability_trace.append(
-                    "clinical_answer_quality_gate=final_structured_fallback"
-                )
-            llm_answer = None
+            effective_specialty=effective_specialty,
+            matched_domains=matched_domains,
+            knowledge_sources=knowledge_sources,
+            endpoint_recommendations=endpoint_recommendations,
+            pipeline_relaxed_mode=pipeline_relaxed_mode,
+            interrogatory_short_circuit=interrogatory_short_circuit,
+            contract_assessment=contract_assessment,
+            logic_assessment=logic_assessment,
+            interpretability_trace=interpretability_trace,
+        )
 
         rag_chunks_retrieved_raw = rag_trace.get("rag_chunks_retrieved", 0)
         try:
@@ -5193,6 +5663,7 @@ class ClinicalChatService:
                     math_assessment=math_assessment,
                 )
 
+        emit_stream_event("stage", {"stage": "quality"})
         quality_metrics = cls._build_quality_metrics(
             query=safe_query,
             answer=answer,
@@ -5260,6 +5731,50 @@ class ClinicalChatService:
             interpretability_trace.extend(
                 [f"{key}={value}" for key, value in guardrails_trace.items()]
             )
+        emit_stream_event("stage", {"stage": "persist"})
+        chat_output: dict[str, Any] = {
+            "answer": answer,
+            "response_mode": response_mode,
+            "tool_mode": tool_mode,
+            "matched_domains": matched_domains,
+            "matched_endpoints": matched_endpoints,
+            "knowledge_sources": knowledge_sources,
+            "web_sources": web_sources,
+            "endpoint_recommendations": endpoint_recommendations,
+            "memory_facts_used": memory_facts_used,
+            "patient_history_facts_used": patient_history_facts_used,
+            "extracted_facts": extracted_facts,
+            "patient_summary": patient_summary,
+            "interpretability_trace": interpretability_trace,
+            "quality_metrics": quality_metrics,
+            "guardrails_trace": guardrails_trace,
+            "interrogatory_result": interrogatory_result,
+            "decision_psychology": decision_psychology,
+            "logic_assessment": logic_assessment,
+            "contract_assessment": contract_assessment,
+            "math_assessment": math_assessment,
+            "cluster_assessment": cluster_assessment,
+            "hcluster_assessment": hcluster_assessment,
+            "vector_assessment": vector_assessment,
+            "svm_domain_assessment": svm_domain_assessment,
+            "naive_bayes_assessment": naive_bayes_assessment,
+            "risk_pipeline_assessment": risk_pipeline_assessment,
+            "svm_assessment": svm_assessment,
+            "security_findings": security_findings,
+            "tool_policy_trace": policy_decision.trace,
+            "tool_risk": {
+                "risk_level": risk_assessment.risk_level,
+                "categories": risk_assessment.categories,
+                "reasons": risk_assessment.reasons,
+            },
+        }
+        if llm_deferred:
+            # Contexto minimo para que el refinamiento genere sin repetir el turno.
+            chat_output["refinement_context"] = {
+                "safe_query": safe_query,
+                "effective_query": effective_query,
+                "recent_dialogue": recent_dialogue,
+            }
         run = AgentRunService.run_care_task_clinical_chat_workflow(
             db=db,
             care_task=care_task,
@@ -5286,42 +5801,7 @@ class ClinicalChatService:
                 "interrogation_confidence_threshold": payload.interrogation_confidence_threshold,
                 "local_evidence_items": len(local_evidence_sources),
             },
-            chat_output={
-                "answer": answer,
-                "response_mode": response_mode,
-                "tool_mode": tool_mode,
-                "matched_domains": matched_domains,
-                "matched_endpoints": matched_endpoints,
-                "knowledge_sources": knowledge_sources,
-                "web_sources": web_sources,
-                "endpoint_recommendations": endpoint_recommendations,
-                "memory_facts_used": memory_facts_used,
-                "patient_history_facts_used": patient_history_facts_used,
-                "extracted_facts": extracted_facts,
-                "patient_summary": patient_summary,
-                "interpretability_trace": interpretability_trace,
-                "quality_metrics": quality_metrics,
-                "guardrails_trace": guardrails_trace,
-                "interrogatory_result": interrogatory_result,
-                "decision_psychology": decision_psychology,
-                "logic_assessment": logic_assessment,
-                "contract_assessment": contract_assessment,
-                "math_assessment": math_assessment,
-                "cluster_assessment": cluster_assessment,
-                "hcluster_assessment": hcluster_assessment,
-                "vector_assessment": vector_assessment,
-                "svm_domain_assessment": svm_domain_assessment,
-                "naive_bayes_assessment": naive_bayes_assessment,
-                "risk_pipeline_assessment": risk_pipeline_assessment,
-                "svm_assessment": svm_assessment,
-                "security_findings": security_findings,
-                "tool_policy_trace": policy_decision.trace,
-                "tool_risk": {
-                    "risk_level": risk_assessment.risk_level,
-                    "categories": risk_assessment.categories,
-                    "reasons": risk_assessment.reasons,
-                },
-            },
+            chat_output=chat_output,
         )
         message = CareTaskChatMessage(
             care_task_id=care_task.id,
@@ -5337,6 +5817,8 @@ class ClinicalChatService:
             memory_facts_used=memory_facts_used,
             patient_history_facts_used=patient_history_facts_used,
             extracted_facts=extracted_facts,
+            answer_revision=1,
+            answer_status="provisional" if llm_deferred else "final",
         )
         lock_key = f"care-task:{care_task.id}:session:{session_id}"
         lock_owner = f"chat-message:{uuid4().hex[:10]}"
@@ -5349,6 +5831,16 @@ class ClinicalChatService:
             db.add(message)
             db.commit()
             db.refresh(message)
+        if llm_deferred:
+            interpretability_trace.extend(
+                cls._schedule_answer_refinement(
+                    db,
+                    message=message,
+                    agent_run_id=run.id,
+                    payload=payload,
+                    authenticated_user=authenticated_user,
+                )
+            )
         return (
             message,
             run.id,
@@ -0,0 +1,49 @@
+"""
+Canal de eventos de streaming para el pipeline de chat clinico.
+
+El pipeline es sincrono y anidado (`ClinicalChatService` -> `RAGOrchestrator`
+-> `LLMChatProvider`), asi que en lugar de pasar un callback por todas las
+capas se registra un sumidero en un `ContextVar` del hilo que ejecuta el
+turno. Sin sumidero activo, `emit_stream_event` no hace nada: el endpoint
+sincrono y el asincrono no cambian.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+StreamSink = Callable[[str, dict[str, Any]], None]
+
+_stream_sink: ContextVar[Optional[StreamSink]] = ContextVar(
+    "clinical_chat_stream_sink",
+    default=None,
+)
+
+
+def stream_active() -> bool:
+    return _stream_sink.get() is not None
+
+
+def emit_stream_event(event: str, data: dict[str, Any]) -> None:
+    """Entrega `event` al sumidero activo; nunca interrumpe el pipeline."""
+    sink = _stream_sink.get()
+    if sink is None:
+        return
+    try:
+        sink(event, data)
+    except Exception as exc:  # pragma: no cover - defensivo
+        logger.warning("Fallo al emitir evento de streaming %s: %s", event, exc)
+
+
+@contextmanager
+def stream_events_to(sink: StreamSink) -> Iterator[None]:
+    token = _stream_sink.set(sink)
+    try:
+        yield
+    finally:
+        _stream_sink.reset(token)
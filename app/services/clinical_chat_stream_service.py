@@ -0,0 +1,187 @@
+"""
+Chat clinico en streaming (server-sent events).
+
+El turno se ejecuta con `ClinicalChatService.create_message` en un hilo propio
+con su propia sesion; el pipeline publica eventos de etapa y, si el proveedor
+LLM responde en streaming, cada fragmento generado. Los eventos pasan por una
+cola al generador que consume el endpoint, de modo que el cliente ve el primer
+token en cuanto Ollama lo produce en vez de esperar a la generacion completa.
+
+La persistencia del mensaje y las puertas de calidad no cambian: se ejecutan al
+final del turno aunque el cliente se haya desconectado, y el evento `message`
+lleva la respuesta definitiva (los tokens son provisionales).
+
+Con respuesta especulativa `message` trae la extractiva provisional y el hilo
+espera (acotado) a que el refinamiento LLM cierre el mensaje para emitir
+`revision` con la respuesta final.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from enum import Enum
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.care_task import CareTask
+from app.models.care_task_chat_message import CareTaskChatMessage
+from app.models.user import User
+from app.schemas.clinical_chat import CareTaskClinicalChatMessageRequest
+from app.services.clinical_chat_service import ClinicalChatService
+from app.services.clinical_chat_stream_events import emit_stream_event, stream_events_to
+
+ResultRenderer = Callable[[CareTask, tuple[Any, ...]], dict[str, Any]]
+RevisionRenderer = Callable[[CareTaskChatMessage], dict[str, Any]]
+
+_REVISION_POLL_SECONDS = 0.25
+
+
+class _StreamMarker(Enum):
+    """Marca de control de la cola de eventos; se compara por identidad."""
+
+    END_OF_STREAM = "end_of_stream"
+
+
+_END_OF_STREAM = _StreamMarker.END_OF_STREAM
+
+StreamEvent = tuple[str, dict[str, Any]]
+StreamQueue = queue.Queue[StreamEvent | _StreamMarker]
+
+
+def format_sse_event(event: str, data: dict[str, Any]) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class ClinicalChatStreamService:
+    """Ejecuta un turno de chat y lo expone como secuencia de eventos SSE."""
+
+    @classmethod
+    def stream_message(
+        cls,
+        *,
+        bind: Any,
+        care_task_id: int,
+        payload: CareTaskClinicalChatMessageRequest,
+        user_id: int | None,
+        render_result: ResultRenderer,
+        render_revision: RevisionRenderer | None = None,
+    ) -> Iterator[str]:
+        """
+        Lanza el turno en segundo plano y devuelve el generador de eventos.
+
+        Eventos: `stage`, `llm_attempt` (el proveedor reinicia la generacion;
+        el cliente descarta los tokens previos), `token`, `message` (respuesta
+        publica final), `revision` (refinamiento de una respuesta especulativa),
+        `error` y `done`.
+        """
+        events: StreamQueue = queue.Queue()
+        worker = threading.Thread(
+            target=cls._run_turn,
+            kwargs={
+                "events": events,
+                "bind": bind,
+                "care_task_id": care_task_id,
+                "payload": payload,
+                "user_id": user_id,
+                "render_result": render_result,
+                "render_revision": render_revision,
+            },
+            name="clinical-chat-stream",
+            daemon=True,
+        )
+        worker.start()
+        return cls._iter_events(events)
+
+    @staticmethod
+    def _iter_events(events: StreamQueue) -> Iterator[str]:
+        heartbeat_seconds = float(settings.CLINICAL_CHAT_STREAM_HEARTBEAT_SECONDS)
+        while True:
+            try:
+                item = events.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                # Comentario SSE: mantiene viva la conexion en proxies intermedios.
+                yield ": keep-alive\n\n"
+                continue
+            if item is _END_OF_STREAM:
+                yield format_sse_event("done", {})
+                return
+            event, data = item
+            yield format_sse_event(event, data)
+
+    @staticmethod
+    def _run_turn(
+        *,
+        events: StreamQueue,
+        bind: Any,
+        care_task_id: int,
+        payload: CareTaskClinicalChatMessageRequest,
+        user_id: int | None,
+        render_result: ResultRenderer,
+        render_revision: RevisionRenderer | None = None,
+    ) -> None:
+        def _sink(event: str, data: dict[str, Any]) -> None:
+            events.put((event, data))
+
+        try:
+            with Session(bind=bind) as db, stream_events_to(_sink):
+                emit_stream_event("stage", {"stage": "started"})
+                care_task = db.query(CareTask).filter(CareTask.id == care_task_id).first()
+                if care_task is None:
+                    events.put(("error", {"error": "care_task_not_found"}))
+                    return
+                user = None
+                if user_id is not None:
+                    user = db.query(User).filter(User.id == int(user_id)).first()
+                result = ClinicalChatService.create_message(
+                    db=db,
+                    care_task=care_task,
+                    payload=payload,
+                    authenticated_user=user,
+                )
+                events.put(("message", render_result(care_task, result)))
+                message = result[0]
+                provisional = getattr(message, "answer_status", None) == "provisional"
+                message_id = message.id
+                if render_revision is not None and provisional and message_id is not None:
+                    revised = ClinicalChatStreamService._await_revision(
+                        db,
+                        care_task_id=care_task_id,
+                        message_id=message_id,
+                    )
+                    if revised is not None:
+                        events.put(("revision", render_revision(revised)))
+        except Exception as exc:
+            events.put(("error", {"error": f"{type(exc).__name__}:{str(exc)[:200]}"}))
+        finally:
+            events.put(_END_OF_STREAM)
+
+    @staticmethod
+    def _await_revision(
+        db: Session,
+        *,
+        care_task_id: int,
+        message_id: int,
+    ) -> CareTaskChatMessage | None:
+        """Espera a que el refinamiento cierre el mensaje; None si vence el plazo."""
+        deadline = time.monotonic() + float(settings.CLINICAL_CHAT_SPECULATIVE_STREAM_WAIT_SECONDS)
+        while True:
+            # El worker escribe con otra sesion: se descarta el estado cacheado.
+            db.expire_all()
+            message = ClinicalChatService.get_message(
+                db,
+                care_task_id=care_task_id,
+                message_id=message_id,
+            )
+            if message is None:
+                return None
+            if message.answer_status != "provisional":
+                return message
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(_REVISION_POLL_SECONDS)
@@ -15,6 +15,7 @@ from collections import Counter, defaultdict
 from typing import Any
 
 from app.core.config import settings
+from app.services.clinical_model_registry import ClinicalModelRegistry
 
 
 class ClinicalFlatClusteringService:
@@ -440,6 +441,110 @@ class ClinicalFlatClusteringService:
             "f_measure": round(max(0.0, min(1.0, f_total)), 4),
         }
 
+    @classmethod
+    def fitted_model(
+        cls,
+        *,
+        domain_catalog: list[dict[str, object]],
+    ) -> tuple[dict[str, Any], bool]:
+        """Particion k-means/EM, centroides y calidad ajustados una vez por catalogo/ajustes."""
+        method = str(settings.CLINICAL_CHAT_CLUSTER_METHOD).strip().lower()
+        k_min = int(settings.CLINICAL_CHAT_CLUSTER_K_MIN)
+        k_max = int(settings.CLINICAL_CHAT_CLUSTER_K_MAX)
+        max_iterations = int(settings.CLINICAL_CHAT_CLUSTER_MAX_ITERATIONS)
+        em_iterations = int(settings.CLINICAL_CHAT_CLUSTER_EM_ITERATIONS)
+        f_beta = float(settings.CLINICAL_CHAT_CLUSTER_F_BETA)
+
+        def _fit() -> dict[str, Any]:
+            empty: dict[str, Any] = {"training_docs": 0}
+            samples = cls._build_training_samples(domain_catalog=domain_catalog)
+            if not samples:
+                return empty
+            idf = cls._compute_idf(samples=samples)
+            sample_vectors = [
+                cls._vectorize_tokens(tokens=tokens, idf=idf) for _, tokens in samples
+            ]
+            sample_labels = [label for label, _ in samples]
+            n_samples = len(sample_vectors)
+            if n_samples == 0:
+                return empty
+
+            effective_k_min = max(1, min(k_min, n_samples))
+            effective_k_max = max(effective_k_min, min(k_max, n_samples))
+            best_run: dict[str, Any] | None = None
+            best_aic = float("inf")
+            for k in range(effective_k_min, effective_k_max + 1):
+                kmeans_run = cls._run_kmeans(
+                    vectors=sample_vectors,
+                    k=k,
+                    max_iterations=max_iterations,
+                )
+                rss = float(kmeans_run["rss"])
+                aic = rss + (2.0 * float(len(idf)) * float(k))
+                if aic < best_aic:
+                    best_aic = aic
+                    best_run = {
+                        "k": k,
+                        "rss": rss,
+                        "aic": aic,
+                        "centroids": kmeans_run["centroids"],
+                        "assignments": kmeans_run["assignments"],
+                    }
+            if best_run is None:
+                return empty
+
+            assignments = list(best_run["assignments"])
+            centroids = list(best_run["centroids"])
+            if method == "kmeans_em":
+                em_run = cls._run_em_refinement(
+                    vectors=sample_vectors,
+                    initial_centroids=centroids,
+                    max_iterations=em_iterations,
+                )
+                centroids = list(em_run["centroids"])
+                assignments = list(em_run["assignments"])
+
+            # Deteccion de singleton clusters (outliers operativos).
+            cluster_sizes: dict[int, int] = Counter(int(cluster_id) for cluster_id in assignments)
+            return {
+                "training_docs": n_samples,
+                "idf": idf,
+                "sample_vectors": sample_vectors,
+                "sample_labels": sample_labels,
+                "k_min": effective_k_min,
+                "k_max": effective_k_max,
+                "k_selected": int(best_run["k"]),
+                "rss": float(best_run["rss"]),
+                "aic": float(best_run["aic"]),
+                "assignments": [int(cluster_id) for cluster_id in assignments],
+                "centroids": centroids,
+                "centroid_norms": [
+                    sum(value * value for value in centroid.values()) for centroid in centroids
+                ],
+                "singleton_clusters": sorted(
+                    cluster_id for cluster_id, size in cluster_sizes.items() if int(size) == 1
+                ),
+                "quality": cls._evaluate_clustering(
+                    true_labels=sample_labels,
+                    cluster_ids=assignments,
+                    beta=f_beta,
+                ),
+            }
+
+        return ClinicalModelRegistry.get_or_fit(
+            "flat_clustering",
+            domain_catalog=domain_catalog,
+            params={
+                "method": method,
+                "k_min": k_min,
+                "k_max": k_max,
+                "max_iterations": max_iterations,
+                "em_iterations": em_iterations,
+                "f_beta": f_beta,
+            },
+            fit=_fit,
+        )
+
     @classmethod
     def analyze_query(
         cls,
@@ -452,9 +557,6 @@ class ClinicalFlatClusteringService:
         method = str(settings.CLINICAL_CHAT_CLUSTER_METHOD).strip().lower()
         k_min = int(settings.CLINICAL_CHAT_CLUSTER_K_MIN)
         k_max = int(settings.CLINICAL_CHAT_CLUSTER_K_MAX)
-        max_iterations = int(settings.CLINICAL_CHAT_CLUSTER_MAX_ITERATIONS)
-        em_iterations = int(settings.CLINICAL_CHAT_CLUSTER_EM_ITERATIONS)
-        f_beta = float(settings.CLINICAL_CHAT_CLUSTER_F_BETA)
 
         disabled_payload = {
             "enabled": False,
@@ -499,55 +601,17 @@ class ClinicalFlatClusteringService:
         if not settings.CLINICAL_CHAT_CLUSTER_ENABLED:
             return disabled_payload
 
-        samples = cls._build_training_samples(domain_catalog=domain_catalog)
-        if not samples:
-            return disabled_payload
-
-        idf = cls._compute_idf(samples=samples)
-        sample_vectors = [cls._vectorize_tokens(tokens=tokens, idf=idf) for _, tokens in samples]
-        sample_labels = [label for label, _ in samples]
-        n_samples = len(sample_vectors)
-        if n_samples == 0:
+        fitted, model_cache_hit = cls.fitted_model(domain_catalog=domain_catalog)
+        if not fitted["training_docs"]:
             return disabled_payload
 
-        effective_k_min = max(1, min(k_min, n_samples))
-        effective_k_max = max(effective_k_min, min(k_max, n_samples))
-        candidate_ks = list(range(effective_k_min, effective_k_max + 1))
-
-        best_run: dict[str, Any] | None = None
-        best_aic = float("inf")
-        for k in candidate_ks:
-            kmeans_run = cls._run_kmeans(
-                vectors=sample_vectors,
-                k=k,
-                max_iterations=max_iterations,
-            )
-            rss = float(kmeans_run["rss"])
-            aic = rss + (2.0 * float(len(idf)) * float(k))
-            if aic < best_aic:
-                best_aic = aic
-                best_run = {
-                    "k": k,
-                    "rss": rss,
-                    "aic": aic,
-                    "centroids": kmeans_run["centroids"],
-                    "assignments": kmeans_run["assignments"],
-                    "iterations": kmeans_run["iterations"],
-                }
-
-        if best_run is None:
-            return disabled_payload
-
-        assignments = list(best_run["assignments"])
-        centroids = list(best_run["centroids"])
-        if method == "kmeans_em":
-            em_run = cls._run_em_refinement(
-                vectors=sample_vectors,
-                initial_centroids=centroids,
-                max_iterations=em_iterations,
-            )
-            centroids = list(em_run["centroids"])
-            assignments = list(em_run["assignments"])
+        idf = fitted["idf"]
+        sample_vectors = fitted["sample_vectors"]
+        sample_labels = fitted["sample_labels"]
+        n_samples = int(fitted["training_docs"])
+        assignments = fitted["assignments"]
+        centroids = fitted["centroids"]
+        centroid_norms = fitted["centroid_norms"]
 
         query_tokens = cls._tokenize(query)
         query_vector = cls._vectorize_tokens(tokens=query_tokens, idf=idf)
@@ -555,12 +619,11 @@ class ClinicalFlatClusteringService:
         centroid_scores: dict[str, float] = {}
         centroid_distances: dict[int, float] = {}
         for cluster_id, centroid in enumerate(centroids):
-            centroid_norm = sum(value * value for value in centroid.values())
             dist = cls._distance_sq(
                 left=query_vector,
                 right=centroid,
                 left_norm=query_norm,
-                right_norm=centroid_norm,
+                right_norm=centroid_norms[cluster_id],
             )
             centroid_distances[cluster_id] = float(dist)
             centroid_scores[str(cluster_id)] = -float(dist) * cls._QUERY_SOFTMAX_SCALE
@@ -604,17 +667,8 @@ class ClinicalFlatClusteringService:
             )
         ]
 
-        # Deteccion de singleton clusters (outliers operativos).
-        cluster_sizes: dict[int, int] = Counter(int(cluster_id) for cluster_id in assignments)
-        singleton_clusters = sorted(
-            cluster_id for cluster_id, size in cluster_sizes.items() if int(size) == 1
-        )
-
-        quality = cls._evaluate_clustering(
-            true_labels=sample_labels,
-            cluster_ids=assignments,
-            beta=f_beta,
-        )
+        singleton_clusters = list(fitted["singleton_clusters"])
+        quality = dict(fitted["quality"])
         rerank_recommended = (
             1
             if candidate_domains
@@ -624,9 +678,9 @@ class ClinicalFlatClusteringService:
         trace = {
             "cluster_enabled": "1",
             "cluster_method": method,
-            "cluster_k_selected": str(best_run["k"]),
-            "cluster_k_min": str(effective_k_min),
-            "cluster_k_max": str(effective_k_max),
+            "cluster_k_selected": str(fitted["k_selected"]),
+            "cluster_k_min": str(fitted["k_min"]),
+            "cluster_k_max": str(fitted["k_max"]),
             "cluster_top_id": str(top_cluster_id),
             "cluster_top_confidence": f"{top_confidence:.4f}",
             "cluster_margin_top2": f"{margin_top2:.4f}",
@@ -635,8 +689,8 @@ class ClinicalFlatClusteringService:
                 ",".join(candidate_domains[:6]) if candidate_domains else "none"
             ),
             "cluster_singletons": str(len(singleton_clusters)),
-            "cluster_rss": f"{float(best_run['rss']):.4f}",
-            "cluster_aic": f"{float(best_run['aic']):.4f}",
+            "cluster_rss": f"{float(fitted['rss']):.4f}",
+            "cluster_aic": f"{float(fitted['aic']):.4f}",
             "cluster_purity": f"{quality['purity']:.4f}",
             "cluster_nmi": f"{quality['nmi']:.4f}",
             "cluster_rand_index": f"{quality['rand_index']:.4f}",
@@ -644,11 +698,12 @@ class ClinicalFlatClusteringService:
             "cluster_vocab_size": str(len(idf)),
             "cluster_training_docs": str(n_samples),
             "cluster_rerank_recommended": str(rerank_recommended),
+            "cluster_model_cache_hit": "1" if model_cache_hit else "0",
         }
         return {
             "enabled": True,
             "method": method,
-            "k_selected": int(best_run["k"]),
+            "k_selected": int(fitted["k_selected"]),
             "top_cluster_id": int(top_cluster_id),
             "top_confidence": round(top_confidence, 4),
             "margin_top2": round(margin_top2, 4),
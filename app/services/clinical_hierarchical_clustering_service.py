@@ -17,6 +17,7 @@ from collections import Counter, defaultdict
 from typing import Any
 
 from app.core.config import settings
+from app.services.clinical_model_registry import ClinicalModelRegistry
 
 
 class ClinicalHierarchicalClusteringService:
@@ -665,6 +666,123 @@ class ClinicalHierarchicalClusteringService:
             )
         return labels
 
+    @classmethod
+    def fitted_model(
+        cls,
+        *,
+        domain_catalog: list[dict[str, object]],
+    ) -> tuple[dict[str, Any], bool]:
+        """Dendrograma/particion, centroides y etiquetas ajustados una vez por catalogo."""
+        method = str(settings.CLINICAL_CHAT_HCLUSTER_METHOD).strip().lower()
+        k_min = int(settings.CLINICAL_CHAT_HCLUSTER_K_MIN)
+        k_max = int(settings.CLINICAL_CHAT_HCLUSTER_K_MAX)
+        f_beta = float(settings.CLINICAL_CHAT_HCLUSTER_F_BETA)
+        buckshot_scale = float(settings.CLINICAL_CHAT_HCLUSTER_BUCKSHOT_SAMPLE_SCALE)
+
+        def _fit() -> dict[str, Any]:
+            empty: dict[str, Any] = {"training_docs": 0}
+            samples = cls._build_training_samples(domain_catalog=domain_catalog)
+            if not samples:
+                return empty
+            sample_labels = [label for label, _ in samples]
+            sample_tokens = [tokens for _, tokens in samples]
+            idf = cls._compute_idf(samples=samples)
+            sample_vectors = [
+                cls._vectorize_tokens(tokens=tokens, idf=idf) for tokens in sample_tokens
+            ]
+            n_samples = len(sample_vectors)
+            if n_samples == 0:
+                return empty
+
+            effective_k_min = max(1, min(k_min, n_samples))
+            effective_k_max = max(effective_k_min, min(k_max, n_samples))
+            best_run: dict[str, Any] | None = None
+            best_objective = float("-inf")
+            linkage = "average"
+            strategy = method
+            for k in range(effective_k_min, effective_k_max + 1):
+                if method in {"hac_single", "hac_complete", "hac_average"}:
+                    linkage = method.split("_", maxsplit=1)[1]
+                    run = cls._run_hac(vectors=sample_vectors, k=k, linkage=linkage)
+                    strategy = f"hac_{linkage}"
+                elif method == "divisive":
+                    run = cls._run_divisive(vectors=sample_vectors, k=k)
+                    linkage = "average"
+                    strategy = "divisive"
+                else:
+                    run = cls._run_buckshot(
+                        vectors=sample_vectors,
+                        k=k,
+                        linkage="average",
+                        sample_scale=buckshot_scale,
+                    )
+                    linkage = "average"
+                    strategy = "buckshot"
+
+                quality = cls._evaluate_clustering(
+                    true_labels=sample_labels,
+                    cluster_ids=run["assignments"],
+                    beta=f_beta,
+                )
+                objective = (
+                    (0.50 * float(quality["f_measure"]))
+                    + (0.30 * float(quality["nmi"]))
+                    + (0.20 * float(quality["purity"]))
+                )
+                objective -= 0.005 * float(max(0, k - effective_k_min))
+                if objective > best_objective:
+                    best_objective = objective
+                    best_run = {
+                        **run,
+                        "k": k,
+                        "quality": quality,
+                        "linkage": linkage,
+                        "strategy": strategy,
+                    }
+            if best_run is None:
+                return empty
+
+            assignments = [int(cluster_id) for cluster_id in best_run["assignments"]]
+            cluster_members = [list(members) for members in best_run["cluster_members"]]
+            cluster_sizes: dict[int, int] = Counter(assignments)
+            return {
+                "training_docs": n_samples,
+                "idf": idf,
+                "sample_vectors": sample_vectors,
+                "sample_labels": sample_labels,
+                "k_min": effective_k_min,
+                "k_max": effective_k_max,
+                "k_selected": int(best_run["k"]),
+                "strategy": str(best_run.get("strategy") or strategy),
+                "linkage": str(best_run.get("linkage") or linkage),
+                "merge_steps": int(best_run.get("merge_steps") or 0),
+                "sample_size": int(best_run.get("sample_size") or 0),
+                "centroids": list(best_run["centroids"]),
+                "cluster_members": cluster_members,
+                "quality": dict(best_run["quality"]),
+                "singleton_clusters": sorted(
+                    cluster_id for cluster_id, size in cluster_sizes.items() if int(size) == 1
+                ),
+                "cluster_labels": cls._build_cluster_labels(
+                    cluster_members=cluster_members,
+                    sample_labels=sample_labels,
+                    sample_tokens=sample_tokens,
+                ),
+            }
+
+        return ClinicalModelRegistry.get_or_fit(
+            "hierarchical_clustering",
+            domain_catalog=domain_catalog,
+            params={
+                "method": method,
+                "k_min": k_min,
+                "k_max": k_max,
+                "f_beta": f_beta,
+                "buckshot_scale": buckshot_scale,
+            },
+            fit=_fit,
+        )
+
     @classmethod
     def analyze_query(
         cls,
@@ -678,8 +796,6 @@ class ClinicalHierarchicalClusteringService:
         k_min = int(settings.CLINICAL_CHAT_HCLUSTER_K_MIN)
         k_max = int(settings.CLINICAL_CHAT_HCLUSTER_K_MAX)
         min_confidence = float(settings.CLINICAL_CHAT_HCLUSTER_MIN_CONFIDENCE)
-        f_beta = float(settings.CLINICAL_CHAT_HCLUSTER_F_BETA)
-        buckshot_scale = float(settings.CLINICAL_CHAT_HCLUSTER_BUCKSHOT_SAMPLE_SCALE)
         max_candidates = int(settings.CLINICAL_CHAT_HCLUSTER_MAX_CANDIDATE_DOMAINS)
 
         disabled_payload = {
@@ -730,74 +846,19 @@ class ClinicalHierarchicalClusteringService:
         if not settings.CLINICAL_CHAT_HCLUSTER_ENABLED:
             return disabled_payload
 
-        samples = cls._build_training_samples(domain_catalog=domain_catalog)
-        if not samples:
-            return disabled_payload
-
-        sample_labels = [label for label, _ in samples]
-        sample_tokens = [tokens for _, tokens in samples]
-        idf = cls._compute_idf(samples=samples)
-        sample_vectors = [cls._vectorize_tokens(tokens=tokens, idf=idf) for tokens in sample_tokens]
-        n_samples = len(sample_vectors)
-        if n_samples == 0:
-            return disabled_payload
-
-        effective_k_min = max(1, min(k_min, n_samples))
-        effective_k_max = max(effective_k_min, min(k_max, n_samples))
-        candidate_ks = list(range(effective_k_min, effective_k_max + 1))
-
-        best_run: dict[str, Any] | None = None
-        best_objective = float("-inf")
-        linkage = "average"
-        strategy = method
-        for k in candidate_ks:
-            if method in {"hac_single", "hac_complete", "hac_average"}:
-                linkage = method.split("_", maxsplit=1)[1]
-                run = cls._run_hac(vectors=sample_vectors, k=k, linkage=linkage)
-                strategy = f"hac_{linkage}"
-            elif method == "divisive":
-                run = cls._run_divisive(vectors=sample_vectors, k=k)
-                linkage = "average"
-                strategy = "divisive"
-            else:
-                run = cls._run_buckshot(
-                    vectors=sample_vectors,
-                    k=k,
-                    linkage="average",
-                    sample_scale=buckshot_scale,
-                )
-                linkage = "average"
-                strategy = "buckshot"
-
-            quality = cls._evaluate_clustering(
-                true_labels=sample_labels,
-                cluster_ids=run["assignments"],
-                beta=f_beta,
-            )
-            objective = (
-                (0.50 * float(quality["f_measure"]))
-                + (0.30 * float(quality["nmi"]))
-                + (0.20 * float(quality["purity"]))
-            )
-            objective -= 0.005 * float(max(0, k - effective_k_min))
-            if objective > best_objective:
-                best_objective = objective
-                best_run = {
-                    **run,
-                    "k": k,
-                    "quality": quality,
-                    "objective": objective,
-                    "linkage": linkage,
-                    "strategy": strategy,
-                }
-
-        if best_run is None:
+        fitted, model_cache_hit = cls.fitted_model(domain_catalog=domain_catalog)
+        if not fitted["training_docs"]:
             return disabled_payload
 
-        assignments = list(best_run["assignments"])
-        centroids = list(best_run["centroids"])
-        cluster_members = list(best_run["cluster_members"])
-        quality = dict(best_run["quality"])
+        idf = fitted["idf"]
+        sample_vectors = fitted["sample_vectors"]
+        sample_labels = fitted["sample_labels"]
+        n_samples = int(fitted["training_docs"])
+        centroids = fitted["centroids"]
+        cluster_members = fitted["cluster_members"]
+        quality = dict(fitted["quality"])
+        strategy = str(fitted["strategy"])
+        linkage = str(fitted["linkage"])
 
         query_tokens = cls._tokenize(query)
         query_vector = cls._vectorize_tokens(tokens=query_tokens, idf=idf)
@@ -847,15 +908,8 @@ class ClinicalHierarchicalClusteringService:
             )
         ]
 
-        cluster_sizes: dict[int, int] = Counter(int(cluster_id) for cluster_id in assignments)
-        singleton_clusters = sorted(
-            cluster_id for cluster_id, size in cluster_sizes.items() if int(size) == 1
-        )
-        cluster_labels = cls._build_cluster_labels(
-            cluster_members=cluster_members,
-            sample_labels=sample_labels,
-            sample_tokens=sample_tokens,
-        )
+        singleton_clusters = list(fitted["singleton_clusters"])
+        cluster_labels = [dict(item) for item in fitted["cluster_labels"]]
         rerank_recommended = (
             1
             if candidate_domains and top_confidence >= float(min_confidence)
@@ -865,11 +919,11 @@ class ClinicalHierarchicalClusteringService:
         trace = {
             "hcluster_enabled": "1",
             "hcluster_method": method,
-            "hcluster_strategy": str(best_run.get("strategy") or strategy),
-            "hcluster_linkage": str(best_run.get("linkage") or linkage),
-            "hcluster_k_selected": str(best_run["k"]),
-            "hcluster_k_min": str(effective_k_min),
-            "hcluster_k_max": str(effective_k_max),
+            "hcluster_strategy": strategy,
+            "hcluster_linkage": linkage,
+            "hcluster_k_selected": str(fitted["k_selected"]),
+            "hcluster_k_min": str(fitted["k_min"]),
+            "hcluster_k_max": str(fitted["k_max"]),
             "hcluster_top_id": str(top_cluster_id),
             "hcluster_top_confidence": f"{top_confidence:.4f}",
             "hcluster_margin_top2": f"{margin_top2:.4f}",
@@ -878,8 +932,8 @@ class ClinicalHierarchicalClusteringService:
                 ",".join(candidate_domains[:max_candidates]) if candidate_domains else "none"
             ),
             "hcluster_singletons": str(len(singleton_clusters)),
-            "hcluster_merge_steps": str(int(best_run.get("merge_steps") or 0)),
-            "hcluster_sample_size": str(int(best_run.get("sample_size") or 0)),
+            "hcluster_merge_steps": str(int(fitted["merge_steps"])),
+            "hcluster_sample_size": str(int(fitted["sample_size"])),
             "hcluster_purity": f"{quality['purity']:.4f}",
             "hcluster_nmi": f"{quality['nmi']:.4f}",
             "hcluster_rand_index": f"{quality['rand_index']:.4f}",
@@ -887,13 +941,14 @@ class ClinicalHierarchicalClusteringService:
             "hcluster_vocab_size": str(len(idf)),
             "hcluster_training_docs": str(n_samples),
             "hcluster_rerank_recommended": str(rerank_recommended),
+            "hcluster_model_cache_hit": "1" if model_cache_hit else "0",
         }
         return {
             "enabled": True,
             "method": method,
-            "strategy": str(best_run.get("strategy") or strategy),
-            "linkage": str(best_run.get("linkage") or linkage),
-            "k_selected": int(best_run["k"]),
+            "strategy": strategy,
+            "linkage": linkage,
+            "k_selected": int(fitted["k_selected"]),
             "top_cluster_id": int(top_cluster_id),
             "top_confidence": round(top_confidence, 4),
             "margin_top2": round(margin_top2, 4),
@@ -0,0 +1,158 @@
+"""
+Registro de modelos entrenados para los clasificadores de dominio del chat.
+
+Objetivo:
+- entrenar una sola vez (arranque o cambio de catalogo/ajustes) y servir muchas
+- dejar en la ruta de peticion solo vectorizacion de la consulta y scoring
+- persistir opcionalmente los artefactos en disco (JSON) para arranques en frio
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import settings
+
+_FORMAT_VERSION = 1
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Artefacto no serializable: {type(value).__name__}")
+
+
+class ClinicalModelRegistry:
+    """Cache de artefactos entrenados indexada por huella de catalogo y ajustes."""
+
+    _lock = threading.Lock()
+    _fit_locks: dict[str, threading.Lock] = {}
+    _entries: dict[str, tuple[str, Any]] = {}
+    _stats: dict[str, int] = {"hits": 0, "fits": 0, "disk_loads": 0, "disk_errors": 0}
+
+    @staticmethod
+    def fingerprint(*, domain_catalog: list[dict[str, object]], params: dict[str, Any]) -> str:
+        """Huella estable del catalogo y de los hiperparametros que afectan al ajuste."""
+        payload = json.dumps(
+            {"version": _FORMAT_VERSION, "catalog": domain_catalog, "params": params},
+            sort_keys=True,
+            ensure_ascii=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _persist_dir() -> Path | None:
+        raw = str(settings.CLINICAL_CHAT_DOMAIN_MODEL_REGISTRY_DIR or "").strip()
+        return Path(raw) if raw else None
+
+    @classmethod
+    def _artifact_path(cls, name: str, fingerprint: str) -> Path | None:
+        base = cls._persist_dir()
+        if base is None:
+            return None
+        return base / f"{name}-{fingerprint[:24]}.json"
+
+    @classmethod
+    def _load_from_disk(cls, name: str, fingerprint: str) -> Any | None:
+        path = cls._artifact_path(name, fingerprint)
+        if path is None or not path.exists():
+            return None
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Artefacto de modelo ilegible en {path}: {exc}")
+            cls._stats["disk_errors"] += 1
+            return None
+        if not isinstance(payload, dict) or payload.get("fingerprint") != fingerprint:
+            return None
+        cls._stats["disk_loads"] += 1
+        return payload.get("artifact")
+
+    @classmethod
+    def _save_to_disk(cls, name: str, fingerprint: str, artifact: Any) -> None:
+        path = cls._artifact_path(name, fingerprint)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            body = json.dumps(
+                {"fingerprint": fingerprint, "model": name, "artifact": artifact},
+                ensure_ascii=False,
+                default=_json_default,
+            )
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_text(body, encoding="utf-8")
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(f"No se pudo persistir el modelo {name}: {exc}")
+            cls._stats["disk_errors"] += 1
+
+    @classmethod
+    def get_or_fit(
+        cls,
+        name: str,
+        *,
+        domain_catalog: list[dict[str, object]],
+        params: dict[str, Any],
+        fit: Callable[[], Any],
+        restore: Callable[[Any], Any] | None = None,
+    ) -> tuple[Any, bool]:
+        """
+        Devuelve (artefacto, cache_hit).
+
+        `fit` solo se ejecuta si no hay artefacto en memoria ni en disco para la
+        huella actual. `restore` adapta un artefacto leido de JSON (listas -> sets).
+        """
+        fingerprint = cls.fingerprint(domain_catalog=domain_catalog, params=params)
+        with cls._lock:
+            cached = cls._entries.get(name)
+            if cached is not None and cached[0] == fingerprint:
+                cls._stats["hits"] += 1
+                return cached[1], True
+            fit_lock = cls._fit_locks.setdefault(name, threading.Lock())
+
+        # Un solo hilo entrena cada modelo; el resto espera y reutiliza el resultado.
+        with fit_lock:
+            with cls._lock:
+                cached = cls._entries.get(name)
+                if cached is not None and cached[0] == fingerprint:
+                    cls._stats["hits"] += 1
+                    return cached[1], True
+            artifact = cls._load_from_disk(name, fingerprint)
+            if artifact is not None and restore is not None:
+                artifact = restore(artifact)
+            if artifact is None:
+                started_at = time.perf_counter()
+                artifact = fit()
+                logger.debug(
+                    f"Modelo {name} entrenado en "
+                    f"{(time.perf_counter() - started_at) * 1000:.1f} ms"
+                )
+                with cls._lock:
+                    cls._stats["fits"] += 1
+                cls._save_to_disk(name, fingerprint, artifact)
+            with cls._lock:
+                cls._entries[name] = (fingerprint, artifact)
+        return artifact, False
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        with cls._lock:
+            return {**cls._stats, "models": len(cls._entries)}
+
+    @classmethod
+    def reset(cls) -> None:
+        """Vacia la cache en memoria (tests o recarga de catalogo)."""
+        with cls._lock:
+            cls._entries.clear()
+            for key in cls._stats:
+                cls._stats[key] = 0
@@ -15,6 +15,7 @@ from collections import Counter
 from typing import Any
 
 from app.core.config import settings
+from app.services.clinical_model_registry import ClinicalModelRegistry
 
 
 class ClinicalNaiveBayesService:
@@ -249,6 +250,35 @@ class ClinicalNaiveBayesService:
             class_scores[class_label] = score
         return class_scores
 
+    @classmethod
+    def fitted_model(
+        cls,
+        *,
+        domain_catalog: list[dict[str, object]],
+    ) -> tuple[dict[str, Any], bool]:
+        """Documentos por clase y features seleccionadas, calculados una vez por catalogo."""
+
+        def _fit() -> dict[str, Any]:
+            docs_by_class = cls._build_training_docs(domain_catalog=domain_catalog)
+            return {
+                "docs_by_class": docs_by_class,
+                "features": cls._select_features(docs_by_class=docs_by_class),
+            }
+
+        def _restore(artifact: dict[str, Any]) -> dict[str, Any]:
+            return {**artifact, "features": set(artifact.get("features") or [])}
+
+        return ClinicalModelRegistry.get_or_fit(
+            "naive_bayes",
+            domain_catalog=domain_catalog,
+            params={
+                "feature_method": str(settings.CLINICAL_CHAT_NB_FEATURE_METHOD).strip().lower(),
+                "max_features": int(settings.CLINICAL_CHAT_NB_MAX_FEATURES),
+            },
+            fit=_fit,
+            restore=_restore,
+        )
+
     @classmethod
     def analyze_query(
         cls,
@@ -282,7 +312,8 @@ class ClinicalNaiveBayesService:
                 "memory_facts": [],
             }
 
-        docs_by_class = cls._build_training_docs(domain_catalog=domain_catalog)
+        fitted, model_cache_hit = cls.fitted_model(domain_catalog=domain_catalog)
+        docs_by_class = fitted["docs_by_class"]
         if not docs_by_class:
             return {
                 "enabled": False,
@@ -316,7 +347,7 @@ class ClinicalNaiveBayesService:
             matched_domains=matched_domains,
             effective_specialty=effective_specialty,
         )
-        features = cls._select_features(docs_by_class=docs_by_class)
+        features = fitted["features"]
 
         if model == "bernoulli":
             class_log_scores = cls._predict_bernoulli(
@@ -359,6 +390,7 @@ class ClinicalNaiveBayesService:
             "nb_classes": str(len(classes)),
             "nb_features_selected": str(len(features)),
             "nb_rerank_recommended": str(rerank_recommended),
+            "nb_model_cache_hit": "1" if model_cache_hit else "0",
         }
         return {
             "enabled": True,
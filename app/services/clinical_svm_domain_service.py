@@ -15,6 +15,7 @@ from collections import Counter
 from typing import Any
 
 from app.core.config import settings
+from app.services.clinical_model_registry import ClinicalModelRegistry
 
 
 class ClinicalSVMDomainService:
@@ -234,6 +235,49 @@ class ClinicalSVMDomainService:
         scored.sort(key=lambda item: item[0], reverse=True)
         return [term for _, term in scored[:max_terms]]
 
+    @classmethod
+    def fitted_model(
+        cls,
+        *,
+        domain_catalog: list[dict[str, object]],
+    ) -> tuple[dict[str, Any], bool]:
+        """Artefactos OVA (idf, clases, pesos) entrenados una vez por catalogo/ajustes."""
+        c_value = float(settings.CLINICAL_CHAT_SVM_DOMAIN_C)
+        l2_value = float(settings.CLINICAL_CHAT_SVM_DOMAIN_L2)
+        epochs = int(settings.CLINICAL_CHAT_SVM_DOMAIN_EPOCHS)
+
+        def _fit() -> dict[str, Any]:
+            samples = cls._build_training_samples(domain_catalog=domain_catalog)
+            if not samples:
+                return {"training_docs": 0, "idf": {}, "classes": [], "models": {}}
+            idf = cls._compute_idf(samples=samples)
+            sample_vectors = [
+                cls._vectorize_tokens(tokens=tokens, idf=idf) for _, tokens in samples
+            ]
+            sample_labels = [label for label, _ in samples]
+            classes = sorted(set(sample_labels))
+            models = cls._train_ova_linear_svm(
+                sample_vectors=sample_vectors,
+                sample_labels=sample_labels,
+                classes=classes,
+                c_value=c_value,
+                l2_value=max(1e-6, l2_value),
+                epochs=max(1, epochs),
+            )
+            return {
+                "training_docs": len(samples),
+                "idf": idf,
+                "classes": classes,
+                "models": models,
+            }
+
+        return ClinicalModelRegistry.get_or_fit(
+            "svm_domain",
+            domain_catalog=domain_catalog,
+            params={"c": c_value, "l2": l2_value, "epochs": epochs},
+            fit=_fit,
+        )
+
     @classmethod
     def analyze_query(
         cls,
@@ -278,8 +322,8 @@ class ClinicalSVMDomainService:
                 "memory_facts": [],
             }
 
-        samples = cls._build_training_samples(domain_catalog=domain_catalog)
-        if not samples:
+        fitted, model_cache_hit = cls.fitted_model(domain_catalog=domain_catalog)
+        if not fitted["training_docs"]:
             return {
                 "enabled": False,
                 "method": method,
@@ -310,23 +354,14 @@ class ClinicalSVMDomainService:
                 "memory_facts": [],
             }
 
-        idf = cls._compute_idf(samples=samples)
-        sample_vectors = [cls._vectorize_tokens(tokens=tokens, idf=idf) for _, tokens in samples]
-        sample_labels = [label for label, _ in samples]
-        classes = sorted(set(sample_labels))
+        idf = fitted["idf"]
+        classes = list(fitted["classes"])
+        models = fitted["models"]
         priors = cls._class_priors(
             classes=classes,
             matched_domains=matched_domains,
             effective_specialty=effective_specialty,
         )
-        models = cls._train_ova_linear_svm(
-            sample_vectors=sample_vectors,
-            sample_labels=sample_labels,
-            classes=classes,
-            c_value=c_value,
-            l2_value=max(1e-6, l2_value),
-            epochs=max(1, epochs),
-        )
 
         query_tokens = cls._tokenize(query)
         query_vector = cls._vectorize_tokens(tokens=query_tokens, idf=idf)
@@ -381,9 +416,10 @@ class ClinicalSVMDomainService:
             "svm_domain_avg_hinge_loss": f"{avg_hinge_loss:.4f}",
             "svm_domain_vocab_size": str(len(idf)),
             "svm_domain_classes": str(len(classes)),
-            "svm_domain_training_docs": str(len(samples)),
+            "svm_domain_training_docs": str(int(fitted["training_docs"])),
             "svm_domain_rerank_recommended": str(rerank_recommended),
             "svm_domain_support_terms": ",".join(support_terms) if support_terms else "none",
+            "svm_domain_model_cache_hit": "1" if model_cache_hit else "0",
         }
 
         return {
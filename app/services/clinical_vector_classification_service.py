@@ -16,6 +16,7 @@ from collections import Counter, defaultdict
 from typing import Any
 
 from app.core.config import settings
+from app.services.clinical_model_registry import ClinicalModelRegistry
 
 
 class ClinicalVectorClassificationService:
@@ -231,6 +232,47 @@ class ClinicalVectorClassificationService:
         norm = float(sum(blended.values())) or 1.0
         return {label: float(value) / norm for label, value in blended.items()}
 
+    @classmethod
+    def fitted_model(
+        cls,
+        *,
+        domain_catalog: list[dict[str, object]],
+    ) -> tuple[dict[str, Any], bool]:
+        """Artefactos Rocchio/kNN (idf, vectores, centroides) ajustados una vez por catalogo."""
+
+        def _fit() -> dict[str, Any]:
+            samples = cls._build_training_samples(domain_catalog=domain_catalog)
+            if not samples:
+                return {
+                    "training_docs": 0,
+                    "idf": {},
+                    "sample_vectors": [],
+                    "sample_labels": [],
+                    "classes": [],
+                    "centroids": {},
+                }
+            idf = cls._compute_idf(samples=samples)
+            sample_vectors = [
+                cls._vectorize_tokens(tokens=tokens, idf=idf)
+                for _, tokens in samples
+            ]
+            sample_labels = [label for label, _ in samples]
+            return {
+                "training_docs": len(samples),
+                "idf": idf,
+                "sample_vectors": sample_vectors,
+                "sample_labels": sample_labels,
+                "classes": sorted(set(sample_labels)),
+                "centroids": cls._build_centroids(samples=samples, sample_vectors=sample_vectors),
+            }
+
+        return ClinicalModelRegistry.get_or_fit(
+            "vector_classification",
+            domain_catalog=domain_catalog,
+            params={},
+            fit=_fit,
+        )
+
     @classmethod
     def analyze_query(
         cls,
@@ -268,8 +310,8 @@ class ClinicalVectorClassificationService:
                 "memory_facts": [],
             }
 
-        samples = cls._build_training_samples(domain_catalog=domain_catalog)
-        if not samples:
+        fitted, model_cache_hit = cls.fitted_model(domain_catalog=domain_catalog)
+        if not fitted["training_docs"]:
             return {
                 "enabled": False,
                 "method": method,
@@ -295,13 +337,10 @@ class ClinicalVectorClassificationService:
                 "memory_facts": [],
             }
 
-        idf = cls._compute_idf(samples=samples)
-        sample_vectors = [
-            cls._vectorize_tokens(tokens=tokens, idf=idf)
-            for _, tokens in samples
-        ]
-        sample_labels = [label for label, _ in samples]
-        classes = sorted(set(sample_labels))
+        idf = fitted["idf"]
+        sample_vectors = fitted["sample_vectors"]
+        sample_labels = fitted["sample_labels"]
+        classes = list(fitted["classes"])
         priors = cls._class_priors(
             classes=classes,
             matched_domains=matched_domains,
@@ -310,7 +349,7 @@ class ClinicalVectorClassificationService:
 
         query_tokens = cls._tokenize(query)
         query_vector = cls._vectorize_tokens(tokens=query_tokens, idf=idf)
-        centroids = cls._build_centroids(samples=samples, sample_vectors=sample_vectors)
+        centroids = fitted["centroids"]
         rocchio_probs = cls._predict_rocchio(
             query_vector=query_vector,
             centroids=centroids,
@@ -361,8 +400,9 @@ class ClinicalVectorClassificationService:
             "vector_tokens": str(len(query_tokens)),
             "vector_vocab_size": str(len(idf)),
             "vector_classes": str(len(classes)),
-            "vector_training_docs": str(len(samples)),
+            "vector_training_docs": str(int(fitted["training_docs"])),
             "vector_rerank_recommended": str(rerank_recommended),
+            "vector_model_cache_hit": "1" if model_cache_hit else "0",
         }
         return {
             "enabled": True,
@@ -0,0 +1,248 @@
+"""
+Cache persistente de embeddings en un unico fichero SQLite.
+
+Sustituye al cache de un JSON por vector: vectores `float32` en BLOB,
+namespacing por modelo, consultas por lotes y desalojo LRU acotado.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Almacen clave-valor `(modelo, sha256(texto)) -> vector float32`."""
+
+    SCHEMA_VERSION = 1
+    LOOKUP_CHUNK_SIZE = 500
+    EVICTION_SLACK_RATIO = 0.05
+
+    _shared: dict[str, "EmbeddingCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str | Path, *, max_entries: Optional[int] = None):
+        self.path = Path(path)
+        self.max_entries = int(
+            max_entries
+            if max_entries is not None
+            else settings.CLINICAL_CHAT_RAG_EMBEDDING_CACHE_MAX_ENTRIES
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used "
+            "ON embedding_cache (last_used)"
+        )
+        self._conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        self._conn.commit()
+        self._entries = int(
+            self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def get_shared(cls, path: Optional[str | Path] = None) -> "EmbeddingCache":
+        resolved = Path(path or settings.CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH)
+        key = str(resolved.resolve())
+        with cls._shared_lock:
+            cache = cls._shared.get(key)
+            if cache is None:
+                cache = cls(resolved)
+                cls._shared[key] = cache
+            return cache
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            caches = list(cls._shared.values())
+            cls._shared.clear()
+        for cache in caches:
+            cache.close()
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(raw: bytes) -> list[float]:
+        values = array("f")
+        values.frombytes(raw)
+        return list(values)
+
+    def get_many(self, model: str, text_hashes: Sequence[str]) -> dict[str, list[float]]:
+        """Devuelve los vectores presentes y marca su uso para el LRU."""
+        unique_hashes = list(dict.fromkeys(text_hashes))
+        if not unique_hashes:
+            return {}
+        found: dict[str, list[float]] = {}
+        now = time.time_ns()
+        with self._lock:
+            for start in range(0, len(unique_hashes), self.LOOKUP_CHUNK_SIZE):
+                chunk = unique_hashes[start : start + self.LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, raw in rows:
+                    found[str(text_hash)] = self._decode(raw)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+        return found
+
+    def get(self, model: str, text_hash: str) -> Optional[list[float]]:
+        return self.get_many(model, [text_hash]).get(text_hash)
+
+    def put_many(self, model: str, items: Iterable[tuple[str, Sequence[float]]]) -> int:
+        """Inserta o reemplaza vectores; desaloja los menos usados si se supera el limite."""
+        now = time.time_ns()
+        rows = [
+            (model, text_hash, len(vector), self._encode(vector), now)
+            for text_hash, vector in items
+            if vector
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embedding_cache "
+                "(model, text_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE embedding_cache SET dim = ?, vector = ?, last_used = ? "
+                "WHERE model = ? AND text_hash = ?",
+                [(dim, blob, used, row_model, key) for row_model, key, dim, blob, used in rows],
+            )
+            self._entries += inserted
+            self._evict_locked()
+            self._conn.commit()
+        return len(rows)
+
+    def put(self, model: str, text_hash: str, vector: Sequence[float]) -> None:
+        self.put_many(model, [(text_hash, vector)])
+
+    def _evict_locked(self) -> None:
+        if self.max_entries <= 0 or self._entries <= self.max_entries:
+            return
+        # Margen para no desalojar en cada insercion una vez alcanzado el limite.
+        target = max(0, int(self.max_entries * (1.0 - self.EVICTION_SLACK_RATIO)))
+        excess = self._entries - target
+        cursor = self._conn.execute(
+            "DELETE FROM embedding_cache WHERE (model, text_hash) IN ("
+            "SELECT model, text_hash FROM embedding_cache ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        removed = max(0, int(cursor.rowcount))
+        self._entries -= removed
+        self.evictions += removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._entries
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:  # pragma: no cover - defensivo
+                pass
+
+    def import_json_dir(
+        self,
+        source_dir: str | Path,
+        *,
+        model: str,
+        batch_size: int = 1000,
+        delete_source: bool = False,
+    ) -> dict[str, int]:
+        """
+        Importa el cache legacy `<sha256>.json` (un vector por fichero).
+
+        El nombre del fichero ya es el sha256 del texto normalizado, asi que
+        se reutiliza como clave sin recalcular nada.
+        """
+        stats = {"files_seen": 0, "imported": 0, "invalid": 0, "deleted": 0}
+        source = Path(source_dir)
+        if not source.is_dir():
+            return stats
+        pending: list[tuple[str, list[float]]] = []
+        pending_files: list[Path] = []
+
+        def _flush() -> None:
+            if not pending:
+                return
+            stats["imported"] += self.put_many(model, pending)
+            if delete_source:
+                for cache_file in pending_files:
+                    try:
+                        cache_file.unlink()
+                        stats["deleted"] += 1
+                    except OSError as exc:
+                        logger.debug("No se pudo borrar %s: %s", cache_file, exc)
+            pending.clear()
+            pending_files.clear()
+
+        for cache_file in sorted(source.glob("*.json")):
+            stats["files_seen"] += 1
+            try:
+                data = json.loads(cache_file.read_text(encoding="utf-8"))
+                embedding = data.get("embedding") if isinstance(data, dict) else None
+                if not isinstance(embedding, list) or not embedding:
+                    raise ValueError("embedding ausente")
+                pending.append((cache_file.stem, [float(item) for item in embedding]))
+                pending_files.append(cache_file)
+            except (OSError, json.JSONDecodeError, TypeError, ValueError):
+                stats["invalid"] += 1
+                continue
+            if len(pending) >= max(1, batch_size):
+                _flush()
+        _flush()
+        return stats
@@ -9,17 +9,31 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
-import math
+import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
 from pathlib import Path
 from typing import Optional
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
 
 from app.core.config import settings
+from app.services import embedding_similarity
+from app.services.embedding_cache import EmbeddingCache
+from app.services.http_connection_pool import KeepAliveHTTPPool
 
 logger = logging.getLogger(__name__)
 
+_EMBEDDING_ERRORS = (
+    HTTPError,
+    URLError,
+    HTTPException,
+    TimeoutError,
+    ValueError,
+    OSError,
+    json.JSONDecodeError,
+)
+
 
 class OllamaEmbeddingService:
     """Servicio de embeddings usando modelo Ollama local."""
@@ -27,14 +41,19 @@ class OllamaEmbeddingService:
     EMBEDDING_DIM = 384
     MAX_INPUT_CHARS = 2000
     WINDOW_OVERLAP_CHARS = 240
-    CACHE_DIR = Path(".ollama_cache/embeddings")
+    LEGACY_CACHE_DIR = Path(".ollama_cache/embeddings")
 
     def __init__(self, model: Optional[str] = None, cache_enabled: bool = True):
         self.model = model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL
         self.cache_enabled = cache_enabled
         self.base_url = settings.CLINICAL_CHAT_LLM_BASE_URL
+        self._cache: Optional[EmbeddingCache] = None
         if cache_enabled:
-            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            try:
+                self._cache = EmbeddingCache.get_shared()
+            except (sqlite3.Error, OSError) as exc:
+                logger.warning("Cache de embeddings no disponible: %s", exc.__class__.__name__)
+                self.cache_enabled = False
 
     def embed_text(self, text: str) -> tuple[list[float], dict[str, str]]:
         """
@@ -59,28 +78,14 @@ class OllamaEmbeddingService:
 
         started_at = time.perf_counter()
         try:
-            vectors: list[list[float]] = []
-            segment_errors = 0
-            for segment in segments:
-                try:
-                    vectors.append(self._call_ollama(segment))
-                except (
-                    HTTPError,
-                    URLError,
-                    TimeoutError,
-                    ValueError,
-                    OSError,
-                    json.JSONDecodeError,
-                ):
-                    segment_errors += 1
-                    vectors.append(self._fallback_vector(segment))
-
+            vectors, segment_failed, _run = self._embed_segments(segments)
             if not vectors:
                 raise ValueError("No se pudieron generar embeddings por segmentos")
 
+            segment_errors = sum(1 for failed in segment_failed if failed)
             vector = self._mean_pool(vectors)
             latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
-            if self.cache_enabled:
+            if self.cache_enabled and segment_errors == 0:
                 self._save_to_cache(text_normalized, vector)
             return vector, {
                 "embedding_source": "ollama",
@@ -106,57 +111,143 @@ class OllamaEmbeddingService:
         self,
         texts: list[str],
     ) -> tuple[list[list[float]], dict[str, str]]:
-        vectors: list[list[float]] = []
+        """
+        Genera embeddings para varios textos con peticiones `/api/embed` por lotes.
+
+        Los segmentos no cacheados se agrupan en lotes de
+        `CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE` entradas y se envian en paralelo
+        (maximo `CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT`). El orden de salida
+        coincide siempre con `texts`.
+        """
         started_at = time.perf_counter()
+        vectors: list[Optional[list[float]]] = [None] * len(texts)
         cache_hits = 0
         errors = 0
+        pending: list[tuple[int, str, int, int]] = []
+        flat_segments: list[str] = []
 
-        for text in texts:
-            try:
-                vector, trace = self.embed_text(text)
-                vectors.append(vector)
-                if trace.get("cache_hit") == "true":
-                    cache_hits += 1
-                if trace.get("embedding_error"):
-                    errors += 1
-            except ValueError:
+        normalized = [str(text or "").strip() for text in texts]
+        cached_vectors = (
+            self._load_many_from_cache([text for text in normalized if text])
+            if self.cache_enabled
+            else {}
+        )
+        for position, text_normalized in enumerate(normalized):
+            if not text_normalized:
                 errors += 1
-                vectors.append(self._fallback_vector(text))
+                vectors[position] = self._fallback_vector(texts[position])
+                continue
+            cached = cached_vectors.get(text_normalized)
+            if cached:
+                vectors[position] = cached
+                cache_hits += 1
+                continue
+            segments = self._split_for_embedding(text_normalized)
+            pending.append(
+                (position, text_normalized, len(flat_segments), len(flat_segments) + len(segments))
+            )
+            flat_segments.extend(segments)
+
+        run_stats = {"requests": 0, "unique_segments": 0, "in_flight": 0}
+        if flat_segments:
+            segment_vectors, segment_failed, run_stats = self._embed_segments(flat_segments)
+            to_cache: list[tuple[str, list[float]]] = []
+            for position, text_normalized, start, end in pending:
+                vector = self._mean_pool(segment_vectors[start:end])
+                vectors[position] = vector
+                if any(segment_failed[start:end]):
+                    errors += 1
+                else:
+                    to_cache.append((text_normalized, vector))
+            if self.cache_enabled:
+                self._save_many_to_cache(to_cache)
 
         latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
-        return vectors, {
+        return [vector or [] for vector in vectors], {
             "embedding_batch_size": str(len(texts)),
             "embedding_vectors": str(len(vectors)),
             "embedding_cache_hits": str(cache_hits),
             "embedding_errors": str(errors),
+            "embedding_segments": str(len(flat_segments)),
+            "embedding_unique_segments": str(run_stats["unique_segments"]),
+            "embedding_requests": str(run_stats["requests"]),
+            "embedding_max_in_flight": str(run_stats["in_flight"]),
             "embedding_batch_latency_ms": str(latency_ms),
             "embedding_avg_latency_ms": f"{latency_ms / len(texts):.2f}" if texts else "0",
         }
 
+    def _embed_segments(
+        self,
+        segments: list[str],
+    ) -> tuple[list[list[float]], list[bool], dict[str, int]]:
+        """
+        Embebe segmentos deduplicados en lotes; devuelve vectores alineados con
+        `segments`, marca de fallo por segmento y contadores de la ejecucion.
+        """
+        unique_segments = list(dict.fromkeys(segments))
+        batch_size = max(1, int(settings.CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE))
+        batches = [
+            unique_segments[start : start + batch_size]
+            for start in range(0, len(unique_segments), batch_size)
+        ]
+        max_in_flight = int(settings.CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT)
+        in_flight = max(1, min(max_in_flight, len(batches)))
+
+        def _run(batch: list[str]) -> tuple[list[list[float]], bool]:
+            try:
+                return self._call_ollama_batch(batch), False
+            except _EMBEDDING_ERRORS as exc:
+                logger.debug("Lote de embeddings fallido: %s", exc.__class__.__name__)
+                return [self._fallback_vector(segment) for segment in batch], True
+
+        if len(batches) <= 1:
+            results = [_run(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=in_flight) as executor:
+                results = list(executor.map(_run, batches))
+
+        by_segment: dict[str, tuple[list[float], bool]] = {}
+        for batch, (batch_vectors, failed) in zip(batches, results, strict=True):
+            for segment, vector in zip(batch, batch_vectors, strict=True):
+                by_segment[segment] = (vector, failed)
+        return (
+            [by_segment[segment][0] for segment in segments],
+            [by_segment[segment][1] for segment in segments],
+            {
+                "requests": len(batches),
+                "unique_segments": len(unique_segments),
+                "in_flight": in_flight if batches else 0,
+            },
+        )
+
+    def _http_pool(self) -> KeepAliveHTTPPool:
+        return KeepAliveHTTPPool.get_shared(
+            self.base_url,
+            max_connections=settings.CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT,
+        )
+
     def _call_ollama(self, text: str) -> list[float]:
+        return self._call_ollama_batch([text])[0]
+
+    def _call_ollama_batch(self, texts: list[str]) -> list[list[float]]:
         payload = {
             "model": self.model,
-            "input": text,
+            "input": texts,
         }
-        url = f"{self.base_url.rstrip('/')}/api/embed"
-        request = Request(
-            url=url,
-            data=json.dumps(payload).encode("utf-8"),
-            headers={"Content-Type": "application/json"},
-            method="POST",
+        response_data = self._http_pool().post_json(
+            "/api/embed",
+            payload,
+            timeout=settings.CLINICAL_CHAT_LLM_TIMEOUT_SECONDS,
         )
-        with urlopen(request, timeout=settings.CLINICAL_CHAT_LLM_TIMEOUT_SECONDS) as response:
-            raw_response = response.read().decode("utf-8", errors="ignore")
-
-        response_data = json.loads(raw_response)
-        embedding = response_data.get("embedding")
-        if not embedding:
-            embeddings = response_data.get("embeddings")
-            if isinstance(embeddings, list) and embeddings:
-                embedding = embeddings[0]
-        if not embedding:
+        if not isinstance(response_data, dict):
+            raise ValueError("Respuesta de Ollama no valida")
+        embeddings = response_data.get("embeddings")
+        if not isinstance(embeddings, list) or not embeddings:
+            single = response_data.get("embedding")
+            embeddings = [single] if single else []
+        if len(embeddings) != len(texts) or not all(embeddings):
             raise ValueError("No embedding en respuesta de Ollama")
-        return [float(item) for item in embedding]
+        return [[float(item) for item in embedding] for embedding in embeddings]
 
     def _fallback_vector(self, text: str) -> list[float]:
         """
@@ -191,50 +282,44 @@ class OllamaEmbeddingService:
     def _mean_pool(self, vectors: list[list[float]]) -> list[float]:
         if not vectors:
             return self._fallback_vector("")
-        dim = len(vectors[0])
-        accum = [0.0] * dim
-        for vector in vectors:
-            for idx, value in enumerate(vector[:dim]):
-                accum[idx] += float(value)
-        total = float(len(vectors))
-        return [value / total for value in accum]
+        return embedding_similarity.mean_pool(vectors)
 
     def _cache_key(self, text: str) -> str:
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
     def _load_from_cache(self, text: str) -> tuple[Optional[list[float]], bool]:
-        cache_file = self.CACHE_DIR / f"{self._cache_key(text)}.json"
-        if not cache_file.exists():
-            return None, False
+        vector = self._load_many_from_cache([text]).get(text)
+        return vector, vector is not None
+
+    def _load_many_from_cache(self, texts: list[str]) -> dict[str, list[float]]:
+        if self._cache is None or not texts:
+            return {}
+        keys = {text: self._cache_key(text) for text in texts}
         try:
-            data = json.loads(cache_file.read_text(encoding="utf-8"))
-            embedding = data.get("embedding")
-            if isinstance(embedding, list):
-                return [float(item) for item in embedding], True
-        except (OSError, json.JSONDecodeError, TypeError, ValueError) as exc:
+            found = self._cache.get_many(self.model, list(keys.values()))
+        except sqlite3.Error as exc:
             logger.debug("Error cargando cache de embeddings: %s", exc)
-        return None, False
+            return {}
+        return {text: found[key] for text, key in keys.items() if key in found}
 
     def _save_to_cache(self, text: str, vector: list[float]) -> None:
-        cache_file = self.CACHE_DIR / f"{self._cache_key(text)}.json"
-        payload = {"text_sample": text[:100], "embedding": vector}
+        self._save_many_to_cache([(text, vector)])
+
+    def _save_many_to_cache(self, items: list[tuple[str, list[float]]]) -> None:
+        if self._cache is None or not items:
+            return
         try:
-            cache_file.write_text(
-                json.dumps(payload, ensure_ascii=False),
-                encoding="utf-8",
+            self._cache.put_many(
+                self.model,
+                [(self._cache_key(text), vector) for text, vector in items],
             )
-        except OSError as exc:
+        except sqlite3.Error as exc:
             logger.debug("Error guardando cache de embeddings: %s", exc)
 
     @staticmethod
     def cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
-        norm_a = math.sqrt(sum(value * value for value in vec1))
-        norm_b = math.sqrt(sum(value * value for value in vec2))
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        dot = sum(a * b for a, b in zip(vec1, vec2, strict=False))
-        similarity = dot / (norm_a * norm_b)
-        return max(0.0, min(1.0, float(similarity)))
+        scores = embedding_similarity.cosine_scores(vec1, [vec2])
+        return scores[0] if scores else 0.0
 
     @staticmethod
     def batch_cosine_similarity(
@@ -243,17 +328,20 @@ class OllamaEmbeddingService:
     ) -> list[float]:
         if not candidate_vecs:
             return []
-        query_norm = math.sqrt(sum(value * value for value in query_vec))
-        if query_norm == 0:
-            return [0.0 for _ in candidate_vecs]
-
-        similarities: list[float] = []
-        for candidate in candidate_vecs:
-            candidate_norm = math.sqrt(sum(value * value for value in candidate))
-            if candidate_norm == 0:
-                similarities.append(0.0)
-                continue
-            dot = sum(a * b for a, b in zip(candidate, query_vec, strict=False))
-            score = dot / (candidate_norm * query_norm)
-            similarities.append(max(0.0, min(1.0, float(score))))
-        return similarities
+        return embedding_similarity.cosine_scores(query_vec, candidate_vecs)
+
+    @staticmethod
+    def batch_cosine_top_k(
+        query_vec: list[float],
+        candidates,
+        k: int,
+        *,
+        dim: Optional[int] = None,
+    ) -> tuple[list[float], list[int]]:
+        """
+        Scores de todos los candidatos y los `k` mejores indices (desc).
+
+        `candidates` puede ser una matriz 2-D, lista de vectores, lista de blobs
+        `chunk_embedding` o un buffer contiguo junto con `dim`.
+        """
+        return embedding_similarity.cosine_top_k(query_vec, candidates, k, dim=dim)
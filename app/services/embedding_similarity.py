@@ -0,0 +1,271 @@
+"""
+Motor de similitud coseno para embeddings.
+
+Usa NumPy cuando esta disponible (producto matriz-vector + `argpartition`)
+y mantiene el camino en Python puro como fallback con la misma semantica.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from collections.abc import Sequence
+from typing import Any
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - fallback defensivo
+    np = None  # type: ignore[assignment]
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def decode_embedding(raw: bytes | bytearray | memoryview | None) -> list[float]:
+    """Decodifica un blob `chunk_embedding` (float32 nativo) a lista."""
+    if not raw:
+        return []
+    values = array("f")
+    values.frombytes(raw)
+    return list(values)
+
+
+def as_candidate_matrix(
+    candidates: Any,
+    *,
+    dim: int | None = None,
+) -> Any:
+    """
+    Convierte candidatos a matriz `float32` 2-D, o `None` si no es posible.
+
+    Acepta `ndarray`, un buffer contiguo con `dim` (vista sin copia), una
+    secuencia de blobs `chunk_embedding` o una secuencia de listas. Filas de
+    dimension heterogenea devuelven `None` para usar el camino Python.
+    """
+    if np is None:
+        return None
+    if isinstance(candidates, np.ndarray):
+        matrix = candidates if candidates.dtype == np.float32 else candidates.astype(np.float32)
+        return matrix if matrix.ndim == 2 else None
+    if isinstance(candidates, (bytes, bytearray, memoryview)):
+        if not dim or dim <= 0:
+            return None
+        flat = np.frombuffer(candidates, dtype=np.float32)
+        if flat.size % dim:
+            return None
+        return flat.reshape(-1, dim)
+    if not candidates:
+        return None
+    first = candidates[0]
+    if isinstance(first, (bytes, bytearray, memoryview)):
+        sizes = {len(item) for item in candidates}
+        if len(sizes) != 1 or not next(iter(sizes)) or next(iter(sizes)) % 4:
+            return None
+        width = next(iter(sizes)) // 4
+        return np.frombuffer(b"".join(candidates), dtype=np.float32).reshape(-1, width)
+    try:
+        matrix = np.asarray(candidates, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    return matrix if matrix.ndim == 2 else None
+
+
+def _python_cosine(query: Sequence[float], query_norm: float, candidate: Sequence[float]) -> float:
+    candidate_norm = math.sqrt(sum(value * value for value in candidate))
+    if candidate_norm == 0:
+        return 0.0
+    dot = sum(a * b for a, b in zip(candidate, query, strict=False))
+    return float(dot / (candidate_norm * query_norm))
+
+
+def _numpy_scores(query: Sequence[float], matrix: Any, *, clamp: bool) -> Any:
+    query_array = np.asarray(query, dtype=np.float32)
+    query_norm = float(np.linalg.norm(query_array))
+    if query_norm == 0:
+        return np.zeros((matrix.shape[0],), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    dots = matrix @ query_array
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(norms > 0, dots / (norms * query_norm), 0.0)
+    if clamp:
+        scores = np.clip(scores, 0.0, 1.0)
+    return scores
+
+
+def _python_scores(
+    query: Sequence[float],
+    candidates: Any,
+    *,
+    clamp: bool,
+    dim: int | None,
+) -> list[float]:
+    if isinstance(candidates, (bytes, bytearray, memoryview)):
+        flat = decode_embedding(candidates)
+        width = int(dim or 0)
+        rows = [flat[i : i + width] for i in range(0, len(flat), width)] if width else []
+    elif (
+        isinstance(candidates, Sequence)
+        and candidates
+        and isinstance(candidates[0], (bytes, bytearray, memoryview))
+    ):
+        rows = [decode_embedding(item) for item in candidates]
+    else:
+        rows = [list(item) for item in candidates]
+    if not rows:
+        return []
+    query_norm = math.sqrt(sum(value * value for value in query))
+    if query_norm == 0:
+        return [0.0 for _ in rows]
+    scores = [_python_cosine(query, query_norm, row) for row in rows]
+    if clamp:
+        return [max(0.0, min(1.0, value)) for value in scores]
+    return scores
+
+
+def _resolve_matrix(
+    query: Sequence[float],
+    candidates: Any,
+    *,
+    dim: int | None,
+    prefer_numpy: bool,
+) -> Any:
+    if not prefer_numpy:
+        return None
+    matrix = as_candidate_matrix(candidates, dim=dim)
+    if matrix is None or matrix.shape[1] != len(query):
+        return None
+    return matrix
+
+
+def cosine_scores(
+    query: Sequence[float],
+    candidates: Any,
+    *,
+    clamp: bool = True,
+    dim: int | None = None,
+    prefer_numpy: bool = True,
+) -> list[float]:
+    """Coseno de `query` contra cada candidato; acotado a [0, 1] si `clamp`."""
+    if candidates is None:
+        return []
+    matrix = _resolve_matrix(query, candidates, dim=dim, prefer_numpy=prefer_numpy)
+    if matrix is not None:
+        return [float(value) for value in _numpy_scores(query, matrix, clamp=clamp)]
+    return _python_scores(query, candidates, clamp=clamp, dim=dim)
+
+
+def cosine_top_k(
+    query: Sequence[float],
+    candidates: Any,
+    k: int,
+    *,
+    clamp: bool = True,
+    dim: int | None = None,
+    prefer_numpy: bool = True,
+) -> tuple[list[float], list[int]]:
+    """
+    Devuelve `(scores, top_indices)` con los `k` indices de mayor coseno
+    ordenados de mayor a menor. `scores` cubre todos los candidatos.
+    """
+    if candidates is None:
+        return [], []
+    matrix = _resolve_matrix(query, candidates, dim=dim, prefer_numpy=prefer_numpy)
+    if matrix is None:
+        scores = _python_scores(query, candidates, clamp=clamp, dim=dim)
+        if not scores or k <= 0:
+            return scores, []
+        limit = min(int(k), len(scores))
+        top = heapq.nsmallest(limit, range(len(scores)), key=lambda i: (-scores[i], i))
+        return scores, top
+
+    score_array = _numpy_scores(query, matrix, clamp=clamp)
+    total = int(score_array.shape[0])
+    if total == 0 or k <= 0:
+        return [float(value) for value in score_array], []
+    limit = min(int(k), total)
+    if limit < total:
+        top_array = np.argpartition(-score_array, limit - 1)[:limit]
+    else:
+        top_array = np.arange(total)
+    # Orden estable: a igualdad de score gana el indice menor (como `sorted`).
+    ordered = top_array[np.lexsort((top_array, -score_array[top_array]))]
+    return score_array.tolist(), [int(index) for index in ordered]
+
+
+def cosine_scores_many(
+    queries: Sequence[Sequence[float]],
+    candidates: Any,
+    *,
+    clamp: bool = True,
+    prefer_numpy: bool = True,
+) -> list[list[float]]:
+    """
+    Coseno de cada candidato contra varias consultas: filas = candidatos.
+
+    Con NumPy es un unico producto matriz-matriz; los candidatos se normalizan
+    una sola vez para todas las consultas.
+    """
+    if not queries or candidates is None:
+        return []
+    widths = {len(query) for query in queries}
+    matrix = None
+    if prefer_numpy and len(widths) == 1:
+        matrix = as_candidate_matrix(candidates)
+        if matrix is not None and matrix.shape[1] != next(iter(widths)):
+            matrix = None
+    if matrix is None:
+        columns = [_python_scores(query, candidates, clamp=clamp, dim=None) for query in queries]
+        return [list(row) for row in zip(*columns)] if columns and columns[0] else []
+    query_matrix = np.asarray(queries, dtype=np.float32)
+    query_norms = np.linalg.norm(query_matrix, axis=1)
+    norms = np.linalg.norm(matrix, axis=1)
+    dots = matrix @ query_matrix.T
+    denominator = np.outer(norms, query_norms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(denominator > 0, dots / denominator, 0.0)
+    if clamp:
+        scores = np.clip(scores, 0.0, 1.0)
+    return scores.tolist()
+
+
+def pairwise_cosine(vectors: Any, *, clamp: bool = False) -> list[list[float]]:
+    """Matriz de cosenos entre todos los pares de vectores."""
+    matrix = as_candidate_matrix(vectors)
+    if matrix is not None:
+        if matrix.shape[0] == 0:
+            return []
+        norms = np.linalg.norm(matrix, axis=1)
+        safe = np.where(norms > 0, norms, 1.0)
+        unit = matrix / safe[:, None]
+        unit[norms == 0] = 0.0
+        similarity = unit @ unit.T
+        if clamp:
+            similarity = np.clip(similarity, 0.0, 1.0)
+        return similarity.astype(np.float64).tolist()
+    rows = [list(item) for item in vectors]
+    result: list[list[float]] = []
+    for row in rows:
+        row_norm = math.sqrt(sum(value * value for value in row))
+        if row_norm == 0:
+            result.append([0.0 for _ in rows])
+            continue
+        values = [_python_cosine(row, row_norm, other) for other in rows]
+        result.append([max(0.0, min(1.0, v)) for v in values] if clamp else values)
+    return result
+
+
+def mean_pool(vectors: Sequence[Sequence[float]]) -> list[float]:
+    """Media por componente; la dimension la fija el primer vector."""
+    if not vectors:
+        return []
+    dim = len(vectors[0])
+    if np is not None and all(len(vector) == dim for vector in vectors):
+        pooled = np.asarray(vectors, dtype=np.float64).mean(axis=0)
+        return [float(value) for value in pooled]
+    accum = [0.0] * dim
+    for vector in vectors:
+        for idx, value in enumerate(vector[:dim]):
+            accum[idx] += float(value)
+    total = float(len(vectors))
+    return [value / total for value in accum]
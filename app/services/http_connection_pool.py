@@ -0,0 +1,157 @@
+"""
+Pool de conexiones HTTP keep-alive para servicios locales (Ollama).
+
+Reutiliza conexiones `http.client` entre peticiones y limita las peticiones
+en vuelo por destino con un semaforo acotado.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from http.client import HTTPConnection, HTTPException, HTTPMessage, HTTPSConnection
+from typing import Any
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+
+class KeepAliveHTTPPool:
+    """Pool LIFO de conexiones persistentes contra un unico `base_url`."""
+
+    _shared: dict[tuple[str, int], "KeepAliveHTTPPool"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url: str, *, max_connections: int = 4):
+        parsed = urlsplit(base_url.rstrip("/"))
+        if parsed.scheme not in {"http", "https"} or not parsed.hostname:
+            raise ValueError(f"URL base no soportada: {base_url}")
+        self.base_url = base_url.rstrip("/")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.base_path = parsed.path.rstrip("/")
+        self.max_connections = max(1, int(max_connections))
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._idle: list[HTTPConnection] = []
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    @classmethod
+    def get_shared(cls, base_url: str, *, max_connections: int = 4) -> "KeepAliveHTTPPool":
+        key = (base_url.rstrip("/"), max(1, int(max_connections)))
+        with cls._shared_lock:
+            pool = cls._shared.get(key)
+            if pool is None:
+                pool = cls(base_url, max_connections=max_connections)
+                cls._shared[key] = pool
+            return pool
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            pools = list(cls._shared.values())
+            cls._shared.clear()
+        for pool in pools:
+            pool.close()
+
+    def _new_connection(self, timeout: float) -> HTTPConnection:
+        connection_cls = HTTPSConnection if self.scheme == "https" else HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return connection_cls(self.host, self.port, timeout=timeout)
+
+    def _checkout(self, timeout: float) -> tuple[HTTPConnection, bool]:
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+            if connection is not None:
+                self.connections_reused += 1
+        if connection is None:
+            return self._new_connection(timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection, True
+
+    def _checkin(self, connection: HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_connections:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def post_json(self, path: str, payload: Any, *, timeout: float) -> Any:
+        """
+        Envia `payload` como JSON y devuelve la respuesta decodificada.
+
+        Bloquea si ya hay `max_connections` peticiones en vuelo. Un fallo al
+        reutilizar una conexion cerrada por el servidor se reintenta una vez
+        con conexion nueva.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        url_path = f"{self.base_path}{path}"
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        with self._slots:
+            connection, reused = self._checkout(timeout)
+            try:
+                status, reason, raw, will_close, response_headers = self._send(
+                    connection, url_path, body, headers
+                )
+            except (HTTPException, ConnectionError) as exc:
+                connection.close()
+                if not reused:
+                    raise OSError(str(exc) or exc.__class__.__name__) from exc
+                connection = self._new_connection(timeout)
+                status, reason, raw, will_close, response_headers = self._send(
+                    connection, url_path, body, headers
+                )
+            except BaseException:
+                connection.close()
+                raise
+            if will_close:
+                connection.close()
+            else:
+                self._checkin(connection)
+        with self._lock:
+            self.requests_sent += 1
+        if status >= 400:
+            raise HTTPError(f"{self.base_url}{path}", status, reason, response_headers, None)
+        return json.loads(raw.decode("utf-8", errors="ignore"))
+
+    @staticmethod
+    def _send(
+        connection: HTTPConnection,
+        path: str,
+        body: bytes,
+        headers: dict[str, str],
+    ) -> tuple[int, str, bytes, bool, HTTPMessage]:
+        try:
+            connection.request("POST", path, body=body, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        return (
+            int(response.status),
+            str(response.reason),
+            raw,
+            bool(response.will_close),
+            response.headers,
+        )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests_sent": self.requests_sent,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+                "idle_connections": len(self._idle),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
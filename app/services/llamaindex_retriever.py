@@ -1,19 +1,37 @@
 """
 Retriever opcional con LlamaIndex para consultas RAG locales.
 
-Este modulo es fail-safe: si `llama-index` no esta instalado o falla,
-devuelve resultado vacio y permite fallback al retriever legacy.
+El indice vectorial se persiste en disco (`CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR`)
+a partir de los embeddings ya calculados en `document_chunks`; la ingesta lo
+mantiene sincronizado y cada proceso carga el indice una sola vez (se recarga
+solo cuando se publica una generacion nueva). El camino de consulta solo
+embebe la pregunta y ejecuta la busqueda por similitud.
+
+Este modulo es fail-safe: si `llama-index` no esta instalado, el indice no
+existe o la consulta falla, devuelve resultado vacio y permite fallback al
+retriever legacy.
 """
 from __future__ import annotations
 
+import json
 import logging
+import os
+import re
+import shutil
+import threading
 import time
+from array import array
+from pathlib import Path
+from types import SimpleNamespace
 from typing import Any, Optional
 
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.document_chunk import DocumentChunk
+from app.services.chroma_retriever import chunk_row_checksum
+from app.services.embedding_service import OllamaEmbeddingService
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +39,40 @@ logger = logging.getLogger(__name__)
 class LlamaIndexRetriever:
     """Recuperador semantico opcional basado en LlamaIndex + Ollama embeddings."""
 
+    SYNC_BATCH_SIZE = 512
+    META_FILENAME = "clinical_meta.json"
+    _handles: dict[str, tuple[str, Any]] = {}
+    _handles_lock = threading.Lock()
+
+    def __init__(self, embedding_service: Optional[OllamaEmbeddingService] = None):
+        self.embedding_service = embedding_service or OllamaEmbeddingService()
+
     @staticmethod
-    def _load_dependencies() -> tuple[Any | None, Any | None, Any | None, str | None]:
+    def _load_dependencies() -> tuple[Any | None, str | None]:
         try:
-            from llama_index.core import Document, VectorStoreIndex
+            from llama_index.core import (
+                StorageContext,
+                VectorStoreIndex,
+                load_index_from_storage,
+            )
+            from llama_index.core.schema import QueryBundle, TextNode
+            from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
             from llama_index.embeddings.ollama import OllamaEmbedding
         except Exception as exc:  # pragma: no cover - depende de extras opcionales
-            return None, None, None, exc.__class__.__name__
-        return Document, VectorStoreIndex, OllamaEmbedding, None
+            return None, exc.__class__.__name__
+        return (
+            SimpleNamespace(
+                StorageContext=StorageContext,
+                VectorStoreIndex=VectorStoreIndex,
+                load_index_from_storage=load_index_from_storage,
+                QueryBundle=QueryBundle,
+                TextNode=TextNode,
+                MetadataFilter=MetadataFilter,
+                MetadataFilters=MetadataFilters,
+                OllamaEmbedding=OllamaEmbedding,
+            ),
+            None,
+        )
 
     @staticmethod
     def _build_embed_model(ollama_embedding_cls: Any) -> Any:
@@ -50,6 +94,196 @@ class LlamaIndexRetriever:
                 continue
         raise TypeError("No compatible constructor for OllamaEmbedding")
 
+    @staticmethod
+    def index_dir(model: str) -> Path:
+        slug = re.sub(r"[^a-z0-9]+", "_", str(model or "").lower()).strip("_") or "default"
+        return Path(settings.CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR) / slug
+
+    @staticmethod
+    def _current_generation(base_dir: Path) -> str | None:
+        try:
+            generation = (base_dir / "CURRENT").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if not generation or not (base_dir / generation).is_dir():
+            return None
+        return generation
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._handles_lock:
+            cls._handles.clear()
+
+    @classmethod
+    def _load_index(cls, deps: Any, base_dir: Path) -> tuple[str | None, Any]:
+        """Devuelve el indice publicado, cargandolo de disco solo si cambio la generacion."""
+        cache_key = str(base_dir.resolve())
+        generation = cls._current_generation(base_dir)
+        if generation is None:
+            return None, None
+        with cls._handles_lock:
+            cached = cls._handles.get(cache_key)
+            if cached is not None and cached[0] == generation:
+                return cached
+            storage_context = deps.StorageContext.from_defaults(
+                persist_dir=str(base_dir / generation)
+            )
+            index = deps.load_index_from_storage(
+                storage_context,
+                embed_model=cls._build_embed_model(deps.OllamaEmbedding),
+            )
+            cls._handles[cache_key] = (generation, index)
+            return generation, index
+
+    @classmethod
+    def _publish(cls, index: Any, base_dir: Path, meta: dict[str, Any]) -> str:
+        """Persiste el indice en una generacion nueva y la publica de forma atomica."""
+        base_dir.mkdir(parents=True, exist_ok=True)
+        previous = cls._current_generation(base_dir)
+        generation = f"gen-{time.time_ns()}"
+        generation_dir = base_dir / generation
+        index.storage_context.persist(persist_dir=str(generation_dir))
+        (generation_dir / cls.META_FILENAME).write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+        tmp_path = base_dir / "CURRENT.tmp"
+        tmp_path.write_text(generation, encoding="utf-8")
+        os.replace(tmp_path, base_dir / "CURRENT")
+        # Se conserva la generacion anterior por si otro proceso la esta cargando.
+        for stale in base_dir.glob("gen-*"):
+            if stale.name not in {generation, previous}:
+                shutil.rmtree(stale, ignore_errors=True)
+        with cls._handles_lock:
+            cls._handles[str(base_dir.resolve())] = (generation, index)
+        return generation
+
+    @classmethod
+    def sync_from_db(
+        cls,
+        db: Session,
+        *,
+        model: Optional[str] = None,
+        full_rebuild: bool = False,
+    ) -> dict[str, int]:
+        """
+        Sincroniza el indice persistente con `document_chunks` de forma incremental.
+
+        Reutiliza los embeddings guardados (no vuelve a embeber). Los metadatos de
+        cada generacion guardan el checksum de cada chunk: se reinsertan los chunks
+        nuevos o cambiados (SQLite reutiliza ids al re-ingestar) y se eliminan los
+        borrados; `full_rebuild` parte de un indice vacio.
+        """
+        stats = {
+            "rows_added": 0,
+            "rows_updated": 0,
+            "rows_removed": 0,
+            "rows_skipped": 0,
+            "rows_total": 0,
+        }
+        deps, _import_error = cls._load_dependencies()
+        if deps is None:
+            stats["unavailable"] = 1
+            return stats
+        model_name = str(model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL)
+        base_dir = cls.index_dir(model_name)
+        index = None
+        dimension = 0
+        stored_checksums: dict[str, Any] = {}
+        if not full_rebuild:
+            generation, index = cls._load_index(deps, base_dir)
+            if generation is not None:
+                try:
+                    meta = json.loads(
+                        (base_dir / generation / cls.META_FILENAME).read_text(encoding="utf-8")
+                    )
+                    dimension = int(meta.get("dim", 0) or 0)
+                    stored_checksums = dict(meta.get("checksums") or {})
+                except (OSError, ValueError, TypeError):
+                    dimension = 0
+        if index is None:
+            index = deps.VectorStoreIndex(
+                nodes=[], embed_model=cls._build_embed_model(deps.OllamaEmbedding)
+            )
+
+        indexed = {
+            str(node_id): str(stored_checksums.get(str(node_id)) or "")
+            for node_id in index.index_struct.nodes_dict.values()
+        }
+        db_ids = {
+            str(row[0]) for row in db.execute(text("SELECT id FROM document_chunks")).fetchall()
+        }
+        removed_ids = sorted(set(indexed) - db_ids)
+        if removed_ids:
+            index.delete_nodes(removed_ids, delete_from_docstore=True)
+            stats["rows_removed"] = len(removed_ids)
+            for node_id in removed_ids:
+                indexed.pop(node_id)
+
+        stale_ids: list[str] = []
+        nodes: list[Any] = []
+        pending: dict[str, str] = {}
+        statement = text(
+            "SELECT id, chunk_embedding, specialty, section_path "
+            "FROM document_chunks ORDER BY id"
+        )
+        for chunk_id, blob, specialty, section_path in db.execute(statement):
+            node_id = str(chunk_id)
+            checksum = chunk_row_checksum(blob, specialty, section_path)
+            previous = indexed.get(node_id)
+            if previous == checksum:
+                continue
+            if previous is not None:
+                stale_ids.append(node_id)
+            embedding = array("f")
+            try:
+                embedding.frombytes(blob or b"")
+            except (TypeError, ValueError):
+                embedding = array("f")
+            if not embedding or (dimension and len(embedding) != dimension):
+                stats["rows_skipped"] += 1
+                if previous is not None:
+                    stats["rows_removed"] += 1
+                continue
+            dimension = dimension or len(embedding)
+            # El texto no se duplica en el docstore: el chunk se lee de la BD.
+            nodes.append(
+                deps.TextNode(
+                    id_=node_id,
+                    text="",
+                    embedding=embedding.tolist(),
+                    metadata={
+                        "chunk_id": node_id,
+                        "specialty": str(specialty or ""),
+                        "section_path": str(section_path or ""),
+                    },
+                )
+            )
+            pending[node_id] = checksum
+            stats["rows_added" if previous is None else "rows_updated"] += 1
+        if stale_ids:
+            index.delete_nodes(stale_ids, delete_from_docstore=True)
+            for node_id in stale_ids:
+                indexed.pop(node_id)
+        for start in range(0, len(nodes), cls.SYNC_BATCH_SIZE):
+            index.insert_nodes(nodes[start : start + cls.SYNC_BATCH_SIZE])
+        indexed.update(pending)
+
+        stats["rows_total"] = len(index.index_struct.nodes_dict)
+        changed = stats["rows_added"] or stats["rows_updated"] or stats["rows_removed"]
+        if changed or full_rebuild or cls._current_generation(base_dir) is None:
+            cls._publish(
+                index,
+                base_dir,
+                {
+                    "model": model_name,
+                    "dim": dimension,
+                    "rows": stats["rows_total"],
+                    "checksums": indexed,
+                    "updated_at": time.time(),
+                },
+            )
+        return stats
+
     def search(
         self,
         query: str,
@@ -64,73 +298,74 @@ class LlamaIndexRetriever:
             "llamaindex_embedding_model": settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL,
         }
 
-        document_cls, index_cls, ollama_embedding_cls, import_error = self._load_dependencies()
-        if import_error:
+        deps, import_error = self._load_dependencies()
+        if deps is None:
             trace["llamaindex_available"] = "0"
-            trace["llamaindex_error"] = import_error
+            trace["llamaindex_error"] = import_error or "unavailable"
             return [], trace
         trace["llamaindex_available"] = "1"
 
         try:
-            candidate_pool = max(20, settings.CLINICAL_CHAT_RAG_LLAMAINDEX_CANDIDATE_POOL)
-            query_builder = db.query(DocumentChunk)
-            if specialty_filter:
-                query_builder = query_builder.filter(DocumentChunk.specialty == specialty_filter)
-            candidates = (
-                query_builder.order_by(DocumentChunk.id.desc()).limit(candidate_pool).all()
+            generation, index = self._load_index(
+                deps, self.index_dir(self.embedding_service.model)
             )
-            trace["llamaindex_candidates"] = str(len(candidates))
-            if not candidates:
+            index_size = len(index.index_struct.nodes_dict) if index is not None else 0
+            trace["llamaindex_index_generation"] = str(generation or "")
+            trace["llamaindex_index_size"] = str(index_size)
+            if index_size == 0:
                 trace["llamaindex_nodes_found"] = "0"
+                trace["llamaindex_error"] = "index_not_built"
                 return [], trace
 
-            docs: list[Any] = []
-            chunks_by_id: dict[int, DocumentChunk] = {}
-            for chunk in candidates:
-                chunk_text = (chunk.chunk_text or "").strip()
-                if not chunk_text:
-                    continue
-                source_file = ""
-                if chunk.document is not None and chunk.document.source_file:
-                    source_file = str(chunk.document.source_file)
-                metadata = {
-                    "chunk_id": str(chunk.id),
-                    "section_path": str(chunk.section_path or ""),
-                    "source_file": source_file,
-                    "specialty": str(chunk.specialty or ""),
-                }
-                docs.append(document_cls(text=chunk_text, metadata=metadata))
-                chunks_by_id[chunk.id] = chunk
-
-            if not docs:
-                trace["llamaindex_nodes_found"] = "0"
+            query_vector, embedding_trace = self.embedding_service.embed_text(query)
+            trace.update(embedding_trace)
+            if not query_vector:
+                trace["llamaindex_error"] = "empty_query_embedding"
                 return [], trace
 
-            embed_model = self._build_embed_model(ollama_embedding_cls)
-            index = index_cls.from_documents(docs, embed_model=embed_model)
-            top_k = max(1, min(k, len(docs)))
-            retriever = index.as_retriever(similarity_top_k=top_k)
-            nodes = retriever.retrieve(query)
+            filters = None
+            if specialty_filter:
+                filters = deps.MetadataFilters(
+                    filters=[deps.MetadataFilter(key="specialty", value=specialty_filter)]
+                )
+            # Vecinos extra para absorber chunks borrados desde la ultima sincronizacion.
+            pool = max(20, settings.CLINICAL_CHAT_RAG_LLAMAINDEX_CANDIDATE_POOL)
+            top_k = max(1, min(index_size, max(k, min(pool, k * 2))))
+            retriever = index.as_retriever(similarity_top_k=top_k, filters=filters)
+            nodes = retriever.retrieve(deps.QueryBundle(query_str=query, embedding=query_vector))
 
-            result: list[DocumentChunk] = []
+            ranked: list[tuple[int, float]] = []
             seen_ids: set[int] = set()
             for node_with_score in nodes:
                 node = getattr(node_with_score, "node", node_with_score)
                 metadata = getattr(node, "metadata", {}) or {}
-                raw_chunk_id = metadata.get("chunk_id")
                 try:
-                    chunk_id = int(raw_chunk_id)
+                    chunk_id = int(metadata.get("chunk_id", ""))
                 except (TypeError, ValueError):
                     continue
                 if chunk_id in seen_ids:
                     continue
+                seen_ids.add(chunk_id)
+                ranked.append((chunk_id, float(getattr(node_with_score, "score", 0.0) or 0.0)))
+
+            chunks_by_id: dict[int, DocumentChunk] = {}
+            if ranked:
+                rows = (
+                    db.query(DocumentChunk)
+                    .filter(DocumentChunk.id.in_([chunk_id for chunk_id, _ in ranked]))
+                    .all()
+                )
+                chunks_by_id = {
+                    chunk.id: chunk for chunk in rows if chunk.id is not None
+                }
+
+            result: list[DocumentChunk] = []
+            for chunk_id, score in ranked:
                 chunk = chunks_by_id.get(chunk_id)
                 if chunk is None:
                     continue
-                score = float(getattr(node_with_score, "score", 0.0) or 0.0)
                 setattr(chunk, "_rag_score", score)
                 result.append(chunk)
-                seen_ids.add(chunk_id)
                 if len(result) >= k:
                     break
 
@@ -139,6 +374,7 @@ class LlamaIndexRetriever:
                 {
                     "llamaindex_nodes_found": str(len(result)),
                     "llamaindex_latency_ms": str(latency_ms),
+                    "llamaindex_stale_ids": str(len(ranked) - len(chunks_by_id)),
                 }
             )
             return result, trace
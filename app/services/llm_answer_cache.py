@@ -0,0 +1,338 @@
+"""
+Cache de respuestas del LLM delante de `LLMChatProvider.generate_answer`.
+
+Una generacion en CPU cuesta decenas de segundos y las preguntas de protocolo
+de urgencias se repiten con la misma evidencia recuperada. La clave combina:
+
+- proveedor y modelo (cambiar de modelo nunca sirve respuestas del anterior);
+- modo de respuesta, herramienta y especialidad;
+- consulta normalizada (minusculas, sin acentos ni puntuacion);
+- huella de la evidencia: ids de chunk seleccionados mas titulo/origen/snippet
+  de cada fuente interna o web;
+- huella del contexto del paciente y del dialogo, para que una respuesta
+  personalizada nunca se sirva a otro paciente ni a otra conversacion.
+
+Todo salvo la consulta forma el "bucket". El nivel opcional de casi-coincidencia
+solo compara embeddings de consultas dentro del mismo bucket, es decir, con
+evidencia y contexto identicos. LRU con TTL en memoria; se invalida al cambiar
+`document_chunks` o `clinical_knowledge_sources` (eventos ORM) o el modelo.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.clinical_knowledge_source import ClinicalKnowledgeSource
+from app.models.document_chunk import DocumentChunk
+from app.services import embedding_similarity
+
+logger = logging.getLogger(__name__)
+
+QueryEmbedder = Callable[[str], Optional[list[float]]]
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", str(query or "").lower())
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    without_punctuation = _PUNCTUATION_RE.sub(" ", without_accents)
+    return _WHITESPACE_RE.sub(" ", without_punctuation).strip()
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def evidence_fingerprint(
+    *,
+    knowledge_sources: Sequence[dict[str, Any]],
+    web_sources: Sequence[dict[str, Any]],
+    evidence_chunk_ids: Optional[Sequence[int]] = None,
+) -> str:
+    """Huella estable de la evidencia que ve el prompt (orden incluido)."""
+    sources = [
+        [
+            str(source.get("type") or ""),
+            str(source.get("source") or ""),
+            str(source.get("title") or ""),
+            str(source.get("snippet") or ""),
+        ]
+        for source in [*knowledge_sources, *web_sources]
+    ]
+    chunk_ids = sorted({int(chunk_id) for chunk_id in (evidence_chunk_ids or [])})
+    return _digest({"chunks": chunk_ids, "sources": sources})
+
+
+def build_answer_cache_key(
+    *,
+    query: str,
+    response_mode: str,
+    effective_specialty: str,
+    tool_mode: str,
+    matched_domains: Sequence[str],
+    matched_endpoints: Sequence[str],
+    memory_facts_used: Sequence[str],
+    patient_summary: Optional[dict[str, Any]],
+    patient_history_facts_used: Sequence[str],
+    knowledge_sources: Sequence[dict[str, Any]],
+    web_sources: Sequence[dict[str, Any]],
+    recent_dialogue: Sequence[dict[str, Any]],
+    endpoint_results: Sequence[dict[str, Any]],
+    evidence_chunk_ids: Optional[Sequence[int]] = None,
+) -> tuple[str, str, str]:
+    """Devuelve `(clave_exacta, bucket, consulta_normalizada)`."""
+    normalized_query = normalize_query(query)
+    context_fingerprint = _digest(
+        {
+            "domains": sorted(str(item) for item in matched_domains),
+            "endpoints": sorted(str(item) for item in matched_endpoints),
+            "memory": list(memory_facts_used),
+            "patient": patient_summary or {},
+            "history": list(patient_history_facts_used),
+            "dialogue": list(recent_dialogue),
+            "endpoint_results": list(endpoint_results),
+        }
+    )
+    bucket = "::".join(
+        [
+            str(settings.CLINICAL_CHAT_LLM_PROVIDER),
+            str(settings.CLINICAL_CHAT_LLM_MODEL),
+            str(response_mode or "clinical").strip().lower(),
+            str(tool_mode or "chat").strip().lower(),
+            str(effective_specialty or "general").strip().lower(),
+            evidence_fingerprint(
+                knowledge_sources=knowledge_sources,
+                web_sources=web_sources,
+                evidence_chunk_ids=evidence_chunk_ids,
+            ),
+            context_fingerprint,
+        ]
+    )
+    return f"{bucket}::{_digest(normalized_query)}", bucket, normalized_query
+
+
+def _default_query_embedder(text: str) -> Optional[list[float]]:
+    from app.services.embedding_service import OllamaEmbeddingService
+
+    vector, trace = OllamaEmbeddingService().embed_text(text)
+    # El vector hash de respaldo no es semantico: no sirve para casi-coincidencias.
+    if trace.get("embedding_source") == "fallback_hash":
+        return None
+    return vector
+
+
+class LLMAnswerCache:
+    """LRU con TTL, indice por bucket y nivel opcional de casi-coincidencia."""
+
+    def __init__(self, *, max_entries: int, embedder: Optional[QueryEmbedder] = None):
+        self.max_entries = max(1, int(max_entries))
+        self._embedder = embedder or _default_query_embedder
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._buckets: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
+        self._corpus_dirty = False
+        self._model_signature: Optional[tuple[str, str]] = None
+        self.hits_exact = 0
+        self.hits_near = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def mark_corpus_dirty(self) -> None:
+        self._corpus_dirty = True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.invalidations += 1
+
+    def _sync_generation(self) -> None:
+        model_signature = (
+            str(settings.CLINICAL_CHAT_LLM_PROVIDER),
+            str(settings.CLINICAL_CHAT_LLM_MODEL),
+        )
+        model_changed = (
+            self._model_signature is not None and self._model_signature != model_signature
+        )
+        self._model_signature = model_signature
+        if self._corpus_dirty or model_changed:
+            self._corpus_dirty = False
+            self.invalidate()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._buckets.get(entry["bucket"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._buckets.pop(entry["bucket"], None)
+
+    def _alive(self, key: str, entry: dict[str, Any], now: float) -> bool:
+        if float(entry.get("expires_at", 0.0)) > now:
+            return True
+        self._remove(key)
+        self.expirations += 1
+        return False
+
+    def _embed(self, text: str) -> Optional[list[float]]:
+        try:
+            vector = self._embedder(text)
+        except Exception as exc:
+            self.errors += 1
+            logger.debug("Embedding de consulta no disponible: %s", exc.__class__.__name__)
+            return None
+        return list(vector) if vector else None
+
+    def lookup(
+        self,
+        *,
+        key: str,
+        bucket: str,
+        normalized_query: str,
+        near_match: bool,
+        min_similarity: float,
+    ) -> tuple[Optional[dict[str, Any]], str, float]:
+        """Devuelve `(entrada, nivel, similitud)`; nivel `exact`, `near` o `miss`."""
+        with self._lock:
+            self._sync_generation()
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and self._alive(key, entry, now):
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return copy.deepcopy(entry), "exact", 1.0
+            neighbours = [
+                (candidate_key, candidate)
+                for candidate_key in list(self._buckets.get(bucket, ()))
+                if (candidate := self._entries.get(candidate_key)) is not None
+                and self._alive(candidate_key, candidate, now)
+                and candidate.get("query_vector")
+            ]
+        if near_match and neighbours:
+            query_vector = self._embed(normalized_query)
+            if query_vector is not None:
+                scores = embedding_similarity.cosine_scores(
+                    query_vector,
+                    [candidate["query_vector"] for _, candidate in neighbours],
+                )
+                best_index = max(range(len(neighbours)), key=lambda index: scores[index])
+                best_score = float(scores[best_index])
+                if best_score >= min_similarity:
+                    best_key, best_entry = neighbours[best_index]
+                    with self._lock:
+                        if best_key in self._entries:
+                            self._entries.move_to_end(best_key)
+                        self.hits_near += 1
+                    return copy.deepcopy(best_entry), "near", best_score
+        with self._lock:
+            self.misses += 1
+        return None, "miss", 0.0
+
+    def store(
+        self,
+        *,
+        key: str,
+        bucket: str,
+        normalized_query: str,
+        answer: str,
+        trace: dict[str, Any],
+        ttl_seconds: int,
+        near_match: bool,
+    ) -> None:
+        query_vector = self._embed(normalized_query) if near_match else None
+        now = time.time()
+        entry = {
+            "answer": str(answer),
+            "trace": copy.deepcopy(dict(trace)),
+            "bucket": bucket,
+            "query": normalized_query,
+            "query_vector": query_vector,
+            "created_at": now,
+            "expires_at": now + float(ttl_seconds),
+        }
+        with self._lock:
+            self._sync_generation()
+            self._remove(key)
+            self._entries[key] = entry
+            self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key, _ = next(iter(self._entries.items()))
+                self._remove(oldest_key)
+                self.evictions += 1
+            self.stores += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits_exact + self.hits_near,
+            "hits_exact": self.hits_exact,
+            "hits_near": self.hits_near,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+_shared_cache: Optional[LLMAnswerCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_llm_answer_cache() -> LLMAnswerCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMAnswerCache(
+                max_entries=int(settings.CLINICAL_CHAT_LLM_ANSWER_CACHE_MAX_ENTRIES)
+            )
+        return _shared_cache
+
+
+def reset_shared_llm_answer_cache() -> None:
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = None
+
+
+def shared_llm_answer_cache_stats() -> dict[str, Any]:
+    """Stats del cache compartido sin crearlo (para `/metrics`)."""
+    cache = _shared_cache
+    if cache is None:
+        return {}
+    return cache.stats()
+
+
+def _on_corpus_change(*_args: Any) -> None:
+    cache = _shared_cache
+    if cache is not None:
+        cache.mark_corpus_dirty()
+
+
+for _model in (DocumentChunk, ClinicalKnowledgeSource):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _on_corpus_change)
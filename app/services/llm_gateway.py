@@ -0,0 +1,366 @@
+"""
+Pasarela de inferencia LLM sobre un pool de backends Ollama/llama.cpp.
+
+Antes todos los turnos iban a `CLINICAL_CHAT_LLM_BASE_URL` y el circuit breaker
+era estado de clase: bajo carga los turnos se apilaban en una sola instancia,
+expiraban a la vez y el breaker se abria para todos. La pasarela:
+
+- reparte cada peticion al backend menos cargado (`en_vuelo / capacidad`,
+  desempate por latencia media) con un tope de concurrencia por backend;
+- mantiene un circuit breaker por backend: un backend caido deja de recibir
+  trafico sin bloquear al resto;
+- encola como mucho `CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE` esperas, cada una con
+  un plazo tomado del presupuesto de latencia que le queda al turno;
+- sin capacidad, rechaza rapido con `LLMGatewayOverloadedError` (subclase de
+  `TimeoutError`), que el proveedor ya trata como timeout y desvia al fallback
+  extractivo.
+
+El backend elegido viaja en un `ContextVar` (igual que los eventos de
+streaming), asi las funciones de peticion no cambian de firma.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from app.core.config import settings
+
+_LATENCY_EWMA_ALPHA = 0.3
+
+
+class LLMGatewayOverloadedError(TimeoutError):
+    """No hay backend disponible dentro del plazo: el turno debe degradar."""
+
+    def __init__(self, reason: str, *, waited_ms: float = 0.0):
+        super().__init__(f"llm_gateway_overloaded:{reason}")
+        self.reason = reason
+        self.waited_ms = waited_ms
+
+
+@dataclass
+class LLMBackend:
+    base_url: str
+    max_concurrency: int
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    open_until_monotonic: float = 0.0
+    latency_ewma_ms: float = 0.0
+    requests_total: int = 0
+    failures_total: int = 0
+
+    def circuit_open(self, now: float) -> bool:
+        if not settings.CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_ENABLED:
+            return False
+        if self.open_until_monotonic > now:
+            return True
+        # Ventana cumplida: semiabierto, el siguiente fallo lo reabre.
+        self.open_until_monotonic = 0.0
+        return False
+
+    def load(self) -> float:
+        return self.in_flight / max(1, self.max_concurrency)
+
+
+@dataclass
+class _TurnState:
+    backend: Optional[LLMBackend] = None
+    requests: int = 0
+    wait_ms: float = 0.0
+    shed_reason: str = ""
+    backends_used: list[str] = field(default_factory=list)
+    # Resultado de la ultima peticion del turno en cada backend (True = fallo).
+    last_failed: dict[str, bool] = field(default_factory=dict)
+
+
+_current_backend_url: ContextVar[Optional[str]] = ContextVar(
+    "llm_gateway_backend_url",
+    default=None,
+)
+_current_turn: ContextVar[Optional[_TurnState]] = ContextVar(
+    "llm_gateway_turn",
+    default=None,
+)
+
+
+def current_backend_url() -> str:
+    """URL base del backend asignado a la peticion en curso (o la configurada)."""
+    return _current_backend_url.get() or str(settings.CLINICAL_CHAT_LLM_BASE_URL)
+
+
+def configured_backend_urls() -> list[str]:
+    raw_urls = str(settings.CLINICAL_CHAT_LLM_BACKEND_URLS or "")
+    urls = [url.strip().rstrip("/") for url in raw_urls.split(",") if url.strip()]
+    return list(dict.fromkeys(urls)) or [str(settings.CLINICAL_CHAT_LLM_BASE_URL).rstrip("/")]
+
+
+class LLMGateway:
+    """Pool de backends con reparto por carga, breaker por backend y cola acotada."""
+
+    def __init__(self, *, backend_urls: list[str], max_concurrency: int, max_queue: int):
+        self.backends = [
+            LLMBackend(base_url=url, max_concurrency=max(1, int(max_concurrency)))
+            for url in backend_urls
+        ]
+        self.max_queue = max(0, int(max_queue))
+        self._condition = threading.Condition()
+        self.waiting = 0
+        self.leases_total = 0
+        self.shed_total: dict[str, int] = {}
+
+    def _pick_backend(self, *, respect_circuit: bool) -> Optional[LLMBackend]:
+        now = time.monotonic()
+        turn = _current_turn.get()
+        failed_in_turn = turn.last_failed if turn is not None else {}
+        candidates = [
+            backend
+            for backend in self.backends
+            if backend.in_flight < backend.max_concurrency
+            and not (respect_circuit and backend.circuit_open(now))
+        ]
+        if not candidates:
+            return None
+        # Un reintento del turno evita el backend que acaba de fallarle.
+        return min(
+            candidates,
+            key=lambda backend: (
+                backend.load(),
+                failed_in_turn.get(backend.base_url, False),
+                backend.latency_ewma_ms,
+            ),
+        )
+
+    def _all_circuits_open(self) -> bool:
+        now = time.monotonic()
+        return all(backend.circuit_open(now) for backend in self.backends)
+
+    def _shed(self, reason: str, waited_ms: float = 0.0) -> LLMGatewayOverloadedError:
+        self.shed_total[reason] = self.shed_total.get(reason, 0) + 1
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.shed_reason = reason
+            turn.wait_ms += waited_ms
+        return LLMGatewayOverloadedError(reason, waited_ms=waited_ms)
+
+    def _acquire(self, *, max_wait_seconds: float, respect_circuit: bool) -> LLMBackend:
+        started_at = time.monotonic()
+        turn = _current_turn.get()
+        with self._condition:
+            backend = self._pick_backend(respect_circuit=respect_circuit)
+            if backend is None:
+                if respect_circuit and self._all_circuits_open():
+                    raise self._shed("all_backends_open")
+                # Un turno ya degradado no vuelve a esperar en sus reintentos.
+                if (turn is not None and turn.shed_reason) or max_wait_seconds <= 0:
+                    raise self._shed("no_capacity")
+                if self.waiting >= self.max_queue:
+                    raise self._shed("queue_full")
+                deadline = started_at + max_wait_seconds
+                self.waiting += 1
+                try:
+                    while backend is None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            waited_ms = (time.monotonic() - started_at) * 1000
+                            raise self._shed("wait_timeout", waited_ms)
+                        self._condition.wait(timeout=remaining)
+                        backend = self._pick_backend(respect_circuit=respect_circuit)
+                finally:
+                    self.waiting -= 1
+            backend.in_flight += 1
+            backend.requests_total += 1
+            self.leases_total += 1
+        if turn is not None:
+            turn.backend = backend
+            turn.requests += 1
+            turn.wait_ms += (time.monotonic() - started_at) * 1000
+            if backend.base_url not in turn.backends_used:
+                turn.backends_used.append(backend.base_url)
+        return backend
+
+    def _release(self, backend: LLMBackend, *, latency_ms: float, failed: bool) -> None:
+        with self._condition:
+            backend.in_flight = max(0, backend.in_flight - 1)
+            if failed:
+                backend.failures_total += 1
+            elif backend.latency_ewma_ms:
+                backend.latency_ewma_ms += _LATENCY_EWMA_ALPHA * (
+                    latency_ms - backend.latency_ewma_ms
+                )
+            else:
+                backend.latency_ewma_ms = latency_ms
+            self._condition.notify()
+
+    @contextmanager
+    def lease(
+        self,
+        *,
+        max_wait_seconds: float,
+        respect_circuit: bool = True,
+    ) -> Iterator[LLMBackend]:
+        """
+        Reserva un hueco en el backend menos cargado durante una peticion.
+
+        Lanza `LLMGatewayOverloadedError` si no lo consigue en `max_wait_seconds`
+        (acotado por `CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS`).
+        """
+        wait_seconds = min(
+            max(0.0, float(max_wait_seconds)),
+            float(settings.CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS),
+        )
+        backend = self._acquire(max_wait_seconds=wait_seconds, respect_circuit=respect_circuit)
+        token = _current_backend_url.set(backend.base_url)
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            yield backend
+            failed = False
+        finally:
+            _current_backend_url.reset(token)
+            turn = _current_turn.get()
+            if turn is not None:
+                turn.last_failed[backend.base_url] = failed
+            self._release(
+                backend,
+                latency_ms=(time.perf_counter() - started_at) * 1000,
+                failed=failed,
+            )
+
+    def record_turn_outcome(self, *, success: bool) -> None:
+        """
+        Traslada el resultado del turno a los breakers de los backends usados.
+
+        Cada turno suma como mucho un fallo por backend: el de cada backend cuya
+        ultima peticion fallo y, si el turno fallo sin error de transporte (p. ej.
+        respuesta vacia), el del ultimo backend. Un turno correcto cierra el
+        breaker del backend que respondio.
+        """
+        if not settings.CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_ENABLED:
+            return
+        turn = _current_turn.get()
+        if turn is None or turn.backend is None:
+            return
+        failed_urls = {url for url, failed in turn.last_failed.items() if failed}
+        if success:
+            failed_urls.discard(turn.backend.base_url)
+        elif not failed_urls:
+            failed_urls.add(turn.backend.base_url)
+        threshold = max(1, int(settings.CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_FAILURE_THRESHOLD))
+        open_seconds = max(1, int(settings.CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_OPEN_SECONDS))
+        with self._condition:
+            for backend in self.backends:
+                if backend.base_url in failed_urls:
+                    backend.consecutive_failures += 1
+                    if backend.consecutive_failures >= threshold:
+                        backend.open_until_monotonic = time.monotonic() + float(open_seconds)
+                elif success and backend is turn.backend:
+                    backend.consecutive_failures = 0
+                    backend.open_until_monotonic = 0.0
+            self._condition.notify_all()
+
+    def circuit_status(self) -> tuple[bool, float, int]:
+        """`(abierto, segundos_restantes, fallos)`; abierto solo si lo estan todos."""
+        if not settings.CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_ENABLED:
+            return False, 0.0, 0
+        now = time.monotonic()
+        with self._condition:
+            if not all(backend.circuit_open(now) for backend in self.backends):
+                turn = _current_turn.get()
+                backend = turn.backend if turn is not None else None
+                failures = backend.consecutive_failures if backend is not None else 0
+                return False, 0.0, failures
+            remaining = min(backend.open_until_monotonic - now for backend in self.backends)
+            failures = min(backend.consecutive_failures for backend in self.backends)
+        return True, max(0.0, remaining), failures
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._condition:
+            return {
+                "backends": len(self.backends),
+                "backends_open": sum(1 for backend in self.backends if backend.circuit_open(now)),
+                "in_flight": sum(backend.in_flight for backend in self.backends),
+                "capacity": sum(backend.max_concurrency for backend in self.backends),
+                "waiting": self.waiting,
+                "leases_total": self.leases_total,
+                "shed_total": sum(self.shed_total.values()),
+                "shed_by_reason": dict(self.shed_total),
+                "per_backend": [
+                    {
+                        "base_url": backend.base_url,
+                        "in_flight": backend.in_flight,
+                        "circuit_open": backend.circuit_open(now),
+                        "consecutive_failures": backend.consecutive_failures,
+                        "latency_ewma_ms": round(backend.latency_ewma_ms, 2),
+                        "requests_total": backend.requests_total,
+                        "failures_total": backend.failures_total,
+                    }
+                    for backend in self.backends
+                ],
+            }
+
+
+@contextmanager
+def llm_turn_scope() -> Iterator[_TurnState]:
+    """Agrupa las peticiones de un turno para breaker y traza."""
+    token = _current_turn.set(_TurnState())
+    try:
+        yield _current_turn.get()  # type: ignore[misc]
+    finally:
+        _current_turn.reset(token)
+
+
+def turn_trace(turn: _TurnState) -> dict[str, str]:
+    trace = {
+        "llm_gateway_requests": str(turn.requests),
+        "llm_gateway_wait_ms": str(round(turn.wait_ms, 2)),
+    }
+    if turn.backends_used:
+        trace["llm_backend"] = turn.backends_used[-1]
+        trace["llm_backends_used"] = ",".join(turn.backends_used)
+    if turn.shed_reason:
+        trace["llm_gateway_shed_reason"] = turn.shed_reason
+    return trace
+
+
+_shared_gateway: Optional[LLMGateway] = None
+_shared_signature: Optional[tuple[Any, ...]] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_llm_gateway() -> LLMGateway:
+    """Pasarela del proceso; se reconstruye si cambia la configuracion del pool."""
+    global _shared_gateway, _shared_signature
+    signature = (
+        tuple(configured_backend_urls()),
+        int(settings.CLINICAL_CHAT_LLM_BACKEND_MAX_CONCURRENCY),
+        int(settings.CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE),
+    )
+    with _shared_lock:
+        if _shared_gateway is None or _shared_signature != signature:
+            _shared_gateway = LLMGateway(
+                backend_urls=list(signature[0]),
+                max_concurrency=signature[1],
+                max_queue=signature[2],
+            )
+            _shared_signature = signature
+        return _shared_gateway
+
+
+def reset_shared_llm_gateway() -> None:
+    global _shared_gateway, _shared_signature
+    with _shared_lock:
+        _shared_gateway = None
+        _shared_signature = None
+
+
+def shared_llm_gateway_stats() -> dict[str, Any]:
+    """Stats de la pasarela compartida sin crearla (para `/metrics`)."""
+    gateway = _shared_gateway
+    if gateway is None:
+        return {}
+    return gateway.stats()
@@ -0,0 +1,143 @@
+"""
+Conteo de tokens y truncado por presupuesto para los prompts del LLM.
+
+`_truncate_text_to_token_budget` reconstruia el candidato y volvia a contar
+todo el texto por cada palabra anadida (cuadratico). Aqui el truncado hace una
+sola pasada sobre sumas prefijas por palabra:
+
+- heuristico (por defecto): tokens lexicos (`\\w+|[^\\w\\s]`, nunca cruzan un
+  espacio, asi que son aditivos por palabra) y caracteres/4; ambas sumas son
+  monotonas, el corte es la ultima palabra que cabe y el resultado es identico
+  al del algoritmo anterior;
+- exacto (opcional): si `CLINICAL_CHAT_LLM_TOKENIZER_PATH` apunta a un
+  `tokenizer.json` local y `tokenizers` esta instalado, se carga una vez y el
+  corte usa los offsets de una unica codificacion.
+
+Los conteos se memorizan en un LRU compartido por `llm_chat_provider` y
+`rag_prompt_builder`: el mismo snippet de evidencia se cuenta una sola vez.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Optional
+
+from app.core.config import settings
+
+try:
+    from tokenizers import Tokenizer
+except Exception:  # pragma: no cover - fallback defensivo
+    Tokenizer = None  # type: ignore[assignment,misc]
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", flags=re.UNICODE)
+_COUNT_CACHE_SIZE = 8192
+
+_tokenizer_lock = threading.Lock()
+_loaded_tokenizer: Optional[tuple[str, Any]] = None
+
+
+def _exact_tokenizer() -> Optional[Any]:
+    """Tokenizer exacto configurado, cargado una sola vez por ruta."""
+    global _loaded_tokenizer
+    path = str(settings.CLINICAL_CHAT_LLM_TOKENIZER_PATH or "").strip()
+    if not path or Tokenizer is None:
+        return None
+    loaded = _loaded_tokenizer
+    if loaded is not None and loaded[0] == path:
+        return loaded[1]
+    with _tokenizer_lock:
+        if _loaded_tokenizer is None or _loaded_tokenizer[0] != path:
+            try:
+                tokenizer = Tokenizer.from_file(path)
+            except Exception as exc:
+                logger.warning("Tokenizer %s no disponible, se usa el heuristico: %s", path, exc)
+                tokenizer = None
+            _loaded_tokenizer = (path, tokenizer)
+        return _loaded_tokenizer[1]
+
+
+def tokenizer_mode() -> str:
+    return "exact" if _exact_tokenizer() is not None else "heuristic"
+
+
+def _heuristic_count(text: str) -> int:
+    return max(len(TOKEN_PATTERN.findall(text)), max(1, len(text) // 4))
+
+
+@lru_cache(maxsize=_COUNT_CACHE_SIZE)
+def _cached_count(mode_key: str, text: str) -> int:
+    tokenizer = _exact_tokenizer() if mode_key != "heuristic" else None
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return _heuristic_count(text)
+
+
+def count_tokens(text: str) -> int:
+    compact = str(text or "").strip()
+    if not compact:
+        return 0
+    mode_key = str(settings.CLINICAL_CHAT_LLM_TOKENIZER_PATH or "") or "heuristic"
+    if mode_key != "heuristic" and _exact_tokenizer() is None:
+        mode_key = "heuristic"
+    return _cached_count(mode_key, compact)
+
+
+def _truncate_heuristic(words: list[str], token_budget: int) -> str:
+    lexical_prefix = accumulate(len(TOKEN_PATTERN.findall(word)) for word in words)
+    char_prefix = accumulate(len(word) for word in words)
+    kept = 0
+    for index, (lexical_tokens, chars) in enumerate(zip(lexical_prefix, char_prefix)):
+        # `chars + index` = longitud del candidato unido con espacios simples.
+        if max(lexical_tokens, max(1, (chars + index) // 4)) > token_budget:
+            break
+        kept = index + 1
+    return " ".join(words[:kept])
+
+
+def _truncate_exact(tokenizer: Any, text: str, token_budget: int) -> str:
+    encoding = tokenizer.encode(text, add_special_tokens=False)
+    if len(encoding.ids) <= token_budget:
+        return text
+    cut = int(encoding.offsets[token_budget - 1][1])
+    head = text[:cut]
+    if cut < len(text) and not text[cut].isspace():
+        # Descarta la palabra partida para cortar siempre en limite de palabra.
+        head = head.rsplit(" ", 1)[0] if " " in head else ""
+    return head.strip()
+
+
+def truncate_to_token_budget(text: str, token_budget: int) -> str:
+    """Prefijo mas largo de `text` (cortado por palabras) que cabe en el presupuesto."""
+    if token_budget <= 0:
+        return ""
+    if count_tokens(text) <= token_budget:
+        return text
+    tokenizer = _exact_tokenizer()
+    if tokenizer is not None:
+        return _truncate_exact(tokenizer, text, token_budget)
+    words = text.split()
+    if not words:
+        return text[: max(0, token_budget * 4)]
+    return _truncate_heuristic(words, token_budget)
+
+
+def token_count_cache_stats() -> dict[str, Any]:
+    info = _cached_count.cache_info()
+    return {
+        "mode": tokenizer_mode(),
+        "hits": info.hits,
+        "misses": info.misses,
+        "entries": info.currsize,
+    }
+
+
+def reset_shared_token_counter() -> None:
+    global _loaded_tokenizer
+    _cached_count.cache_clear()
+    with _tokenizer_lock:
+        _loaded_tokenizer = None
@@ -0,0 +1,214 @@
+"""
+Filas ligeras de candidatos para el retriever hibrido.
+
+La generacion de candidatos puede devolver cientos o miles de chunks que se
+descartan tras puntuar. Materializarlos como `DocumentChunk` ORM implica
+hidratar el embedding (`LargeBinary`), el `ClinicalDocument` unido de forma
+ansiosa y el seguimiento de identidad de la sesion para cada fila.
+
+`CandidateChunk` es una fila con `__slots__` y solo las columnas que usan las
+fases de puntuacion (texto por zonas, longitud, especialidad y titulo/fichero
+del documento). Los campos pesados se cargan bajo demanda:
+
+- `chunk_embedding`: por lotes, solo para los candidatos que la busqueda
+  vectorial no resuelve con el indice persistente;
+- el `DocumentChunk` completo: solo para el top-k final (`hydrate_chunks`).
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional
+
+from sqlalchemy.orm import Session, object_session
+
+from app.models.clinical_document import ClinicalDocument
+from app.models.document_chunk import DocumentChunk
+
+LOAD_BATCH_SIZE = 500
+
+CANDIDATE_COLUMNS = (
+    DocumentChunk.id,
+    DocumentChunk.document_id,
+    DocumentChunk.chunk_index,
+    DocumentChunk.chunk_text,
+    DocumentChunk.section_path,
+    DocumentChunk.tokens_count,
+    DocumentChunk.keywords,
+    DocumentChunk.custom_questions,
+    DocumentChunk.specialty,
+    DocumentChunk.content_type,
+    ClinicalDocument.title,
+    ClinicalDocument.source_file,
+)
+
+
+class CandidateDocument:
+    """Titulo y fichero del documento, compartidos por todos sus chunks."""
+
+    __slots__ = ("id", "title", "source_file")
+
+    def __init__(self, id: Any, title: Any, source_file: Any):
+        self.id = id
+        self.title = title
+        self.source_file = source_file
+
+
+class CandidateChunk:
+    """Chunk candidato con las columnas de puntuacion y embedding perezoso."""
+
+    __slots__ = (
+        "id",
+        "document_id",
+        "chunk_index",
+        "chunk_text",
+        "section_path",
+        "tokens_count",
+        "keywords",
+        "custom_questions",
+        "specialty",
+        "content_type",
+        "document",
+        "_batch",
+        "_embedding",
+        "_rag_score",
+    )
+
+    def __init__(self, row: Any, *, batch: CandidateBatch, document: CandidateDocument):
+        self.id = row.id
+        self.document_id = getattr(row, "document_id", None)
+        self.chunk_index = getattr(row, "chunk_index", None)
+        self.chunk_text = getattr(row, "chunk_text", "") or ""
+        self.section_path = getattr(row, "section_path", None)
+        self.tokens_count = getattr(row, "tokens_count", 0) or 0
+        self.keywords = getattr(row, "keywords", None) or []
+        self.custom_questions = getattr(row, "custom_questions", None) or []
+        self.specialty = getattr(row, "specialty", None)
+        self.content_type = getattr(row, "content_type", None) or "paragraph"
+        self.document = document
+        self._batch = batch
+        self._embedding: Optional[bytes] = None
+
+    @property
+    def chunk_embedding(self) -> bytes:
+        if self._embedding is None:
+            self._batch.load_embeddings([self])
+        return self._embedding or b""
+
+    def __repr__(self) -> str:
+        return f"CandidateChunk(id={self.id}, doc_id={self.document_id})"
+
+
+class CandidateBatch:
+    """Sesion y documentos compartidos por las filas de una misma generacion."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.documents: dict[Any, CandidateDocument] = {}
+
+    def _document_for(self, row: Any) -> CandidateDocument:
+        document_id = getattr(row, "document_id", None)
+        document = self.documents.get(document_id)
+        if document is None:
+            document = CandidateDocument(
+                document_id,
+                getattr(row, "title", None),
+                getattr(row, "source_file", None),
+            )
+            self.documents[document_id] = document
+        return document
+
+    def build(self, rows: Iterable[Any]) -> list[CandidateChunk]:
+        return [CandidateChunk(row, batch=self, document=self._document_for(row)) for row in rows]
+
+    def load_embeddings(self, chunks: list[CandidateChunk]) -> int:
+        """Carga en lotes los embeddings que aun no se han leido; devuelve cuantos."""
+        pending = {int(chunk.id): chunk for chunk in chunks if chunk._embedding is None}
+        pending_ids = sorted(pending)
+        for start in range(0, len(pending_ids), LOAD_BATCH_SIZE):
+            batch_ids = pending_ids[start : start + LOAD_BATCH_SIZE]
+            rows = (
+                self.db.query(DocumentChunk.id, DocumentChunk.chunk_embedding)
+                .filter(DocumentChunk.id.in_(batch_ids))
+                .all()
+            )
+            for chunk_id, blob in rows:
+                pending[int(chunk_id)]._embedding = bytes(blob or b"")
+        for chunk in pending.values():
+            if chunk._embedding is None:
+                chunk._embedding = b""
+        return len(pending_ids)
+
+
+def load_candidate_rows(
+    db: Session,
+    *,
+    specialty_filter: Optional[str] = None,
+    ids: Optional[list[int]] = None,
+) -> list[CandidateChunk]:
+    """Candidatos con especialidad asignada (opcionalmente filtrados por ids)."""
+    query_builder = db.query(*CANDIDATE_COLUMNS).filter(
+        ClinicalDocument.id == DocumentChunk.document_id,
+        DocumentChunk.specialty.isnot(None),
+    )
+    if ids is not None:
+        query_builder = query_builder.filter(DocumentChunk.id.in_(ids))
+    if specialty_filter:
+        query_builder = query_builder.filter(DocumentChunk.specialty == specialty_filter)
+    return CandidateBatch(db).build(query_builder.all())
+
+
+def candidate_session(chunk: Any) -> Optional[Session]:
+    """Sesion de la que procede un candidato (ORM o fila ligera)."""
+    batch = getattr(chunk, "_batch", None)
+    if isinstance(batch, CandidateBatch):
+        return batch.db
+    try:
+        return object_session(chunk)
+    except Exception:
+        return None
+
+
+def prefetch_embeddings(chunks: Iterable[Any]) -> int:
+    """Carga por lotes los embeddings de las filas ligeras (las ORM ya los traen)."""
+    by_batch: dict[int, tuple[CandidateBatch, list[CandidateChunk]]] = {}
+    for chunk in chunks:
+        if isinstance(chunk, CandidateChunk) and chunk._embedding is None:
+            by_batch.setdefault(id(chunk._batch), (chunk._batch, []))[1].append(chunk)
+    return sum(batch.load_embeddings(items) for batch, items in by_batch.values())
+
+
+def hydrate_chunks(chunks: list[Any]) -> list[Any]:
+    """
+    Sustituye las filas ligeras del resultado final por `DocumentChunk` completos.
+
+    Una consulta por lote; conserva orden y `_rag_score`. Las filas cuyo chunk ya
+    no existe se descartan.
+    """
+    light = [chunk for chunk in chunks if isinstance(chunk, CandidateChunk)]
+    if not light:
+        return chunks
+    loaded: dict[int, DocumentChunk] = {}
+    by_batch: dict[int, tuple[CandidateBatch, list[int]]] = {}
+    for chunk in light:
+        by_batch.setdefault(id(chunk._batch), (chunk._batch, []))[1].append(int(chunk.id))
+    for batch, chunk_ids in by_batch.values():
+        for start in range(0, len(chunk_ids), LOAD_BATCH_SIZE):
+            rows = (
+                batch.db.query(DocumentChunk)
+                .filter(DocumentChunk.id.in_(chunk_ids[start : start + LOAD_BATCH_SIZE]))
+                .all()
+            )
+            loaded.update((row.id, row) for row in rows if row.id is not None)
+
+    hydrated: list[Any] = []
+    for chunk in chunks:
+        if not isinstance(chunk, CandidateChunk):
+            hydrated.append(chunk)
+            continue
+        full_chunk = loaded.get(int(chunk.id))
+        if full_chunk is None:
+            continue
+        score = getattr(chunk, "_rag_score", None)
+        if score is not None:
+            setattr(full_chunk, "_rag_score", score)
+        hydrated.append(full_chunk)
+    return hydrated
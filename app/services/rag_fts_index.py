@@ -0,0 +1,295 @@
+"""
+Ciclo de vida del indice FTS5 de candidatos (`document_chunks_fts`, solo SQLite).
+
+El indice es de contenido externo y se mantiene al dia con triggers sobre
+`document_chunks`, asi que solo hace falta reconstruirlo cuando:
+
+- no existe o falta alguno de sus objetos (tabla, vocab, triggers);
+- cambia `SCHEMA_VERSION` (DDL o tokenizador);
+- la marca de agua registrada no cuadra con la tabla fuente (filas indexadas
+  en `document_chunks_fts_docsize` vs filas de `document_chunks`).
+
+La version y la marca de agua se guardan en `rag_index_meta`. El estado se
+cachea por proceso y por base de datos, de modo que un reinicio de worker
+solo paga unas comprobaciones `COUNT(*)`. La reconstruccion se hace fuera de
+las peticiones (CLI `build_rag_indexes --fts`, precalentamiento al arrancar o
+hilo en segundo plano); en la ruta de consulta solo se permite si el corpus es
+pequeno (`CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS`).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "document_chunks_fts"
+META_TABLE = "rag_index_meta"
+
+_FTS_COLUMNS_NEW = """
+    new.id,
+    new.chunk_text,
+    COALESCE(new.section_path, ''),
+    COALESCE(CAST(new.keywords AS TEXT), ''),
+    COALESCE(new.specialty, '')
+"""
+_FTS_COLUMNS_OLD = """
+    'delete',
+    old.id,
+    old.chunk_text,
+    COALESCE(old.section_path, ''),
+    COALESCE(CAST(old.keywords AS TEXT), ''),
+    COALESCE(old.specialty, '')
+"""
+_INSERT_NEW = f"""
+    INSERT INTO document_chunks_fts(rowid, chunk_text, section_path, keywords, specialty)
+    VALUES ({_FTS_COLUMNS_NEW});
+"""
+_DELETE_OLD = f"""
+    INSERT INTO document_chunks_fts(
+        document_chunks_fts, rowid, chunk_text, section_path, keywords, specialty
+    )
+    VALUES ({_FTS_COLUMNS_OLD});
+"""
+
+_OBJECTS: tuple[tuple[str, str, str], ...] = (
+    (
+        "document_chunks_fts",
+        "TABLE",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts
+        USING fts5(
+            chunk_text,
+            section_path,
+            keywords,
+            specialty,
+            content='document_chunks',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        """,
+    ),
+    (
+        "document_chunks_fts_vocab",
+        "TABLE",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts_vocab
+        USING fts5vocab(document_chunks_fts, 'row');
+        """,
+    ),
+    (
+        "document_chunks_fts_ai",
+        "TRIGGER",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ai
+        AFTER INSERT ON document_chunks BEGIN {_INSERT_NEW} END;
+        """,
+    ),
+    (
+        "document_chunks_fts_ad",
+        "TRIGGER",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ad
+        AFTER DELETE ON document_chunks BEGIN {_DELETE_OLD} END;
+        """,
+    ),
+    (
+        "document_chunks_fts_au",
+        "TRIGGER",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS document_chunks_fts_au
+        AFTER UPDATE ON document_chunks BEGIN {_DELETE_OLD} {_INSERT_NEW} END;
+        """,
+    ),
+)
+
+
+class FTSIndexManager:
+    """Crea, valida y reconstruye el indice FTS5 solo cuando hace falta."""
+
+    # Incrementar al cambiar el DDL, las columnas o el tokenizador.
+    SCHEMA_VERSION = 1
+    _ready: dict[str, bool] = {}
+    _errors: dict[str, str] = {}
+    _builders: dict[str, threading.Thread] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(bind: Any) -> str:
+        return str(bind.url)
+
+    @staticmethod
+    def is_supported(bind: Any) -> bool:
+        return bind.dialect.name == "sqlite"
+
+    @classmethod
+    def reset_state(cls) -> None:
+        with cls._lock:
+            cls._ready.clear()
+            cls._errors.clear()
+
+    @staticmethod
+    def _ensure_meta_table(conn: Any) -> None:
+        conn.exec_driver_sql(
+            f"""
+            CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                watermark TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+
+    @staticmethod
+    def _source_watermark(conn: Any) -> dict[str, int]:
+        row = conn.exec_driver_sql(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM document_chunks"
+        ).fetchone()
+        return {"rows": int(row[0] or 0), "max_id": int(row[1] or 0)}
+
+    @classmethod
+    def _inspect(cls, conn: Any) -> tuple[Optional[str], dict[str, int]]:
+        """Motivo por el que hay que reconstruir (None si el indice es valido)."""
+        source = cls._source_watermark(conn)
+        names = {
+            str(row[0])
+            for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE name LIKE 'document_chunks_fts%'"
+            ).fetchall()
+        }
+        if any(name not in names for name, _kind, _ddl in _OBJECTS):
+            return "missing_objects", source
+        meta = conn.exec_driver_sql(
+            f"SELECT version FROM {META_TABLE} WHERE name = ?", (FTS_TABLE,)
+        ).fetchone()
+        if meta is None:
+            return "missing_meta", source
+        if int(meta[0]) != cls.SCHEMA_VERSION:
+            return "version_changed", source
+        indexed_rows = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM document_chunks_fts_docsize"
+        ).fetchone()[0]
+        if int(indexed_rows or 0) != source["rows"]:
+            return "watermark_mismatch", source
+        return None, source
+
+    @classmethod
+    def _rebuild(cls, conn: Any, *, reason: str) -> dict[str, int]:
+        if reason == "version_changed":
+            for name, kind, _ddl in reversed(_OBJECTS):
+                conn.exec_driver_sql(f"DROP {kind} IF EXISTS {name}")
+        for _name, _kind, ddl in _OBJECTS:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(
+            "INSERT INTO document_chunks_fts(document_chunks_fts) VALUES ('rebuild')"
+        )
+        watermark = cls._source_watermark(conn)
+        conn.exec_driver_sql(
+            f"""
+            INSERT INTO {META_TABLE}(name, version, watermark, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                version = excluded.version,
+                watermark = excluded.watermark,
+                updated_at = excluded.updated_at
+            """,
+            (FTS_TABLE, cls.SCHEMA_VERSION, json.dumps(watermark), time.time()),
+        )
+        return watermark
+
+    @classmethod
+    def ensure(
+        cls,
+        bind: Any,
+        *,
+        allow_rebuild: bool,
+        force: bool = False,
+    ) -> tuple[bool, dict[str, str]]:
+        """
+        Deja el indice listo si es valido o si se permite reconstruirlo.
+
+        Devuelve `(listo, trace)`; con `allow_rebuild=False` un indice invalido se
+        reporta como `fts_index_rebuild_pending` sin tocarlo.
+        """
+        key = cls._key(bind)
+        trace: dict[str, str] = {}
+        if not force and cls._ready.get(key):
+            return True, trace
+        try:
+            with bind.begin() as conn:
+                cls._ensure_meta_table(conn)
+                reason, source = cls._inspect(conn)
+                if force:
+                    reason = "forced"
+                if reason is not None:
+                    inline_ok = source["rows"] <= int(
+                        settings.CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS
+                    )
+                    if not (allow_rebuild or inline_ok):
+                        trace["fts_index_rebuild_pending"] = reason
+                        return False, trace
+                    started_at = time.perf_counter()
+                    cls._rebuild(conn, reason=reason)
+                    trace["fts_index_rebuilt"] = reason
+                    trace["fts_index_rebuild_ms"] = str(
+                        round((time.perf_counter() - started_at) * 1000, 2)
+                    )
+                    logger.info("Indice FTS reconstruido (%s, %s filas)", reason, source["rows"])
+        except Exception as exc:  # pragma: no cover - depende de build sqlite
+            with cls._lock:
+                cls._errors[key] = exc.__class__.__name__
+            trace["fts_index_error"] = exc.__class__.__name__
+            logger.warning("No se pudo preparar el indice FTS de candidatos: %s", exc)
+            return False, trace
+        with cls._lock:
+            cls._ready[key] = True
+            cls._errors.pop(key, None)
+        return True, trace
+
+    @classmethod
+    def last_error(cls, bind: Any) -> Optional[str]:
+        return cls._errors.get(cls._key(bind))
+
+    @classmethod
+    def schedule_rebuild(cls, bind: Any) -> bool:
+        """Lanza (una sola vez por BD) la validacion/reconstruccion en segundo plano."""
+        key = cls._key(bind)
+        with cls._lock:
+            running = cls._builders.get(key)
+            if running is not None and running.is_alive():
+                return False
+            thread = threading.Thread(
+                target=cls.ensure,
+                args=(bind,),
+                kwargs={"allow_rebuild": True},
+                name="rag-fts-index-build",
+                daemon=True,
+            )
+            cls._builders[key] = thread
+        thread.start()
+        return True
+
+    @classmethod
+    def describe(cls, bind: Any) -> dict[str, Any]:
+        with bind.connect() as conn:
+            cls._ensure_meta_table(conn)
+            reason, source = cls._inspect(conn)
+            meta = conn.exec_driver_sql(
+                f"SELECT version, watermark, updated_at FROM {META_TABLE} WHERE name = ?",
+                (FTS_TABLE,),
+            ).fetchone()
+            conn.commit()
+        return {
+            "schema_version": cls.SCHEMA_VERSION,
+            "stored_version": int(meta[0]) if meta else None,
+            "watermark": json.loads(meta[1]) if meta else None,
+            "updated_at": float(meta[2]) if meta else None,
+            "source": source,
+            "needs_rebuild": reason,
+        }
@@ -0,0 +1,383 @@
+"""
+Modelo LSI persistente para el scoring lexico RAG.
+
+Se ajusta offline sobre todo el corpus (y opcionalmente por especialidad) con
+una SVD truncada de la matriz termino-documento ponderada por zonas
+`(1 + log tf) * idf`. La SVD se obtiene por autodescomposicion de la matriz de
+Gram `A^T A` (V x V), que se acumula documento a documento sin materializar A.
+
+En consulta, la query y los candidatos se proyectan (fold-in) en el espacio
+latente fijo: `x_hat = (x @ V_k) / s_k`. El coste por consulta son solo
+productos matriz-vector sobre los terminos presentes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - fallback defensivo
+    np = None  # type: ignore[assignment]
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_term_stats_index import (
+    TermStatsIndex,
+    count_zone_terms,
+    extract_chunk_zone_texts,
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+
+def merge_zone_weights(
+    zone_counts: dict[str, Counter[str]],
+    zone_weights: dict[str, float],
+) -> dict[str, float]:
+    """TF por termino ponderado por zona (misma agregacion que el LSI por pool)."""
+    merged: dict[str, float] = {}
+    for zone_name, zone_weight in zone_weights.items():
+        if zone_weight <= 0:
+            continue
+        for term, term_count in zone_counts.get(zone_name, Counter()).items():
+            if int(term_count) <= 0:
+                continue
+            merged[term] = merged.get(term, 0.0) + float(zone_weight) * float(term_count)
+    return merged
+
+
+class LSIModel:
+    """Espacio latente LSI ajustado offline y versionado en disco (`.npz`)."""
+
+    FORMAT_VERSION = 1
+    FIT_BATCH_SIZE = 512
+    _shared: dict[str, LSIModel] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_dir: Path | str):
+        self.model_dir = Path(model_dir)
+        self._lock = threading.Lock()
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._models: dict[str, Optional[dict[str, Any]]] = {}
+
+    @classmethod
+    def get_shared(cls, model_dir: Optional[Path | str] = None) -> LSIModel:
+        resolved = Path(model_dir or settings.CLINICAL_CHAT_RAG_LSI_MODEL_DIR)
+        key = str(resolved.resolve())
+        with cls._shared_lock:
+            instance = cls._shared.get(key)
+            if instance is None:
+                instance = cls(resolved)
+                cls._shared[key] = instance
+            return instance
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    @staticmethod
+    def is_available() -> bool:
+        return np is not None
+
+    @staticmethod
+    def scope_for_specialty(specialty: Optional[str]) -> str:
+        slug = re.sub(r"[^a-z0-9]+", "_", str(specialty or "").lower()).strip("_")
+        return f"specialty_{slug}" if slug else GLOBAL_SCOPE
+
+    @staticmethod
+    def zone_weights_signature(zone_weights: dict[str, float]) -> str:
+        payload = json.dumps(
+            {zone: round(float(weight), 6) for zone, weight in sorted(zone_weights.items())}
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, scope: str) -> Path:
+        return self.model_dir / f"lsi-{scope}.npz"
+
+    def _load(self, scope: str) -> Optional[dict[str, Any]]:
+        """Carga (o reutiliza) el modelo del scope si el fichero ha cambiado."""
+        path = self._path(scope)
+        try:
+            stat = path.stat()
+        except OSError:
+            self._signatures.pop(scope, None)
+            self._models.pop(scope, None)
+            return None
+        signature = (int(stat.st_mtime_ns), int(stat.st_size))
+        if self._signatures.get(scope) == signature:
+            return self._models.get(scope)
+        model: Optional[dict[str, Any]] = None
+        try:
+            with np.load(path, allow_pickle=False) as payload:
+                meta = json.loads(str(payload["meta"]))
+                terms = [str(term) for term in payload["terms"].tolist()]
+                model = {
+                    "meta": meta,
+                    "col_by_term": {term: col for col, term in enumerate(terms)},
+                    "idf": np.asarray(payload["idf"], dtype=np.float32),
+                    "components": np.asarray(payload["components"], dtype=np.float32),
+                    "inv_singular": np.asarray(payload["inv_singular"], dtype=np.float32),
+                }
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Modelo LSI ilegible en %s: %s", path, exc)
+        if model is not None and int(model["meta"].get("format_version", 0)) != (
+            self.FORMAT_VERSION
+        ):
+            model = None
+        self._signatures[scope] = signature
+        self._models[scope] = model
+        return model
+
+    def resolve(
+        self,
+        *,
+        scopes: Sequence[str],
+        zone_weights: dict[str, float],
+        database: Optional[str] = None,
+    ) -> tuple[Optional[str], Optional[dict[str, Any]]]:
+        """Primer scope con modelo compatible (formato, tokenizador, zonas y BD)."""
+        if np is None:
+            return None, None
+        weights_signature = self.zone_weights_signature(zone_weights)
+        with self._lock:
+            for scope in scopes:
+                model = self._load(scope)
+                if model is None:
+                    continue
+                meta = model["meta"]
+                if meta.get("tokenizer") != TermStatsIndex.TOKENIZER_SIGNATURE:
+                    continue
+                if meta.get("zone_weights") != weights_signature:
+                    continue
+                if database is not None and meta.get("database") != database:
+                    continue
+                return scope, model
+        return None, None
+
+    @staticmethod
+    def _weighted_vector(
+        model: dict[str, Any],
+        term_weights: dict[str, float],
+    ) -> tuple[Any, Any]:
+        col_by_term = model["col_by_term"]
+        present = [
+            term for term, tf_value in term_weights.items() if term in col_by_term and tf_value > 0
+        ]
+        if not present:
+            return None, None
+        cols = np.asarray([col_by_term[term] for term in present], dtype=np.int64)
+        tf_values = np.asarray([term_weights[term] for term in present], dtype=np.float32)
+        return cols, (1.0 + np.log(tf_values)) * model["idf"][cols]
+
+    @classmethod
+    def fold_in(cls, model: dict[str, Any], term_weights: dict[str, float]) -> Any:
+        """Proyeccion `(x @ V_k) / s_k` usando solo las columnas presentes."""
+        cols, values = cls._weighted_vector(model, term_weights)
+        if cols is None:
+            return None
+        return (values @ model["components"][cols]) * model["inv_singular"]
+
+    @classmethod
+    def score(
+        cls,
+        model: dict[str, Any],
+        *,
+        query_term_counts: Counter[str],
+        documents: Sequence[tuple[int, dict[str, float]]],
+    ) -> tuple[dict[int, float], str]:
+        """Coseno latente query-documento; devuelve `(scores, error)`."""
+        query_latent = cls.fold_in(
+            model, {term: float(count) for term, count in query_term_counts.items() if count > 0}
+        )
+        if query_latent is None:
+            return {}, "empty_query_vector"
+        query_norm = float(np.linalg.norm(query_latent))
+        if query_norm <= 0:
+            return {}, "zero_query_norm"
+        scores: dict[int, float] = {}
+        for chunk_id, term_weights in documents:
+            doc_latent = cls.fold_in(model, term_weights)
+            if doc_latent is None:
+                continue
+            doc_norm = float(np.linalg.norm(doc_latent))
+            if doc_norm <= 0:
+                continue
+            cosine_score = float(np.dot(doc_latent, query_latent) / (doc_norm * query_norm))
+            scores[int(chunk_id)] = max(0.0, cosine_score)
+        return scores, ""
+
+    @staticmethod
+    def _fit_scope(
+        documents: list[tuple[Any, Any]],
+        df_by_term_id: Counter[int],
+        *,
+        vocab_terms: int,
+        min_df: int,
+        k: int,
+    ) -> Optional[dict[str, Any]]:
+        n_docs = len(documents)
+        ranked = [
+            (term_id, df_value)
+            for term_id, df_value in df_by_term_id.most_common()
+            if df_value >= min_df
+        ][:vocab_terms]
+        if len(ranked) < 2:
+            return None
+        vocab_ids = np.asarray([term_id for term_id, _df in ranked], dtype=np.int64)
+        col_by_term_id = {int(term_id): col for col, term_id in enumerate(vocab_ids.tolist())}
+        idf = np.asarray(
+            [math.log((n_docs + 1.0) / (df_value + 1.0)) + 1.0 for _term_id, df_value in ranked],
+            dtype=np.float64,
+        )
+        gram = np.zeros((len(ranked), len(ranked)), dtype=np.float64)
+        for term_ids, tf_values in documents:
+            cols = [col_by_term_id.get(int(term_id), -1) for term_id in term_ids.tolist()]
+            mask = np.asarray(cols, dtype=np.int64) >= 0
+            if not mask.any():
+                continue
+            doc_cols = np.asarray(cols, dtype=np.int64)[mask]
+            values = (1.0 + np.log(tf_values[mask].astype(np.float64))) * idf[doc_cols]
+            gram[np.ix_(doc_cols, doc_cols)] += np.outer(values, values)
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1][: max(1, min(k, n_docs, len(ranked)))]
+        singular = np.sqrt(np.maximum(eigenvalues[order], 0.0))
+        keep = singular > 1e-6
+        if not keep.any():
+            return None
+        return {
+            "vocab_ids": vocab_ids,
+            "idf": idf.astype(np.float32),
+            "components": eigenvectors[:, order][:, keep].astype(np.float32),
+            "inv_singular": (1.0 / singular[keep]).astype(np.float32),
+            "n_docs": n_docs,
+        }
+
+    def _save(self, scope: str, fitted: dict[str, Any], terms: list[str], meta: dict) -> None:
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(scope)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as handle:
+            np.savez(
+                handle,
+                meta=np.asarray(json.dumps(meta, sort_keys=True)),
+                terms=np.asarray(terms),
+                idf=fitted["idf"],
+                components=fitted["components"],
+                inv_singular=fitted["inv_singular"],
+            )
+        os.replace(tmp_path, path)
+
+    def fit_from_db(
+        self,
+        db: Session,
+        *,
+        zone_weights: dict[str, float],
+        k: Optional[int] = None,
+        vocab_terms: Optional[int] = None,
+        min_df: Optional[int] = None,
+        per_specialty: Optional[bool] = None,
+    ) -> dict[str, Any]:
+        """Ajusta y persiste el modelo global (y por especialidad si procede)."""
+        if np is None:
+            return {"scopes": {}, "error": "numpy_unavailable"}
+        k = int(k or settings.CLINICAL_CHAT_RAG_LSI_K)
+        vocab_terms = int(vocab_terms or settings.CLINICAL_CHAT_RAG_LSI_MODEL_VOCAB_TERMS)
+        min_df = int(min_df or settings.CLINICAL_CHAT_RAG_LSI_MODEL_MIN_DF)
+        if per_specialty is None:
+            per_specialty = bool(settings.CLINICAL_CHAT_RAG_LSI_MODEL_PER_SPECIALTY)
+        started_at = time.perf_counter()
+
+        term_id_by_term: dict[str, int] = {}
+        documents_by_scope: dict[str, list[tuple[Any, Any]]] = {GLOBAL_SCOPE: []}
+        df_by_scope: dict[str, Counter[int]] = {GLOBAL_SCOPE: Counter()}
+        db_ids = sorted(
+            int(row[0]) for row in db.execute(text("SELECT id FROM document_chunks")).fetchall()
+        )
+        for start in range(0, len(db_ids), self.FIT_BATCH_SIZE):
+            batch = db_ids[start : start + self.FIT_BATCH_SIZE]
+            chunks = (
+                db.query(DocumentChunk)
+                .options(joinedload(DocumentChunk.document))
+                .filter(DocumentChunk.id.in_(batch))
+                .all()
+            )
+            for chunk in chunks:
+                merged = merge_zone_weights(
+                    count_zone_terms(extract_chunk_zone_texts(chunk)), zone_weights
+                )
+                if not merged:
+                    continue
+                term_ids = np.asarray(
+                    [term_id_by_term.setdefault(term, len(term_id_by_term)) for term in merged],
+                    dtype=np.int64,
+                )
+                document = (term_ids, np.asarray(list(merged.values()), dtype=np.float32))
+                scopes = [GLOBAL_SCOPE]
+                if per_specialty and chunk.specialty:
+                    scopes.append(self.scope_for_specialty(chunk.specialty))
+                for scope in scopes:
+                    documents_by_scope.setdefault(scope, []).append(document)
+                    df_by_scope.setdefault(scope, Counter()).update(term_ids.tolist())
+
+        terms_by_id = list(term_id_by_term)
+        database = TermStatsIndex.database_identity(db)
+        weights_signature = self.zone_weights_signature(zone_weights)
+        min_specialty_docs = int(settings.CLINICAL_CHAT_RAG_LSI_MODEL_MIN_SPECIALTY_DOCS)
+        summary: dict[str, Any] = {}
+        with self._lock:
+            for scope, documents in documents_by_scope.items():
+                if scope != GLOBAL_SCOPE and len(documents) < min_specialty_docs:
+                    continue
+                fitted = self._fit_scope(
+                    documents,
+                    df_by_scope[scope],
+                    vocab_terms=vocab_terms,
+                    min_df=min_df,
+                    k=k,
+                )
+                if fitted is None:
+                    summary[scope] = {"docs": len(documents), "error": "insufficient_vocab"}
+                    continue
+                fitted_at = time.time()
+                components = int(fitted["components"].shape[1])
+                version_source = f"{scope}:{fitted_at}:{fitted['n_docs']}:{components}"
+                meta = {
+                    "format_version": self.FORMAT_VERSION,
+                    "model_version": hashlib.sha1(version_source.encode("utf-8")).hexdigest()[:12],
+                    "scope": scope,
+                    "tokenizer": TermStatsIndex.TOKENIZER_SIGNATURE,
+                    "zone_weights": weights_signature,
+                    "database": database,
+                    "docs": int(fitted["n_docs"]),
+                    "vocab_size": int(fitted["vocab_ids"].size),
+                    "components": components,
+                    "fitted_at": fitted_at,
+                }
+                terms = [terms_by_id[int(term_id)] for term_id in fitted["vocab_ids"].tolist()]
+                self._save(scope, fitted, terms, meta)
+                summary[scope] = {
+                    key: meta[key] for key in ("model_version", "docs", "vocab_size", "components")
+                }
+            self._signatures.clear()
+            self._models.clear()
+        return {
+            "scopes": summary,
+            "elapsed_ms": round((time.perf_counter() - started_at) * 1000.0, 1),
+        }
@@ -0,0 +1,132 @@
+"""
+Cache de ventanas de vecinos para los context packs del orquestador RAG.
+
+`RAGOrchestrator` se instancia por turno, asi que el cache vive a nivel de
+proceso: un LRU de documentos "calientes" que guarda instantaneas ligeras de
+sus chunks (solo las columnas que usa el context pack) junto con los
+`chunk_index` ya consultados. Una ventana se sirve desde cache solo si todos
+sus indices estan cubiertos, incluidos los que no existian en la BD (bordes
+del documento).
+
+Las entradas caducan por TTL y se invalidan por documento cuando el ORM
+inserta, actualiza o borra un `DocumentChunk` en este proceso.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+
+class NeighborWindowCache:
+    """LRU por documento de chunks vecinos ya cargados."""
+
+    def __init__(self, *, max_documents: int, ttl_seconds: float):
+        self.max_documents = max(0, int(max_documents))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._documents: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_documents > 0
+
+    def get_window(self, document_id: int, start: int, end: int) -> Optional[list[Any]]:
+        """Devuelve los chunks de `[start, end]` si la ventana completa esta cubierta."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._documents.get(int(document_id))
+            if entry is not None and entry["expires_at"] <= time.monotonic():
+                self._documents.pop(int(document_id), None)
+                entry = None
+            covered = entry["covered"] if entry is not None else ()
+            if entry is None or any(index not in covered for index in range(start, end + 1)):
+                self.misses += 1
+                return None
+            self._documents.move_to_end(int(document_id))
+            self.hits += 1
+            rows = entry["rows"]
+            return [rows[index] for index in range(start, end + 1) if index in rows]
+
+    def put_ranges(
+        self,
+        document_id: int,
+        ranges: list[tuple[int, int]],
+        rows: list[Any],
+    ) -> None:
+        """Registra los rangos consultados de un documento y los chunks encontrados."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            entry = self._documents.get(int(document_id))
+            if entry is None or entry["expires_at"] <= now:
+                entry = {"rows": {}, "covered": set(), "expires_at": now + self.ttl_seconds}
+                self._documents[int(document_id)] = entry
+            for start, end in ranges:
+                entry["covered"].update(range(start, end + 1))
+            for row in rows:
+                entry["rows"][int(row.chunk_index)] = row
+            self._documents.move_to_end(int(document_id))
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: Any) -> None:
+        try:
+            key = int(document_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._documents.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            documents = len(self._documents)
+        return {
+            "documents": documents,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_shared_cache: Optional[NeighborWindowCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_neighbor_cache() -> NeighborWindowCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = NeighborWindowCache(
+                max_documents=settings.CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_DOCUMENTS,
+                ttl_seconds=settings.CLINICAL_CHAT_RAG_CONTEXT_PACK_CACHE_TTL_SECONDS,
+            )
+        return _shared_cache
+
+
+def reset_shared_neighbor_cache() -> None:
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = None
+
+
+def _on_document_chunk_change(_mapper: Any, _connection: Any, target: Any) -> None:
+    cache = _shared_cache
+    if cache is not None:
+        cache.invalidate_document(getattr(target, "document_id", None))
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DocumentChunk, _event_name, _on_document_chunk_change)
@@ -10,28 +10,34 @@ Pipeline:
 """
 from __future__ import annotations
 
-import copy
+import hashlib
+import json
 import logging
 import math
 import re
 import time
 from array import array
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
 from typing import Any, Optional
 
-from sqlalchemy import Text, cast, func, or_
+from sqlalchemy import Text, and_, cast, func, or_
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 from app.models.document_chunk import DocumentChunk
 from app.services.chroma_retriever import ChromaRetriever
 from app.services.clinical_svm_domain_service import ClinicalSVMDomainService
 from app.services.elastic_retriever import ElasticRetriever
+from app.services.embedding_similarity import cosine_scores, pairwise_cosine
 from app.services.llamaindex_retriever import LlamaIndexRetriever
 from app.services.llm_chat_provider import LLMChatProvider
 from app.services.rag_gatekeeper import BasicGatekeeper
+from app.services.rag_neighbor_window_cache import get_shared_neighbor_cache
 from app.services.rag_prompt_builder import RAGContextAssembler
+from app.services.rag_query_cache import RAGQueryCache, get_shared_query_cache
 from app.services.rag_retriever import HybridRetriever
 
 logger = logging.getLogger(__name__)
@@ -464,7 +470,8 @@ class RAGOrchestrator:
         self.chroma_retriever = ChromaRetriever()
         self.elastic_retriever = ElasticRetriever()
         self.gatekeeper = BasicGatekeeper()
-        self._query_cache: dict[str, dict[str, Any]] = {}
+        self._query_cache = get_shared_query_cache()
+        self._skip_query_cache_store = False
 
     def process_query_with_rag(
         self,
@@ -484,9 +491,13 @@ class RAGOrchestrator:
         endpoint_results: Optional[list[dict[str, Any]]] = None,
         care_task_id: Optional[int] = None,
         pipeline_relaxed_mode: bool = False,
+        speculative_extractive: bool = False,
     ) -> tuple[Optional[str], dict[str, Any]]:
         started_at = time.perf_counter()
         trace: dict[str, Any] = {}
+        # La respuesta especulativa es provisional: si se cacheara, el
+        # refinamiento LLM del mismo turno la reutilizaria en vez de generar.
+        self._skip_query_cache_store = speculative_extractive
         gatekeeper_enabled = bool(
             settings.CLINICAL_CHAT_RAG_ENABLE_GATEKEEPER and not pipeline_relaxed_mode
         )
@@ -511,11 +522,24 @@ class RAGOrchestrator:
             return None, {"rag_status": "skipped_non_clinical"}
 
         query_tokens_for_cache = set(self._tokenize_for_relevance(query))
+        # La respuesta depende del paciente, del dialogo y de la evidencia
+        # aportada: sin esta huella se serviria a otro caso clinico.
+        context_fingerprint = self._build_query_cache_context_fingerprint(
+            matched_endpoints=matched_endpoints,
+            memory_facts_used=memory_facts_used,
+            patient_summary=patient_summary,
+            patient_history_facts_used=patient_history_facts_used,
+            knowledge_sources=knowledge_sources,
+            web_sources=web_sources,
+            recent_dialogue=recent_dialogue,
+            endpoint_results=endpoint_results,
+        )
         cache_key = self._build_query_cache_key(
             query=query,
             response_mode=response_mode,
             effective_specialty=effective_specialty,
             matched_domains=matched_domains,
+            context_fingerprint=context_fingerprint,
         )
         cache_enabled = bool(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_ENABLED)
         trace["rag_query_cache_enabled"] = "1" if cache_enabled else "0"
@@ -525,6 +549,7 @@ class RAGOrchestrator:
                 query_tokens=query_tokens_for_cache,
                 response_mode=response_mode,
                 effective_specialty=effective_specialty,
+                context_fingerprint=context_fingerprint,
             )
             if cached_trace is not None:
                 elapsed_ms = round((time.perf_counter() - started_at) * 1000, 2)
@@ -534,6 +559,16 @@ class RAGOrchestrator:
                     "1" if cache_hit_kind == "subset_prune" else "0"
                 )
                 cached_trace["rag_total_latency_ms"] = str(elapsed_ms)
+                if care_task_id:
+                    self._log_rag_query_audit(
+                        care_task_id=care_task_id,
+                        query=query,
+                        method=f"cache_{cache_hit_kind}",
+                        chunks_retrieved=int(
+                            self._to_float(cached_trace.get("rag_chunks_retrieved")) or 0
+                        ),
+                        trace=cached_trace,
+                    )
                 return cached_answer, cached_trace
         trace["rag_query_cache_hit"] = "0"
         trace["rag_query_cache_hit_type"] = "miss"
@@ -552,9 +587,11 @@ class RAGOrchestrator:
             trace["rag_query_complexity"] = query_complexity
             trace["rag_query_complexity_reason"] = query_complexity_reason
             fact_only_mode_enabled = bool(settings.CLINICAL_CHAT_RAG_FACT_ONLY_MODE_ENABLED)
+            # Fase especulativa: el LLM se difiere al refinamiento en segundo plano.
             force_extractive_only = bool(
                 settings.CLINICAL_CHAT_RAG_FORCE_EXTRACTIVE_ONLY
                 or fact_only_mode_enabled
+                or speculative_extractive
             )
             trace["rag_fact_only_mode_enabled"] = "1" if fact_only_mode_enabled else "0"
             native_ollama_style = bool(
@@ -836,6 +873,7 @@ class RAGOrchestrator:
                         query_tokens=query_tokens_for_cache,
                         response_mode=response_mode,
                         effective_specialty=effective_specialty,
+                        context_fingerprint=context_fingerprint,
                     )
                     return safe_wrapper_answer, trace
                 elapsed_ms = round((time.perf_counter() - started_at) * 1000, 2)
@@ -941,6 +979,7 @@ class RAGOrchestrator:
                     query_tokens=query_tokens_for_cache,
                     response_mode=response_mode,
                     effective_specialty=effective_specialty,
+                    context_fingerprint=context_fingerprint,
                 )
                 return safe_wrapper_answer, trace
             if fact_only_mode_enabled:
@@ -976,6 +1015,7 @@ class RAGOrchestrator:
                         query_tokens=query_tokens_for_cache,
                         response_mode=response_mode,
                         effective_specialty=effective_specialty,
+                        context_fingerprint=context_fingerprint,
                     )
                     return early_goal_answer, trace
             else:
@@ -1016,7 +1056,11 @@ class RAGOrchestrator:
                     "llm_error": "ForcedExtractiveMode",
                 }
                 trace.update(llm_trace)
-                trace["rag_llm_skipped_reason"] = "force_extractive_only"
+                trace["rag_llm_skipped_reason"] = (
+                    "speculative_extractive_phase"
+                    if speculative_extractive
+                    else "force_extractive_only"
+                )
             elif settings.CLINICAL_CHAT_LLM_ENABLED:
                 if remaining_pre_llm_ms < float(min_remaining_for_llm_ms):
                     llm_trace = {
@@ -1059,6 +1103,11 @@ class RAGOrchestrator:
                         recent_dialogue=recent_dialogue,
                         endpoint_results=endpoint_results,
                         timeout_budget_seconds_override=llm_timeout_override_seconds,
+                        evidence_chunk_ids=[
+                            int(chunk["id"])
+                            for chunk in chunk_dicts
+                            if chunk.get("id") is not None
+                        ],
                     )
                     trace.update(llm_trace)
                     rag_generation_mode = "llm"
@@ -1184,6 +1233,7 @@ class RAGOrchestrator:
                 query_tokens=query_tokens_for_cache,
                 response_mode=response_mode,
                 effective_specialty=effective_specialty,
+                context_fingerprint=context_fingerprint,
             )
             return answer, trace
         except Exception as exc:  # pragma: no cover - defensivo
@@ -1213,10 +1263,7 @@ class RAGOrchestrator:
             trace["rag_context_pack_neighbors_loaded"] = "0"
             return chunks, trace
 
-        packed_chunks: list[Any] = []
-        seen_signatures: set[tuple[int, ...]] = set()
-        neighbors_loaded = 0
-
+        windows: list[Optional[tuple[int, int, int]]] = []
         for chunk in chunks:
             document_id = getattr(chunk, "document_id", None)
             if document_id is None:
@@ -1224,14 +1271,26 @@ class RAGOrchestrator:
                 document_id = getattr(document, "id", None)
             chunk_index = getattr(chunk, "chunk_index", None)
             if document_id is None or chunk_index is None:
-                packed_chunks.append(chunk)
+                windows.append(None)
                 continue
-
-            neighbors = self._load_context_pack_neighbors(
-                document_id=int(document_id),
-                center_chunk_index=int(chunk_index),
-                radius=radius,
+            windows.append(
+                (
+                    int(document_id),
+                    max(0, int(chunk_index) - radius),
+                    int(chunk_index) + radius,
+                )
             )
+        neighbors_by_window, load_trace = self._load_context_pack_windows(
+            [window for window in windows if window is not None]
+        )
+        trace.update(load_trace)
+
+        packed_chunks: list[Any] = []
+        seen_signatures: set[tuple[int, ...]] = set()
+        neighbors_loaded = 0
+
+        for chunk, window in zip(chunks, windows):
+            neighbors = neighbors_by_window.get(window) if window is not None else None
             if not neighbors:
                 packed_chunks.append(chunk)
                 continue
@@ -1258,25 +1317,93 @@ class RAGOrchestrator:
         trace["rag_context_packs_deduped"] = str(max(0, len(chunks) - len(packed_chunks)))
         return packed_chunks, trace
 
-    def _load_context_pack_neighbors(
+    @staticmethod
+    def _merge_index_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _load_context_pack_windows(
         self,
-        *,
-        document_id: int,
-        center_chunk_index: int,
-        radius: int,
-    ) -> list[DocumentChunk]:
-        start_index = max(0, int(center_chunk_index) - int(radius))
-        end_index = int(center_chunk_index) + int(radius)
-        return (
-            self.db.query(DocumentChunk)
-            .filter(
-                DocumentChunk.document_id == int(document_id),
-                DocumentChunk.chunk_index >= start_index,
-                DocumentChunk.chunk_index <= end_index,
+        windows: list[tuple[int, int, int]],
+    ) -> tuple[dict[tuple[int, int, int], list[Any]], dict[str, str]]:
+        """
+        Carga todas las ventanas `(document_id, inicio, fin)` en una sola consulta.
+
+        Las ventanas repetidas o solapadas se fusionan por documento, las ya
+        cubiertas por el LRU de documentos calientes no tocan la BD y solo se
+        proyectan las columnas que usa el context pack (sin embedding ni join
+        con `clinical_documents`).
+        """
+        cache = get_shared_neighbor_cache()
+        unique_windows = sorted(set(windows))
+        neighbors_by_window: dict[tuple[int, int, int], list[Any]] = {}
+        missing_by_document: dict[int, list[tuple[int, int]]] = {}
+        cached_windows = 0
+        for document_id, start, end in unique_windows:
+            cached_rows = cache.get_window(document_id, start, end)
+            if cached_rows is not None:
+                neighbors_by_window[(document_id, start, end)] = cached_rows
+                cached_windows += 1
+                continue
+            missing_by_document.setdefault(document_id, []).append((start, end))
+
+        merged_by_document = {
+            document_id: self._merge_index_ranges(ranges)
+            for document_id, ranges in missing_by_document.items()
+        }
+        round_trips = 0
+        if merged_by_document:
+            conditions = [
+                and_(
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.chunk_index.between(start, end),
+                )
+                for document_id, ranges in merged_by_document.items()
+                for start, end in ranges
+            ]
+            rows = (
+                self.db.query(
+                    DocumentChunk.id,
+                    DocumentChunk.document_id,
+                    DocumentChunk.chunk_index,
+                    DocumentChunk.chunk_text,
+                    DocumentChunk.section_path,
+                    DocumentChunk.tokens_count,
+                    DocumentChunk.keywords,
+                    DocumentChunk.custom_questions,
+                )
+                .filter(or_(*conditions))
+                .order_by(DocumentChunk.document_id.asc(), DocumentChunk.chunk_index.asc())
+                .all()
             )
-            .order_by(DocumentChunk.chunk_index.asc())
-            .all()
-        )
+            round_trips = 1
+            rows_by_document: dict[int, list[Any]] = {}
+            for row in rows:
+                rows_by_document.setdefault(int(row.document_id), []).append(
+                    SimpleNamespace(**row._asdict())
+                )
+            for document_id, ranges in merged_by_document.items():
+                document_rows = rows_by_document.get(document_id, [])
+                cache.put_ranges(document_id, ranges, document_rows)
+                for start, end in missing_by_document[document_id]:
+                    neighbors_by_window[(document_id, start, end)] = [
+                        row for row in document_rows if start <= int(row.chunk_index) <= end
+                    ]
+
+        trace = {
+            "rag_context_pack_windows_requested": str(len(windows)),
+            "rag_context_pack_windows_unique": str(len(unique_windows)),
+            "rag_context_pack_windows_cached": str(cached_windows),
+            "rag_context_pack_db_round_trips": str(round_trips),
+            # Antes cada ventana solicitada costaba su propia consulta.
+            "rag_context_pack_db_round_trips_saved": str(max(0, len(windows) - round_trips)),
+        }
+        return neighbors_by_window, trace
 
     @staticmethod
     def _build_context_pack(
@@ -1343,6 +1470,7 @@ class RAGOrchestrator:
         response_mode: str,
         effective_specialty: str,
         matched_domains: list[str],
+        context_fingerprint: str = "",
     ) -> str:
         normalized_query = re.sub(r"\s+", " ", str(query or "").strip().lower())
         normalized_specialty = str(effective_specialty or "general").strip().lower()
@@ -1355,28 +1483,35 @@ class RAGOrchestrator:
             }
         )
         domain_signature = "|".join(normalized_domains)
-        return f"{normalized_mode}::{normalized_specialty}::{domain_signature}::{normalized_query}"
-
-    def _prune_query_cache(self) -> None:
-        now = time.time()
-        expired_keys = [
-            key
-            for key, item in self._query_cache.items()
-            if float(item.get("expires_at", 0.0) or 0.0) <= now
-        ]
-        for key in expired_keys:
-            self._query_cache.pop(key, None)
+        return (
+            f"{normalized_mode}::{normalized_specialty}::{domain_signature}::"
+            f"{context_fingerprint}::{normalized_query}"
+        )
 
-        max_entries = max(16, int(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_MAX_ENTRIES))
-        if len(self._query_cache) <= max_entries:
-            return
-        overflow = len(self._query_cache) - max_entries
-        oldest = sorted(
-            self._query_cache.items(),
-            key=lambda item: float(item[1].get("created_at", 0.0) or 0.0),
-        )[:overflow]
-        for key, _ in oldest:
-            self._query_cache.pop(key, None)
+    @staticmethod
+    def _build_query_cache_context_fingerprint(
+        *,
+        matched_endpoints: list[str],
+        memory_facts_used: list[str],
+        patient_summary: Optional[dict[str, Any]],
+        patient_history_facts_used: list[str],
+        knowledge_sources: list[dict[str, str]],
+        web_sources: list[dict[str, str]],
+        recent_dialogue: list[dict[str, str]],
+        endpoint_results: list[dict[str, Any]],
+    ) -> str:
+        payload = {
+            "endpoints": sorted(str(item) for item in matched_endpoints),
+            "memory": list(memory_facts_used),
+            "patient": patient_summary or {},
+            "history": list(patient_history_facts_used),
+            "knowledge": list(knowledge_sources),
+            "web": list(web_sources),
+            "dialogue": list(recent_dialogue),
+            "endpoint_results": list(endpoint_results),
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32]
 
     def _lookup_cached_result(
         self,
@@ -1385,43 +1520,21 @@ class RAGOrchestrator:
         query_tokens: set[str],
         response_mode: str,
         effective_specialty: str,
+        context_fingerprint: str = "",
     ) -> tuple[Optional[str], Optional[dict[str, Any]], str]:
-        self._prune_query_cache()
-        exact = self._query_cache.get(cache_key)
-        if exact:
-            return (
-                str(exact.get("answer") or ""),
-                copy.deepcopy(dict(exact.get("trace") or {})),
-                "exact",
-            )
-
-        if not query_tokens:
-            return None, None, "miss"
-
-        normalized_mode = str(response_mode or "clinical").strip().lower()
-        normalized_specialty = str(effective_specialty or "general").strip().lower()
-        best_subset_hit: Optional[dict[str, Any]] = None
-        best_subset_size = 10**9
-        for item in self._query_cache.values():
-            if str(item.get("response_mode") or "").lower() != normalized_mode:
-                continue
-            if str(item.get("effective_specialty") or "").lower() != normalized_specialty:
-                continue
-            item_tokens = set(item.get("query_tokens") or set())
-            if not item_tokens or not query_tokens.issubset(item_tokens):
-                continue
-            if len(item_tokens) < best_subset_size:
-                best_subset_hit = item
-                best_subset_size = len(item_tokens)
-
-        if best_subset_hit is None:
-            return None, None, "miss"
-
-        return (
-            str(best_subset_hit.get("answer") or ""),
-            copy.deepcopy(dict(best_subset_hit.get("trace") or {})),
-            "subset_prune",
+        entry, hit_kind = self._query_cache.lookup(
+            cache_key=cache_key,
+            namespace=RAGQueryCache.namespace(
+                response_mode, effective_specialty, context_fingerprint
+            ),
+            query_tokens=query_tokens,
+            db=self.db,
         )
+        if entry is None:
+            return None, None, "miss"
+        cached_trace = dict(entry.get("trace") or {})
+        cached_trace["rag_query_cache_backend"] = self._query_cache.backend.name
+        return str(entry.get("answer") or ""), cached_trace, hit_kind
 
     def _store_cached_result(
         self,
@@ -1432,24 +1545,23 @@ class RAGOrchestrator:
         query_tokens: set[str],
         response_mode: str,
         effective_specialty: str,
+        context_fingerprint: str = "",
     ) -> None:
         if not settings.CLINICAL_CHAT_RAG_QUERY_CACHE_ENABLED:
             return
-        if not answer:
+        if not answer or self._skip_query_cache_store:
             return
-        self._prune_query_cache()
-        now = time.time()
-        ttl = max(30, int(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_TTL_SECONDS))
-        self._query_cache[cache_key] = {
-            "answer": str(answer),
-            "trace": copy.deepcopy(dict(trace)),
-            "query_tokens": set(query_tokens),
-            "response_mode": str(response_mode or "clinical").strip().lower(),
-            "effective_specialty": str(effective_specialty or "general").strip().lower(),
-            "created_at": now,
-            "expires_at": now + float(ttl),
-        }
-        self._prune_query_cache()
+        self._query_cache.store(
+            cache_key=cache_key,
+            namespace=RAGQueryCache.namespace(
+                response_mode, effective_specialty, context_fingerprint
+            ),
+            answer=str(answer),
+            trace=trace,
+            query_tokens=query_tokens,
+            ttl_seconds=max(30, int(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_TTL_SECONDS)),
+            db=self.db,
+        )
 
     @classmethod
     def _run_early_goal_test(
@@ -1817,14 +1929,22 @@ class RAGOrchestrator:
         max_score = max(original_scores) if original_scores else 0.0
         score_span = max(1e-6, max_score - min_score)
 
+        # Coseno query-candidato y candidato-candidato en una sola pasada vectorizada.
+        vector_ids = list(candidate_vectors)
+        vector_rows = [candidate_vectors[chunk_id] for chunk_id in vector_ids]
+        semantic_by_id = dict(
+            zip(vector_ids, cosine_scores(query_vec, vector_rows, clamp=False), strict=False)
+        )
+        pairwise = pairwise_cosine(vector_rows)
+        position_by_id = {chunk_id: position for position, chunk_id in enumerate(vector_ids)}
+
         relevance: dict[int, float] = {}
         for chunk in chunks:
             chunk_id = int(getattr(chunk, "id"))
-            vector = candidate_vectors.get(chunk_id)
-            if not vector:
+            if chunk_id not in semantic_by_id:
                 relevance[chunk_id] = 0.0
                 continue
-            semantic = self._cosine_similarity(query_vec, vector)
+            semantic = semantic_by_id[chunk_id]
             lexical = (float(getattr(chunk, "_rag_score", 0.0) or 0.0) - min_score) / score_span
             relevance[chunk_id] = (0.7 * semantic) + (0.3 * lexical)
 
@@ -1839,15 +1959,17 @@ class RAGOrchestrator:
                 candidate_id = int(getattr(candidate, "id"))
                 if candidate_id in selected_ids:
                     continue
-                candidate_vector = candidate_vectors.get(candidate_id)
+                candidate_position = position_by_id.get(candidate_id)
                 diversity_penalty = 0.0
-                if candidate_vector and selected:
+                if candidate_position is not None and selected:
+                    similarity_row = pairwise[candidate_position]
                     diversity_penalty = max(
-                        self._cosine_similarity(
-                            candidate_vector,
-                            candidate_vectors.get(int(getattr(chosen, "id")), []),
+                        (
+                            similarity_row[position_by_id[chosen_id]]
+                            if chosen_id in position_by_id
+                            else 0.0
                         )
-                        for chosen in selected
+                        for chosen_id in (int(getattr(chosen, "id")) for chosen in selected)
                     )
                 mmr_score = (lambda_value * relevance.get(candidate_id, 0.0)) - (
                     (1 - lambda_value) * diversity_penalty
@@ -1883,21 +2005,6 @@ class RAGOrchestrator:
         except (TypeError, ValueError):
             return []
 
-    @staticmethod
-    def _cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
-        if not vec_a or not vec_b:
-            return 0.0
-        dot = 0.0
-        norm_a = 0.0
-        norm_b = 0.0
-        for a, b in zip(vec_a, vec_b, strict=False):
-            dot += a * b
-            norm_a += a * a
-            norm_b += b * b
-        if norm_a <= 0 or norm_b <= 0:
-            return 0.0
-        return float(dot / ((norm_a ** 0.5) * (norm_b ** 0.5)))
-
     @staticmethod
     def _filter_chunks_for_specialty(
         chunks: list[Any],
@@ -2087,7 +2194,10 @@ class RAGOrchestrator:
         k: int,
         specialty_filter: str,
         keyword_only: bool = False,
+        db: Optional[Session] = None,
     ) -> tuple[list[Any], dict[str, str], str]:
+        # `db` permite a los workers de multi-intencion usar su propia sesion.
+        session = db if db is not None else self.db
         configured_backend = (
             settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND.strip().lower() or "legacy"
         )
@@ -2115,7 +2225,7 @@ class RAGOrchestrator:
                 try:
                     return self.legacy_retriever.search_hybrid(
                         search_query,
-                        self.db,
+                        session,
                         k=k,
                         specialty_filter=specialty,
                         keyword_only=True,
@@ -2124,13 +2234,13 @@ class RAGOrchestrator:
                     # Compatibilidad con stubs/tests que no aceptan keyword_only.
                     return self.legacy_retriever.search_hybrid(
                         search_query,
-                        self.db,
+                        session,
                         k=k,
                         specialty_filter=specialty,
                     )
             return self.legacy_retriever.search_hybrid(
                 search_query,
-                self.db,
+                session,
                 k=k,
                 specialty_filter=specialty,
             )
@@ -2158,7 +2268,7 @@ class RAGOrchestrator:
         if backend == "llamaindex":
             llama_chunks, llama_trace = self.llamaindex_retriever.search(
                 query,
-                self.db,
+                session,
                 k=k,
                 specialty_filter=specialty_filter,
             )
@@ -2186,7 +2296,7 @@ class RAGOrchestrator:
         if backend == "chroma":
             chroma_chunks, chroma_trace = self.chroma_retriever.search(
                 query,
-                self.db,
+                session,
                 k=k,
                 specialty_filter=specialty_filter,
             )
@@ -2214,7 +2324,7 @@ class RAGOrchestrator:
         if backend == "elastic":
             elastic_chunks, elastic_trace = self.elastic_retriever.search(
                 query,
-                self.db,
+                session,
                 k=k,
                 specialty_filter=specialty_filter,
             )
@@ -2421,8 +2531,7 @@ class RAGOrchestrator:
             return [], trace
 
         per_segment_k = max(1, min(k, 2))
-        collected_chunks: list[Any] = []
-        segment_strategies: list[str] = []
+        segments: list[dict[str, Any]] = []
         for index, segment_item in enumerate(segment_plan, start=1):
             query = str(
                 segment_item.get("search_query")
@@ -2431,66 +2540,274 @@ class RAGOrchestrator:
             ).strip()
             if not query:
                 continue
-            original_segment = str(segment_item.get("segment") or "").strip()
-            specialty_filter = str(segment_item.get("specialty_filter") or "").strip()
-            top_probability = float(segment_item.get("top_probability") or 0.0)
-            try:
-                chunks, backend_trace, strategy = self._search_with_configured_backend(
-                    query=query,
-                    k=per_segment_k,
-                    specialty_filter=specialty_filter,
-                    keyword_only=keyword_only,
-                )
-            except TypeError:
-                chunks, backend_trace, strategy = self._search_with_configured_backend(
-                    query=query,
-                    k=per_segment_k,
-                    specialty_filter=specialty_filter,
-                )
+            segments.append(
+                {
+                    "index": index,
+                    "query": query,
+                    "original": str(segment_item.get("segment") or "").strip(),
+                    "specialty_filter": str(segment_item.get("specialty_filter") or "").strip(),
+                    "top_probability": float(segment_item.get("top_probability") or 0.0),
+                }
+            )
+
+        results = self._run_multi_intent_segment_searches(
+            segments=segments,
+            k=per_segment_k,
+            keyword_only=keyword_only,
+            trace=trace,
+        )
+        # Pares (chunk, score): un mismo chunk puede venir de varios segmentos.
+        collected: list[tuple[Any, float]] = []
+        segment_strategies: list[str] = []
+        for segment in segments:
+            index = segment["index"]
+            scored, backend_trace, strategy = results[index]
+            specialty_filter = segment["specialty_filter"]
             segment_strategies.append(strategy)
             trace[f"rag_multi_intent_segment_{index}_strategy"] = strategy
-            trace[f"rag_multi_intent_segment_{index}_query"] = original_segment or query
+            trace[f"rag_multi_intent_segment_{index}_query"] = (
+                segment["original"] or segment["query"]
+            )
             trace[f"rag_multi_intent_segment_{index}_specialty"] = specialty_filter or "general"
-            trace[f"rag_multi_intent_segment_{index}_hits"] = str(len(chunks))
+            trace[f"rag_multi_intent_segment_{index}_hits"] = str(len(scored))
             for key, value in backend_trace.items():
                 if key in {"rag_sources"}:
                     continue
                 trace[f"rag_multi_intent_segment_{index}_{key}"] = str(value)
-            boost = min(0.08, top_probability * 0.10)
-            for chunk in chunks:
-                base_score = float(getattr(chunk, "_rag_score", 0.0) or 0.0)
-                setattr(chunk, "_rag_score", base_score + boost)
-                collected_chunks.append(chunk)
+            boost = min(0.08, segment["top_probability"] * 0.10)
+            for chunk, score in scored:
+                collected.append((chunk, score + boost))
 
-        if not collected_chunks:
+        if not collected:
             trace["rag_multi_intent_chunks"] = "0"
             return [], trace
 
-        deduped_by_id: dict[str, Any] = {}
-        for chunk in collected_chunks:
+        deduped_by_id: dict[str, tuple[Any, float]] = {}
+        for chunk, score in collected:
             chunk_id = str(getattr(chunk, "id", "") or "")
             if not chunk_id:
                 chunk_id = str(id(chunk))
             existing = deduped_by_id.get(chunk_id)
-            if existing is None:
-                deduped_by_id[chunk_id] = chunk
-                continue
-            existing_score = float(getattr(existing, "_rag_score", 0.0) or 0.0)
-            new_score = float(getattr(chunk, "_rag_score", 0.0) or 0.0)
-            if new_score > existing_score:
-                deduped_by_id[chunk_id] = chunk
-
-        ranked_chunks = sorted(
-            deduped_by_id.values(),
-            key=lambda item: float(getattr(item, "_rag_score", 0.0) or 0.0),
-            reverse=True,
-        )
+            if existing is None or score > existing[1]:
+                deduped_by_id[chunk_id] = (chunk, score)
+
+        ranked = sorted(deduped_by_id.values(), key=lambda item: item[1], reverse=True)
         max_return = max(1, min(int(settings.CLINICAL_CHAT_RAG_MAX_CHUNKS_HARD), max(k, 4)))
-        selected = ranked_chunks[:max_return]
+        selected: list[Any] = []
+        for chunk, score in ranked[:max_return]:
+            setattr(chunk, "_rag_score", score)
+            selected.append(chunk)
         trace["rag_multi_intent_chunks"] = str(len(selected))
         trace["rag_multi_intent_strategies"] = ",".join(segment_strategies[:6]) or "none"
         return selected, trace
 
+    def _run_multi_intent_segment_searches(
+        self,
+        *,
+        segments: list[dict[str, Any]],
+        k: int,
+        keyword_only: bool,
+        trace: dict[str, str],
+    ) -> dict[int, tuple[list[tuple[Any, float]], dict[str, str], str]]:
+        """
+        Recupera todos los segmentos de una consulta multi-intencion.
+
+        Los segmentos enrutados a `legacy` se resuelven juntos con
+        `HybridRetriever.search_hybrid_multi` (una carga de candidatos y una
+        pasada vectorial). Los enrutados a un backend externo se lanzan en
+        paralelo, cada worker con su propia sesion. El resto (o cualquier fallo
+        de las rutas anteriores) sigue el camino secuencial de siempre.
+        """
+        configured_backend = (
+            settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND.strip().lower() or "legacy"
+        )
+        results: dict[int, tuple[list[tuple[Any, float]], dict[str, str], str]] = {}
+        routed: dict[int, tuple[str, str]] = {
+            segment["index"]: self._select_retriever_backend(
+                query=segment["query"],
+                specialty_filter=segment["specialty_filter"],
+                configured_backend=configured_backend,
+            )
+            for segment in segments
+        }
+        legacy_segments = [
+            segment for segment in segments if routed[segment["index"]][0] == "legacy"
+        ]
+        if (
+            settings.CLINICAL_CHAT_RAG_MULTI_QUERY_ENABLED
+            and len(legacy_segments) >= 2
+            and isinstance(self.db, Session)
+        ):
+            try:
+                results.update(
+                    self._search_legacy_segments_batched(
+                        segments=legacy_segments,
+                        routed=routed,
+                        configured_backend=configured_backend,
+                        k=k,
+                        keyword_only=keyword_only,
+                        trace=trace,
+                    )
+                )
+            except Exception as exc:
+                logger.warning("Fallo la busqueda multi-consulta; se usa la secuencial: %s", exc)
+                trace["rag_multi_intent_multi_query_error"] = exc.__class__.__name__
+
+        pending = [segment for segment in segments if segment["index"] not in results]
+        external = [segment for segment in pending if routed[segment["index"]][0] != "legacy"]
+        max_workers = min(int(settings.CLINICAL_CHAT_RAG_MULTI_INTENT_MAX_WORKERS), len(external))
+        if (
+            settings.CLINICAL_CHAT_RAG_MULTI_INTENT_PARALLEL_BACKENDS
+            and max_workers >= 2
+            and self._supports_worker_sessions()
+        ):
+            bind = self.db.get_bind()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    segment["index"]: executor.submit(
+                        self._search_segment_in_worker_session,
+                        bind=bind,
+                        segment=segment,
+                        k=k,
+                        keyword_only=keyword_only,
+                    )
+                    for segment in external
+                }
+                for index, future in futures.items():
+                    try:
+                        scored, backend_trace, strategy = future.result()
+                    except Exception as exc:
+                        logger.warning("Fallo el worker del segmento %s: %s", index, exc)
+                        continue
+                    results[index] = (
+                        [(self._attach_to_session(chunk), score) for chunk, score in scored],
+                        backend_trace,
+                        strategy,
+                    )
+            trace["rag_multi_intent_parallel_workers"] = str(max_workers)
+
+        for segment in segments:
+            if segment["index"] in results:
+                continue
+            chunks, backend_trace, strategy = self._call_configured_backend_for_segment(
+                segment=segment,
+                k=k,
+                keyword_only=keyword_only,
+            )
+            results[segment["index"]] = (
+                [(chunk, float(getattr(chunk, "_rag_score", 0.0) or 0.0)) for chunk in chunks],
+                backend_trace,
+                strategy,
+            )
+        return results
+
+    def _call_configured_backend_for_segment(
+        self,
+        *,
+        segment: dict[str, Any],
+        k: int,
+        keyword_only: bool,
+        db: Optional[Session] = None,
+    ) -> tuple[list[Any], dict[str, str], str]:
+        kwargs: dict[str, Any] = {
+            "query": segment["query"],
+            "k": k,
+            "specialty_filter": segment["specialty_filter"],
+        }
+        if db is not None:
+            kwargs["db"] = db
+        try:
+            return self._search_with_configured_backend(**kwargs, keyword_only=keyword_only)
+        except TypeError:
+            return self._search_with_configured_backend(**kwargs)
+
+    def _search_legacy_segments_batched(
+        self,
+        *,
+        segments: list[dict[str, Any]],
+        routed: dict[int, tuple[str, str]],
+        configured_backend: str,
+        k: int,
+        keyword_only: bool,
+        trace: dict[str, str],
+    ) -> dict[int, tuple[list[tuple[Any, float]], dict[str, str], str]]:
+        batch, shared_trace = self.legacy_retriever.search_hybrid_multi(
+            [(segment["query"], segment["specialty_filter"] or None) for segment in segments],
+            self.db,
+            k=k,
+            keyword_only=keyword_only,
+        )
+        trace["rag_multi_intent_multi_query"] = "1"
+        for key, value in shared_trace.items():
+            trace[f"rag_multi_intent_{key}"] = str(value)
+        results: dict[int, tuple[list[tuple[Any, float]], dict[str, str], str]] = {}
+        for segment, (scored, segment_trace) in zip(segments, batch, strict=True):
+            specialty_filter = segment["specialty_filter"]
+            can_relax = self._should_relax_specialty_filter(specialty_filter)
+            if not scored and can_relax:
+                # La relajacion de especialidad sigue en la ruta secuencial.
+                continue
+            backend_trace = {
+                "rag_retriever_backend": "legacy",
+                "rag_router_configured_backend": configured_backend,
+                "rag_router_selected_backend": "legacy",
+                "rag_router_reason": routed[segment["index"]][1],
+                "rag_retriever_specialty_relaxation_allowed": "1" if can_relax else "0",
+                "rag_retriever_specialty_relaxation": "0",
+                **segment_trace,
+            }
+            strategy = "hybrid" if scored else "hybrid_empty"
+            results[segment["index"]] = (scored, backend_trace, strategy)
+        return results
+
+    def _supports_worker_sessions(self) -> bool:
+        """Solo hay concurrencia si cada worker puede abrir su propia conexion."""
+        if not isinstance(self.db, Session):
+            return False
+        try:
+            bind = self.db.get_bind()
+        except Exception:
+            return False
+        if isinstance(getattr(bind, "pool", None), StaticPool):
+            return False
+        url = getattr(bind, "url", None)
+        if bind.dialect.name == "sqlite" and str(getattr(url, "database", "") or "") in {
+            "",
+            ":memory:",
+        }:
+            return False
+        return True
+
+    def _search_segment_in_worker_session(
+        self,
+        *,
+        bind: Any,
+        segment: dict[str, Any],
+        k: int,
+        keyword_only: bool,
+    ) -> tuple[list[tuple[Any, float]], dict[str, str], str]:
+        with Session(bind=bind) as worker_db:
+            chunks, backend_trace, strategy = self._call_configured_backend_for_segment(
+                segment=segment,
+                k=k,
+                keyword_only=keyword_only,
+                db=worker_db,
+            )
+            return (
+                [(chunk, float(getattr(chunk, "_rag_score", 0.0) or 0.0)) for chunk in chunks],
+                backend_trace,
+                strategy,
+            )
+
+    def _attach_to_session(self, chunk: Any) -> Any:
+        """Reasocia a `self.db` un chunk ORM cargado por la sesion de un worker."""
+        if not isinstance(chunk, DocumentChunk):
+            return chunk
+        try:
+            return self.db.merge(chunk, load=False)
+        except Exception:  # pragma: no cover - defensivo
+            return chunk
+
     @staticmethod
     def _tokenize_qa_text(value: str) -> list[str]:
         return re.findall(r"[a-z0-9#\-\+/]+", str(value or "").lower())
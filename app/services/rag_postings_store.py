@@ -0,0 +1,658 @@
+"""
+Indice invertido comprimido en disco para la generacion de candidatos RAG.
+
+Se construye en la ingesta a partir de `document_chunks` (mismas columnas que
+el indice FTS5: chunk_text, section_path, keywords, specialty) y se lee con
+`mmap`, sin depender de SQLite FTS5: funciona igual sobre PostgreSQL.
+
+Formato por termino (bloques de `BLOCK_SIZE` documentos):
+- bloque = [gaps de doc_id][tf por doc][gaps de posiciones por doc], todo en
+  variable-byte (bit alto en el ultimo byte de cada numero)
+- tabla de skips por bloque: (ultimo doc_id, offset del bloque, tf maximo);
+  `advance_to` salta bloques completos por busqueda binaria y el tf maximo
+  queda disponible como metadato block-max
+- las posiciones de cada columna arrancan separadas `COLUMN_GAP` para que
+  frases y NEAR no crucen columnas (como en FTS5)
+
+Cada construccion escribe una generacion nueva y publica el puntero
+`CURRENT` de forma atomica; los lectores recargan al detectar el cambio.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+COLUMN_GAP = 1 << 16
+ALL_DOCS_KEY = "*"
+_TOKEN_REGEX = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize_fts_text(value: str) -> list[str]:
+    """Aproxima el tokenizador `unicode61 remove_diacritics 2` de FTS5."""
+    decomposed = unicodedata.normalize("NFKD", str(value or "").lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _TOKEN_REGEX.findall(stripped)
+
+
+def chunk_fts_columns(row: Any) -> list[str]:
+    """Columnas indexadas de un chunk, en el orden de `document_chunks_fts`."""
+    keywords = row.keywords or []
+    if isinstance(keywords, str):
+        keywords_text = keywords
+    else:
+        keywords_text = " ".join(str(item) for item in keywords)
+    return [
+        str(row.chunk_text or ""),
+        str(row.section_path or ""),
+        keywords_text,
+        str(row.specialty or ""),
+    ]
+
+
+def _vb_encode(values: Sequence[int], out: bytearray) -> None:
+    for value in values:
+        safe_value = max(0, int(value))
+        chunks = [safe_value & 0x7F]
+        safe_value >>= 7
+        while safe_value:
+            chunks.append(safe_value & 0x7F)
+            safe_value >>= 7
+        chunks.reverse()
+        chunks[-1] |= 0x80
+        out.extend(chunks)
+
+
+def _vb_decode(buffer: Any, offset: int, count: int) -> tuple[list[int], int]:
+    values: list[int] = []
+    current = 0
+    while len(values) < count:
+        byte = buffer[offset]
+        offset += 1
+        current = (current << 7) | (byte & 0x7F)
+        if byte & 0x80:
+            values.append(current)
+            current = 0
+    return values, offset
+
+
+class PostingsCursor:
+    """Recorrido de una lista de postings con saltos por tabla de skips."""
+
+    def __init__(self, store: PostingsStore, entry: tuple[int, int, int, int]):
+        self._store = store
+        self._offset, self._skip_start, self._n_blocks, self.df = entry
+        self._block = -1
+        self._doc_ids: list[int] = []
+        self._tfs: list[int] = []
+        self._positions_at = 0
+        self._positions: Optional[list[list[int]]] = None
+        self._index = 0
+        self.blocks_decoded = 0
+        self.blocks_skipped = 0
+
+    def _skip_entry(self, block: int) -> tuple[int, int, int]:
+        base = (self._skip_start + block) * 3
+        skips = self._store._skips
+        return int(skips[base]), int(skips[base + 1]), int(skips[base + 2])
+
+    def _load_block(self, block: int) -> None:
+        block_size = self._store.block_size
+        count = min(block_size, self.df - block * block_size)
+        _last, block_offset, _max_tf = self._skip_entry(block)
+        previous = self._skip_entry(block - 1)[0] if block > 0 else 0
+        gaps, cursor = _vb_decode(self._store._postings, self._offset + block_offset, count)
+        doc_ids: list[int] = []
+        for gap in gaps:
+            previous += gap
+            doc_ids.append(previous)
+        self._tfs, self._positions_at = _vb_decode(self._store._postings, cursor, count)
+        self._doc_ids = doc_ids
+        self._positions = None
+        self._block = block
+        self._index = 0
+        self.blocks_decoded += 1
+
+    def block_max_tf(self) -> int:
+        """tf maximo del bloque actual (metadato block-max)."""
+        if self._block < 0:
+            return 0
+        return self._skip_entry(self._block)[2]
+
+    def current(self) -> Optional[int]:
+        if self._block < 0:
+            if self._n_blocks <= 0:
+                return None
+            self._load_block(0)
+        if self._index >= len(self._doc_ids):
+            return None
+        return self._doc_ids[self._index]
+
+    def next(self) -> Optional[int]:
+        if self.current() is None:
+            return None
+        self._index += 1
+        if self._index >= len(self._doc_ids) and self._block + 1 < self._n_blocks:
+            self._load_block(self._block + 1)
+        return self.current()
+
+    def advance_to(self, target: int) -> Optional[int]:
+        """Primer doc_id >= target; salta bloques enteros con la tabla de skips."""
+        current = self.current()
+        if current is None or current >= target:
+            return current
+        if self._doc_ids[-1] < target:
+            low = self._block + 1
+            high = self._n_blocks
+            while low < high:
+                middle = (low + high) // 2
+                if self._skip_entry(middle)[0] < target:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low >= self._n_blocks:
+                self.blocks_skipped += max(0, self._n_blocks - self._block - 1)
+                self._index = len(self._doc_ids)
+                return None
+            self.blocks_skipped += max(0, low - self._block - 1)
+            self._load_block(low)
+        self._index = bisect_left(self._doc_ids, target, self._index)
+        return self.current()
+
+    def positions(self) -> list[int]:
+        if self.current() is None:
+            return []
+        if self._positions is None:
+            decoded: list[list[int]] = []
+            cursor = self._positions_at
+            for tf_value in self._tfs:
+                gaps, cursor = _vb_decode(self._store._postings, cursor, tf_value)
+                absolute: list[int] = []
+                position = 0
+                for gap in gaps:
+                    position += gap
+                    absolute.append(position)
+                decoded.append(absolute)
+            self._positions = decoded
+        return self._positions[self._index]
+
+
+class PostingsStore:
+    """Indice invertido posicional, comprimido y memory-mapped."""
+
+    FORMAT_VERSION = 1
+    READY_CHECK_SECONDS = 5.0
+    BUILD_BATCH_SIZE = 1000
+    _shared: dict[str, PostingsStore] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, store_dir: Path | str):
+        self.store_dir = Path(store_dir)
+        self.block_size = 128
+        self._lock = threading.RLock()
+        self._generation = ""
+        self._meta: dict[str, Any] = {}
+        self._terms: tuple[str, ...] = ()
+        self._doc_freq: dict[str, int] = {}
+        self._lexicon: Any = array("q")
+        self._skips: Any = array("q")
+        self._postings: Any = b""
+        self._postings_file: Any = None
+        self._ready_cache: dict[str, tuple[float, bool]] = {}
+
+    @classmethod
+    def get_shared(cls, store_dir: Optional[Path | str] = None) -> PostingsStore:
+        resolved = Path(store_dir or settings.CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR)
+        key = str(resolved.resolve())
+        with cls._shared_lock:
+            instance = cls._shared.get(key)
+            if instance is None:
+                instance = cls(resolved)
+                cls._shared[key] = instance
+            return instance
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            instances = list(cls._shared.values())
+            cls._shared.clear()
+        for instance in instances:
+            instance.close()
+
+    @staticmethod
+    def database_identity(db: Session) -> str:
+        url = db.get_bind().engine.url.render_as_string(hide_password=True)
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def corpus_signature(db: Session) -> dict[str, int]:
+        count_value, max_id = db.query(
+            func.count(DocumentChunk.id), func.max(DocumentChunk.id)
+        ).one()
+        return {"chunks": int(count_value or 0), "max_chunk_id": int(max_id or 0)}
+
+    def _pointer_path(self) -> Path:
+        return self.store_dir / "CURRENT"
+
+    def _release_locked(self) -> None:
+        if isinstance(self._postings, mmap.mmap):
+            self._postings.close()
+        if self._postings_file is not None:
+            self._postings_file.close()
+        self._postings = b""
+        self._postings_file = None
+        self._generation = ""
+        self._meta = {}
+        self._terms = ()
+        self._doc_freq = {}
+        self._lexicon = array("q")
+        self._skips = array("q")
+
+    def _refresh_locked(self) -> bool:
+        try:
+            generation = self._pointer_path().read_text(encoding="utf-8").strip()
+        except OSError:
+            self._release_locked()
+            return False
+        if generation and generation == self._generation:
+            return True
+        self._release_locked()
+        generation_dir = self.store_dir / generation
+        try:
+            meta = json.loads((generation_dir / "meta.json").read_text(encoding="utf-8"))
+            if int(meta.get("format_version", 0)) != self.FORMAT_VERSION:
+                return False
+            terms: tuple[str, ...] = ()
+            if int(meta.get("terms", 0)):
+                terms_text = (generation_dir / "terms.txt").read_text(encoding="utf-8")
+                terms = tuple(terms_text.split("\n"))
+            lexicon = array("q")
+            lexicon.frombytes((generation_dir / "lexicon.i64").read_bytes())
+            skips = array("q")
+            skips.frombytes((generation_dir / "skips.i64").read_bytes())
+            postings_file = open(generation_dir / "postings.bin", "rb")
+        except (OSError, ValueError) as exc:
+            logger.warning("Postings store ilegible en %s: %s", generation_dir, exc)
+            return False
+        try:
+            postings: Any = mmap.mmap(postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            postings = b""  # fichero vacio: corpus sin terminos
+        self._generation = generation
+        self._meta = meta
+        self._terms = terms
+        self._lexicon = lexicon
+        self._skips = skips
+        self._postings = postings
+        self._postings_file = postings_file
+        self.block_size = int(meta.get("block_size", 128))
+        self._doc_freq = {term: int(lexicon[index * 4 + 3]) for index, term in enumerate(terms)}
+        return True
+
+    def is_ready(self, db: Session) -> bool:
+        """Listo si existe, es de esta BD y cubre el corpus actual (cacheado unos segundos)."""
+        database = self.database_identity(db)
+        now = time.monotonic()
+        cached = self._ready_cache.get(database)
+        if cached is not None and (now - cached[0]) <= self.READY_CHECK_SECONDS:
+            return cached[1]
+        with self._lock:
+            ready = self._refresh_locked() and self._meta.get("database") == database
+            if ready:
+                signature = self.corpus_signature(db)
+                ready = all(
+                    int(self._meta.get(key, -1)) == value for key, value in signature.items()
+                )
+        self._ready_cache[database] = (now, ready)
+        return ready
+
+    def vocabulary(self) -> tuple[tuple[str, ...], dict[str, int]]:
+        """Terminos ordenados y su DF (sustituye a `fts5vocab`)."""
+        with self._lock:
+            return self._terms, self._doc_freq
+
+    def _term_entry(self, term: str) -> Optional[tuple[int, int, int, int]]:
+        index = bisect_left(self._terms, term)
+        if index >= len(self._terms) or self._terms[index] != term:
+            return None
+        base = index * 4
+        return tuple(int(value) for value in self._lexicon[base : base + 4])  # type: ignore[return-value]
+
+    def _specialty_entry(self, specialty: Optional[str]) -> Optional[tuple[int, int, int, int]]:
+        key = str(specialty or "").strip().lower() or ALL_DOCS_KEY
+        entry = self._meta.get("lists", {}).get(key)
+        return tuple(int(value) for value in entry) if entry else None  # type: ignore[return-value]
+
+    @staticmethod
+    def _leapfrog(cursors: list[PostingsCursor]) -> Optional[int]:
+        """Alinea todos los cursores en el siguiente doc_id comun."""
+        candidate = cursors[0].current()
+        while candidate is not None:
+            aligned = True
+            for cursor in cursors:
+                value = cursor.advance_to(candidate)
+                if value is None:
+                    return None
+                if value != candidate:
+                    candidate = value
+                    aligned = False
+                    break
+            if aligned:
+                return candidate
+        return None
+
+    @staticmethod
+    def _phrase_starts(cursors: list[PostingsCursor]) -> list[int]:
+        starts = set(cursors[0].positions())
+        for offset, cursor in enumerate(cursors[1:], start=1):
+            starts &= {position - offset for position in cursor.positions()}
+            if not starts:
+                break
+        return sorted(starts)
+
+    def _collect(
+        self,
+        phrases: list[list[str]],
+        *,
+        specialty_filter: Optional[str],
+        limit: Optional[int],
+        near_distance: Optional[int] = None,
+        stats: Optional[dict[str, int]] = None,
+    ) -> list[int]:
+        if not phrases:
+            return []
+        entries: list[list[tuple[int, int, int, int]]] = []
+        for phrase in phrases:
+            phrase_entries: list[tuple[int, int, int, int]] = []
+            for term in phrase:
+                entry = self._term_entry(term)
+                if entry is None:
+                    return []
+                phrase_entries.append(entry)
+            entries.append(phrase_entries)
+        cursors_by_phrase = [
+            [PostingsCursor(self, entry) for entry in phrase] for phrase in entries
+        ]
+        all_cursors = [cursor for phrase in cursors_by_phrase for cursor in phrase]
+        if specialty_filter:
+            specialty_entry = self._specialty_entry(specialty_filter)
+            if specialty_entry is None:
+                return []
+            all_cursors.append(PostingsCursor(self, specialty_entry))
+        # El cursor mas corto marca el ritmo del leapfrog.
+        all_cursors.sort(key=lambda cursor: cursor.df)
+        needs_positions = near_distance is not None or any(len(p) > 1 for p in phrases)
+        result: list[int] = []
+        doc_id = self._leapfrog(all_cursors)
+        while doc_id is not None and (limit is None or len(result) < limit):
+            if not needs_positions or self._positions_match(
+                cursors_by_phrase, [len(phrase) for phrase in phrases], near_distance
+            ):
+                result.append(doc_id)
+            all_cursors[0].next()
+            doc_id = self._leapfrog(all_cursors)
+        if stats is not None:
+            stats["blocks_decoded"] = stats.get("blocks_decoded", 0) + sum(
+                cursor.blocks_decoded for cursor in all_cursors
+            )
+            stats["blocks_skipped"] = stats.get("blocks_skipped", 0) + sum(
+                cursor.blocks_skipped for cursor in all_cursors
+            )
+        return result
+
+    def _positions_match(
+        self,
+        cursors_by_phrase: list[list[PostingsCursor]],
+        lengths: list[int],
+        near_distance: Optional[int],
+    ) -> bool:
+        starts = [self._phrase_starts(cursors) for cursors in cursors_by_phrase]
+        if any(not phrase_starts for phrase_starts in starts):
+            return False
+        if near_distance is None:
+            return True
+        left_starts, right_starts = starts[0], starts[1]
+        left_len, right_len = lengths[0], lengths[1]
+        for left in left_starts:
+            for right in right_starts:
+                if right >= left + left_len and right - (left + left_len) <= near_distance:
+                    return True
+                if left >= right + right_len and left - (right + right_len) <= near_distance:
+                    return True
+        return False
+
+    def match(
+        self,
+        operand: str,
+        *,
+        specialty_filter: Optional[str] = None,
+        limit: Optional[int] = None,
+        stats: Optional[dict[str, int]] = None,
+    ) -> list[int]:
+        """doc_ids que contienen el termino (o la frase si hay varios tokens)."""
+        tokens = tokenize_fts_text(operand)
+        if not tokens:
+            return []
+        with self._lock:
+            return self._collect(
+                [tokens], specialty_filter=specialty_filter, limit=limit, stats=stats
+            )
+
+    def near(
+        self,
+        left: str,
+        right: str,
+        distance: int,
+        *,
+        specialty_filter: Optional[str] = None,
+        limit: Optional[int] = None,
+        stats: Optional[dict[str, int]] = None,
+    ) -> list[int]:
+        """Semantica `NEAR(left right, distance)` de FTS5 dentro de una misma columna."""
+        left_tokens = tokenize_fts_text(left)
+        right_tokens = tokenize_fts_text(right)
+        if not left_tokens or not right_tokens:
+            return []
+        with self._lock:
+            return self._collect(
+                [left_tokens, right_tokens],
+                specialty_filter=specialty_filter,
+                limit=limit,
+                near_distance=max(1, int(distance)),
+                stats=stats,
+            )
+
+    def doc_ids(
+        self,
+        *,
+        specialty_filter: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[int]:
+        with self._lock:
+            entry = self._specialty_entry(specialty_filter)
+            if entry is None:
+                return []
+            cursor = PostingsCursor(self, entry)
+            result: list[int] = []
+            doc_id = cursor.current()
+            while doc_id is not None and (limit is None or len(result) < limit):
+                result.append(doc_id)
+                doc_id = cursor.next()
+            return result
+
+    def _write_list(
+        self,
+        doc_ids: Sequence[int],
+        tfs: Sequence[int],
+        positions: Sequence[int],
+        postings: bytearray,
+        skips: array,
+    ) -> tuple[int, int, int, int]:
+        """Codifica una lista en bloques y devuelve su entrada de lexico."""
+        offset = len(postings)
+        skip_start = len(skips) // 3
+        block_size = self.block_size
+        previous = 0
+        position_cursor = 0
+        n_blocks = 0
+        for block_start in range(0, len(doc_ids), block_size):
+            block_docs = doc_ids[block_start : block_start + block_size]
+            block_tfs = tfs[block_start : block_start + block_size]
+            block_offset = len(postings) - offset
+            gaps = []
+            for doc_id in block_docs:
+                gaps.append(doc_id - previous)
+                previous = doc_id
+            _vb_encode(gaps, postings)
+            _vb_encode(block_tfs, postings)
+            for tf_value in block_tfs:
+                doc_positions = positions[position_cursor : position_cursor + tf_value]
+                position_cursor += tf_value
+                last = 0
+                position_gaps = []
+                for position in doc_positions:
+                    position_gaps.append(position - last)
+                    last = position
+                _vb_encode(position_gaps, postings)
+            skips.extend((block_docs[-1], block_offset, max(block_tfs)))
+            n_blocks += 1
+        return offset, skip_start, n_blocks, len(doc_ids)
+
+    def build_from_db(self, db: Session) -> dict[str, Any]:
+        """Reconstruye el indice completo y publica una generacion nueva."""
+        started_at = time.perf_counter()
+        block_size = int(settings.CLINICAL_CHAT_RAG_POSTINGS_STORE_BLOCK_SIZE)
+        term_docs: dict[str, array] = {}
+        term_tfs: dict[str, array] = {}
+        term_positions: dict[str, array] = {}
+        list_docs: dict[str, array] = {ALL_DOCS_KEY: array("q")}
+        signature = self.corpus_signature(db)
+        rows = (
+            db.query(
+                DocumentChunk.id,
+                DocumentChunk.chunk_text,
+                DocumentChunk.section_path,
+                DocumentChunk.keywords,
+                DocumentChunk.specialty,
+            )
+            .order_by(DocumentChunk.id.asc())
+            .yield_per(self.BUILD_BATCH_SIZE)
+        )
+        for row in rows:
+            doc_id = int(row.id)
+            positions_by_term: dict[str, list[int]] = {}
+            for column_index, column_text in enumerate(chunk_fts_columns(row)):
+                base = column_index * COLUMN_GAP
+                for position, token in enumerate(tokenize_fts_text(column_text)):
+                    positions_by_term.setdefault(token, []).append(base + position)
+            for term, term_positions_list in positions_by_term.items():
+                if term not in term_docs:
+                    term_docs[term] = array("q")
+                    term_tfs[term] = array("q")
+                    term_positions[term] = array("q")
+                term_docs[term].append(doc_id)
+                term_tfs[term].append(len(term_positions_list))
+                term_positions[term].extend(term_positions_list)
+            list_docs[ALL_DOCS_KEY].append(doc_id)
+            specialty_key = str(row.specialty or "").strip().lower()
+            if specialty_key:
+                list_docs.setdefault(specialty_key, array("q")).append(doc_id)
+
+        with self._lock:
+            self.block_size = block_size
+            terms = sorted(term_docs)
+            postings = bytearray()
+            skips = array("q")
+            lexicon = array("q")
+            for term in terms:
+                lexicon.extend(
+                    self._write_list(
+                        term_docs[term], term_tfs[term], term_positions[term], postings, skips
+                    )
+                )
+            lists: dict[str, list[int]] = {}
+            for key, doc_ids in list_docs.items():
+                # Listas de filtro (todos / por especialidad): tf=1 y posicion 0.
+                lists[key] = list(
+                    self._write_list(
+                        doc_ids, [1] * len(doc_ids), [0] * len(doc_ids), postings, skips
+                    )
+                )
+            generation = f"gen-{uuid4().hex[:12]}"
+            generation_dir = self.store_dir / generation
+            generation_dir.mkdir(parents=True, exist_ok=True)
+            (generation_dir / "terms.txt").write_text("\n".join(terms), encoding="utf-8")
+            (generation_dir / "lexicon.i64").write_bytes(lexicon.tobytes())
+            (generation_dir / "skips.i64").write_bytes(skips.tobytes())
+            (generation_dir / "postings.bin").write_bytes(bytes(postings))
+            meta = {
+                "format_version": self.FORMAT_VERSION,
+                "block_size": block_size,
+                "database": self.database_identity(db),
+                "terms": len(terms),
+                "lists": lists,
+                "postings_bytes": len(postings),
+                "built_at": time.time(),
+                **signature,
+            }
+            (generation_dir / "meta.json").write_text(
+                json.dumps(meta, sort_keys=True), encoding="utf-8"
+            )
+            pointer_tmp = self._pointer_path().with_suffix(f".{os.getpid()}.tmp")
+            pointer_tmp.write_text(generation, encoding="utf-8")
+            os.replace(pointer_tmp, self._pointer_path())
+            self._release_locked()
+            self._ready_cache.clear()
+            self._remove_stale_generations(keep=generation)
+        return {
+            "terms": len(terms),
+            "docs": int(signature["chunks"]),
+            "postings_bytes": len(postings),
+            "blocks": len(skips) // 3,
+            "elapsed_ms": round((time.perf_counter() - started_at) * 1000.0, 1),
+        }
+
+    def _remove_stale_generations(self, *, keep: str) -> None:
+        for path in self.store_dir.glob("gen-*"):
+            if path.name == keep or not path.is_dir():
+                continue
+            # En Windows un lector con el mmap abierto impide borrar: se reintenta en la proxima.
+            shutil.rmtree(path, ignore_errors=True)
+
+    def describe(self) -> dict[str, Any]:
+        with self._lock:
+            self._refresh_locked()
+            return {
+                "store_dir": str(self.store_dir),
+                "generation": self._generation,
+                "format_version": int(self._meta.get("format_version", 0)),
+                "terms": len(self._terms),
+                "chunks": int(self._meta.get("chunks", 0)),
+                "postings_bytes": int(self._meta.get("postings_bytes", 0)),
+                "block_size": int(self._meta.get("block_size", 0)),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._release_locked()
@@ -9,6 +9,7 @@ from typing import Any, Optional
 
 from app.core.config import settings
 from app.services.llm_chat_provider import LLMChatProvider
+from app.services.llm_token_budget import count_tokens, tokenizer_mode
 
 
 class RAGPromptBuilder:
@@ -53,6 +54,8 @@ class RAGPromptBuilder:
             web_sources=web_sources,
             recent_dialogue=recent_dialogue,
             endpoint_results=endpoint_results,
+            effective_specialty=effective_specialty,
+            tool_mode=tool_mode,
         )
         rag_context = RAGPromptBuilder._build_rag_context(retrieved_chunks)
         final_prompt = "\n".join(
@@ -75,6 +78,8 @@ class RAGPromptBuilder:
         trace = {
             "rag_chunks_injected": str(len(retrieved_chunks)),
             "rag_prompt_truncated": "1" if truncated_prompt != final_prompt else "0",
+            "rag_prompt_tokens": str(count_tokens(truncated_prompt)),
+            "rag_prompt_token_counter": tokenizer_mode(),
         }
         return truncated_prompt, trace
 
@@ -0,0 +1,476 @@
+"""
+Cache compartido de respuestas RAG a nivel de proceso (o de cluster con Redis).
+
+`RAGOrchestrator` se instancia por turno, asi que el cache no puede vivir en
+la instancia. Este modulo expone un cache unico con:
+
+- backend en memoria (LRU) por defecto y backend Redis opcional;
+- TTL por entrada y namespaces `response_mode::especialidad`;
+- indice invertido token -> claves para resolver `subset_prune` sin recorrer
+  todas las entradas;
+- invalidacion cuando cambia `document_chunks` (firma COUNT/MAX(id) y eventos ORM);
+- contadores de aciertos/fallos/desalojos para `/metrics`.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event, text
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+try:
+    import redis
+except Exception:  # pragma: no cover - fallback defensivo
+    redis = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryQueryCacheBackend:
+    """LRU en memoria con indice invertido por namespace."""
+
+    name = "memory"
+
+    def __init__(self, *, max_entries: int):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._postings: dict[str, dict[str, set[str]]] = {}
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _unindex(self, key: str, entry: dict[str, Any]) -> None:
+        postings = self._postings.get(str(entry.get("namespace") or ""))
+        if postings is None:
+            return
+        for token in entry.get("query_tokens") or []:
+            keys = postings.get(token)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                postings.pop(token, None)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._unindex(key, entry)
+
+    def _alive(self, key: str, entry: dict[str, Any], now: float) -> bool:
+        if float(entry.get("expires_at", 0.0) or 0.0) > now:
+            return True
+        self._remove(key)
+        self.expirations += 1
+        return False
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._alive(key, entry, time.time()):
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def find_subset(self, namespace: str, tokens: set[str]) -> Optional[dict[str, Any]]:
+        """Entrada mas especifica cuyo conjunto de tokens contiene a `tokens`."""
+        if not tokens:
+            return None
+        with self._lock:
+            postings = self._postings.get(namespace)
+            if not postings:
+                return None
+            token_keys: list[set[str]] = []
+            for token in tokens:
+                keys = postings.get(token)
+                if not keys:
+                    return None
+                token_keys.append(keys)
+            token_keys.sort(key=len)
+            candidates = set(token_keys[0])
+            for keys in token_keys[1:]:
+                candidates &= keys
+                if not candidates:
+                    return None
+            now = time.time()
+            best_key: Optional[str] = None
+            best_size = 10**9
+            for key in candidates:
+                entry = self._entries.get(key)
+                if entry is None or not self._alive(key, entry, now):
+                    continue
+                size = len(entry.get("query_tokens") or [])
+                if size < best_size:
+                    best_key, best_size = key, size
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key]
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            postings = self._postings.setdefault(str(entry.get("namespace") or ""), {})
+            for token in entry.get("query_tokens") or []:
+                postings.setdefault(token, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key, oldest_entry = self._entries.popitem(last=False)
+                self._unindex(oldest_key, oldest_entry)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisQueryCacheBackend:
+    """
+    Backend Redis compartido entre workers.
+
+    Cada entrada es un JSON con TTL nativo; el indice invertido son SETs por
+    token y un ZSET `lru` acota el numero de entradas. Invalidar incrementa
+    una generacion global: las entradas de generaciones previas se ignoran y
+    caducan solas.
+    """
+
+    name = "redis"
+    PREFIX = "rag:qcache"
+
+    def __init__(self, client: Any, *, max_entries: int):
+        self._client = client
+        self.max_entries = max(1, int(max_entries))
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_url(cls, url: str, *, max_entries: int) -> "RedisQueryCacheBackend":
+        if redis is None:
+            raise RuntimeError("redis no esta instalado")
+        client: Any = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+        return cls(client, max_entries=max_entries)
+
+    def _generation_key(self) -> str:
+        return f"{self.PREFIX}:generation"
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.PREFIX}:e:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def _token_key(self, namespace: str, token: str) -> str:
+        return f"{self.PREFIX}:t:{namespace}:{token}"
+
+    def _lru_key(self) -> str:
+        return f"{self.PREFIX}:lru"
+
+    def _decode(self, raw: Any, generation: int) -> Optional[dict[str, Any]]:
+        if not raw:
+            return None
+        try:
+            entry = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if int(entry.get("generation", -1)) != generation:
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        entry_key = self._entry_key(key)
+        raw_generation, raw_entry = self._client.mget([self._generation_key(), entry_key])
+        entry = self._decode(raw_entry, int(raw_generation or 0))
+        if entry is not None:
+            self._client.zadd(self._lru_key(), {entry_key: time.time()})
+        return entry
+
+    def find_subset(self, namespace: str, tokens: set[str]) -> Optional[dict[str, Any]]:
+        if not tokens:
+            return None
+        members = self._client.sinter([self._token_key(namespace, token) for token in tokens])
+        if not members:
+            return None
+        entry_keys = [m.decode("utf-8") if isinstance(m, bytes) else str(m) for m in members]
+        raw_values = self._client.mget([self._generation_key(), *entry_keys])
+        generation = int(raw_values[0] or 0)
+        best: Optional[dict[str, Any]] = None
+        best_key = ""
+        stale: list[str] = []
+        for entry_key, raw in zip(entry_keys, raw_values[1:], strict=True):
+            entry = self._decode(raw, generation)
+            if entry is None:
+                stale.append(entry_key)
+                continue
+            if best is None or len(entry.get("query_tokens") or []) < len(
+                best.get("query_tokens") or []
+            ):
+                best, best_key = entry, entry_key
+        if stale:
+            self.expirations += len(stale)
+            pipe = self._client.pipeline()
+            for token in tokens:
+                pipe.srem(self._token_key(namespace, token), *stale)
+            pipe.execute()
+        if best is not None:
+            self._client.zadd(self._lru_key(), {best_key: time.time()})
+        return best
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        ttl = max(1, int(float(entry.get("expires_at", 0.0)) - time.time()))
+        entry_key = self._entry_key(key)
+        generation = int(self._client.get(self._generation_key()) or 0)
+        payload = dict(entry)
+        payload["generation"] = generation
+        namespace = str(entry.get("namespace") or "")
+        pipe = self._client.pipeline()
+        pipe.set(entry_key, json.dumps(payload, ensure_ascii=False), ex=ttl)
+        for token in entry.get("query_tokens") or []:
+            token_key = self._token_key(namespace, token)
+            pipe.sadd(token_key, entry_key)
+            pipe.expire(token_key, ttl)
+        pipe.zadd(self._lru_key(), {entry_key: time.time()})
+        pipe.zcard(self._lru_key())
+        results = pipe.execute()
+        overflow = int(results[-1] or 0) - self.max_entries
+        if overflow > 0:
+            evicted = self._client.zpopmin(self._lru_key(), overflow)
+            evicted_keys = [
+                item[0].decode("utf-8") if isinstance(item[0], bytes) else str(item[0])
+                for item in evicted
+            ]
+            if evicted_keys:
+                self._client.delete(*evicted_keys)
+                self.evictions += len(evicted_keys)
+
+    def clear(self) -> None:
+        self._client.incr(self._generation_key())
+        self._client.delete(self._lru_key())
+
+    def size(self) -> int:
+        return int(self._client.zcard(self._lru_key()) or 0)
+
+
+class RAGQueryCache:
+    """Fachada con TTL, namespaces, invalidacion por corpus y contadores."""
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._corpus_signature: Optional[tuple[int, int, int, int, str]] = None
+        self._corpus_checked_at = 0.0
+        self._corpus_dirty = False
+        self.hits_exact = 0
+        self.hits_subset = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @staticmethod
+    def namespace(
+        response_mode: str, effective_specialty: str, context_fingerprint: str = ""
+    ) -> str:
+        mode = str(response_mode or "clinical").strip().lower()
+        specialty = str(effective_specialty or "general").strip().lower()
+        if context_fingerprint:
+            # La poda por subconjunto solo reutiliza respuestas del mismo contexto.
+            return f"{mode}::{specialty}::{context_fingerprint}"
+        return f"{mode}::{specialty}"
+
+    def mark_corpus_dirty(self) -> None:
+        self._corpus_dirty = True
+
+    @staticmethod
+    def _read_corpus_signature(db: Any) -> Optional[tuple[int, int, int, int, str]]:
+        """
+        Firma barata de `document_chunks` para detectar escrituras de otros procesos.
+
+        COUNT/MAX(id) no ven un chunk reemplazado reutilizando su id; las sumas
+        de tokens y longitud de texto y el ultimo `created_at` actuan como
+        marca de contenido.
+        """
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                text(
+                    "SELECT COUNT(id), COALESCE(MAX(id), 0), COALESCE(SUM(tokens_count), 0), "
+                    "COALESCE(SUM(LENGTH(chunk_text)), 0), MAX(created_at) FROM document_chunks"
+                )
+            ).first()
+        except Exception:
+            return None
+        if row is None:
+            return None
+        return (
+            int(row[0] or 0),
+            int(row[1] or 0),
+            int(row[2] or 0),
+            int(row[3] or 0),
+            str(row[4] or ""),
+        )
+
+    def _sync_corpus(self, db: Any) -> None:
+        now = time.monotonic()
+        interval = float(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS)
+        with self._lock:
+            dirty = self._corpus_dirty
+            due = dirty or (now - self._corpus_checked_at) >= interval
+            if not due:
+                return
+            self._corpus_checked_at = now
+            self._corpus_dirty = False
+        signature = self._read_corpus_signature(db)
+        with self._lock:
+            previous = self._corpus_signature
+            if signature is not None:
+                self._corpus_signature = signature
+            changed = signature is not None and previous is not None and signature != previous
+        if dirty or changed:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        try:
+            self.backend.clear()
+        except Exception as exc:
+            self.errors += 1
+            logger.debug("No se pudo invalidar cache RAG: %s", exc.__class__.__name__)
+        self.invalidations += 1
+
+    def lookup(
+        self,
+        *,
+        cache_key: str,
+        namespace: str,
+        query_tokens: set[str],
+        db: Any = None,
+    ) -> tuple[Optional[dict[str, Any]], str]:
+        self._sync_corpus(db)
+        try:
+            entry = self.backend.get(cache_key)
+            if entry is not None:
+                self.hits_exact += 1
+                return copy.deepcopy(entry), "exact"
+            entry = self.backend.find_subset(namespace, set(query_tokens))
+        except Exception as exc:
+            self.errors += 1
+            logger.debug("Error leyendo cache RAG: %s", exc.__class__.__name__)
+            entry = None
+        if entry is not None:
+            self.hits_subset += 1
+            return copy.deepcopy(entry), "subset_prune"
+        self.misses += 1
+        return None, "miss"
+
+    def store(
+        self,
+        *,
+        cache_key: str,
+        namespace: str,
+        answer: str,
+        trace: dict[str, Any],
+        query_tokens: set[str],
+        ttl_seconds: int,
+        db: Any = None,
+    ) -> None:
+        self._sync_corpus(db)
+        now = time.time()
+        entry = {
+            "answer": str(answer),
+            "trace": copy.deepcopy(dict(trace)),
+            "query_tokens": sorted(query_tokens),
+            "namespace": namespace,
+            "created_at": now,
+            "expires_at": now + float(ttl_seconds),
+        }
+        try:
+            self.backend.put(cache_key, entry)
+            self.stores += 1
+        except Exception as exc:
+            self.errors += 1
+            logger.debug("Error guardando cache RAG: %s", exc.__class__.__name__)
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            entries = int(self.backend.size())
+        except Exception:
+            entries = 0
+        return {
+            "backend": self.backend.name,
+            "entries": entries,
+            "hits": self.hits_exact + self.hits_subset,
+            "hits_exact": self.hits_exact,
+            "hits_subset": self.hits_subset,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": int(getattr(self.backend, "evictions", 0)),
+            "expirations": int(getattr(self.backend, "expirations", 0)),
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+_shared_cache: Optional[RAGQueryCache] = None
+_shared_lock = threading.Lock()
+
+
+def _build_backend() -> Any:
+    max_entries = max(16, int(settings.CLINICAL_CHAT_RAG_QUERY_CACHE_MAX_ENTRIES))
+    if settings.CLINICAL_CHAT_RAG_QUERY_CACHE_BACKEND == "redis":
+        url = settings.CLINICAL_CHAT_RAG_QUERY_CACHE_REDIS_URL.strip() or settings.REDIS_URL
+        try:
+            return RedisQueryCacheBackend.from_url(url, max_entries=max_entries)
+        except Exception as exc:
+            logger.warning(
+                "Cache RAG Redis no disponible (%s); se usa backend en memoria.",
+                exc.__class__.__name__,
+            )
+    return InMemoryQueryCacheBackend(max_entries=max_entries)
+
+
+def get_shared_query_cache() -> RAGQueryCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = RAGQueryCache(_build_backend())
+        return _shared_cache
+
+
+def reset_shared_query_cache() -> None:
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = None
+
+
+def invalidate_shared_query_cache() -> None:
+    """Invalida el cache compartido (con Redis alcanza a todos los workers)."""
+    get_shared_query_cache().invalidate()
+
+
+def shared_query_cache_stats() -> dict[str, Any]:
+    """Stats del cache compartido sin crearlo (para `/metrics`)."""
+    cache = _shared_cache
+    if cache is None:
+        return {}
+    return cache.stats()
+
+
+def _on_document_chunk_change(*_args: Any) -> None:
+    cache = _shared_cache
+    if cache is not None:
+        cache.mark_corpus_dirty()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DocumentChunk, _event_name, _on_document_chunk_change)
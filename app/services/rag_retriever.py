@@ -9,14 +9,16 @@ import json
 import logging
 import math
 import re
+import threading
 import time
 import unicodedata
 from array import array
 from bisect import bisect_left, bisect_right
 from collections import Counter, OrderedDict
+from collections.abc import Sequence
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 try:
     import numpy as np
@@ -28,20 +30,43 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.document_chunk import DocumentChunk
+from app.services import embedding_similarity
 from app.services.embedding_service import OllamaEmbeddingService
+from app.services.rag_candidate_rows import (
+    candidate_session,
+    hydrate_chunks,
+    load_candidate_rows,
+    prefetch_embeddings,
+)
+from app.services.rag_fts_index import FTSIndexManager
+from app.services.rag_lsi_model import GLOBAL_SCOPE, LSIModel, merge_zone_weights
+from app.services.rag_postings_store import PostingsStore
+from app.services.rag_spell_index import BigramTable, SpellCorrectionIndex
+from app.services.rag_term_stats_index import (
+    TermStatsIndex,
+    count_zone_terms,
+    extract_chunk_zone_texts,
+    tokenize_terms,
+    zone_texts_checksum,
+)
+from app.services.rag_vector_index import ChunkVectorIndex
+from app.services.rag_wildcard_index import WildcardIndex
 
 logger = logging.getLogger(__name__)
 
 
 class HybridRetriever:
     """Recuperador hibrido de fragmentos clinicos."""
-    _fts_bootstrap_state: bool | None = None
-    _fts_bootstrap_error: str | None = None
     _fts_vocab_cache_state: bool | None = None
     _fts_vocab_cache_error: str | None = None
     _fts_vocab_cache_terms: tuple[str, ...] = ()
     _fts_vocab_cache_doc_freq: dict[str, int] = {}
     _fts_vocab_cache_loaded_at: float = 0.0
+    _spell_index: SpellCorrectionIndex | None = None
+    _spell_index_lock = threading.Lock()
+    _wildcard_index: WildcardIndex | None = None
+    _wildcard_index_builder: threading.Thread | None = None
+    _wildcard_index_lock = threading.Lock()
     _fts_postings_cache: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
     _global_thesaurus_cache_state: bool | None = None
     _global_thesaurus_cache_error: str | None = None
@@ -729,6 +754,20 @@ class HybridRetriever:
         if cache_stats is not None and post_size < pre_size:
             cache_stats["evictions"] = cache_stats.get("evictions", 0) + (pre_size - post_size)
 
+    @staticmethod
+    def _resolve_postings_store(db: Session) -> Optional[PostingsStore]:
+        """Postings store construido en la ingesta, si cubre el corpus de esta BD."""
+        if not settings.CLINICAL_CHAT_RAG_POSTINGS_STORE_ENABLED:
+            return None
+        if not (Path(settings.CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR) / "CURRENT").exists():
+            return None
+        try:
+            postings_store = PostingsStore.get_shared()
+            return postings_store if postings_store.is_ready(db) else None
+        except Exception as exc:  # pragma: no cover - fallback defensivo
+            logger.warning("Postings store no disponible: %s", exc)
+            return None
+
     @classmethod
     def _ensure_sqlite_fts_index(cls, db: Session) -> tuple[bool, dict[str, str]]:
         trace: dict[str, str] = {
@@ -745,131 +784,41 @@ class HybridRetriever:
             trace["fts_candidate_reason"] = "non_sqlite_backend"
             return False, trace
 
-        if cls._fts_bootstrap_state is True:
-            trace["fts_candidate_ready"] = "1"
-            return True, trace
-        if cls._fts_bootstrap_state is False:
-            trace["fts_candidate_ready"] = "0"
-            trace["fts_candidate_error"] = cls._fts_bootstrap_error or "bootstrap_failed"
-            return False, trace
-
-        try:
-            with bind.begin() as conn:
-                conn.exec_driver_sql(
-                    """
-                    CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts
-                    USING fts5(
-                        chunk_text,
-                        section_path,
-                        keywords,
-                        specialty,
-                        content='document_chunks',
-                        content_rowid='id',
-                        tokenize='unicode61 remove_diacritics 2'
-                    );
-                    """
-                )
-                conn.exec_driver_sql(
-                    """
-                    CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts_vocab
-                    USING fts5vocab(document_chunks_fts, 'row');
-                    """
-                )
-                conn.exec_driver_sql(
-                    """
-                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ai
-                    AFTER INSERT ON document_chunks BEGIN
-                        INSERT INTO document_chunks_fts(
-                            rowid, chunk_text, section_path, keywords, specialty
-                        )
-                        VALUES (
-                            new.id,
-                            new.chunk_text,
-                            COALESCE(new.section_path, ''),
-                            COALESCE(CAST(new.keywords AS TEXT), ''),
-                            COALESCE(new.specialty, '')
-                        );
-                    END;
-                    """
-                )
-                conn.exec_driver_sql(
-                    """
-                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ad
-                    AFTER DELETE ON document_chunks BEGIN
-                        INSERT INTO document_chunks_fts(
-                            document_chunks_fts,
-                            rowid,
-                            chunk_text,
-                            section_path,
-                            keywords,
-                            specialty
-                        )
-                        VALUES (
-                            'delete',
-                            old.id,
-                            old.chunk_text,
-                            COALESCE(old.section_path, ''),
-                            COALESCE(CAST(old.keywords AS TEXT), ''),
-                            COALESCE(old.specialty, '')
-                        );
-                    END;
-                    """
-                )
-                conn.exec_driver_sql(
-                    """
-                    CREATE TRIGGER IF NOT EXISTS document_chunks_fts_au
-                    AFTER UPDATE ON document_chunks BEGIN
-                        INSERT INTO document_chunks_fts(
-                            document_chunks_fts,
-                            rowid,
-                            chunk_text,
-                            section_path,
-                            keywords,
-                            specialty
-                        )
-                        VALUES (
-                            'delete',
-                            old.id,
-                            old.chunk_text,
-                            COALESCE(old.section_path, ''),
-                            COALESCE(CAST(old.keywords AS TEXT), ''),
-                            COALESCE(old.specialty, '')
-                        );
-                        INSERT INTO document_chunks_fts(
-                            rowid, chunk_text, section_path, keywords, specialty
-                        )
-                        VALUES (
-                            new.id,
-                            new.chunk_text,
-                            COALESCE(new.section_path, ''),
-                            COALESCE(CAST(new.keywords AS TEXT), ''),
-                            COALESCE(new.specialty, '')
-                        );
-                    END;
-                    """
-                )
-                conn.exec_driver_sql(
-                    """
-                    INSERT INTO document_chunks_fts(document_chunks_fts)
-                    VALUES ('rebuild');
-                    """
-                )
-            cls._fts_bootstrap_state = True
+        ready, index_trace = FTSIndexManager.ensure(
+            bind,
+            allow_rebuild=settings.CLINICAL_CHAT_RAG_FTS_REBUILD_ON_REQUEST,
+        )
+        trace.update(index_trace)
+        if ready:
             trace["fts_candidate_ready"] = "1"
             return True, trace
-        except Exception as exc:  # pragma: no cover - depende de build sqlite
-            cls._fts_bootstrap_state = False
-            cls._fts_bootstrap_error = exc.__class__.__name__
-            trace["fts_candidate_ready"] = "0"
-            trace["fts_candidate_error"] = exc.__class__.__name__
-            logger.warning("No se pudo inicializar FTS candidate index: %s", exc)
-            return False, trace
+        trace["fts_candidate_ready"] = "0"
+        if "fts_index_rebuild_pending" in index_trace:
+            # Corpus grande sin indice valido: se reconstruye fuera de la peticion.
+            FTSIndexManager.schedule_rebuild(bind)
+            trace["fts_candidate_reason"] = "rebuild_pending"
+        else:
+            trace["fts_candidate_error"] = FTSIndexManager.last_error(bind) or "bootstrap_failed"
+        return False, trace
 
     @classmethod
     def _ensure_fts_vocab_cache(cls, db: Session) -> bool:
         if not settings.CLINICAL_CHAT_RAG_VOCAB_CACHE_ENABLED:
             return False
         now = time.time()
+        postings_store = cls._resolve_postings_store(db)
+        if postings_store is not None:
+            # El lexico del postings store ya esta ordenado: no hace falta fts5vocab.
+            terms, doc_freq = postings_store.vocabulary()
+            if terms is not cls._fts_vocab_cache_terms:
+                cls._spell_index = None
+                cls._wildcard_index = None
+            cls._fts_vocab_cache_terms = terms
+            cls._fts_vocab_cache_doc_freq = doc_freq
+            cls._fts_vocab_cache_loaded_at = now
+            cls._fts_vocab_cache_state = True
+            cls._fts_vocab_cache_error = None
+            return True
         ttl_seconds = settings.CLINICAL_CHAT_RAG_VOCAB_CACHE_TTL_SECONDS
         if (
             cls._fts_vocab_cache_state is True
@@ -898,8 +847,15 @@ class HybridRetriever:
                 if normalized not in doc_freq:
                     terms.append(normalized)
                 doc_freq[normalized] = int(doc_value or 0)
-            cls._fts_vocab_cache_terms = tuple(terms)
-            cls._fts_vocab_cache_doc_freq = doc_freq
+            if (
+                tuple(terms) != cls._fts_vocab_cache_terms
+                or doc_freq != cls._fts_vocab_cache_doc_freq
+            ):
+                # Los indices ortografico y de comodines se refrescan con el vocabulario.
+                cls._spell_index = None
+                cls._wildcard_index = None
+                cls._fts_vocab_cache_terms = tuple(terms)
+                cls._fts_vocab_cache_doc_freq = doc_freq
             cls._fts_vocab_cache_loaded_at = now
             cls._fts_vocab_cache_state = True
             cls._fts_vocab_cache_error = None
@@ -909,6 +865,102 @@ class HybridRetriever:
             cls._fts_vocab_cache_error = exc.__class__.__name__
             return False
 
+    @classmethod
+    def _get_spell_index(cls, db: Session) -> Optional[SpellCorrectionIndex]:
+        """Indice de borrados simetricos del vocabulario cacheado (se construye al primer uso)."""
+        if not settings.CLINICAL_CHAT_RAG_SPELL_INDEX_ENABLED:
+            return None
+        if not cls._ensure_fts_vocab_cache(db):
+            return None
+        max_distance = int(settings.CLINICAL_CHAT_RAG_SPELL_MAX_EDIT_DISTANCE)
+        prefix_length = int(settings.CLINICAL_CHAT_RAG_SPELL_INDEX_PREFIX_LENGTH)
+        with cls._spell_index_lock:
+            index = cls._spell_index
+            if (
+                index is not None
+                and index.max_distance == max_distance
+                and index.prefix_length == prefix_length
+            ):
+                return index
+            terms = cls._fts_vocab_cache_terms
+            doc_freq = cls._fts_vocab_cache_doc_freq
+            bigrams: Optional[BigramTable] = None
+            max_bigrams = int(settings.CLINICAL_CHAT_RAG_SPELL_BIGRAM_MAX_ENTRIES)
+            if settings.CLINICAL_CHAT_RAG_CONTEXTUAL_SPELL_ENABLED and max_bigrams > 0:
+                try:
+                    bigrams = BigramTable.build_from_db(db, max_entries=max_bigrams)
+                except Exception as exc:  # pragma: no cover - defensivo
+                    logger.warning("No se pudo construir la tabla de bigramas: %s", exc)
+            started_at = time.perf_counter()
+            index = SpellCorrectionIndex.build(
+                terms,
+                doc_freq,
+                max_distance=max_distance,
+                prefix_length=prefix_length,
+                phonetic_key=cls._soundex if settings.CLINICAL_CHAT_RAG_SOUNDEX_ENABLED else None,
+                bigrams=bigrams,
+            )
+            logger.info(
+                "Indice ortografico construido en %.1f ms: %s",
+                (time.perf_counter() - started_at) * 1000,
+                index.stats(),
+            )
+            # Si el vocabulario cambio durante la construccion, no se publica.
+            if terms is cls._fts_vocab_cache_terms:
+                cls._spell_index = index
+            return index
+
+    @classmethod
+    def _build_wildcard_index(cls, terms: tuple[str, ...], doc_freq: dict[str, int]) -> None:
+        started_at = time.perf_counter()
+        index = WildcardIndex.build(
+            terms,
+            doc_freq,
+            k=int(settings.CLINICAL_CHAT_RAG_KGRAM_SIZE),
+        )
+        logger.info(
+            "Indice de comodines construido en %.1f ms: %s",
+            (time.perf_counter() - started_at) * 1000,
+            index.stats(),
+        )
+        with cls._wildcard_index_lock:
+            # Si el vocabulario cambio durante la construccion, no se publica.
+            if terms is cls._fts_vocab_cache_terms:
+                cls._wildcard_index = index
+
+    @classmethod
+    def _get_wildcard_index(cls, db: Session) -> Optional[WildcardIndex]:
+        """
+        Indice k-gram del vocabulario cacheado.
+
+        Con vocabularios grandes se construye en segundo plano y, mientras tanto,
+        las consultas siguen usando el recorrido del cache.
+        """
+        if not settings.CLINICAL_CHAT_RAG_WILDCARD_INDEX_ENABLED:
+            return None
+        if not cls._ensure_fts_vocab_cache(db):
+            return None
+        index = cls._wildcard_index
+        if index is not None and index.k == int(settings.CLINICAL_CHAT_RAG_KGRAM_SIZE):
+            return index
+        terms = cls._fts_vocab_cache_terms
+        doc_freq = cls._fts_vocab_cache_doc_freq
+        if len(terms) <= int(settings.CLINICAL_CHAT_RAG_WILDCARD_INDEX_INLINE_MAX_TERMS):
+            cls._build_wildcard_index(terms, doc_freq)
+            return cls._wildcard_index
+        with cls._wildcard_index_lock:
+            builder = cls._wildcard_index_builder
+            if builder is None or not builder.is_alive():
+                builder = threading.Thread(
+                    target=cls._build_wildcard_index,
+                    args=(terms, doc_freq),
+                    name="rag-wildcard-index-build",
+                    daemon=True,
+                )
+                cls._wildcard_index_builder = builder
+                builder.start()
+        return None
+
     @staticmethod
     def _glob_to_regex(glob_pattern: str) -> re.Pattern[str]:
         escaped = re.escape(glob_pattern)
@@ -924,11 +976,31 @@ class HybridRetriever:
         limit: int,
         min_len: int | None = None,
         max_len: int | None = None,
+        lookup_stats: dict[str, int] | None = None,
     ) -> tuple[list[tuple[str, int]], str]:
-        use_cache = cls._ensure_fts_vocab_cache(db)
+        postings_store = cls._resolve_postings_store(db)
+        vocab_source = "store" if postings_store is not None else "cache"
+        use_cache = postings_store is not None or cls._ensure_fts_vocab_cache(db)
+        wildcard_index = cls._get_wildcard_index(db) if use_cache else None
+        if wildcard_index is not None:
+            index_stats: dict[str, int] = {}
+            rows = wildcard_index.lookup(
+                glob_pattern,
+                limit=limit,
+                min_len=min_len,
+                max_len=max_len,
+                stats=index_stats,
+            )
+            if lookup_stats is not None:
+                for key, value in index_stats.items():
+                    lookup_stats[key] = lookup_stats.get(key, 0) + int(value)
+            return rows, "kgram"
         if use_cache:
-            terms = cls._fts_vocab_cache_terms
-            doc_freq = cls._fts_vocab_cache_doc_freq
+            if postings_store is not None:
+                terms, doc_freq = postings_store.vocabulary()
+            else:
+                terms = cls._fts_vocab_cache_terms
+                doc_freq = cls._fts_vocab_cache_doc_freq
             candidates: list[str] = []
             simple_prefix = glob_pattern.endswith("*") and glob_pattern.count("*") == 1
             if simple_prefix:
@@ -950,7 +1022,7 @@ class HybridRetriever:
                     continue
                 filtered.append((candidate, int(doc_freq.get(candidate, 0))))
             filtered.sort(key=lambda item: item[1], reverse=True)
-            return filtered[: int(max(1, limit))], "cache"
+            return filtered[: int(max(1, limit))], vocab_source
 
         stmt = """
             SELECT term, doc
@@ -1014,6 +1086,14 @@ class HybridRetriever:
         match_query = cls._build_match_operand(term, is_phrase=is_phrase)
         if not match_query:
             return []
+        postings_store = cls._resolve_postings_store(db)
+        if postings_store is not None:
+            return postings_store.match(
+                match_query.strip('"'),
+                specialty_filter=specialty_filter,
+                limit=int(max(1, limit)),
+                stats=cache_stats,
+            )
         cache_key = cls._build_postings_cache_key(
             kind="phrase" if is_phrase else "term",
             match_query=match_query,
@@ -1067,6 +1147,16 @@ class HybridRetriever:
         if not left_operand or not right_operand:
             return []
         near_distance = max(1, int(distance))
+        postings_store = cls._resolve_postings_store(db)
+        if postings_store is not None:
+            return postings_store.near(
+                left_operand.strip('"'),
+                right_operand.strip('"'),
+                near_distance,
+                specialty_filter=specialty_filter,
+                limit=int(max(1, limit)),
+                stats=cache_stats,
+            )
         match_query = f"NEAR({left_operand} {right_operand}, {near_distance})"
         cache_key = cls._build_postings_cache_key(
             kind="near",
@@ -1100,13 +1190,20 @@ class HybridRetriever:
         )
         return postings
 
-    @staticmethod
+    @classmethod
     def _fetch_universe_ids(
+        cls,
         *,
         db: Session,
         specialty_filter: Optional[str],
         limit: int,
     ) -> list[int]:
+        postings_store = cls._resolve_postings_store(db)
+        if postings_store is not None:
+            return postings_store.doc_ids(
+                specialty_filter=specialty_filter,
+                limit=int(max(1, limit)),
+            )
         stmt = "SELECT id FROM document_chunks"
         params: dict[str, object] = {"limit_n": int(max(1, limit))}
         if specialty_filter:
@@ -1123,6 +1220,7 @@ class HybridRetriever:
         term: str,
         limit: int,
         vocab_stats: dict[str, int] | None = None,
+        lookup_stats: dict[str, int] | None = None,
     ) -> list[str]:
         if not settings.CLINICAL_CHAT_RAG_WILDCARD_ENABLED:
             return []
@@ -1144,6 +1242,7 @@ class HybridRetriever:
                 db=db,
                 glob_pattern=glob_pattern,
                 limit=max(8, limit),
+                lookup_stats=lookup_stats,
             )
             if vocab_stats is not None:
                 vocab_stats[f"{source}_hits"] = vocab_stats.get(f"{source}_hits", 0) + 1
@@ -1195,6 +1294,11 @@ class HybridRetriever:
         )
         if not match_query:
             return 0
+        postings_store = self._resolve_postings_store(db)
+        if postings_store is not None:
+            return len(
+                postings_store.match(match_query.strip('"'), specialty_filter=specialty_filter)
+            )
         stmt = """
             SELECT COUNT(1)
             FROM document_chunks_fts fts
@@ -1233,18 +1337,37 @@ class HybridRetriever:
         prefix = f"{normalized_term[0]}*"
         min_len = max(3, len(normalized_term) - max_distance)
         max_len = len(normalized_term) + max_distance
-        try:
-            rows, source = self._query_vocab_rows(
-                db=db,
-                glob_pattern=prefix,
-                min_len=min_len,
-                max_len=max_len,
-                limit=max(16, candidate_limit),
-            )
+        soundex_target = self._soundex(normalized_term)
+        spell_index = self._get_spell_index(db)
+        if spell_index is not None and max_distance <= spell_index.max_distance:
+            # Candidatos por borrados simetricos + cubo Soundex: sin acceso a BD.
+            rows = [
+                (candidate, doc_freq)
+                for candidate, doc_freq in spell_index.edit_candidates(normalized_term)
+                + (
+                    spell_index.phonetic_candidates(soundex_target, limit=candidate_limit)
+                    if soundex_target and settings.CLINICAL_CHAT_RAG_SOUNDEX_ENABLED
+                    else []
+                )
+                if candidate[0] == normalized_term[0] and min_len <= len(candidate) <= max_len
+            ]
+            rows = list(dict.fromkeys(rows))
             if vocab_stats is not None:
-                vocab_stats[f"{source}_hits"] = vocab_stats.get(f"{source}_hits", 0) + 1
-        except Exception:  # pragma: no cover - depende de sqlite/fts5 local
-            return None
+                vocab_stats["index_hits"] = vocab_stats.get("index_hits", 0) + 1
+        else:
+            spell_index = None
+            try:
+                rows, source = self._query_vocab_rows(
+                    db=db,
+                    glob_pattern=prefix,
+                    min_len=min_len,
+                    max_len=max_len,
+                    limit=max(16, candidate_limit),
+                )
+                if vocab_stats is not None:
+                    vocab_stats[f"{source}_hits"] = vocab_stats.get(f"{source}_hits", 0) + 1
+            except Exception:  # pragma: no cover - depende de sqlite/fts5 local
+                return None
         if not rows:
             return None
 
@@ -1256,7 +1379,6 @@ class HybridRetriever:
         best_distance: Optional[int] = None
         best_context_score = -1
         best_doc_freq = -1
-        soundex_target = self._soundex(normalized_term)
         soundex_best_term: Optional[str] = None
         soundex_best_context_score = -1
         soundex_best_doc_freq = -1
@@ -1265,7 +1387,9 @@ class HybridRetriever:
             and (left_context or right_context)
         )
         context_cache: dict[tuple[str, str], int] = {}
-        if contextual_enabled:
+        bigrams = spell_index.bigrams if spell_index is not None else None
+        if contextual_enabled and bigrams is None:
+            # Sin tabla de bigramas cada candidato cuesta consultas de frase.
             max_candidates = settings.CLINICAL_CHAT_RAG_CONTEXTUAL_SPELL_MAX_CANDIDATES
             rows = rows[: max(8, max_candidates)]
 
@@ -1274,12 +1398,19 @@ class HybridRetriever:
             cached = context_cache.get(cache_key)
             if cached is not None:
                 return cached
-            value = self._bigram_phrase_count(
-                db=db,
-                left_term=left_term,
-                right_term=right_term,
-                specialty_filter=specialty_filter,
-            )
+            value = None
+            if bigrams is not None:
+                left_clean = self._context_term_from_neighbor(left_term, use_last=True)
+                right_clean = self._context_term_from_neighbor(right_term, use_last=False)
+                if left_clean and right_clean:
+                    value = bigrams.count(left_clean, right_clean, specialty_filter)
+            if value is None:
+                value = self._bigram_phrase_count(
+                    db=db,
+                    left_term=left_term,
+                    right_term=right_term,
+                    specialty_filter=specialty_filter,
+                )
             context_cache[cache_key] = value
             return value
 
@@ -1356,18 +1487,56 @@ class HybridRetriever:
         specialty_filter: Optional[str],
         candidate_pool: int,
     ) -> tuple[list[DocumentChunk], dict[str, str]]:
-        trace: dict[str, str] = {}
-        use_fts, fts_trace = self._ensure_sqlite_fts_index(db)
-        trace.update(fts_trace)
-
-        if not use_fts:
-            query_builder = db.query(DocumentChunk).filter(DocumentChunk.specialty.isnot(None))
-            if specialty_filter:
-                query_builder = query_builder.filter_by(specialty=specialty_filter)
-            chunks = query_builder.all()
-            trace["candidate_strategy"] = "full_scan_fallback"
+        candidate_ids, trace = self._collect_candidate_ids(
+            query=query,
+            db=db,
+            specialty_filter=specialty_filter,
+            candidate_pool=candidate_pool,
+        )
+        if candidate_ids is None:
+            chunks = self._load_candidate_rows(db, specialty_filter=specialty_filter)
             trace["candidate_chunks_pool"] = str(len(chunks))
             return chunks, trace
+        if not candidate_ids:
+            return [], trace
+        loaded = self._load_candidate_rows(
+            db,
+            specialty_filter=specialty_filter,
+            ids=candidate_ids,
+        )
+        chunks_by_id = {int(chunk.id): chunk for chunk in loaded}
+        ordered_chunks = [
+            chunks_by_id[item_id]
+            for item_id in candidate_ids
+            if item_id in chunks_by_id
+        ]
+        return ordered_chunks, trace
+
+    def _collect_candidate_ids(
+        self,
+        *,
+        query: str,
+        db: Session,
+        specialty_filter: Optional[str],
+        candidate_pool: int,
+    ) -> tuple[Optional[list[int]], dict[str, str]]:
+        """
+        Ids candidatos por postings booleanos, sin cargar filas.
+
+        `None` indica que hay que recorrer todos los chunks de la especialidad
+        (sin indice lexico o sin coincidencias en una consulta no explicita).
+        """
+        trace: dict[str, str] = {}
+        postings_store = self._resolve_postings_store(db)
+        trace["candidate_postings_backend"] = "store" if postings_store is not None else "fts5"
+        use_fts = False
+        if postings_store is None:
+            use_fts, fts_trace = self._ensure_sqlite_fts_index(db)
+            trace.update(fts_trace)
+
+        if postings_store is None and not use_fts:
+            trace["candidate_strategy"] = "full_scan_fallback"
+            return None, trace
 
         vocab_cache_ready = self._ensure_fts_vocab_cache(db)
         trace["candidate_vocab_cache_enabled"] = (
@@ -1410,6 +1579,9 @@ class HybridRetriever:
         corrected_terms: dict[str, str] = {}
         spell_stats = {"attempted": 0, "applied": 0}
         wildcard_stats = {"attempted": 0, "expanded_terms": 0}
+        wildcard_lookup_stats: dict[str, int] = {}
+        wildcard_expansions: dict[str, int] = {}
+        wildcard_timing = {"lookup_ms": 0.0}
         vocab_stats = {"cache_hits": 0, "db_hits": 0}
         postings_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
         spell_max_distance = settings.CLINICAL_CHAT_RAG_SPELL_MAX_EDIT_DISTANCE
@@ -1511,13 +1683,17 @@ class HybridRetriever:
                 )
             elif has_wildcard:
                 wildcard_stats["attempted"] += 1
+                lookup_started_at = time.perf_counter()
                 wildcard_terms = self._expand_wildcard_term(
                     db=db,
                     term=raw_term,
                     limit=settings.CLINICAL_CHAT_RAG_WILDCARD_MAX_EXPANSIONS,
                     vocab_stats=vocab_stats,
+                    lookup_stats=wildcard_lookup_stats,
                 )
+                wildcard_timing["lookup_ms"] += (time.perf_counter() - lookup_started_at) * 1000
                 wildcard_stats["expanded_terms"] += len(wildcard_terms)
+                wildcard_expansions[raw_term] = len(wildcard_terms)
                 for wildcard_term in wildcard_terms:
                     wildcard_postings = self._fetch_postings_for_term(
                         db=db,
@@ -1692,8 +1868,19 @@ class HybridRetriever:
         )
         trace["candidate_wildcard_attempted"] = str(wildcard_stats["attempted"])
         trace["candidate_wildcard_expanded_terms"] = str(wildcard_stats["expanded_terms"])
+        trace["candidate_wildcard_expansions"] = (
+            ";".join(f"{src}:{count}" for src, count in wildcard_expansions.items())
+            if wildcard_expansions
+            else "none"
+        )
+        trace["candidate_wildcard_lookup_ms"] = str(round(wildcard_timing["lookup_ms"], 3))
+        trace["candidate_wildcard_index_ready"] = "1" if self._wildcard_index is not None else "0"
+        trace["candidate_wildcard_index_scanned"] = str(wildcard_lookup_stats.get("scanned", 0))
         trace["candidate_vocab_lookup_cache_hits"] = str(vocab_stats["cache_hits"])
         trace["candidate_vocab_lookup_db_hits"] = str(vocab_stats["db_hits"])
+        trace["candidate_vocab_lookup_store_hits"] = str(vocab_stats.get("store_hits", 0))
+        trace["candidate_vocab_lookup_index_hits"] = str(vocab_stats.get("index_hits", 0))
+        trace["candidate_vocab_lookup_kgram_hits"] = str(vocab_stats.get("kgram_hits", 0))
         trace["candidate_postings_cache_enabled"] = (
             "1" if settings.CLINICAL_CHAT_RAG_POSTINGS_CACHE_ENABLED else "0"
         )
@@ -1704,6 +1891,13 @@ class HybridRetriever:
         trace["candidate_postings_cache_misses"] = str(postings_cache_stats["misses"])
         trace["candidate_postings_cache_evictions"] = str(postings_cache_stats["evictions"])
         trace["candidate_postings_cache_size"] = str(len(self._fts_postings_cache))
+        if postings_store is not None:
+            trace["candidate_store_blocks_decoded"] = str(
+                postings_cache_stats.get("blocks_decoded", 0)
+            )
+            trace["candidate_store_blocks_skipped"] = str(
+                postings_cache_stats.get("blocks_skipped", 0)
+            )
         trace["candidate_soundex_enabled"] = (
             "1" if settings.CLINICAL_CHAT_RAG_SOUNDEX_ENABLED else "0"
         )
@@ -1721,27 +1915,40 @@ class HybridRetriever:
                 trace["candidate_strategy"] = "fts_boolean_no_match"
                 return [], trace
             trace["candidate_strategy"] = "fts_empty_fallback_full_scan"
-            query_builder = db.query(DocumentChunk).filter(DocumentChunk.specialty.isnot(None))
-            if specialty_filter:
-                query_builder = query_builder.filter_by(specialty=specialty_filter)
-            chunks = query_builder.all()
-            trace["candidate_chunks_pool"] = str(len(chunks))
-            return chunks, trace
+            return None, trace
+        return list(candidate_ids), trace
 
-        query_builder = db.query(DocumentChunk).filter(
-            DocumentChunk.id.in_(candidate_ids),
-            DocumentChunk.specialty.isnot(None),
-        )
+    @staticmethod
+    def _load_candidate_rows(
+        db: Session,
+        *,
+        specialty_filter: Optional[str],
+        ids: Optional[list[int]] = None,
+    ) -> Sequence[Any]:
+        """
+        Carga los candidatos a puntuar.
+
+        Por defecto devuelve filas ligeras (`CandidateChunk`) sin embedding ni
+        documento ORM; el top-k final se hidrata en `search_*`.
+        """
+        if settings.CLINICAL_CHAT_RAG_LIGHT_CANDIDATES_ENABLED:
+            return load_candidate_rows(db, specialty_filter=specialty_filter, ids=ids)
+        query_builder = db.query(DocumentChunk).filter(DocumentChunk.specialty.isnot(None))
+        if ids is not None:
+            query_builder = query_builder.filter(DocumentChunk.id.in_(ids))
         if specialty_filter:
             query_builder = query_builder.filter_by(specialty=specialty_filter)
-        loaded = query_builder.all()
-        chunks_by_id = {int(chunk.id): chunk for chunk in loaded}
-        ordered_chunks = [
-            chunks_by_id[item_id]
-            for item_id in candidate_ids
-            if item_id in chunks_by_id
-        ]
-        return ordered_chunks, trace
+        return query_builder.all()
+
+    def _resolve_vector_index(self) -> ChunkVectorIndex | None:
+        if not settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ENABLED:
+            return None
+        if not ChunkVectorIndex.is_available():
+            return None
+        model = getattr(self.embedding_service, "model", None)
+        return ChunkVectorIndex.get_shared(
+            str(model or settings.CLINICAL_CHAT_RAG_EMBEDDING_MODEL)
+        )
 
     def _score_vector_candidates(
         self,
@@ -1760,9 +1967,43 @@ class HybridRetriever:
                 trace_info["vector_search_chunks_found"] = "0"
                 return [], trace_info
 
+            scored: list[tuple[DocumentChunk, float]] = []
+            remaining_chunks = chunks
+            method_name = "cosine_similarity"
+            vector_index = self._resolve_vector_index()
+            if vector_index is not None and chunks:
+                chunks_by_id = {int(chunk.id): chunk for chunk in chunks}
+                approximate = bool(
+                    settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_ENABLED
+                    and len(chunks_by_id)
+                    >= settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES
+                )
+                indexed_scores, missing_ids, index_trace = vector_index.search(
+                    query_vec,
+                    k=k,
+                    allowed_ids=list(chunks_by_id),
+                    approximate=approximate,
+                )
+                trace_info.update(index_trace)
+                if index_trace.get("vector_index_ready") == "1":
+                    scored = [
+                        (chunks_by_id[chunk_id], score)
+                        for chunk_id, score in indexed_scores
+                        if chunk_id in chunks_by_id
+                    ]
+                    # Chunks aun no indexados (ingesta reciente) se puntuan por la via clasica.
+                    remaining_chunks = [
+                        chunks_by_id[chunk_id]
+                        for chunk_id in missing_ids
+                        if chunk_id in chunks_by_id
+                    ]
+                    method_name = f"cosine_similarity_index_{index_trace.get('vector_index_mode')}"
+
+            # Solo se leen de la BD los embeddings que el indice no ha resuelto.
+            embeddings_loaded = prefetch_embeddings(remaining_chunks)
             candidate_chunks: list[DocumentChunk] = []
             candidate_vectors: list[list[float]] = []
-            for chunk in chunks:
+            for chunk in remaining_chunks:
                 try:
                     embedding_array = array("f")
                     embedding_array.frombytes(chunk.chunk_embedding)
@@ -1773,16 +2014,17 @@ class HybridRetriever:
                 except ValueError:
                     continue
 
-            if not candidate_vectors:
+            if not candidate_vectors and not scored:
                 trace_info["vector_search_chunks_found"] = "0"
                 trace_info["vector_search_error"] = "empty_candidate_embeddings"
                 return [], trace_info
 
-            similarities = self.embedding_service.batch_cosine_similarity(
-                query_vec,
-                candidate_vectors,
-            )
-            scored = list(zip(candidate_chunks, similarities, strict=False))
+            if candidate_vectors:
+                similarities = self.embedding_service.batch_cosine_similarity(
+                    query_vec,
+                    candidate_vectors,
+                )
+                scored.extend(zip(candidate_chunks, similarities, strict=False))
             scored.sort(key=lambda item: item[1], reverse=True)
             top_scores = [(chunk, float(score)) for chunk, score in scored[:k]]
 
@@ -1797,7 +2039,9 @@ class HybridRetriever:
                     "vector_search_chunks_found": str(len(top_scores)),
                     "vector_search_avg_score": f"{avg_score:.3f}",
                     "vector_search_latency_ms": str(latency_ms),
-                    "vector_search_method": "cosine_similarity",
+                    "vector_search_method": method_name,
+                    "vector_search_fallback_decoded": str(len(candidate_vectors)),
+                    "vector_search_embeddings_loaded": str(embeddings_loaded),
                 }
             )
             return top_scores, trace_info
@@ -1808,9 +2052,147 @@ class HybridRetriever:
             logger.error("Error en busqueda vectorial: %s", exc)
             return [], trace_info
 
+    def _embed_queries(self, queries: list[str]) -> tuple[list[list[float]], dict[str, str]]:
+        """Embeddings de varias consultas; por lotes si el servicio lo soporta."""
+        embed_batch = getattr(self.embedding_service, "embed_batch", None)
+        if callable(embed_batch) and len(queries) > 1:
+            try:
+                vectors, trace = embed_batch(queries)
+                if len(vectors) == len(queries):
+                    return [list(vector or []) for vector in vectors], dict(trace)
+            except Exception as exc:  # pragma: no cover - defensivo
+                logger.warning("Fallo embed_batch en busqueda multi-consulta: %s", exc)
+        vectors = []
+        trace = {}
+        for query in queries:
+            vector, query_trace = self.embedding_service.embed_text(query)
+            vectors.append(list(vector or []))
+            trace = {**query_trace, **trace}
+        return vectors, trace
+
+    def _score_vector_candidates_multi(
+        self,
+        *,
+        queries: list[str],
+        pools: list[list[DocumentChunk]],
+        k: int,
+    ) -> list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]]:
+        """
+        `_score_vector_candidates` para varias consultas en una pasada.
+
+        El indice persistente puntua la union de candidatos con un solo producto
+        matriz-matriz; los candidatos que no resuelve se leen y decodifican una
+        vez aunque aparezcan en varias consultas.
+        """
+        started_at = time.perf_counter()
+        traces: list[dict[str, str]] = [{} for _ in queries]
+        try:
+            vectors, embedding_trace = self._embed_queries(queries)
+            scored_lists: list[list[tuple[DocumentChunk, float]]] = [[] for _ in queries]
+            remaining = list(pools)
+            methods = ["cosine_similarity" for _ in queries]
+            active = [index for index, vector in enumerate(vectors) if vector]
+            for index, trace in enumerate(traces):
+                trace.update(embedding_trace)
+                if index not in active:
+                    trace["vector_search_error"] = "empty_query_embedding"
+
+            vector_index = self._resolve_vector_index()
+            indexed = [index for index in active if pools[index]]
+            if vector_index is not None and indexed:
+                batch = vector_index.search_many(
+                    [vectors[index] for index in indexed],
+                    k=k,
+                    allowed_ids=[[int(chunk.id) for chunk in pools[index]] for index in indexed],
+                )
+                for index, (indexed_scores, missing_ids, index_trace) in zip(
+                    indexed, batch, strict=True
+                ):
+                    traces[index].update(index_trace)
+                    if index_trace.get("vector_index_ready") != "1":
+                        continue
+                    chunks_by_id = {int(chunk.id): chunk for chunk in pools[index]}
+                    scored_lists[index] = [
+                        (chunks_by_id[chunk_id], score)
+                        for chunk_id, score in indexed_scores
+                        if chunk_id in chunks_by_id
+                    ]
+                    remaining[index] = [
+                        chunks_by_id[chunk_id]
+                        for chunk_id in missing_ids
+                        if chunk_id in chunks_by_id
+                    ]
+                    methods[index] = (
+                        f"cosine_similarity_index_{index_trace.get('vector_index_mode')}"
+                    )
+
+            union: dict[int, DocumentChunk] = {}
+            for index in active:
+                for chunk in remaining[index]:
+                    union.setdefault(int(chunk.id), chunk)
+            embeddings_loaded = prefetch_embeddings(union.values())
+            blobs: dict[int, bytes] = {}
+            for chunk_id, chunk in union.items():
+                blob = chunk.chunk_embedding
+                if blob and len(blob) % 4 == 0:
+                    blobs[chunk_id] = blob
+            blob_ids = list(blobs)
+            position_by_id = {chunk_id: position for position, chunk_id in enumerate(blob_ids)}
+            score_rows = (
+                embedding_similarity.cosine_scores_many(
+                    [vectors[index] for index in active],
+                    [blobs[chunk_id] for chunk_id in blob_ids],
+                )
+                if blob_ids and active
+                else []
+            )
+
+            latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
+            results: list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]] = []
+            column_by_index = {index: column for column, index in enumerate(active)}
+            for index, trace in enumerate(traces):
+                column = column_by_index.get(index)
+                if column is None:
+                    trace["vector_search_chunks_found"] = "0"
+                    results.append(([], trace))
+                    continue
+                scored = scored_lists[index]
+                decoded = 0
+                for chunk in remaining[index]:
+                    position = position_by_id.get(int(chunk.id))
+                    if position is None:
+                        continue
+                    scored.append((chunk, float(score_rows[position][column])))
+                    decoded += 1
+                scored.sort(key=lambda item: item[1], reverse=True)
+                top_scores = [(chunk, float(score)) for chunk, score in scored[:k]]
+                avg_score = (
+                    sum(score for _, score in top_scores) / len(top_scores) if top_scores else 0.0
+                )
+                trace.update(
+                    {
+                        "vector_search_chunks_found": str(len(top_scores)),
+                        "vector_search_avg_score": f"{avg_score:.3f}",
+                        "vector_search_latency_ms": str(latency_ms),
+                        "vector_search_method": methods[index],
+                        "vector_search_fallback_decoded": str(decoded),
+                        "vector_search_embeddings_loaded": str(embeddings_loaded),
+                        "vector_search_batched_queries": str(len(active)),
+                    }
+                )
+                results.append((top_scores, trace))
+            return results
+        except Exception as exc:  # pragma: no cover - defensivo
+            latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
+            logger.error("Error en busqueda vectorial multi-consulta: %s", exc)
+            for trace in traces:
+                trace["vector_search_error"] = exc.__class__.__name__
+                trace["vector_search_latency_ms"] = str(latency_ms)
+            return [([], trace) for trace in traces]
+
     @staticmethod
     def _tokenize_terms(value: str) -> list[str]:
-        return re.findall(r"[a-z0-9#\-\+/]+", str(value or "").lower())
+        return tokenize_terms(value)
 
     @staticmethod
     def _sublinear_tf(term_frequency: int) -> float:
@@ -1935,20 +2317,70 @@ class HybridRetriever:
 
     @classmethod
     def _extract_chunk_zone_texts(cls, chunk: DocumentChunk) -> dict[str, str]:
-        title_parts: list[str] = []
-        document = getattr(chunk, "document", None)
-        if document is not None:
-            title_parts.append(str(getattr(document, "title", "") or ""))
-            title_parts.append(str(getattr(document, "source_file", "") or ""))
-        keywords_value = " ".join(str(item) for item in (chunk.keywords or []))
-        custom_questions_value = " ".join(str(item) for item in (chunk.custom_questions or []))
-        return {
-            "title": " ".join(part for part in title_parts if part).strip().lower(),
-            "section": str(chunk.section_path or "").lower(),
-            "body": str(chunk.chunk_text or "").lower(),
-            "keywords": keywords_value.lower(),
-            "custom_questions": custom_questions_value.lower(),
-        }
+        return extract_chunk_zone_texts(chunk)
+
+    @staticmethod
+    def _resolve_term_stats_index(chunks: list[DocumentChunk]) -> Optional[TermStatsIndex]:
+        """Indice de estadisticas de terminos listo para la BD de los candidatos."""
+        if not settings.CLINICAL_CHAT_RAG_TERM_STATS_ENABLED or not chunks:
+            return None
+        db = candidate_session(chunks[0])
+        # Nunca se crea el fichero en la ruta de consulta: lo construye la ingesta.
+        if db is None or not Path(settings.CLINICAL_CHAT_RAG_TERM_STATS_PATH).exists():
+            return None
+        try:
+            index = TermStatsIndex.get_shared()
+            return index if index.is_ready(db) else None
+        except Exception as exc:  # pragma: no cover - fallback defensivo
+            logger.warning("Indice de estadisticas de terminos no disponible: %s", exc)
+            return None
+
+    def _prepare_keyword_chunks(
+        self,
+        chunks: list[DocumentChunk],
+    ) -> tuple[
+        list[tuple[DocumentChunk, dict[str, Counter[str]], int]],
+        dict[str, str],
+        Optional[TermStatsIndex],
+    ]:
+        """Frecuencias por zona de cada candidato: del indice si esta al dia, si no tokeniza."""
+        term_stats_index = self._resolve_term_stats_index(chunks)
+        zone_texts_by_id: dict[int, dict[str, str]] = {}
+        indexed: dict[int, tuple[dict[str, Counter[str]], int]] = {}
+        stale_rows = 0
+        if term_stats_index is not None:
+            entries: list[tuple[int, int]] = []
+            for chunk in chunks:
+                zone_texts = self._extract_chunk_zone_texts(chunk)
+                zone_texts_by_id[int(chunk.id)] = zone_texts
+                entries.append((int(chunk.id), zone_texts_checksum(zone_texts)))
+            indexed, stale_rows = term_stats_index.lookup(entries)
+
+        prepared: list[tuple[DocumentChunk, dict[str, Counter[str]], int]] = []
+        for chunk in chunks:
+            entry = indexed.get(int(chunk.id))
+            if entry is not None:
+                zone_counts, body_tokens_count = entry
+            else:
+                zone_texts = zone_texts_by_id.get(int(chunk.id)) or self._extract_chunk_zone_texts(
+                    chunk
+                )
+                zone_counts = count_zone_terms(zone_texts)
+                body_tokens_count = sum(zone_counts["body"].values())
+            doc_length = max(1, int(chunk.tokens_count or 0), int(body_tokens_count))
+            prepared.append((chunk, zone_counts, doc_length))
+
+        if term_stats_index is None:
+            source = "tokenized"
+        elif len(indexed) == len(prepared):
+            source = "index"
+        else:
+            source = "partial"
+        return prepared, {
+            "keyword_search_term_stats": source,
+            "keyword_search_term_stats_hits": str(len(indexed)),
+            "keyword_search_term_stats_stale": str(stale_rows),
+        }, term_stats_index
 
     def _score_keyword_candidates(
         self,
@@ -2014,26 +2446,16 @@ class HybridRetriever:
 
         query_terms = list(query_term_counts.keys())
         zone_weights = self._build_zone_weights()
-        prepared_chunks: list[tuple[DocumentChunk, dict[str, Counter[str]], int]] = []
+        prepared_chunks, term_stats_trace, term_stats_index = self._prepare_keyword_chunks(
+            chunks
+        )
+        trace_info.update(term_stats_trace)
         doc_frequency: dict[str, int] = {term: 0 for term in query_terms}
         doc_lengths: list[float] = []
-
-        for chunk in chunks:
-            zone_texts = self._extract_chunk_zone_texts(chunk)
-            zone_counts: dict[str, Counter[str]] = {
-                zone_name: Counter(self._tokenize_terms(text_value))
-                for zone_name, text_value in zone_texts.items()
-            }
-            term_seen_in_doc = set()
+        for _chunk, zone_counts, doc_length in prepared_chunks:
             for term in query_terms:
-                if any(zone_counts[zone].get(term, 0) > 0 for zone in zone_counts):
-                    term_seen_in_doc.add(term)
-            for term in term_seen_in_doc:
-                doc_frequency[term] = doc_frequency.get(term, 0) + 1
-
-            body_tokens_count = sum(zone_counts["body"].values())
-            doc_length = max(1, int(chunk.tokens_count or 0), int(body_tokens_count))
-            prepared_chunks.append((chunk, zone_counts, doc_length))
+                if any(counts.get(term, 0) > 0 for counts in zone_counts.values()):
+                    doc_frequency[term] = doc_frequency.get(term, 0) + 1
             doc_lengths.append(float(doc_length))
 
         if not prepared_chunks:
@@ -2041,6 +2463,23 @@ class HybridRetriever:
             return [], trace_info
 
         collection_size = len(prepared_chunks)
+        global_collection_prob: dict[str, float] = {}
+        if term_stats_index is not None and settings.CLINICAL_CHAT_RAG_TERM_STATS_GLOBAL_ENABLED:
+            # DF/TF de todo el corpus indexado en lugar de solo el conjunto candidato.
+            global_docs, global_df, global_cf, global_cf_total = term_stats_index.global_stats(
+                query_terms
+            )
+            if global_docs >= collection_size:
+                collection_size = global_docs
+                doc_frequency = {
+                    term: max(int(global_df.get(term, 0)), doc_frequency.get(term, 0))
+                    for term in query_terms
+                }
+                global_collection_prob = {
+                    term: max(1e-12, float(global_cf.get(term, 0)) / max(1.0, global_cf_total))
+                    for term in query_terms
+                }
+                trace_info["keyword_search_term_stats_scope"] = "global"
         idf_by_term: dict[str, float] = {}
         for term in query_terms:
             df_value = float(doc_frequency.get(term, 0))
@@ -2100,6 +2539,10 @@ class HybridRetriever:
             term: max(1e-12, float(tf_value) / collection_tf_total)
             for term, tf_value in collection_tf_by_term.items()
         }
+        if global_collection_prob:
+            collection_prob_by_term = {
+                term: global_collection_prob.get(term, 1e-12) for term in collection_tf_by_term
+            }
 
         avg_doc_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 1.0
         pivot_slope = float(settings.CLINICAL_CHAT_RAG_TFIDF_PIVOT_SLOPE)
@@ -2235,13 +2678,14 @@ class HybridRetriever:
         bim_norm_by_id: dict[int, float] = {}
         if bim_bonus_enabled and bim_bonus_weight > 0:
             bim_values_by_id: dict[int, float] = {}
+            zone_counts_by_id = {
+                int(chunk.id): zone_counts for chunk, zone_counts, _doc_length in prepared_chunks
+            }
             for chunk, _base, _sq, _bm25_raw, _prox, _qlm in scored_raw:
                 score = 0.0
-                zone_texts = self._extract_chunk_zone_texts(chunk)
-                doc_text = " ".join(zone_texts.values())
-                doc_tokens = set(self._tokenize_terms(doc_text))
+                zone_counts = zone_counts_by_id.get(int(chunk.id), {})
                 for term in query_weights:
-                    if term not in doc_tokens:
+                    if not any(counts.get(term, 0) > 0 for counts in zone_counts.values()):
                         continue
                     df_value = float(doc_frequency.get(term, 0))
                     odds_num = max(1e-9, (collection_size - df_value + 0.5))
@@ -2427,6 +2871,15 @@ class HybridRetriever:
         if np is None:
             trace["keyword_search_lsi_error"] = "numpy_unavailable"
             return {}, trace
+        model_scores = self._compute_lsi_model_scores(
+            prepared_chunks=prepared_chunks,
+            query_term_counts=query_term_counts,
+            zone_weights=zone_weights,
+            trace=trace,
+        )
+        if model_scores is not None:
+            return model_scores, trace
+        trace["keyword_search_lsi_mode"] = "pool"
         if len(prepared_chunks) < max(2, lsi_min_docs):
             trace["keyword_search_lsi_error"] = "insufficient_docs"
             trace["keyword_search_lsi_doc_count"] = str(len(prepared_chunks))
@@ -2546,6 +2999,53 @@ class HybridRetriever:
             trace["keyword_search_lsi_error"] = exc.__class__.__name__
             return {}, trace
 
+    def _compute_lsi_model_scores(
+        self,
+        *,
+        prepared_chunks: list[tuple[DocumentChunk, dict[str, Counter[str]], int]],
+        query_term_counts: Counter[str],
+        zone_weights: dict[str, float],
+        trace: dict[str, str],
+    ) -> Optional[dict[int, float]]:
+        """Fold-in sobre el modelo LSI persistido; None si no hay modelo utilizable."""
+        if not settings.CLINICAL_CHAT_RAG_LSI_MODEL_ENABLED or not prepared_chunks:
+            return None
+        specialties = {str(chunk.specialty or "") for chunk, _counts, _len in prepared_chunks}
+        scopes = [GLOBAL_SCOPE]
+        if len(specialties) == 1:
+            scopes.insert(0, LSIModel.scope_for_specialty(next(iter(specialties))))
+        db = candidate_session(prepared_chunks[0][0])
+        try:
+            scope, model = LSIModel.get_shared().resolve(
+                scopes=scopes,
+                zone_weights=zone_weights,
+                database=TermStatsIndex.database_identity(db) if db is not None else None,
+            )
+            if model is None:
+                return None
+            raw_scores, error = LSIModel.score(
+                model,
+                query_term_counts=query_term_counts,
+                documents=[
+                    (int(chunk.id), merge_zone_weights(zone_counts, zone_weights))
+                    for chunk, zone_counts, _doc_length in prepared_chunks
+                ],
+            )
+        except Exception as exc:  # pragma: no cover - fallback defensivo
+            logger.warning("Modelo LSI persistido no utilizable: %s", exc)
+            return None
+        meta = model["meta"]
+        trace["keyword_search_lsi_mode"] = "model"
+        trace["keyword_search_lsi_model_scope"] = str(scope)
+        trace["keyword_search_lsi_model_version"] = str(meta.get("model_version", ""))
+        trace["keyword_search_lsi_vocab_size"] = str(meta.get("vocab_size", 0))
+        trace["keyword_search_lsi_components"] = str(meta.get("components", 0))
+        trace["keyword_search_lsi_doc_count"] = str(len(prepared_chunks))
+        if error:
+            trace["keyword_search_lsi_error"] = error
+            return {}
+        return self._normalize_raw_score_map(raw_scores)
+
     @classmethod
     def _resolve_thesaurus_path(cls) -> Path:
         configured = Path(settings.CLINICAL_CHAT_RAG_GLOBAL_THESAURUS_PATH)
@@ -2828,6 +3328,7 @@ class HybridRetriever:
         for chunk, score in scored:
             setattr(chunk, "_rag_score", float(score))
             results.append(chunk)
+        results = hydrate_chunks(results)
         trace_info.update(candidate_trace)
         return results, trace_info
 
@@ -2861,6 +3362,7 @@ class HybridRetriever:
         for chunk, score in scored:
             setattr(chunk, "_rag_score", float(score))
             results.append(chunk)
+        results = hydrate_chunks(results)
         trace_info.update(candidate_trace)
         trace_info.update(expansion_trace)
         return results, trace_info
@@ -2942,6 +3444,39 @@ class HybridRetriever:
         trace.update(vector_trace)
         trace.update(keyword_trace)
 
+        result: list[DocumentChunk] = []
+        for chunk, score in self._combine_hybrid_scores(vector_scored, keyword_scored, k=k):
+            setattr(chunk, "_rag_score", score)
+            result.append(chunk)
+        result = hydrate_chunks(result)
+
+        latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
+        trace.update(
+            {
+                "hybrid_search_chunks_found": str(len(result)),
+                "hybrid_search_latency_ms": str(latency_ms),
+                "hybrid_search_method": self._hybrid_method_label(keyword_only),
+            }
+        )
+        return result, trace
+
+    def _hybrid_method_label(self, keyword_only: bool) -> str:
+        if keyword_only:
+            return "keyword_only"
+        return (
+            "normalized_score_mix "
+            f"vector({self.vector_weight:.0%})"
+            f"+keyword({self.keyword_weight:.0%})"
+        )
+
+    def _combine_hybrid_scores(
+        self,
+        vector_scored: list[tuple[DocumentChunk, float]],
+        keyword_scored: list[tuple[DocumentChunk, float]],
+        *,
+        k: int,
+    ) -> list[tuple[DocumentChunk, float]]:
+        """Mezcla ponderada de scores normalizados; top-k `(chunk, score)`."""
         combined_scores: dict[int, float] = {}
         chunks_by_id: dict[int, DocumentChunk] = {}
         vector_scores_by_id = self._normalize_candidate_scores(vector_scored)
@@ -2960,27 +3495,162 @@ class HybridRetriever:
                 chunks_by_id[chunk.id] = chunk
 
         ranked_ids = sorted(combined_scores.items(), key=lambda item: item[1], reverse=True)
-        result: list[DocumentChunk] = []
-        for chunk_id, score in ranked_ids[:k]:
-            chunk = chunks_by_id[chunk_id]
-            setattr(chunk, "_rag_score", float(score))
-            result.append(chunk)
+        return [(chunks_by_id[chunk_id], float(score)) for chunk_id, score in ranked_ids[:k]]
 
-        latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
-        trace.update(
-            {
-                "hybrid_search_chunks_found": str(len(result)),
-                "hybrid_search_latency_ms": str(latency_ms),
-                "hybrid_search_method": (
-                    "keyword_only" if keyword_only else (
-                        "normalized_score_mix "
-                        f"vector({self.vector_weight:.0%})"
-                        f"+keyword({self.keyword_weight:.0%})"
-                    )
-                ),
+    def search_hybrid_multi(
+        self,
+        queries: list[tuple[str, Optional[str]]],
+        db: Session,
+        *,
+        k: int = 5,
+        keyword_only: bool = False,
+    ) -> tuple[list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]], dict[str, str]]:
+        """
+        Busqueda hibrida de varias consultas `(query, specialty_filter)` a la vez.
+
+        Cada consulta conserva su expansion y sus postings, pero los candidatos de
+        todas se cargan con una sola consulta, los embeddings pendientes se leen
+        una vez para la union y la puntuacion vectorial es un unico producto
+        matriz-matriz. Devuelve, por consulta, el top-k `(chunk, score)` con su
+        traza: un mismo chunk puede aparecer en varias consultas con score
+        distinto, por eso no se usa `_rag_score`.
+        """
+        started_at = time.perf_counter()
+        candidate_pool = max(settings.CLINICAL_CHAT_RAG_FTS_CANDIDATE_POOL, max(k * 12, 120))
+        expanded_queries: list[str] = []
+        segment_ids: list[Optional[list[int]]] = []
+        traces: list[dict[str, str]] = []
+        for query, specialty_filter in queries:
+            trace: dict[str, str] = {"hybrid_multi_query": "1"}
+            expanded_query, expansion_trace = self._expand_query_with_feedback(
+                query=query,
+                db=db,
+                specialty_filter=specialty_filter,
+                candidate_pool=candidate_pool,
+            )
+            trace.update(expansion_trace)
+            candidate_ids, candidate_trace = self._collect_candidate_ids(
+                query=expanded_query,
+                db=db,
+                specialty_filter=specialty_filter,
+                candidate_pool=candidate_pool,
+            )
+            trace.update(candidate_trace)
+            expanded_queries.append(expanded_query)
+            segment_ids.append(candidate_ids)
+            traces.append(trace)
+
+        # Una sola carga para la union de candidatos de todas las consultas.
+        union_ids = sorted({item_id for ids in segment_ids if ids for item_id in ids})
+        rows_by_id: dict[int, DocumentChunk] = {}
+        db_loads = 0
+        if union_ids:
+            for row in self._load_candidate_rows(db, specialty_filter=None, ids=union_ids):
+                rows_by_id[int(row.id)] = row
+            db_loads += 1
+        full_scans: dict[Optional[str], list[DocumentChunk]] = {}
+        pools: list[list[DocumentChunk]] = []
+        for (_query, specialty_filter), candidate_ids, trace in zip(
+            queries, segment_ids, traces, strict=True
+        ):
+            if candidate_ids is None:
+                scope = specialty_filter or None
+                if scope not in full_scans:
+                    loaded = self._load_candidate_rows(db, specialty_filter=scope)
+                    full_scans[scope] = [
+                        rows_by_id.setdefault(int(row.id), row) for row in loaded
+                    ]
+                    db_loads += 1
+                pool = full_scans[scope]
+                trace["candidate_chunks_pool"] = str(len(pool))
+            else:
+                # Mismo filtro exacto que `_load_candidate_rows` con especialidad.
+                pool = [
+                    rows_by_id[item_id]
+                    for item_id in candidate_ids
+                    if item_id in rows_by_id
+                    and (not specialty_filter or rows_by_id[item_id].specialty == specialty_filter)
+                ]
+            pools.append(pool)
+
+        candidate_k = max(k * 2, 8)
+
+        def _score_keywords() -> list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]]:
+            return [
+                self._score_keyword_candidates(query=expanded_query, chunks=pool, k=candidate_k)
+                for expanded_query, pool in zip(expanded_queries, pools, strict=True)
+            ]
+
+        parallelized = False
+        if keyword_only:
+            disabled_trace = {
+                "vector_search_chunks_found": "0",
+                "vector_search_latency_ms": "0.0",
+                "vector_search_method": "disabled_keyword_only",
             }
-        )
-        return result, trace
+            vector_results: list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]] = [
+                ([], dict(disabled_trace)) for _ in queries
+            ]
+            keyword_results = _score_keywords()
+        elif settings.CLINICAL_CHAT_RAG_PARALLEL_HYBRID_ENABLED:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                vector_future = executor.submit(
+                    self._score_vector_candidates_multi,
+                    queries=[query for query, _specialty in queries],
+                    pools=pools,
+                    k=candidate_k,
+                )
+                keyword_results = _score_keywords()
+                vector_results = vector_future.result()
+            parallelized = True
+        else:
+            vector_results = self._score_vector_candidates_multi(
+                queries=[query for query, _specialty in queries],
+                pools=pools,
+                k=candidate_k,
+            )
+            keyword_results = _score_keywords()
+
+        ranked_per_query: list[list[tuple[DocumentChunk, float]]] = []
+        for (vector_scored, vector_trace), (keyword_scored, keyword_trace), trace in zip(
+            vector_results, keyword_results, traces, strict=True
+        ):
+            trace.update(vector_trace)
+            trace.update(keyword_trace)
+            trace["hybrid_parallelized"] = "1" if parallelized else "0"
+            trace["hybrid_vector_disabled"] = "1" if keyword_only else "0"
+            ranked_per_query.append(
+                self._combine_hybrid_scores(vector_scored, keyword_scored, k=k)
+            )
+
+        # Hidratacion conjunta del top-k de todas las consultas.
+        final_rows: dict[int, DocumentChunk] = {}
+        for ranked in ranked_per_query:
+            for chunk, _score in ranked:
+                final_rows.setdefault(int(chunk.id), chunk)
+        hydrated_by_id = {
+            int(chunk.id): chunk for chunk in hydrate_chunks(list(final_rows.values()))
+        }
+        latency_ms = round((time.perf_counter() - started_at) * 1000, 2)
+        results: list[tuple[list[tuple[DocumentChunk, float]], dict[str, str]]] = []
+        for ranked, trace in zip(ranked_per_query, traces, strict=True):
+            scored = [
+                (hydrated_by_id[int(chunk.id)], score)
+                for chunk, score in ranked
+                if int(chunk.id) in hydrated_by_id
+            ]
+            trace["hybrid_search_chunks_found"] = str(len(scored))
+            trace["hybrid_search_latency_ms"] = str(latency_ms)
+            trace["hybrid_search_method"] = self._hybrid_method_label(keyword_only)
+            results.append((scored, trace))
+        shared_trace = {
+            "hybrid_multi_queries": str(len(queries)),
+            "hybrid_multi_candidate_union": str(len(rows_by_id)),
+            "hybrid_multi_candidate_total": str(sum(len(pool) for pool in pools)),
+            "hybrid_multi_db_loads": str(db_loads),
+            "hybrid_multi_latency_ms": str(latency_ms),
+        }
+        return results, shared_trace
 
     def search_by_domain(
         self,
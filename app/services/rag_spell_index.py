@@ -0,0 +1,198 @@
+"""
+Indice de correccion ortografica precalculado para el retriever hibrido.
+
+Sustituye el escaneo por primera letra del vocabulario FTS (hasta 128 filas
+por termino, con Jaccard/Levenshtein/Soundex sobre cada una y consultas SQL de
+frase por candidato) por estructuras en memoria construidas una sola vez a
+partir del vocabulario cacheado:
+
+- diccionario de borrados simetricos (estilo SymSpell): cada termino se indexa
+  por todas las variantes de su prefijo con hasta `max_distance` borrados; dos
+  terminos a distancia de edicion <= d comparten al menos una variante, asi que
+  los candidatos salen de unas pocas busquedas hash sin tocar la BD;
+- cubos Soundex ordenados por frecuencia documental para el fallback fonetico;
+- tabla de bigramas (DF por par de tokens adyacentes, global y por
+  especialidad) para el desempate contextual.
+
+El indice se invalida cuando el cache de vocabulario recarga un lexico
+distinto. La verificacion final (Levenshtein, Jaccard) y la eleccion del mejor
+candidato siguen en `HybridRetriever`.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from itertools import combinations
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_postings_store import chunk_fts_columns, tokenize_fts_text
+
+MIN_TERM_LENGTH = 3
+BUILD_BATCH_SIZE = 1000
+
+
+def delete_variants(term: str, max_distance: int) -> set[str]:
+    """Variantes de `term` con 0..max_distance caracteres borrados."""
+    variants = {term}
+    length = len(term)
+    for removed in range(1, min(max_distance, length) + 1):
+        for positions in combinations(range(length), removed):
+            skip = set(positions)
+            variants.add("".join(char for index, char in enumerate(term) if index not in skip))
+    return variants
+
+
+class BigramTable:
+    """DF de bigramas de tokens adyacentes (sin cruzar columnas), global y por especialidad."""
+
+    def __init__(self, counts: dict[str, int], *, complete: bool):
+        self._counts = counts
+        self.complete = complete
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @staticmethod
+    def _key(left: str, right: str, specialty: Optional[str]) -> str:
+        return f"{specialty or ''}\x1f{left} {right}"
+
+    @classmethod
+    def build_from_db(cls, db: Session, *, max_entries: int) -> BigramTable:
+        counts: Counter[str] = Counter()
+        rows = db.query(
+            DocumentChunk.chunk_text,
+            DocumentChunk.section_path,
+            DocumentChunk.keywords,
+            DocumentChunk.specialty,
+        ).yield_per(BUILD_BATCH_SIZE)
+        for row in rows:
+            specialty = str(row.specialty or "").strip().lower()
+            pairs: set[tuple[str, str]] = set()
+            for column_text in chunk_fts_columns(row):
+                tokens = tokenize_fts_text(column_text)
+                pairs.update(zip(tokens, tokens[1:]))
+            for left, right in pairs:
+                counts[cls._key(left, right, None)] += 1
+                if specialty:
+                    counts[cls._key(left, right, specialty)] += 1
+        complete = len(counts) <= max_entries
+        if complete:
+            return cls(dict(counts), complete=True)
+        return cls(dict(counts.most_common(max_entries)), complete=False)
+
+    def count(self, left: str, right: str, specialty: Optional[str] = None) -> Optional[int]:
+        """DF de la frase `left right`; None si la tabla no puede resolverla."""
+        left_tokens = tokenize_fts_text(left)
+        right_tokens = tokenize_fts_text(right)
+        if len(left_tokens) != 1 or len(right_tokens) != 1:
+            return None
+        specialty_key = str(specialty or "").strip().lower() or None
+        value = self._counts.get(self._key(left_tokens[0], right_tokens[0], specialty_key))
+        if value is None:
+            # Tabla recortada: un par ausente puede ser poco frecuente, no inexistente.
+            return 0 if self.complete else None
+        return int(value)
+
+
+class SpellCorrectionIndex:
+    """Borrados simetricos + cubos Soundex sobre el vocabulario FTS."""
+
+    def __init__(
+        self,
+        *,
+        max_distance: int,
+        prefix_length: int,
+        terms: list[str],
+        doc_freq: list[int],
+        deletes: dict[str, list[int]],
+        phonetic: dict[str, list[int]],
+        bigrams: Optional[BigramTable] = None,
+    ):
+        self.max_distance = int(max_distance)
+        self.prefix_length = int(prefix_length)
+        self._terms = terms
+        self._doc_freq = doc_freq
+        self._deletes = deletes
+        self._phonetic = phonetic
+        self.bigrams = bigrams
+        self.built_at = time.time()
+
+    @classmethod
+    def build(
+        cls,
+        terms: Iterable[str],
+        doc_freq: dict[str, int],
+        *,
+        max_distance: int,
+        prefix_length: int,
+        phonetic_key: Optional[Callable[[str], str]] = None,
+        bigrams: Optional[BigramTable] = None,
+    ) -> SpellCorrectionIndex:
+        indexed_terms: list[str] = []
+        indexed_doc_freq: list[int] = []
+        deletes: dict[str, list[int]] = {}
+        phonetic: dict[str, list[int]] = {}
+        for term in terms:
+            if len(term) < MIN_TERM_LENGTH or term.isdigit():
+                continue
+            term_id = len(indexed_terms)
+            indexed_terms.append(term)
+            indexed_doc_freq.append(int(doc_freq.get(term, 0)))
+            for variant in delete_variants(term[:prefix_length], max_distance):
+                deletes.setdefault(variant, []).append(term_id)
+            if phonetic_key is not None:
+                code = phonetic_key(term)
+                if code:
+                    phonetic.setdefault(code, []).append(term_id)
+        for bucket in phonetic.values():
+            bucket.sort(key=lambda term_id: indexed_doc_freq[term_id], reverse=True)
+        return cls(
+            max_distance=max_distance,
+            prefix_length=prefix_length,
+            terms=indexed_terms,
+            doc_freq=indexed_doc_freq,
+            deletes=deletes,
+            phonetic=phonetic,
+            bigrams=bigrams,
+        )
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def edit_candidates(self, term: str) -> list[tuple[str, int]]:
+        """
+        Terminos que comparten alguna variante de borrado con `term`.
+
+        Es un superconjunto de los terminos a distancia <= `max_distance`; el
+        llamador verifica la distancia real. Ordenados por DF descendente.
+        """
+        term_ids: set[int] = set()
+        for variant in delete_variants(term[: self.prefix_length], self.max_distance):
+            bucket = self._deletes.get(variant)
+            if bucket:
+                term_ids.update(bucket)
+        return self._rows(term_ids)
+
+    def phonetic_candidates(self, code: str, *, limit: int) -> list[tuple[str, int]]:
+        """Terminos con el mismo codigo fonetico, los `limit` mas frecuentes."""
+        return self._rows(self._phonetic.get(code, ())[: max(1, limit)])
+
+    def _rows(self, term_ids: Iterable[int]) -> list[tuple[str, int]]:
+        rows = [(self._terms[term_id], self._doc_freq[term_id]) for term_id in term_ids]
+        rows.sort(key=lambda item: (-item[1], item[0]))
+        return rows
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "terms": len(self._terms),
+            "delete_keys": len(self._deletes),
+            "phonetic_keys": len(self._phonetic),
+            "bigrams": len(self.bigrams) if self.bigrams is not None else 0,
+            "bigrams_complete": bool(self.bigrams.complete) if self.bigrams else False,
+            "max_distance": self.max_distance,
+            "prefix_length": self.prefix_length,
+        }
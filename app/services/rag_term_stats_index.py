@@ -0,0 +1,441 @@
+"""
+Indice persistente de estadisticas de terminos para el scoring lexico RAG.
+
+Guarda en un fichero SQLite, por chunk y por zona (title, section, body,
+keywords, custom_questions), las frecuencias de termino como arrays compactos
+`uint32` de pares `(term_id, tf)`, junto a la longitud del cuerpo y un checksum
+del texto indexado. A nivel global mantiene vocabulario, DF y TF de coleccion.
+
+El retriever lee de aqui en lugar de re-tokenizar cada candidato; una fila
+cuyo checksum no coincide con el chunk actual se considera obsoleta y se
+tokeniza en linea. El formato y el tokenizador van versionados en `meta`.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+TERM_PATTERN = r"[a-z0-9#\-\+/]+"
+ZONES: tuple[str, ...] = ("title", "section", "body", "keywords", "custom_questions")
+_TERM_REGEX = re.compile(TERM_PATTERN)
+
+ZoneCounts = dict[str, Counter[str]]
+
+
+def tokenize_terms(value: str) -> list[str]:
+    return _TERM_REGEX.findall(str(value or "").lower())
+
+
+def extract_chunk_zone_texts(chunk: Any) -> dict[str, str]:
+    title_parts: list[str] = []
+    document = getattr(chunk, "document", None)
+    if document is not None:
+        title_parts.append(str(getattr(document, "title", "") or ""))
+        title_parts.append(str(getattr(document, "source_file", "") or ""))
+    keywords_value = " ".join(str(item) for item in (chunk.keywords or []))
+    custom_questions_value = " ".join(str(item) for item in (chunk.custom_questions or []))
+    return {
+        "title": " ".join(part for part in title_parts if part).strip().lower(),
+        "section": str(chunk.section_path or "").lower(),
+        "body": str(chunk.chunk_text or "").lower(),
+        "keywords": keywords_value.lower(),
+        "custom_questions": custom_questions_value.lower(),
+    }
+
+
+def zone_texts_checksum(zone_texts: dict[str, str]) -> int:
+    """CRC32 del texto por zonas: detecta filas obsoletas sin re-tokenizar."""
+    payload = "\x1f".join(zone_texts.get(zone, "") for zone in ZONES)
+    return zlib.crc32(payload.encode("utf-8"))
+
+
+def count_zone_terms(zone_texts: dict[str, str]) -> ZoneCounts:
+    return {zone: Counter(tokenize_terms(zone_texts.get(zone, ""))) for zone in ZONES}
+
+
+class TermStatsIndex:
+    """Estadisticas de terminos por chunk/zona y globales (DF, TF de coleccion)."""
+
+    FORMAT_VERSION = 1
+    TOKENIZER_SIGNATURE = hashlib.sha1(
+        f"{TERM_PATTERN}|{','.join(ZONES)}|lower".encode("utf-8")
+    ).hexdigest()[:12]
+    SYNC_BATCH_SIZE = 500
+    LOOKUP_CHUNK_SIZE = 500
+
+    _shared: dict[str, "TermStatsIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._terms_by_id: list[str] = []
+        self._ids_by_term: dict[str, int] = {}
+        self._meta_cache: dict[str, str] = {}
+        self._meta_checked_at = 0.0
+        self._generation = ""
+
+    @classmethod
+    def get_shared(cls, path: Optional[str | Path] = None) -> "TermStatsIndex":
+        resolved = Path(path or settings.CLINICAL_CHAT_RAG_TERM_STATS_PATH)
+        key = str(resolved.resolve())
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            if index is None:
+                index = cls(resolved)
+                cls._shared[key] = index
+            return index
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            indexes = list(cls._shared.values())
+            cls._shared.clear()
+        for index in indexes:
+            index.close()
+
+    @staticmethod
+    def database_identity(db: Session) -> str:
+        url = db.get_bind().engine.url.render_as_string(hide_password=True)
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+    def _create_schema(self) -> None:
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS terms (
+                term_id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE,
+                df INTEGER NOT NULL DEFAULT 0,
+                cf INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS chunk_terms (
+                chunk_id INTEGER PRIMARY KEY,
+                checksum INTEGER NOT NULL,
+                body_length INTEGER NOT NULL,
+                zone_tf BLOB NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _read_meta_locked(self) -> dict[str, str]:
+        return {
+            str(key): str(value)
+            for key, value in self._conn.execute("SELECT key, value FROM meta").fetchall()
+        }
+
+    def _write_meta_locked(self, values: dict[str, Any]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()],
+        )
+
+    def _meta(self) -> dict[str, str]:
+        # La ingesta puede escribir desde otro proceso: releer meta como mucho cada segundo.
+        now = time.monotonic()
+        if not self._meta_cache or now - self._meta_checked_at > 1.0:
+            self._meta_cache = self._read_meta_locked()
+            self._meta_checked_at = now
+            generation = self._meta_cache.get("generation", "")
+            if generation != self._generation:
+                # Reconstruccion completa en otro proceso: los term_id ya no son validos.
+                self._terms_by_id = []
+                self._ids_by_term = {}
+                self._generation = generation
+        return self._meta_cache
+
+    def _is_compatible(self, meta: dict[str, str], database: str) -> bool:
+        return (
+            meta.get("format_version") == str(self.FORMAT_VERSION)
+            and meta.get("tokenizer") == self.TOKENIZER_SIGNATURE
+            and meta.get("database") == database
+        )
+
+    def is_ready(self, db: Session) -> bool:
+        """Indice construido con este formato/tokenizador y para esta base de datos."""
+        with self._lock:
+            meta = self._meta()
+            return (
+                self._is_compatible(meta, self.database_identity(db))
+                and int(meta.get("chunks", "0") or 0) > 0
+            )
+
+    def _clear_locked(self) -> None:
+        self._conn.execute("DELETE FROM chunk_terms")
+        self._conn.execute("DELETE FROM terms")
+        self._conn.execute("DELETE FROM meta")
+        self._terms_by_id = []
+        self._ids_by_term = {}
+        self._meta_cache = {}
+        self._generation = uuid4().hex
+        self._write_meta_locked({"generation": self._generation})
+
+    def _load_vocabulary_locked(self) -> None:
+        """Carga incremental id->termino (los ids nunca se reasignan)."""
+        rows = self._conn.execute(
+            "SELECT term_id, term FROM terms WHERE term_id > ? ORDER BY term_id",
+            (len(self._terms_by_id),),
+        ).fetchall()
+        for term_id, term in rows:
+            while len(self._terms_by_id) < int(term_id) - 1:
+                self._terms_by_id.append("")
+            self._terms_by_id.append(str(term))
+            self._ids_by_term[str(term)] = int(term_id)
+
+    def _term_ids_locked(self, terms: Iterable[str]) -> dict[str, int]:
+        missing = [term for term in terms if term not in self._ids_by_term]
+        if missing:
+            self._load_vocabulary_locked()
+            new_terms = [term for term in dict.fromkeys(missing) if term not in self._ids_by_term]
+            if new_terms:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO terms (term) VALUES (?)",
+                    [(term,) for term in new_terms],
+                )
+                self._load_vocabulary_locked()
+        return self._ids_by_term
+
+    def _encode_locked(self, zone_counts: ZoneCounts) -> bytes:
+        term_ids = self._term_ids_locked(
+            {term for counts in zone_counts.values() for term in counts}
+        )
+        payload = array("I")
+        for zone in ZONES:
+            items = sorted((term_ids[term], int(tf)) for term, tf in zone_counts[zone].items())
+            payload.append(len(items))
+            for term_id, tf in items:
+                payload.append(term_id)
+                payload.append(tf)
+        return payload.tobytes()
+
+    def _decode_locked(self, blob: bytes) -> ZoneCounts:
+        try:
+            return self._decode_with_vocabulary(blob)
+        except IndexError:
+            # Terminos anadidos por otro proceso tras la ultima carga de vocabulario.
+            self._load_vocabulary_locked()
+            return self._decode_with_vocabulary(blob)
+
+    def _decode_with_vocabulary(self, blob: bytes) -> ZoneCounts:
+        values = array("I")
+        values.frombytes(blob)
+        terms_by_id = self._terms_by_id
+        zone_counts: ZoneCounts = {}
+        cursor = 0
+        for zone in ZONES:
+            size = int(values[cursor]) if cursor < len(values) else 0
+            start = cursor + 1
+            end = start + (2 * size)
+            pairs = values[start:end]
+            zone_counts[zone] = Counter(
+                dict(zip((terms_by_id[term_id - 1] for term_id in pairs[0::2]), pairs[1::2]))
+            )
+            cursor = end
+        return zone_counts
+
+    @staticmethod
+    def _contribution(zone_counts: ZoneCounts) -> Counter[str]:
+        totals: Counter[str] = Counter()
+        for counts in zone_counts.values():
+            totals.update(counts)
+        return totals
+
+    def _apply_global_delta_locked(self, totals: Counter[str], sign: int) -> None:
+        if not totals:
+            return
+        self._conn.executemany(
+            "UPDATE terms SET df = df + ?, cf = cf + ? WHERE term = ?",
+            [(sign, sign * int(cf), term) for term, cf in totals.items()],
+        )
+
+    def sync_from_db(self, db: Session, *, full_rebuild: bool = False) -> dict[str, int]:
+        """
+        Sincroniza con `document_chunks` de forma incremental.
+
+        Solo tokeniza chunks nuevos o cuyo checksum ha cambiado y descuenta de
+        DF/TF globales los borrados; `full_rebuild` reconstruye desde cero.
+        """
+        stats = {"rows_added": 0, "rows_updated": 0, "rows_removed": 0, "rows_total": 0}
+        database = self.database_identity(db)
+        with self._lock:
+            self._meta_checked_at = 0.0
+            meta = self._meta()
+            if full_rebuild or not self._is_compatible(meta, database):
+                self._clear_locked()
+            self._load_vocabulary_locked()
+            indexed = {
+                int(chunk_id): (int(checksum), blob)
+                for chunk_id, checksum, blob in self._conn.execute(
+                    "SELECT chunk_id, checksum, zone_tf FROM chunk_terms"
+                ).fetchall()
+            }
+            db_ids = sorted(
+                int(row[0]) for row in db.execute(text("SELECT id FROM document_chunks")).fetchall()
+            )
+            removed_ids = set(indexed) - set(db_ids)
+            for removed_id in removed_ids:
+                _checksum, blob = indexed.pop(removed_id)
+                self._apply_global_delta_locked(self._contribution(self._decode_locked(blob)), -1)
+            if removed_ids:
+                self._conn.executemany(
+                    "DELETE FROM chunk_terms WHERE chunk_id = ?",
+                    [(chunk_id,) for chunk_id in removed_ids],
+                )
+                stats["rows_removed"] = len(removed_ids)
+
+            for start in range(0, len(db_ids), self.SYNC_BATCH_SIZE):
+                batch = db_ids[start : start + self.SYNC_BATCH_SIZE]
+                chunks = (
+                    db.query(DocumentChunk)
+                    .options(joinedload(DocumentChunk.document))
+                    .filter(DocumentChunk.id.in_(batch))
+                    .all()
+                )
+                rows: list[tuple[int, int, int, bytes]] = []
+                for chunk in chunks:
+                    chunk_id = chunk.id
+                    if chunk_id is None:
+                        continue
+                    zone_texts = extract_chunk_zone_texts(chunk)
+                    checksum = zone_texts_checksum(zone_texts)
+                    previous = indexed.get(chunk_id)
+                    if previous is not None and previous[0] == checksum:
+                        continue
+                    if previous is not None:
+                        self._apply_global_delta_locked(
+                            self._contribution(self._decode_locked(previous[1])), -1
+                        )
+                        stats["rows_updated"] += 1
+                    else:
+                        stats["rows_added"] += 1
+                    zone_counts = count_zone_terms(zone_texts)
+                    blob = self._encode_locked(zone_counts)
+                    self._apply_global_delta_locked(self._contribution(zone_counts), 1)
+                    rows.append((chunk_id, checksum, sum(zone_counts["body"].values()), blob))
+                    indexed[chunk_id] = (checksum, blob)
+                if rows:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO chunk_terms "
+                        "(chunk_id, checksum, body_length, zone_tf) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+            total_cf = int(
+                self._conn.execute("SELECT COALESCE(SUM(cf), 0) FROM terms").fetchone()[0]
+            )
+            self._write_meta_locked(
+                {
+                    "format_version": self.FORMAT_VERSION,
+                    "tokenizer": self.TOKENIZER_SIGNATURE,
+                    "database": database,
+                    "chunks": len(indexed),
+                    "total_cf": total_cf,
+                    "updated_at": time.time(),
+                }
+            )
+            self._conn.commit()
+            self._meta_cache = {}
+            stats["rows_total"] = len(indexed)
+        return stats
+
+    def lookup(
+        self,
+        entries: Sequence[tuple[int, int]],
+    ) -> tuple[dict[int, tuple[ZoneCounts, int]], int]:
+        """
+        Lee frecuencias por zona para `(chunk_id, checksum)`.
+
+        Devuelve `({chunk_id: (zone_counts, body_length)}, filas_obsoletas)`;
+        los chunks ausentes u obsoletos no aparecen y deben tokenizarse.
+        """
+        expected = {int(chunk_id): int(checksum) for chunk_id, checksum in entries}
+        found: dict[int, tuple[ZoneCounts, int]] = {}
+        stale = 0
+        if not expected:
+            return found, stale
+        ids = list(expected)
+        with self._lock:
+            self._meta()
+            for start in range(0, len(ids), self.LOOKUP_CHUNK_SIZE):
+                batch = ids[start : start + self.LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._conn.execute(
+                    "SELECT chunk_id, checksum, body_length, zone_tf FROM chunk_terms "
+                    f"WHERE chunk_id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for chunk_id, checksum, body_length, blob in rows:
+                    if int(checksum) != expected[int(chunk_id)]:
+                        stale += 1
+                        continue
+                    found[int(chunk_id)] = (self._decode_locked(blob), int(body_length))
+        return found, stale
+
+    def global_stats(self, terms: Iterable[str]) -> tuple[int, dict[str, int], dict[str, int], int]:
+        """`(n_chunks, df_por_termino, cf_por_termino, cf_total)` del corpus indexado."""
+        unique_terms = list(dict.fromkeys(terms))
+        df_by_term: dict[str, int] = {term: 0 for term in unique_terms}
+        cf_by_term: dict[str, int] = {term: 0 for term in unique_terms}
+        with self._lock:
+            meta = self._meta()
+            if unique_terms:
+                placeholders = ",".join("?" for _ in unique_terms)
+                for term, df_value, cf_value in self._conn.execute(
+                    f"SELECT term, df, cf FROM terms WHERE term IN ({placeholders})",
+                    unique_terms,
+                ).fetchall():
+                    df_by_term[str(term)] = int(df_value)
+                    cf_by_term[str(term)] = int(cf_value)
+            return (
+                int(meta.get("chunks", "0") or 0),
+                df_by_term,
+                cf_by_term,
+                int(meta.get("total_cf", "0") or 0),
+            )
+
+    def describe(self) -> dict[str, Any]:
+        with self._lock:
+            meta = self._read_meta_locked()
+            vocab_size = int(self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0])
+        return {
+            "path": str(self.path),
+            "format_version": int(meta.get("format_version", "0") or 0),
+            "tokenizer": meta.get("tokenizer", ""),
+            "chunks": int(meta.get("chunks", "0") or 0),
+            "vocab_size": vocab_size,
+            "total_cf": int(meta.get("total_cf", "0") or 0),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:  # pragma: no cover - defensivo
+                pass
@@ -0,0 +1,596 @@
+"""
+Indice vectorial persistente para chunks RAG.
+
+Mantiene una matriz float32 contigua y L2-normalizada (memory-mapped desde disco)
+indexada por `chunk_id`, con el CRC32 del embedding de cada fila para detectar
+chunks reemplazados aunque SQLite reutilice su id. La busqueda top-k se resuelve
+con un unico producto matriz-vector y `argpartition`; opcionalmente se usa un
+particionado IVF (k-means esferico) para busqueda aproximada sobre corpus grandes.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - fallback defensivo
+    np = None  # type: ignore[assignment]
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkVectorIndex:
+    """Matriz de embeddings de chunks con busqueda top-k vectorizada."""
+
+    FORMAT_VERSION = 2
+    SYNC_BATCH_SIZE = 512
+    IVF_TRAIN_ITERATIONS = 8
+    IVF_SAMPLE_PER_LIST = 64
+    _shared_instances: dict[tuple[str, str], ChunkVectorIndex] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, *, index_dir: Path | str, model: str):
+        self.index_dir = Path(index_dir)
+        self.model = str(model or "").strip() or "default"
+        self._slug = re.sub(r"[^a-z0-9]+", "_", self.model.lower()).strip("_") or "default"
+        self._lock = threading.RLock()
+        self._signature: tuple[int, int] | None = None
+        self._meta: dict[str, Any] = {}
+        self._matrix: Any = None
+        self._ids: Any = None
+        self._alive: Any = None
+        self._checksums: Any = None
+        self._centroids: Any = None
+        self._assignments: Any = None
+        self._row_by_id: dict[int, int] = {}
+
+    @classmethod
+    def get_shared(
+        cls,
+        model: str,
+        *,
+        index_dir: Optional[Path | str] = None,
+    ) -> ChunkVectorIndex:
+        resolved_dir = Path(index_dir or settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR)
+        cache_key = (str(resolved_dir.resolve()), str(model or ""))
+        with cls._shared_lock:
+            instance = cls._shared_instances.get(cache_key)
+            if instance is None:
+                instance = cls(index_dir=resolved_dir, model=model)
+                cls._shared_instances[cache_key] = instance
+            return instance
+
+    @classmethod
+    def reset_shared(cls) -> None:
+        with cls._shared_lock:
+            cls._shared_instances.clear()
+
+    @staticmethod
+    def is_available() -> bool:
+        return np is not None
+
+    def _path(self, suffix: str) -> Path:
+        return self.index_dir / f"{self._slug}.{suffix}"
+
+    def _reset_state(self) -> None:
+        self._signature = None
+        self._meta = {}
+        self._matrix = None
+        self._ids = None
+        self._alive = None
+        self._checksums = None
+        self._centroids = None
+        self._assignments = None
+        self._row_by_id = {}
+
+    def _refresh(self) -> bool:
+        """Recarga el indice si otro proceso (ingesta) lo ha modificado."""
+        meta_path = self._path("meta.json")
+        try:
+            stat = meta_path.stat()
+        except OSError:
+            self._reset_state()
+            return False
+        signature = (int(stat.st_mtime_ns), int(stat.st_size))
+        if signature == self._signature:
+            return self._matrix is not None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Metadatos de indice vectorial ilegibles: %s", exc)
+            self._reset_state()
+            return False
+        self._reset_state()
+        self._signature = signature
+        self._meta = meta
+        if (
+            int(meta.get("format_version", 0)) != self.FORMAT_VERSION
+            or str(meta.get("model", "")) != self.model
+        ):
+            return False
+        rows = int(meta.get("rows", 0))
+        dim = int(meta.get("dim", 0))
+        if rows <= 0 or dim <= 0:
+            return False
+        self._matrix = np.memmap(
+            self._path("vectors.f32"),
+            dtype=np.float32,
+            mode="r",
+            shape=(rows, dim),
+        )
+        self._ids = np.fromfile(self._path("ids.i64"), dtype=np.int64, count=rows)
+        self._alive = np.fromfile(
+            self._path("alive.u8"),
+            dtype=np.uint8,
+            count=rows,
+        ).astype(bool)
+        self._checksums = np.fromfile(self._path("crc.u32"), dtype=np.uint32, count=rows)
+        nlist = int(meta.get("ivf_nlist", 0))
+        if nlist > 0:
+            self._centroids = np.fromfile(
+                self._path("centroids.f32"),
+                dtype=np.float32,
+                count=nlist * dim,
+            ).reshape(nlist, dim)
+            self._assignments = np.fromfile(
+                self._path("assign.i32"),
+                dtype=np.int32,
+                count=rows,
+            )
+        self._row_by_id = {
+            int(chunk_id): row
+            for row, chunk_id in enumerate(self._ids.tolist())
+            if self._alive[row]
+        }
+        return True
+
+    def _write_meta(self, meta: dict[str, Any]) -> None:
+        meta_path = self._path("meta.json")
+        tmp_path = meta_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(meta, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, meta_path)
+
+    def _remove_files(self) -> None:
+        # Suelta los memmaps antes de borrar (Windows no permite unlink de ficheros mapeados).
+        self._reset_state()
+        for suffix in (
+            "meta.json",
+            "vectors.f32",
+            "ids.i64",
+            "alive.u8",
+            "crc.u32",
+            "centroids.f32",
+            "assign.i32",
+        ):
+            try:
+                self._path(suffix).unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as exc:  # pragma: no cover - depende del sistema de ficheros
+                logger.warning("No se pudo borrar fichero de indice vectorial: %s", exc)
+
+    @staticmethod
+    def _embedding_checksum(blob: bytes | None) -> int:
+        return zlib.crc32(blob or b"")
+
+    @staticmethod
+    def _decode_embedding(blob: bytes | None, dim: int) -> Any:
+        if not blob or len(blob) % 4 != 0:
+            return None
+        vector = np.frombuffer(blob, dtype=np.float32)
+        if vector.size == 0 or (dim and vector.size != dim):
+            return None
+        norm = float(np.linalg.norm(vector))
+        if not np.isfinite(norm) or norm <= 0:
+            return None
+        return vector / norm
+
+    def _nearest_centroids(self, vectors: Any) -> Any:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _append_rows(self, ids: list[int], vectors: list[Any], checksums: list[int]) -> None:
+        matrix = np.vstack(vectors).astype(np.float32, copy=False)
+        with open(self._path("vectors.f32"), "ab") as handle:
+            handle.write(matrix.tobytes())
+        with open(self._path("ids.i64"), "ab") as handle:
+            handle.write(np.asarray(ids, dtype=np.int64).tobytes())
+        with open(self._path("alive.u8"), "ab") as handle:
+            handle.write(np.ones(len(ids), dtype=np.uint8).tobytes())
+        with open(self._path("crc.u32"), "ab") as handle:
+            handle.write(np.asarray(checksums, dtype=np.uint32).tobytes())
+        if self._centroids is not None:
+            with open(self._path("assign.i32"), "ab") as handle:
+                handle.write(self._nearest_centroids(matrix).tobytes())
+
+    def _mark_removed(self, rows: list[int]) -> None:
+        if not rows:
+            return
+        alive = np.memmap(
+            self._path("alive.u8"),
+            dtype=np.uint8,
+            mode="r+",
+            shape=(int(self._meta.get("rows", 0)),),
+        )
+        alive[np.asarray(rows, dtype=np.int64)] = 0
+        alive.flush()
+        del alive
+
+    def _rewrite_compacted(self, dim: int) -> dict[str, Any]:
+        """Reescribe el indice solo con filas vivas (tras muchos tombstones)."""
+        alive_rows = np.flatnonzero(self._alive)
+        ids = np.asarray(self._ids[alive_rows], dtype=np.int64)
+        matrix = np.asarray(self._matrix[alive_rows], dtype=np.float32)
+        checksums = np.asarray(self._checksums[alive_rows], dtype=np.uint32)
+        self._remove_files()
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        matrix.tofile(self._path("vectors.f32"))
+        ids.tofile(self._path("ids.i64"))
+        np.ones(len(ids), dtype=np.uint8).tofile(self._path("alive.u8"))
+        checksums.tofile(self._path("crc.u32"))
+        return self._build_meta(rows=len(ids), alive_rows=len(ids), dim=dim, nlist=0)
+
+    def _train_ivf(self, dim: int) -> int:
+        """Entrena particiones IVF (k-means esferico) sobre las filas vivas."""
+        alive_rows = np.flatnonzero(self._alive)
+        n_rows = int(alive_rows.size)
+        nlist = min(
+            int(settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST),
+            max(1, int(n_rows**0.5)),
+        )
+        if nlist < 2:
+            return 0
+        rng = np.random.default_rng(13)
+        sample_size = min(n_rows, nlist * self.IVF_SAMPLE_PER_LIST)
+        sample_rows = np.sort(rng.choice(alive_rows, size=sample_size, replace=False))
+        sample = np.asarray(self._matrix[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(self.IVF_TRAIN_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(nlist):
+                members = sample[assign == list_id]
+                if members.size == 0:
+                    continue
+                center = members.sum(axis=0)
+                norm = float(np.linalg.norm(center))
+                if norm > 0:
+                    centroids[list_id] = center / norm
+        total_rows = int(self._matrix.shape[0])
+        assignments = np.empty(total_rows, dtype=np.int32)
+        block = 65536
+        for start in range(0, total_rows, block):
+            stop = min(total_rows, start + block)
+            assignments[start:stop] = np.argmax(
+                np.asarray(self._matrix[start:stop]) @ centroids.T,
+                axis=1,
+            )
+        centroids.astype(np.float32).tofile(self._path("centroids.f32"))
+        assignments.tofile(self._path("assign.i32"))
+        return nlist
+
+    def _build_meta(self, *, rows: int, alive_rows: int, dim: int, nlist: int) -> dict[str, Any]:
+        return {
+            "format_version": self.FORMAT_VERSION,
+            "model": self.model,
+            "dim": int(dim),
+            "rows": int(rows),
+            "alive_rows": int(alive_rows),
+            "ivf_nlist": int(nlist),
+            "updated_at": time.time(),
+        }
+
+    def sync_from_db(self, db: Session, *, full_rebuild: bool = False) -> dict[str, int]:
+        """
+        Sincroniza el indice con `document_chunks` de forma incremental.
+
+        Solo decodifica embeddings de chunks nuevos o cuyo checksum ha cambiado
+        (ids reutilizados tras re-ingestar); las filas obsoletas y las de chunks
+        borrados se marcan como muertas. `full_rebuild` descarta el indice.
+        """
+        stats = {
+            "rows_added": 0,
+            "rows_updated": 0,
+            "rows_removed": 0,
+            "rows_skipped": 0,
+            "rows_total": 0,
+            "compacted": 0,
+            "ivf_nlist": 0,
+        }
+        if np is None:
+            stats["unavailable"] = 1
+            return stats
+        with self._lock:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            if full_rebuild:
+                self._remove_files()
+            self._refresh()
+            rows = int(self._meta.get("rows", 0)) if self._matrix is not None else 0
+            if rows == 0:
+                # Indice vacio o invalido (otro modelo/version): se parte de cero.
+                self._remove_files()
+            dim = int(self._meta.get("dim", 0)) if rows else 0
+            nlist = int(self._meta.get("ivf_nlist", 0)) if rows else 0
+
+            seen_ids: set[int] = set()
+            stale_rows: list[int] = []
+            batch_ids: list[int] = []
+            batch_vectors: list[Any] = []
+            batch_checksums: list[int] = []
+            result = db.execute(text("SELECT id, chunk_embedding FROM document_chunks ORDER BY id"))
+            for raw_id, blob in result:
+                chunk_id = int(raw_id)
+                seen_ids.add(chunk_id)
+                checksum = self._embedding_checksum(blob)
+                row = self._row_by_id.get(chunk_id)
+                if row is not None:
+                    if int(self._checksums[row]) == checksum:
+                        continue
+                    stale_rows.append(row)
+                vector = self._decode_embedding(blob, dim)
+                if vector is None:
+                    stats["rows_skipped"] += 1
+                    continue
+                dim = dim or int(vector.size)
+                batch_ids.append(chunk_id)
+                batch_vectors.append(vector)
+                batch_checksums.append(checksum)
+                if row is not None:
+                    stats["rows_updated"] += 1
+                else:
+                    stats["rows_added"] += 1
+                if len(batch_ids) >= self.SYNC_BATCH_SIZE:
+                    self._append_rows(batch_ids, batch_vectors, batch_checksums)
+                    rows += len(batch_ids)
+                    batch_ids, batch_vectors, batch_checksums = [], [], []
+            if batch_ids:
+                self._append_rows(batch_ids, batch_vectors, batch_checksums)
+                rows += len(batch_ids)
+
+            removed_rows = [
+                self._row_by_id[chunk_id] for chunk_id in set(self._row_by_id) - seen_ids
+            ]
+            self._mark_removed(removed_rows + stale_rows)
+            stats["rows_removed"] = len(removed_rows)
+
+            alive_rows = rows - (int(self._meta.get("rows", 0)) - len(self._row_by_id))
+            alive_rows -= len(removed_rows) + len(stale_rows)
+            if rows and dim:
+                self._write_meta(
+                    self._build_meta(rows=rows, alive_rows=alive_rows, dim=dim, nlist=nlist)
+                )
+                self._refresh()
+                dead_ratio = 1.0 - (alive_rows / float(rows))
+                if dead_ratio > float(settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_COMPACT_DEAD_RATIO):
+                    self._write_meta(self._rewrite_compacted(dim))
+                    self._refresh()
+                    stats["compacted"] = 1
+                    nlist = 0
+                should_train_ivf = (
+                    settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_ENABLED
+                    and nlist == 0
+                    and alive_rows
+                    >= int(settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES)
+                )
+                if should_train_ivf:
+                    nlist = self._train_ivf(dim)
+                    meta = dict(self._meta)
+                    meta["ivf_nlist"] = nlist
+                    meta["updated_at"] = time.time()
+                    self._write_meta(meta)
+                    self._refresh()
+            stats["rows_total"] = len(self._row_by_id)
+            stats["ivf_nlist"] = int(self._meta.get("ivf_nlist", 0) or 0)
+            return stats
+
+    def describe(self) -> dict[str, Any]:
+        with self._lock:
+            ready = np is not None and self._refresh()
+            return {
+                "ready": bool(ready),
+                "model": self.model,
+                "dim": int(self._meta.get("dim", 0) or 0),
+                "rows": int(self._meta.get("rows", 0) or 0),
+                "alive_rows": len(self._row_by_id),
+                "ivf_nlist": int(self._meta.get("ivf_nlist", 0) or 0),
+            }
+
+    def search(
+        self,
+        query_vector: list[float],
+        *,
+        k: int,
+        allowed_ids: Optional[Iterable[int]] = None,
+        approximate: bool = False,
+    ) -> tuple[list[tuple[int, float]], list[int], dict[str, str]]:
+        """
+        Top-k por coseno sobre el indice.
+
+        Devuelve `(scored, missing_ids, trace)`; `missing_ids` son candidatos
+        permitidos que aun no estan indexados y deben puntuarse por otra via.
+        """
+        started_at = time.perf_counter()
+        allowed = [int(item) for item in allowed_ids] if allowed_ids is not None else None
+        if np is None:
+            return (
+                [],
+                list(allowed or []),
+                {
+                    "vector_index_ready": "0",
+                    "vector_index_error": "numpy_unavailable",
+                },
+            )
+        with self._lock:
+            ready = self._refresh()
+            matrix = self._matrix
+            ids = self._ids
+            alive = self._alive
+            centroids = self._centroids
+            assignments = self._assignments
+            row_by_id = self._row_by_id
+        if not ready:
+            return [], list(allowed or []), {"vector_index_ready": "0"}
+
+        trace = {
+            "vector_index_ready": "1",
+            "vector_index_rows": str(len(row_by_id)),
+        }
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != matrix.shape[1]:
+            trace["vector_index_ready"] = "0"
+            trace["vector_index_error"] = "dimension_mismatch"
+            return [], list(allowed or []), trace
+        query_norm = float(np.linalg.norm(query))
+        if query_norm <= 0:
+            trace["vector_index_error"] = "zero_query_norm"
+            return [], [], trace
+        query = query / query_norm
+
+        missing: list[int] = []
+        if allowed is not None:
+            allowed_rows: list[int] = []
+            for chunk_id in allowed:
+                row = row_by_id.get(chunk_id)
+                if row is None:
+                    missing.append(chunk_id)
+                else:
+                    allowed_rows.append(row)
+            rows = np.asarray(allowed_rows, dtype=np.int64)
+        else:
+            rows = np.flatnonzero(alive)
+
+        mode = "exact"
+        if approximate and centroids is not None and assignments is not None and rows.size:
+            nprobe = max(
+                1,
+                min(int(settings.CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE), len(centroids)),
+            )
+            centroid_scores = centroids @ query
+            probes = np.argpartition(centroid_scores, -nprobe)[-nprobe:]
+            rows = rows[np.isin(assignments[rows], probes)]
+            mode = "ivf"
+            trace["vector_index_nprobe"] = str(nprobe)
+        trace["vector_index_mode"] = mode
+        trace["vector_index_missing"] = str(len(missing))
+        trace["vector_index_scored"] = str(int(rows.size))
+        if rows.size == 0:
+            trace["vector_index_latency_ms"] = str(
+                round((time.perf_counter() - started_at) * 1000, 2)
+            )
+            return [], missing, trace
+
+        if rows.size * 2 >= matrix.shape[0]:
+            # Con pools grandes es mas barato un unico GEMV sobre la matriz contigua.
+            scores = np.asarray(matrix @ query)[rows]
+        else:
+            scores = np.asarray(matrix[rows] @ query)
+        top_n = max(1, min(int(k), int(rows.size)))
+        if top_n < rows.size:
+            top_positions = np.argpartition(scores, -top_n)[-top_n:]
+        else:
+            top_positions = np.arange(rows.size)
+        top_positions = top_positions[np.argsort(scores[top_positions])[::-1]]
+        scored = [
+            (int(ids[rows[position]]), max(0.0, min(1.0, float(scores[position]))))
+            for position in top_positions
+        ]
+        trace["vector_index_latency_ms"] = str(round((time.perf_counter() - started_at) * 1000, 2))
+        return scored, missing, trace
+
+    def search_many(
+        self,
+        query_vectors: list[list[float]],
+        *,
+        k: int,
+        allowed_ids: list[Iterable[int]],
+    ) -> list[tuple[list[tuple[int, float]], list[int], dict[str, str]]]:
+        """
+        Top-k exacto de varias consultas con un unico producto matriz-matriz.
+
+        Cada consulta tiene su propio conjunto de ids permitidos; se puntua la
+        union de filas una sola vez y luego se reparte por consulta. Devuelve
+        una tupla `(scored, missing_ids, trace)` por consulta, como `search`.
+        """
+        started_at = time.perf_counter()
+        allowed_lists = [[int(item) for item in ids] for ids in allowed_ids]
+        if np is None:
+            unavailable = {"vector_index_ready": "0", "vector_index_error": "numpy_unavailable"}
+            return [([], allowed, dict(unavailable)) for allowed in allowed_lists]
+        with self._lock:
+            ready = self._refresh()
+            matrix = self._matrix
+            ids = self._ids
+            row_by_id = self._row_by_id
+        if not ready:
+            return [([], allowed, {"vector_index_ready": "0"}) for allowed in allowed_lists]
+
+        results: list[tuple[list[tuple[int, float]], list[int], dict[str, str]]] = []
+        active: list[tuple[int, Any, list[int], dict[str, str]]] = []
+        columns: list[Any] = []
+        for position, (query_vector, allowed) in enumerate(
+            zip(query_vectors, allowed_lists, strict=True)
+        ):
+            trace = {
+                "vector_index_ready": "1",
+                "vector_index_rows": str(len(row_by_id)),
+                "vector_index_mode": "exact_batched",
+            }
+            query = np.asarray(query_vector, dtype=np.float32)
+            if query.ndim != 1 or query.shape[0] != matrix.shape[1]:
+                trace["vector_index_ready"] = "0"
+                trace["vector_index_error"] = "dimension_mismatch"
+                results.append(([], allowed, trace))
+                continue
+            query_norm = float(np.linalg.norm(query))
+            if query_norm <= 0:
+                trace["vector_index_error"] = "zero_query_norm"
+                results.append(([], [], trace))
+                continue
+            missing = [chunk_id for chunk_id in allowed if chunk_id not in row_by_id]
+            rows = np.asarray(
+                [row_by_id[chunk_id] for chunk_id in allowed if chunk_id in row_by_id],
+                dtype=np.int64,
+            )
+            trace["vector_index_missing"] = str(len(missing))
+            trace["vector_index_scored"] = str(int(rows.size))
+            results.append(([], missing, trace))
+            if rows.size:
+                active.append((position, rows, missing, trace))
+                columns.append(query / query_norm)
+
+        if active:
+            union_rows = np.unique(np.concatenate([rows for _, rows, _, _ in active]))
+            scores_matrix = np.asarray(matrix[union_rows] @ np.stack(columns, axis=1))
+            for column, (position, rows, missing, trace) in enumerate(active):
+                scores = scores_matrix[np.searchsorted(union_rows, rows), column]
+                top_n = max(1, min(int(k), int(rows.size)))
+                if top_n < rows.size:
+                    top_positions = np.argpartition(scores, -top_n)[-top_n:]
+                else:
+                    top_positions = np.arange(rows.size)
+                top_positions = top_positions[np.argsort(scores[top_positions])[::-1]]
+                scored = [
+                    (int(ids[rows[index]]), max(0.0, min(1.0, float(scores[index]))))
+                    for index in top_positions
+                ]
+                results[position] = (scored, missing, trace)
+            trace_union = str(int(union_rows.size))
+        else:
+            trace_union = "0"
+        latency_ms = str(round((time.perf_counter() - started_at) * 1000, 2))
+        for _scored, _missing, trace in results:
+            trace.setdefault("vector_index_latency_ms", latency_ms)
+            trace["vector_index_batch_queries"] = str(len(results))
+            trace["vector_index_batch_union_rows"] = trace_union
+        return results
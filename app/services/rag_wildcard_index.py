@@ -0,0 +1,133 @@
+"""
+Indice k-gram del vocabulario FTS para operandos comodin (`hipo*`, `*itis`, `a*emia`).
+
+Cada termino se indexa por los k-gramas de `$termino$` y, ademas, por sus
+prefijos/sufijos anclados mas cortos que k (`$h`, `a$`), de modo que cualquier
+segmento anclado aporta al menos un gramo. Los ids de termino se asignan en
+orden de frecuencia documental descendente, asi que todas las listas quedan
+ordenadas por DF: la consulta recorre la lista del gramo mas selectivo del
+patron, postfiltra con su expresion regular y se detiene al reunir `limit`
+terminos, que ya son los mas frecuentes. Los segmentos interiores mas cortos
+que k (`*ab*`) se resuelven con unigramas.
+"""
+from __future__ import annotations
+
+import re
+import time
+from array import array
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+
+def _glob_regex(pattern: str) -> re.Pattern[str]:
+    return re.compile("^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$")
+
+
+class WildcardIndex:
+    """Lista invertida k-grama -> ids de termino (ordenados por DF)."""
+
+    def __init__(self, *, k: int, terms: list[str], doc_freq: list[int]):
+        self.k = int(k)
+        self._terms = terms
+        self._doc_freq = doc_freq
+        self._grams: dict[str, array] = {}
+        self.built_at = time.time()
+
+    @classmethod
+    def build(cls, terms: Iterable[str], doc_freq: dict[str, int], *, k: int) -> WildcardIndex:
+        ordered = sorted(set(terms), key=lambda term: (-int(doc_freq.get(term, 0)), term))
+        index = cls(k=k, terms=ordered, doc_freq=[int(doc_freq.get(term, 0)) for term in ordered])
+        grams = index._grams
+        for term_id, term in enumerate(ordered):
+            for gram in index._term_grams(term):
+                bucket = grams.get(gram)
+                if bucket is None:
+                    bucket = grams[gram] = array("I")
+                bucket.append(term_id)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _term_grams(self, term: str) -> set[str]:
+        k = self.k
+        padded = f"${term}$"
+        grams = {padded[index : index + k] for index in range(max(1, len(padded) - k + 1))}
+        for length in range(1, min(k - 1, len(term) + 1)):
+            grams.add(f"${term[:length]}")
+            grams.add(f"{term[-length:]}$")
+        # Unigramas para segmentos interiores mas cortos que k (`*x*`).
+        grams.update(term)
+        return grams
+
+    def _pattern_grams(self, pattern: str) -> list[str]:
+        """Gramos que todo termino que case con `pattern` debe contener."""
+        k = self.k
+        segments = pattern.split("*")
+        last = len(segments) - 1
+        grams: set[str] = set()
+        for position, segment in enumerate(segments):
+            if position == 0:
+                segment = f"${segment}"
+            if position == last:
+                segment = f"{segment}$"
+            if segment in {"$", "$$"}:
+                continue
+            if len(segment) >= k:
+                grams.update(segment[index : index + k] for index in range(len(segment) - k + 1))
+            elif segment.startswith("$") != segment.endswith("$"):
+                # Segmento anclado mas corto que k: se indexo como gramo corto.
+                grams.add(segment)
+            else:
+                grams.update(segment.strip("$"))
+        return sorted(grams)
+
+    def lookup(
+        self,
+        pattern: str,
+        *,
+        limit: int,
+        min_len: Optional[int] = None,
+        max_len: Optional[int] = None,
+        stats: Optional[dict[str, Any]] = None,
+    ) -> list[tuple[str, int]]:
+        """Hasta `limit` terminos que casan con el glob, por DF descendente."""
+        limit = max(1, int(limit))
+        regex = _glob_regex(pattern)
+        grams = self._pattern_grams(pattern)
+        driver: Sequence[int] = range(len(self._terms))
+        for gram in grams:
+            bucket = self._grams.get(gram)
+            if bucket is None:
+                driver = ()
+                break
+            if len(bucket) < len(driver):
+                driver = bucket
+        # La lista mas corta basta como fuente: la regex es el filtro exacto y
+        # sale mas barata que comprobar la pertenencia al resto de listas.
+        rows: list[tuple[str, int]] = []
+        scanned = 0
+        terms = self._terms
+        for term_id in driver:
+            scanned += 1
+            term = terms[term_id]
+            if min_len is not None and len(term) < min_len:
+                continue
+            if max_len is not None and len(term) > max_len:
+                continue
+            if not regex.match(term):
+                continue
+            rows.append((term, self._doc_freq[term_id]))
+            if len(rows) >= limit:
+                break
+        if stats is not None:
+            stats.update({"grams": len(grams), "scanned": scanned, "matched": len(rows)})
+        return rows
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "terms": len(self._terms),
+            "grams": len(self._grams),
+            "postings": sum(len(bucket) for bucket in self._grams.values()),
+            "k": self.k,
+        }
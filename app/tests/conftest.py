@@ -1,4 +1,8 @@
+from array import array
+from collections.abc import Sequence
 from pathlib import Path
+from typing import Any, Union
+from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
@@ -7,6 +11,25 @@ from sqlalchemy.orm import sessionmaker
 
 from app.core.database import Base, get_db
 from app.main import app
+from app.models.clinical_document import ClinicalDocument
+from app.models.document_chunk import DocumentChunk
+from app.services.llm_answer_cache import reset_shared_llm_answer_cache
+from app.services.llm_gateway import reset_shared_llm_gateway
+from app.services.llm_token_budget import reset_shared_token_counter
+from app.services.rag_query_cache import reset_shared_query_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_singletons():
+    reset_shared_query_cache()
+    reset_shared_llm_answer_cache()
+    reset_shared_llm_gateway()
+    reset_shared_token_counter()
+    yield
+    reset_shared_query_cache()
+    reset_shared_llm_answer_cache()
+    reset_shared_llm_gateway()
+    reset_shared_token_counter()
 
 
 @pytest.fixture()
@@ -27,6 +50,58 @@ def db_session(tmp_path: Path):
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture()
+def add_chunks(db_session):
+    """
+    Siembra un documento con sus chunks y devuelve los `DocumentChunk` persistidos.
+
+    Cada elemento es el texto del chunk o un dict con `text` y, opcionalmente,
+    `vector`, `keywords`, `specialty`, `section_path` y `tokens_count`; los
+    argumentos con nombre fijan los valores por defecto del documento.
+    """
+
+    def _add(
+        chunks: Sequence[Union[str, dict[str, Any]]],
+        *,
+        title: str = "Protocolo",
+        source_file: str = "docs/95_protocolo.md",
+        specialty: str = "emergency",
+        section_path: str = "Urgencias",
+    ) -> list[DocumentChunk]:
+        document = ClinicalDocument(
+            title=title,
+            source_file=source_file,
+            specialty=specialty,
+            content_hash=uuid4().hex * 2,
+        )
+        db_session.add(document)
+        db_session.flush()
+        rows: list[DocumentChunk] = []
+        for index, item in enumerate(chunks):
+            spec = {"text": item} if isinstance(item, str) else dict(item)
+            text_value = str(spec["text"])
+            vector = spec.get("vector")
+            chunk = DocumentChunk(
+                document_id=document.id,
+                chunk_text=text_value,
+                chunk_index=index,
+                section_path=spec.get("section_path", section_path),
+                tokens_count=spec.get("tokens_count", len(text_value.split())),
+                chunk_embedding=array("f", vector).tobytes() if vector is not None else b"",
+                keywords=list(spec.get("keywords") or []),
+                custom_questions=[],
+                specialty=spec.get("specialty", specialty),
+                content_type="paragraph",
+            )
+            db_session.add(chunk)
+            db_session.flush()
+            rows.append(chunk)
+        db_session.commit()
+        return rows
+
+    return _add
+
+
 @pytest.fixture()
 def client(db_session):
     def override_get_db():
@@ -0,0 +1,128 @@
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.metrics.agent_metrics import (
+    AGENT_METRIC_SPECS,
+    AgentMetricsCollector,
+    collect_agent_metric_values,
+)
+from app.models.agent_run import AgentRun, AgentStep
+from app.models.care_task import CareTask
+from app.models.care_task_triage_audit_log import CareTaskTriageAuditLog
+from app.services.agent_run_service import AgentRunService
+from app.services.care_task_service import CareTaskService
+
+
+def _seed(db_session) -> None:
+    task = CareTask(title="Caso metricas")
+    db_session.add(task)
+    db_session.flush()
+    runs = [
+        AgentRun(
+            workflow_name="critical_ops_support_v1",
+            status="completed",
+            run_input={},
+            run_output={"critical_ops": {"critical_alerts": ["a", "b"]}},
+        ),
+        AgentRun(
+            workflow_name="critical_ops_support_v1",
+            status="completed",
+            run_output={"critical_ops": {"critical_alerts": "no-lista"}},
+            run_input={},
+        ),
+        AgentRun(
+            workflow_name="advanced_screening_support_v1",
+            status="completed",
+            run_input={},
+            run_output={"advanced_screening": {"alerts_generated_total": 3}},
+        ),
+        AgentRun(workflow_name="critical_ops_support_v1", status="failed", run_input={}),
+        AgentRun(workflow_name="triage_v1", status="completed", run_input={}),
+    ]
+    db_session.add_all(runs)
+    db_session.flush()
+    db_session.add_all(
+        [
+            AgentStep(
+                run_id=runs[0].id,
+                step_order=1,
+                step_name="rules",
+                status="completed",
+                step_input={},
+                fallback_used=True,
+            ),
+            CareTaskTriageAuditLog(
+                care_task_id=task.id,
+                agent_run_id=runs[4].id,
+                ai_recommended_level=2,
+                human_validated_level=1,
+                classification="under_triage",
+            ),
+        ]
+    )
+    db_session.commit()
+
+
+def test_snapshot_matches_per_summary_service_values(db_session):
+    _seed(db_session)
+
+    values = collect_agent_metric_values(db_session)
+
+    ops = AgentRunService.get_ops_summary(db=db_session)
+    workflow = AgentRunService.get_ops_summary(
+        db=db_session, workflow_name="critical_ops_support_v1"
+    )
+    triage = CareTaskService.get_triage_audit_summary(db=db_session)
+    scorecard = CareTaskService.get_quality_scorecard(db=db_session)
+    for key in ("total_runs", "completed_runs", "failed_runs", "fallback_steps"):
+        assert values[("ops", key)] == ops[key]
+    assert values[("ops", "fallback_rate_percent")] == ops["fallback_rate_percent"]
+    assert values[("workflow", "critical_ops_support_v1", "total_runs")] == workflow["total_runs"]
+    assert (
+        values[("workflow", "critical_ops_support_v1", "completed_runs")]
+        == workflow["completed_runs"]
+    )
+    critical_alerts = (
+        "workflow_list_length_sum",
+        "critical_ops_support_v1",
+        "critical_ops",
+        "critical_alerts",
+    )
+    assert values[critical_alerts] == 2.0
+    generated = (
+        "workflow_output_sum",
+        "advanced_screening_support_v1",
+        "advanced_screening",
+        "alerts_generated_total",
+    )
+    assert values[generated] == 3.0
+    assert values[("audit", "triage", "under_triage")] == triage["under_triage"]
+    assert values[("quality", "under_rate_percent")] == scorecard["under_rate_percent"]
+
+
+def test_collector_shares_snapshot_within_ttl(db_session, monkeypatch):
+    _seed(db_session)
+    engine = db_session.get_bind()
+    statements: list[str] = []
+
+    def _count(*args):
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        monkeypatch.setattr(settings, "AGENT_METRICS_SNAPSHOT_TTL_SECONDS", 60.0)
+        collector = AgentMetricsCollector(sessionmaker(bind=engine))
+        first = {family.name: family.samples[0].value for family in collector.collect()}
+        queries_per_snapshot = len(statements)
+        second = {family.name: family.samples[0].value for family in collector.collect()}
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert len(first) == len(AGENT_METRIC_SPECS) + 3
+    assert first["critical_ops_support_runs_total"] == 3.0
+    assert first["critical_ops_support_critical_alerts_total"] == 2.0
+    assert first["triage_audit_under_total"] == 1.0
+    assert queries_per_snapshot < 60
+    assert len(statements) == queries_per_snapshot
+    assert second["agent_runs_total"] == first["agent_runs_total"]
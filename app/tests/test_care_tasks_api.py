@@ -5661,6 +5661,115 @@ def test_create_care_task_chat_message_async_enqueues_job(client, monkeypatch):
     assert payload["poll_after_ms"] >= 250
 
 
+def test_create_care_task_chat_message_async_returns_429_when_queue_is_full(client, monkeypatch):
+    from app.services.clinical_chat_async_service import (
+        ClinicalChatAsyncService,
+        ClinicalChatQueueFullError,
+    )
+
+    create_task = client.post(
+        "/api/v1/care-tasks/",
+        json={
+            "title": "Caso async cola llena",
+            "clinical_priority": "low",
+            "specialty": "general",
+            "sla_target_minutes": 240,
+            "human_review_required": True,
+            "completed": False,
+        },
+    )
+    assert create_task.status_code == 201
+    task_id = create_task.json()["id"]
+
+    def fake_enqueue_job(*, care_task_id, payload, authenticated_user):
+        raise ClinicalChatQueueFullError(queued=200, limit=200, retry_after_seconds=9)
+
+    monkeypatch.setattr(ClinicalChatAsyncService, "enqueue_job", staticmethod(fake_enqueue_job))
+
+    response = client.post(
+        f"/api/v1/care-tasks/{task_id}/chat/messages/async",
+        json={"query": "Consulta rutinaria en segundo plano."},
+    )
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "9"
+
+
+def test_stream_care_task_chat_message_emits_stages_tokens_and_final_message(client, monkeypatch):
+    import json
+
+    from app.core.config import settings
+    from app.services.llm_gateway import reset_shared_llm_gateway
+
+    class _FakeStreamResponse:
+        def __init__(self, lines: list[dict]):
+            self._lines = [json.dumps(line).encode("utf-8") + b"\n" for line in lines]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def __iter__(self):
+            return iter(self._lines)
+
+    requests: list[dict] = []
+
+    def fake_urlopen(request, timeout):  # noqa: ARG001
+        requests.append(json.loads(request.data.decode("utf-8")))
+        return _FakeStreamResponse(
+            [
+                {"message": {"role": "assistant", "content": "Hola, "}, "done": False},
+                {"message": {"role": "assistant", "content": "te ayudo."}, "done": False},
+                {"done": True, "done_reason": "stop"},
+            ]
+        )
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_PROVIDER", "ollama")
+    monkeypatch.setattr("app.services.llm_chat_provider.urlopen", fake_urlopen)
+    reset_shared_llm_gateway()
+
+    create_task = client.post(
+        "/api/v1/care-tasks/",
+        json={
+            "title": "Caso chat streaming",
+            "clinical_priority": "low",
+            "specialty": "emergency",
+            "sla_target_minutes": 60,
+            "human_review_required": False,
+            "completed": False,
+        },
+    )
+    assert create_task.status_code == 201
+    task_id = create_task.json()["id"]
+
+    response = client.post(
+        f"/api/v1/care-tasks/{task_id}/chat/messages/stream",
+        json={"query": "Hola, que tal estas hoy?", "session_id": "session-stream"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events: list[tuple[str, dict]] = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    names = [name for name, _data in events]
+    assert names[0] == "stage"
+    assert names[-2:] == ["message", "done"]
+    assert "token" in names
+    assert names.index("token") < names.index("message")
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert tokens == "Hola, te ayudo."
+    assert all(request["stream"] is True for request in requests)
+    final = events[-2][1]
+    assert final["care_task_id"] == task_id
+    assert final["session_id"] == "session-stream"
+    stored = client.get(f"/api/v1/care-tasks/{task_id}/chat/messages").json()
+    assert [item["id"] for item in stored] == [final["message_id"]]
+
+
 def test_get_care_task_chat_message_async_status_returns_completed_payload(client, monkeypatch):
     from datetime import datetime, timezone
 
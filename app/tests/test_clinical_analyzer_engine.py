@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.clinical_analyzer_engine import AnalyzerStage, ClinicalAnalyzerEngine
+
+
+def _sleeping_stage(name: str, seconds: float) -> AnalyzerStage:
+    def _run():
+        time.sleep(seconds)
+        return {"enabled": True, "trace": {f"{name}_enabled": "1"}}
+
+    return AnalyzerStage(name, _run)
+
+
+@pytest.fixture(autouse=True)
+def _engine_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_PARALLEL_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_MAX_WORKERS", 8)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS", 2000)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS", 3000)
+    yield
+    ClinicalAnalyzerEngine.shutdown()
+
+
+def test_parallel_stages_take_about_the_slowest_stage():
+    stages = [_sleeping_stage(f"s{index}", 0.1) for index in range(4)]
+
+    started_at = time.perf_counter()
+    results, trace = ClinicalAnalyzerEngine.run_stages(stages)
+    elapsed = time.perf_counter() - started_at
+
+    assert elapsed < 0.3
+    assert set(results) == {"s0", "s1", "s2", "s3"}
+    assert trace["analyzer_engine_mode"] == "parallel"
+    assert trace["analyzer_skipped"] == "none"
+    assert float(trace["analyzer_s0_ms"]) >= 90.0
+
+
+def test_stage_missing_deadline_is_skipped_and_traced(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS", 50)
+
+    started_at = time.perf_counter()
+    results, trace = ClinicalAnalyzerEngine.run_stages(
+        [_sleeping_stage("fast", 0.0), _sleeping_stage("slow", 0.5)]
+    )
+
+    assert time.perf_counter() - started_at < 0.4
+    assert results["fast"]["enabled"] is True
+    assert results["slow"]["enabled"] is False
+    assert results["slow"]["skip_reason"] == "timeout"
+    # Los consumidores indexan claves de traza concretas: la omision no rompe el turno.
+    assert results["slow"]["trace"]["slow_enabled"] == "skipped"
+    assert trace["analyzer_slow_status"] == "timeout"
+    assert trace["analyzer_skipped"] == "slow"
+
+
+def test_stage_deadline_starts_when_the_stage_leaves_the_queue(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_MAX_WORKERS", 1)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS", 250)
+
+    results, trace = ClinicalAnalyzerEngine.run_stages(
+        [_sleeping_stage("math", 0.15), _sleeping_stage("risk_pipeline", 0.15)]
+    )
+
+    # Con un solo worker la segunda etapa espera en cola ~150 ms; ese tiempo
+    # no cuenta contra su presupuesto de etapa.
+    assert results["risk_pipeline"]["enabled"] is True
+    assert trace["analyzer_skipped"] == "none"
+
+
+def test_turn_budget_caps_total_wait(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_STAGE_TIMEOUT_MS", 100)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_TURN_TIMEOUT_MS", 100)
+
+    started_at = time.perf_counter()
+    _, trace = ClinicalAnalyzerEngine.run_stages(
+        [_sleeping_stage("a", 0.4), _sleeping_stage("b", 0.4)]
+    )
+
+    assert time.perf_counter() - started_at < 0.3
+    assert trace["analyzer_skipped"] == "a,b"
+
+
+def test_failing_stage_defaults_without_aborting_turn():
+    def _boom():
+        raise RuntimeError("fallo")
+
+    results, trace = ClinicalAnalyzerEngine.run_stages(
+        [AnalyzerStage("broken", _boom), _sleeping_stage("ok", 0.0)]
+    )
+
+    assert results["broken"]["skip_reason"] == "error"
+    assert results["ok"]["enabled"] is True
+    assert trace["analyzer_broken_status"] == "error"
+
+
+def test_sequential_mode_keeps_order_and_reports_timings(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ANALYZER_PARALLEL_ENABLED", False)
+    calls = []
+    stages = [
+        AnalyzerStage(name, lambda name=name: calls.append(name) or {"enabled": True})
+        for name in ("math", "vector", "svm_triage")
+    ]
+
+    results, trace = ClinicalAnalyzerEngine.run_stages(stages)
+
+    assert calls == ["math", "vector", "svm_triage"]
+    assert list(results) == ["math", "vector", "svm_triage"]
+    assert trace["analyzer_engine_mode"] == "sequential"
+    assert "analyzer_vector_ms" in trace
@@ -0,0 +1,177 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.care_task import CareTask
+from app.models.clinical_chat_job import ClinicalChatJob
+from app.schemas.clinical_chat import CareTaskClinicalChatMessageRequest
+from app.services.clinical_chat_async_service import (
+    ClinicalChatAsyncService,
+    ClinicalChatQueueFullError,
+    _utcnow,
+)
+from app.services.clinical_chat_service import ClinicalChatService
+
+
+@pytest.fixture
+def async_service(db_session, monkeypatch):
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+    monkeypatch.setattr(ClinicalChatAsyncService, "_session_factory", factory)
+    monkeypatch.setattr(ClinicalChatAsyncService, "_stats", {})
+    monkeypatch.setattr(ClinicalChatAsyncService, "_last_maintenance_monotonic", 0.0)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_POLL_SECONDS", 0.05)
+    yield ClinicalChatAsyncService
+    ClinicalChatAsyncService.shutdown(timeout=5.0)
+
+
+@pytest.fixture
+def no_workers(monkeypatch):
+    monkeypatch.setattr(
+        ClinicalChatAsyncService, "_ensure_workers_started", classmethod(lambda cls: None)
+    )
+
+
+def _add_task(db_session, clinical_priority: str) -> int:
+    task = CareTask(title=f"Caso {clinical_priority}", clinical_priority=clinical_priority)
+    db_session.add(task)
+    db_session.commit()
+    assert task.id is not None
+    return task.id
+
+
+def _enqueue(service, care_task_id: int, query: str = "Dolor toracico") -> dict:
+    return service.enqueue_job(
+        care_task_id=care_task_id,
+        payload=CareTaskClinicalChatMessageRequest(query=query),
+        authenticated_user=None,
+    )
+
+
+def test_workers_claim_jobs_by_clinical_priority(async_service, db_session, no_workers):
+    low = _enqueue(async_service, _add_task(db_session, "low"))
+    critical = _enqueue(async_service, _add_task(db_session, "critical"))
+    medium = _enqueue(async_service, _add_task(db_session, "medium"))
+
+    claimed = [async_service._claim_next_job(worker_id="w1") for _ in range(3)]
+
+    assert claimed == [critical["job_id"], medium["job_id"], low["job_id"]]
+    assert async_service._claim_next_job(worker_id="w2") is None
+    status = async_service.get_job_status(job_id=critical["job_id"])
+    assert status["status"] == "running"
+    assert status["priority"] == 0
+    assert status["attempts"] == 1
+    assert status["queue_wait_ms"] is not None
+
+
+def test_full_queue_rejects_routine_jobs_but_admits_critical(
+    async_service, db_session, monkeypatch, no_workers
+):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_MAX_QUEUED_JOBS", 1)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_RETRY_AFTER_SECONDS", 7)
+    routine_task = _add_task(db_session, "low")
+    _enqueue(async_service, routine_task)
+
+    with pytest.raises(ClinicalChatQueueFullError) as exc_info:
+        _enqueue(async_service, routine_task)
+    critical = _enqueue(async_service, _add_task(db_session, "critical"))
+
+    assert exc_info.value.retry_after_seconds == 7
+    assert critical["status"] == "queued"
+    snapshot = async_service.metrics_snapshot()
+    assert snapshot["rejected"] == 1
+    assert snapshot["enqueued"] == 2
+    assert snapshot["depth"]["queued"] == 2
+
+
+def test_expired_lease_is_requeued_then_failed_after_max_attempts(
+    async_service, db_session, monkeypatch, no_workers
+):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_MAX_ATTEMPTS", 2)
+    job = _enqueue(async_service, _add_task(db_session, "high"))
+
+    def _expire_lease():
+        row = db_session.query(ClinicalChatJob).filter_by(job_id=job["job_id"]).one()
+        row.lease_expires_at = _utcnow() - timedelta(seconds=1)
+        db_session.commit()
+
+    assert async_service._claim_next_job(worker_id="node-a") == job["job_id"]
+    _expire_lease()
+    assert async_service.resume_pending_jobs() == 1
+    # Otro nodo reclama el trabajo reencolado; el resultado tardio del primero se descarta.
+    assert async_service._claim_next_job(worker_id="node-b") == job["job_id"]
+    _expire_lease()
+    async_service._run_maintenance(db_session, now=_utcnow(), force=True)
+
+    status = async_service.get_job_status(job_id=job["job_id"])
+    assert status["status"] == "failed"
+    assert status["error"] == "lease_expired"
+    assert status["attempts"] == 2
+
+
+def test_worker_pool_completes_persisted_job(async_service, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_WORKERS", 2)
+
+    def fake_create_message(*, db, care_task, payload, authenticated_user):
+        message = SimpleNamespace(id=41, session_id=payload.session_id)
+        return (
+            message,
+            7,
+            "care_task_clinical_chat_v1",
+            ["llm_used=true"],
+            "clinical",
+            "chat",
+            {"quality_status": "ok"},
+            {},
+            [],
+        )
+
+    monkeypatch.setattr(ClinicalChatService, "create_message", staticmethod(fake_create_message))
+    job = _enqueue(async_service, _add_task(db_session, "medium"))
+
+    deadline = time.monotonic() + 5
+    status = async_service.get_job_status(job_id=job["job_id"])
+    while status["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.02)
+        status = async_service.get_job_status(job_id=job["job_id"])
+
+    assert status["status"] == "completed"
+    assert status["message_id"] == 41
+    assert status["session_id"] == job["session_id"]
+    assert status["llm_used"] is True
+    assert status["run_ms"] is not None
+    snapshot = async_service.metrics_snapshot()
+    assert snapshot["workers"] == 2
+    assert snapshot["completed"] == 1
+    assert snapshot["depth"]["completed"] == 1
+
+
+def test_long_running_job_renews_its_lease_and_is_not_replayed(
+    async_service, db_session, monkeypatch
+):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_WORKERS", 2)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_ASYNC_JOB_LEASE_SECONDS", 1)
+    calls: list[int] = []
+
+    def slow_create_message(*, db, care_task, payload, authenticated_user):
+        calls.append(care_task.id)
+        # Mas que el lease: sin renovacion el worker libre lo reencolaria.
+        time.sleep(1.6)
+        message = SimpleNamespace(id=42, session_id=payload.session_id)
+        return (message, 7, "wf", [], "clinical", "chat", {"quality_status": "ok"}, {}, [])
+
+    monkeypatch.setattr(ClinicalChatService, "create_message", staticmethod(slow_create_message))
+    job = _enqueue(async_service, _add_task(db_session, "medium"))
+
+    deadline = time.monotonic() + 8
+    status = async_service.get_job_status(job_id=job["job_id"])
+    while status["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = async_service.get_job_status(job_id=job["job_id"])
+
+    assert status["status"] == "completed"
+    assert status["attempts"] == 1
+    assert len(calls) == 1
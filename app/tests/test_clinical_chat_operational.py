@@ -16,6 +16,7 @@ from app.services.clinical_svm_triage_service import ClinicalSVMTriageService
 from app.services.clinical_vector_classification_service import ClinicalVectorClassificationService
 from app.services.diagnostic_interrogatory_service import DiagnosticInterrogatoryService
 from app.services.llm_chat_provider import LLMChatProvider
+from app.services.llm_gateway import reset_shared_llm_gateway
 from app.services.nemo_guardrails_service import NeMoGuardrailsService
 from app.services.rag_gatekeeper import BasicGatekeeper
 from app.services.rag_orchestrator import RAGOrchestrator
@@ -1373,8 +1374,7 @@ def test_llm_provider_native_general_uses_quick_recovery_after_timeouts(monkeypa
         True,
     )
     monkeypatch.setattr(LLMChatProvider, "_request_ollama_json", staticmethod(fake_request))
-    LLMChatProvider._circuit_open_until_monotonic = 0.0
-    LLMChatProvider._circuit_consecutive_failures = 0
+    reset_shared_llm_gateway()
 
     answer, trace = LLMChatProvider.generate_answer(
         query="que tal estas hoy?",
@@ -1726,8 +1726,7 @@ def test_llm_provider_circuit_breaker_short_circuits_after_failures(monkeypatch)
         60,
     )
     monkeypatch.setattr(LLMChatProvider, "_request_ollama_json", staticmethod(fake_request))
-    LLMChatProvider._circuit_open_until_monotonic = 0.0
-    LLMChatProvider._circuit_consecutive_failures = 0
+    reset_shared_llm_gateway()
 
     _answer_1, trace_1 = LLMChatProvider.generate_answer(
         query="resume el plan",
@@ -1766,8 +1765,7 @@ def test_llm_provider_circuit_breaker_short_circuits_after_failures(monkeypatch)
     assert trace_2["llm_error"] == "CircuitOpen"
     assert trace_2["llm_circuit_open"] == "true"
     assert call_counter["count"] >= 1
-    LLMChatProvider._circuit_open_until_monotonic = 0.0
-    LLMChatProvider._circuit_consecutive_failures = 0
+    reset_shared_llm_gateway()
 
 
 def test_chat_e2e_three_turns_continuity_and_trace(client, monkeypatch):
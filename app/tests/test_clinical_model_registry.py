@@ -0,0 +1,116 @@
+import pytest
+
+from app.core.config import settings
+from app.services.clinical_chat_service import ClinicalChatService
+from app.services.clinical_flat_clustering_service import ClinicalFlatClusteringService
+from app.services.clinical_hierarchical_clustering_service import (
+    ClinicalHierarchicalClusteringService,
+)
+from app.services.clinical_model_registry import ClinicalModelRegistry
+from app.services.clinical_naive_bayes_service import ClinicalNaiveBayesService
+from app.services.clinical_svm_domain_service import ClinicalSVMDomainService
+from app.services.clinical_vector_classification_service import (
+    ClinicalVectorClassificationService,
+)
+
+_CATALOG = ClinicalChatService._DOMAIN_CATALOG  # noqa: SLF001
+_SERVICES = [
+    (ClinicalVectorClassificationService, "vector_model_cache_hit"),
+    (ClinicalFlatClusteringService, "cluster_model_cache_hit"),
+    (ClinicalHierarchicalClusteringService, "hcluster_model_cache_hit"),
+    (ClinicalSVMDomainService, "svm_domain_model_cache_hit"),
+    (ClinicalNaiveBayesService, "nb_model_cache_hit"),
+]
+
+
+@pytest.fixture(autouse=True)
+def _empty_registry():
+    ClinicalModelRegistry.reset()
+    yield
+    ClinicalModelRegistry.reset()
+
+
+def _analyze(service, query="Oliguria con hiperkalemia y creatinina en ascenso"):
+    return service.analyze_query(
+        query=query,
+        domain_catalog=_CATALOG,
+        matched_domains=["critical_ops"],
+        effective_specialty="emergency",
+    )
+
+
+def _without_cache_flag(assessment, flag):
+    trace = {key: value for key, value in assessment["trace"].items() if key != flag}
+    return {**assessment, "trace": trace}
+
+
+def test_svm_trains_once_and_serves_following_queries(monkeypatch):
+    calls = []
+    original = ClinicalSVMDomainService._train_ova_linear_svm.__func__  # noqa: SLF001
+
+    def _counting_train(cls, **kwargs):
+        calls.append(kwargs["epochs"])
+        return original(cls, **kwargs)
+
+    monkeypatch.setattr(
+        ClinicalSVMDomainService, "_train_ova_linear_svm", classmethod(_counting_train)
+    )
+
+    first = _analyze(ClinicalSVMDomainService)
+    second = _analyze(ClinicalSVMDomainService, query="Neutropenia febril tras quimioterapia")
+
+    assert len(calls) == 1
+    assert first["trace"]["svm_domain_model_cache_hit"] == "0"
+    assert second["trace"]["svm_domain_model_cache_hit"] == "1"
+    assert second["top_domain"] == "oncology"
+
+
+def test_settings_change_invalidates_fitted_model(monkeypatch):
+    _analyze(ClinicalSVMDomainService)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_SVM_DOMAIN_EPOCHS", 4)
+
+    refit = _analyze(ClinicalSVMDomainService)
+
+    assert refit["trace"]["svm_domain_model_cache_hit"] == "0"
+    assert refit["trace"]["svm_domain_epochs"] == "4"
+    assert ClinicalModelRegistry.stats()["fits"] == 2
+
+
+def test_catalog_change_invalidates_fitted_model():
+    _analyze(ClinicalNaiveBayesService)
+    extended = [*_CATALOG, {"key": "toxicology", "label": "Toxicologia", "keywords": ["opioide"]}]
+
+    assessment = ClinicalNaiveBayesService.analyze_query(
+        query="Sobredosis de opioide con miosis",
+        domain_catalog=extended,
+        matched_domains=[],
+        effective_specialty="emergency",
+    )
+
+    assert assessment["trace"]["nb_model_cache_hit"] == "0"
+    assert assessment["trace"]["nb_classes"] == str(len(extended))
+
+
+@pytest.mark.parametrize(("service", "flag"), _SERVICES)
+def test_persisted_artifacts_reproduce_in_memory_results(service, flag, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_DOMAIN_MODEL_REGISTRY_DIR", str(tmp_path))
+    fitted_in_process = _analyze(service)
+    assert list(tmp_path.glob("*.json"))
+
+    ClinicalModelRegistry.reset()
+    loaded_from_disk = _analyze(service)
+
+    stats = ClinicalModelRegistry.stats()
+    assert stats["fits"] == 0
+    assert stats["disk_loads"] == 1
+    assert _without_cache_flag(loaded_from_disk, flag) == _without_cache_flag(
+        fitted_in_process, flag
+    )
+
+
+def test_warm_up_fits_every_domain_classifier():
+    timings = ClinicalChatService.warm_up_domain_models()
+
+    assert set(timings) == {service.__name__ for service, _ in _SERVICES}
+    for service, flag in _SERVICES:
+        assert _analyze(service)["trace"][flag] == "1"
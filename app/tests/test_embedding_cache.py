@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.scripts.migrate_embedding_cache import migrate_json_cache
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import OllamaEmbeddingService
+
+
+def test_cache_round_trip_is_namespaced_by_model(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=100)
+
+    cache.put_many("modelo-a", [("h1", [0.5, 1.0]), ("h2", [2.0, -1.0])])
+    cache.put("modelo-b", "h1", [9.0, 9.0])
+
+    assert cache.get_many("modelo-a", ["h1", "h2", "h3"]) == {
+        "h1": [0.5, 1.0],
+        "h2": [2.0, -1.0],
+    }
+    assert cache.get("modelo-b", "h1") == [9.0, 9.0]
+    assert cache.get("modelo-b", "h2") is None
+    assert len(cache) == 3
+    assert cache.stats()["misses"] == 2
+    cache.close()
+
+
+def test_cache_replaces_existing_vector_without_growing(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=100)
+
+    cache.put("m", "h1", [1.0])
+    cache.put("m", "h1", [2.0])
+
+    assert cache.get("m", "h1") == [2.0]
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=4)
+    cache.put_many("m", [(f"h{index}", [float(index)]) for index in range(4)])
+    cache.get("m", "h0")
+
+    cache.put("m", "h4", [4.0])
+
+    remaining = cache.get_many("m", [f"h{index}" for index in range(5)])
+    assert "h0" in remaining
+    assert "h4" in remaining
+    assert "h1" not in remaining
+    assert len(cache) <= 4
+    assert cache.stats()["evictions"] >= 1
+    cache.close()
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    first = EmbeddingCache(path, max_entries=10)
+    first.put("m", "h1", [0.25])
+    first.close()
+
+    second = EmbeddingCache(path, max_entries=10)
+
+    assert second.get("m", "h1") == [0.25]
+    assert len(second) == 1
+    second.close()
+
+
+def test_migration_imports_legacy_json_files(tmp_path):
+    source = tmp_path / "legacy"
+    source.mkdir()
+    (source / f"{'a' * 64}.json").write_text(
+        json.dumps({"text_sample": "sepsis", "embedding": [0.5, 0.25]}),
+        encoding="utf-8",
+    )
+    (source / f"{'b' * 64}.json").write_text("{no json", encoding="utf-8")
+    target = tmp_path / "cache.sqlite3"
+
+    stats = migrate_json_cache(
+        source_dir=source,
+        target_path=target,
+        model="nomic-embed-text",
+        delete_source=True,
+    )
+
+    assert stats["imported"] == 1
+    assert stats["invalid"] == 1
+    assert stats["deleted"] == 1
+    cache = EmbeddingCache(target, max_entries=10)
+    assert cache.get("nomic-embed-text", "a" * 64) == [0.5, 0.25]
+    cache.close()
+
+
+def test_embedding_service_serves_batched_cache_hits(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH",
+        str(tmp_path / "cache.sqlite3"),
+    )
+    EmbeddingCache.reset_shared()
+    service = OllamaEmbeddingService(model="m", cache_enabled=True)
+    service._save_many_to_cache([("sepsis", [1.0, 0.0]), ("shock", [0.0, 1.0])])
+
+    def _unexpected_call(texts):
+        raise AssertionError("no deberia llamar a Ollama con cache completa")
+
+    monkeypatch.setattr(service, "_call_ollama_batch", _unexpected_call)
+    vectors, trace = service.embed_batch([" sepsis ", "shock"])
+    vector, single_trace = service.embed_text("shock")
+
+    assert vectors == [[1.0, 0.0], [0.0, 1.0]]
+    assert trace["embedding_cache_hits"] == "2"
+    assert vector == pytest.approx([0.0, 1.0])
+    assert single_trace["embedding_source"] == "cache"
+    EmbeddingCache.reset_shared()
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import OllamaEmbeddingService
+from app.services.http_connection_pool import KeepAliveHTTPPool
+
+
+def _stub_vector(text: str) -> list[float]:
+    return [float(len(text)), float(sum(ord(char) for char in text) % 97), 1.0]
+
+
+class _StubEmbedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay_seconds: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _StubEmbedHandler)
+        self.delay_seconds = delay_seconds
+        self.lock = threading.Lock()
+        self.batch_sizes: list[int] = []
+        self.client_ports: set[int] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_inputs: set[str] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _StubEmbedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+    def do_POST(self):  # noqa: N802
+        server: _StubEmbedServer = self.server  # type: ignore[assignment]
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length).decode("utf-8"))
+        inputs = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+        with server.lock:
+            server.batch_sizes.append(len(inputs))
+            server.client_ports.add(int(self.client_address[1]))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if server.delay_seconds:
+                time.sleep(server.delay_seconds)
+            if self.path != "/api/embed" or server.fail_inputs.intersection(inputs):
+                body = b'{"error":"fail"}'
+                self.send_response(500)
+            else:
+                body = json.dumps(
+                    {"model": payload["model"], "embeddings": [_stub_vector(t) for t in inputs]}
+                ).encode("utf-8")
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def stub_server():
+    KeepAliveHTTPPool.reset_shared()
+    server = _StubEmbedServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    KeepAliveHTTPPool.reset_shared()
+
+
+def _service(base_url: str) -> OllamaEmbeddingService:
+    service = OllamaEmbeddingService(model="stub-embed", cache_enabled=False)
+    service.base_url = base_url
+    return service
+
+
+def test_embed_batch_sends_multiple_inputs_per_request_in_order(stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE", 4)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT", 2)
+    texts = [f"texto clinico {index}" for index in range(10)]
+
+    vectors, trace = _service(stub_server.base_url).embed_batch(texts)
+
+    assert vectors == [_stub_vector(text) for text in texts]
+    assert sorted(stub_server.batch_sizes) == [2, 4, 4]
+    assert trace["embedding_requests"] == "3"
+    assert trace["embedding_errors"] == "0"
+    assert len(stub_server.client_ports) <= 2
+
+
+def test_embed_batch_deduplicates_segments_and_handles_empty_text(stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE", 8)
+    service = _service(stub_server.base_url)
+
+    vectors, trace = service.embed_batch(["sepsis", "", "sepsis", "shock"])
+
+    assert vectors[0] == vectors[2] == _stub_vector("sepsis")
+    assert vectors[1] == service._fallback_vector("")
+    assert stub_server.batch_sizes == [2]
+    assert trace["embedding_unique_segments"] == "2"
+    assert trace["embedding_errors"] == "1"
+
+
+def test_keep_alive_pool_reuses_connections_across_calls(stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT", 1)
+    service = _service(stub_server.base_url)
+
+    for index in range(5):
+        vector, trace = service.embed_text(f"consulta {index}")
+        assert vector == _stub_vector(f"consulta {index}")
+        assert trace["embedding_source"] == "ollama"
+
+    stats = service._http_pool().stats()
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+    assert len(stub_server.client_ports) == 1
+
+
+def test_keep_alive_pool_error_carries_response_headers(stub_server):
+    pool = KeepAliveHTTPPool(stub_server.base_url)
+
+    with pytest.raises(HTTPError) as error:
+        pool.post_json("/api/missing", {"model": "stub-embed", "input": "x"}, timeout=2.0)
+
+    assert error.value.code == 500
+    assert error.value.headers["Content-Type"] == "application/json"
+    pool.close()
+
+
+def test_in_flight_requests_are_capped(stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE", 1)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_MAX_IN_FLIGHT", 3)
+    stub_server.delay_seconds = 0.02
+    texts = [f"fragmento {index}" for index in range(12)]
+
+    started_at = time.perf_counter()
+    vectors, trace = _service(stub_server.base_url).embed_batch(texts)
+    elapsed = time.perf_counter() - started_at
+
+    assert vectors == [_stub_vector(text) for text in texts]
+    assert stub_server.max_in_flight <= 3
+    assert trace["embedding_max_in_flight"] == "3"
+    # 12 peticiones con 3 en vuelo: ~4 rondas, claramente por debajo de la serie (12 rondas).
+    assert elapsed < 12 * stub_server.delay_seconds
+
+
+def test_failed_batch_falls_back_without_poisoning_cache(stub_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_EMBEDDING_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        settings,
+        "CLINICAL_CHAT_RAG_EMBEDDING_CACHE_PATH",
+        str(tmp_path / "embeddings.sqlite3"),
+    )
+    EmbeddingCache.reset_shared()
+    stub_server.fail_inputs = {"roto"}
+    service = OllamaEmbeddingService(model="stub-embed", cache_enabled=True)
+    service.base_url = stub_server.base_url
+
+    vectors, trace = service.embed_batch(["roto", "vecino", "sano"])
+
+    assert vectors[0] == service._fallback_vector("roto")
+    assert vectors[2] == _stub_vector("sano")
+    assert trace["embedding_errors"] == "2"
+    assert list(service._load_many_from_cache(["roto", "vecino", "sano"])) == ["sano"]
+    EmbeddingCache.reset_shared()
@@ -0,0 +1,103 @@
+from array import array
+
+import pytest
+
+from app.scripts.benchmark_embedding_similarity import run_benchmark
+from app.services import embedding_similarity
+from app.services.embedding_service import OllamaEmbeddingService
+
+
+def _blob(values: list[float]) -> bytes:
+    return array("f", values).tobytes()
+
+
+def test_python_top_k_orders_scores_and_clamps_negative_values():
+    scores, top = embedding_similarity.cosine_top_k(
+        [1.0, 0.0],
+        [[0.0, 1.0], [-1.0, 0.0], [1.0, 0.0], [0.6, 0.8]],
+        2,
+        prefer_numpy=False,
+    )
+
+    assert scores == pytest.approx([0.0, 0.0, 1.0, 0.6])
+    assert top == [2, 3]
+
+
+def test_numpy_path_matches_python_fallback():
+    pytest.importorskip("numpy")
+    query = [0.3, -0.2, 0.9, 0.1]
+    rows = [
+        [0.1, 0.2, 0.3, 0.4],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.3, -0.2, 0.9, 0.1],
+        [-0.5, 0.1, 0.2, 0.0],
+    ]
+
+    python_scores, python_top = embedding_similarity.cosine_top_k(
+        query, rows, 3, prefer_numpy=False
+    )
+    numpy_scores, numpy_top = embedding_similarity.cosine_top_k(query, rows, 3)
+
+    assert numpy_scores == pytest.approx(python_scores, abs=1e-6)
+    assert numpy_top == python_top
+
+
+def test_top_k_accepts_chunk_blobs_and_contiguous_buffer():
+    rows = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    blobs = [_blob(row) for row in rows]
+
+    _scores, top_from_blobs = embedding_similarity.cosine_top_k([0.0, 1.0], blobs, 2)
+    _scores, top_from_buffer = embedding_similarity.cosine_top_k(
+        [0.0, 1.0],
+        b"".join(blobs),
+        2,
+        dim=2,
+    )
+
+    assert top_from_blobs == [1, 2]
+    assert top_from_buffer == [1, 2]
+
+
+def test_ragged_candidates_fall_back_to_python_semantics():
+    scores = embedding_similarity.cosine_scores([1.0, 0.0, 0.0], [[1.0, 0.0], [1.0, 0.0, 0.0]])
+
+    assert scores == pytest.approx([1.0, 1.0])
+
+
+def test_pairwise_cosine_keeps_sign_without_clamp():
+    matrix = embedding_similarity.pairwise_cosine([[1.0, 0.0], [-1.0, 0.0], [0.0, 0.0]])
+
+    assert matrix[0][0] == pytest.approx(1.0)
+    assert matrix[0][1] == pytest.approx(-1.0)
+    assert matrix[2] == pytest.approx([0.0, 0.0, 0.0])
+
+
+def test_embedding_service_delegates_to_similarity_engine():
+    service = OllamaEmbeddingService(cache_enabled=False)
+
+    assert service.batch_cosine_similarity([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]]) == pytest.approx(
+        [1.0, 0.0]
+    )
+    assert service.cosine_similarity([1.0, 1.0], [1.0, 1.0]) == pytest.approx(1.0)
+    assert service._mean_pool([[1.0, 3.0], [3.0, 5.0]]) == pytest.approx([2.0, 4.0])
+    _scores, top = service.batch_cosine_top_k([0.0, 1.0], [[1.0, 0.0], [0.0, 2.0]], 1)
+    assert top == [1]
+
+
+def test_benchmark_reports_throughput_per_size():
+    results = run_benchmark(sizes=[20, 50], dim=8, k=3, repeat=1, python_max=50)
+
+    assert [entry["candidates"] for entry in results] == [20, 50]
+    assert all(entry["python_ms"] is not None for entry in results)
+
+
+@pytest.mark.parametrize("prefer_numpy", [True, False])
+def test_cosine_scores_many_matches_per_query_scores(prefer_numpy):
+    queries = [[1.0, 0.0, 0.0], [0.3, -0.2, 0.9]]
+    rows = [_blob([0.1, 0.2, 0.3]), _blob([0.0, 0.0, 0.0]), _blob([-1.0, 0.0, 0.0])]
+
+    matrix = embedding_similarity.cosine_scores_many(queries, rows, prefer_numpy=prefer_numpy)
+
+    for column, query in enumerate(queries):
+        expected = embedding_similarity.cosine_scores(query, rows, prefer_numpy=False)
+        assert [row[column] for row in matrix] == pytest.approx(expected, abs=1e-6)
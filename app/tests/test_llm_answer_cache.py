@@ -0,0 +1,173 @@
+import pytest
+
+from app.core.config import settings
+from app.services import llm_answer_cache
+from app.services.llm_answer_cache import (
+    LLMAnswerCache,
+    build_answer_cache_key,
+    normalize_query,
+)
+from app.services.llm_chat_provider import LLMChatProvider
+
+
+def _generation_kwargs(**overrides) -> dict:
+    kwargs = {
+        "query": "Manejo inicial de sepsis",
+        "response_mode": "clinical",
+        "effective_specialty": "emergency",
+        "tool_mode": "chat",
+        "matched_domains": ["sepsis"],
+        "matched_endpoints": [],
+        "memory_facts_used": [],
+        "patient_summary": None,
+        "patient_history_facts_used": [],
+        "knowledge_sources": [{"title": "Sepsis", "source": "docs/sepsis.md", "snippet": "SSC"}],
+        "web_sources": [],
+        "recent_dialogue": [],
+        "endpoint_results": [],
+    }
+    kwargs.update(overrides)
+    return kwargs
+
+
+@pytest.fixture
+def counted_llm(monkeypatch):
+    calls: list[str] = []
+
+    def fake_uncached(**kwargs):
+        calls.append(kwargs["query"])
+        return "Respuesta generada", {"llm_used": "true", "llm_latency_ms": "9000.0"}
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(LLMChatProvider, "_generate_answer_uncached", staticmethod(fake_uncached))
+    return calls
+
+
+def test_normalized_query_hits_exact_tier(counted_llm):
+    first_answer, first_trace = LLMChatProvider.generate_answer(
+        **_generation_kwargs(), evidence_chunk_ids=[3, 1]
+    )
+    answer, trace = LLMChatProvider.generate_answer(
+        **_generation_kwargs(query="  manejo inicial de SEPSIS?"), evidence_chunk_ids=[1, 3]
+    )
+
+    assert counted_llm == ["Manejo inicial de sepsis"]
+    assert first_answer == answer == "Respuesta generada"
+    assert first_trace["llm_cache_hit"] == "false"
+    assert trace["llm_cache_hit"] == "true"
+    assert trace["llm_cache_tier"] == "exact"
+    assert trace["llm_cache_source_latency_ms"] == "9000.0"
+
+
+def test_evidence_or_patient_change_misses(counted_llm):
+    LLMChatProvider.generate_answer(**_generation_kwargs(), evidence_chunk_ids=[1])
+    LLMChatProvider.generate_answer(**_generation_kwargs(), evidence_chunk_ids=[2])
+    LLMChatProvider.generate_answer(
+        **_generation_kwargs(patient_summary={"age": 80}), evidence_chunk_ids=[1]
+    )
+
+    assert len(counted_llm) == 3
+
+
+def test_degraded_generation_is_not_cached(monkeypatch):
+    calls: list[str] = []
+
+    def fake_uncached(**kwargs):
+        calls.append(kwargs["query"])
+        return "Datos clave: ...", {"llm_used": "true", "llm_primary_error": "TimeoutError"}
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(LLMChatProvider, "_generate_answer_uncached", staticmethod(fake_uncached))
+
+    LLMChatProvider.generate_answer(**_generation_kwargs())
+    _, trace = LLMChatProvider.generate_answer(**_generation_kwargs())
+
+    assert len(calls) == 2
+    assert trace["llm_cache_hit"] == "false"
+
+
+def test_near_match_only_within_same_bucket():
+    vectors = {
+        "manejo inicial de sepsis": [1.0, 0.0],
+        "manejo inicial sepsis": [0.99, 0.05],
+    }
+    cache = LLMAnswerCache(max_entries=8, embedder=lambda text: vectors.get(text))
+    key, bucket, query = build_answer_cache_key(**_generation_kwargs())
+    cache.store(
+        key=key,
+        bucket=bucket,
+        normalized_query=query,
+        answer="A",
+        trace={},
+        ttl_seconds=60,
+        near_match=True,
+    )
+
+    near_key, near_bucket, near_query = build_answer_cache_key(
+        **_generation_kwargs(query="Manejo inicial sepsis")
+    )
+    other_key, other_bucket, _ = build_answer_cache_key(
+        **_generation_kwargs(query="Manejo inicial sepsis", recent_dialogue=[{"user": "x"}])
+    )
+    entry, tier, similarity = cache.lookup(
+        key=near_key,
+        bucket=near_bucket,
+        normalized_query=near_query,
+        near_match=True,
+        min_similarity=0.95,
+    )
+    _, other_tier, _ = cache.lookup(
+        key=other_key,
+        bucket=other_bucket,
+        normalized_query=near_query,
+        near_match=True,
+        min_similarity=0.95,
+    )
+
+    assert entry["answer"] == "A"
+    assert tier == "near"
+    assert similarity >= 0.95
+    assert other_tier == "miss"
+
+
+def test_lru_ttl_and_generation_invalidation(monkeypatch):
+    cache = LLMAnswerCache(max_entries=2, embedder=lambda text: None)
+
+    def _store(name: str, ttl_seconds: int = 60) -> None:
+        cache.store(
+            key=name,
+            bucket="b",
+            normalized_query=name,
+            answer=name,
+            trace={},
+            ttl_seconds=ttl_seconds,
+            near_match=False,
+        )
+
+    def _tier(name: str) -> str:
+        return cache.lookup(
+            key=name, bucket="b", normalized_query=name, near_match=False, min_similarity=1.0
+        )[1]
+
+    _store("a")
+    _store("b")
+    _store("c")
+    assert _tier("a") == "miss"
+    assert cache.stats()["evictions"] == 1
+
+    _store("expired", ttl_seconds=-1)
+    assert _tier("expired") == "miss"
+
+    monkeypatch.setattr(llm_answer_cache, "_shared_cache", cache)
+    llm_answer_cache._on_corpus_change()
+    assert _tier("c") == "miss"
+
+    _store("d")
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_MODEL", "otro-modelo:latest")
+    assert _tier("d") == "miss"
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_normalize_query_strips_accents_and_punctuation():
+    assert normalize_query("¿Cuál es la dosis de Adrenalina?") == "cual es la dosis de adrenalina"
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_chat_provider import LLMChatProvider
+from app.services.llm_gateway import (
+    LLMGateway,
+    LLMGatewayOverloadedError,
+    get_shared_llm_gateway,
+)
+
+
+class _StubBackend:
+    """Servidor Ollama de juguete: responde siempre o falla siempre con 503."""
+
+    def __init__(self, *, healthy: bool):
+        self.hits = 0
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # noqa: N802
+                stub.hits += 1
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if not healthy:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps(
+                    {
+                        "message": {"role": "assistant", "content": "Respuesta del stub."},
+                        "response": "Respuesta del stub.",
+                        "done": True,
+                        "done_reason": "stop",
+                    }
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                return
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_pool(monkeypatch):
+    down, up = _StubBackend(healthy=False), _StubBackend(healthy=True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_PROVIDER", "ollama")
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_CIRCUIT_BREAKER_OPEN_SECONDS", 60)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_BACKEND_URLS", f"{down.url},{up.url}")
+    yield down, up
+    down.close()
+    up.close()
+
+
+def _ask(query: str = "resume el plan"):
+    return LLMChatProvider.generate_answer(
+        query=query,
+        response_mode="clinical",
+        effective_specialty="emergency",
+        tool_mode="chat",
+        matched_domains=["sepsis"],
+        matched_endpoints=[],
+        memory_facts_used=[],
+        patient_summary=None,
+        patient_history_facts_used=[],
+        knowledge_sources=[],
+        web_sources=[],
+        recent_dialogue=[],
+        endpoint_results=[],
+        timeout_budget_seconds_override=10.0,
+    )
+
+
+def test_failing_backend_is_retried_elsewhere_then_isolated(stub_pool):
+    down, up = stub_pool
+
+    first_answer, first_trace = _ask()
+    second_answer, second_trace = _ask()
+
+    assert first_answer == second_answer == "Respuesta del stub."
+    assert first_trace["llm_backends_used"] == f"{down.url},{up.url}"
+    assert first_trace["llm_backend"] == up.url
+    # El breaker del backend caido se abre sin cortar el trafico al sano.
+    assert second_trace["llm_backends_used"] == up.url
+    assert second_trace["llm_circuit_open"] == "false"
+    assert down.hits == 1
+    stats = get_shared_llm_gateway().stats()
+    assert stats["backends_open"] == 1
+
+
+def test_exhausted_capacity_sheds_fast(stub_pool, monkeypatch):
+    down, up = stub_pool
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_BACKEND_URLS", up.url)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_BACKEND_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_GATEWAY_MAX_QUEUE", 0)
+    gateway = get_shared_llm_gateway()
+
+    started_at = time.monotonic()
+    with gateway.lease(max_wait_seconds=0.0):
+        answer, trace = _ask()
+    elapsed = time.monotonic() - started_at
+
+    assert answer is None
+    assert trace["llm_used"] == "false"
+    assert trace["llm_gateway_shed_reason"] in {"queue_full", "no_capacity"}
+    assert elapsed < 1.0
+    assert up.hits == 0
+    assert gateway.stats()["shed_total"] >= 1
+
+
+def test_waiter_gets_released_slot_within_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_GATEWAY_MAX_WAIT_SECONDS", 5.0)
+    gateway = LLMGateway(backend_urls=["http://a"], max_concurrency=1, max_queue=1)
+    acquired = threading.Event()
+
+    def _hold(seconds: float):
+        with gateway.lease(max_wait_seconds=0.0):
+            acquired.set()
+            time.sleep(seconds)
+
+    holder = threading.Thread(target=_hold, args=(0.15,))
+    holder.start()
+    acquired.wait(timeout=2.0)
+    started_at = time.monotonic()
+    with gateway.lease(max_wait_seconds=2.0) as backend:
+        waited = time.monotonic() - started_at
+        assert backend.base_url == "http://a"
+    holder.join()
+
+    acquired.clear()
+    holder = threading.Thread(target=_hold, args=(0.3,))
+    holder.start()
+    acquired.wait(timeout=2.0)
+    with pytest.raises(LLMGatewayOverloadedError) as exc_info:
+        with gateway.lease(max_wait_seconds=0.05):
+            pass
+    holder.join()
+
+    assert 0.05 < waited < 1.0
+    assert exc_info.value.reason == "wait_timeout"
+    assert gateway.stats()["in_flight"] == 0
+    assert gateway.stats()["waiting"] == 0
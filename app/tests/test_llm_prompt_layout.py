@@ -0,0 +1,128 @@
+from app.core.config import settings
+from app.services.llm_chat_provider import LLMChatProvider
+
+
+def _clinical_messages(*, query: str, snippet: str, specialty: str):
+    system_prompt = LLMChatProvider._build_system_prompt(
+        response_mode="clinical",
+        effective_specialty=specialty,
+        tool_mode="chat",
+    )
+    user_prompt = LLMChatProvider._build_user_prompt(
+        query=query,
+        response_mode="clinical",
+        matched_domains=[],
+        matched_endpoints=[],
+        memory_facts_used=[],
+        patient_summary=None,
+        patient_history_facts_used=[],
+        knowledge_sources=[{"title": "Protocolo", "snippet": snippet}],
+        web_sources=[],
+        recent_dialogue=[],
+        endpoint_results=[],
+        effective_specialty=specialty,
+        tool_mode="chat",
+    )
+    messages, _ = LLMChatProvider._build_chat_messages(
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        recent_dialogue=[],
+        response_mode="clinical",
+    )
+    return messages
+
+
+def test_stable_layout_shares_byte_identical_prefix_across_turns(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_STABLE_PROMPT_PREFIX_ENABLED", True)
+
+    first = _clinical_messages(
+        query="Sepsis: antibiotico inicial",
+        snippet="Antibiotico de amplio espectro en la primera hora.",
+        specialty="emergency",
+    )
+    second = _clinical_messages(
+        query="Dolor toracico: escalado",
+        snippet="ECG en los primeros diez minutos.",
+        specialty="cardiology",
+    )
+
+    assert first[0] == second[0]
+    assert "emergency" not in first[0]["content"]
+    first_user, second_user = first[-1]["content"], second[-1]["content"]
+    shared_prefix = first_user[: first_user.index("### ESPECIALIDAD")]
+    assert shared_prefix.startswith("### REGLAS")
+    assert second_user.startswith(shared_prefix)
+    assert first_user.index("### CONSULTA") < first_user.index("### EVIDENCIA")
+    assert first_user.rstrip().endswith("primera hora.")
+
+
+def test_legacy_layout_keeps_turn_data_first(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_NATIVE_STYLE_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_STABLE_PROMPT_PREFIX_ENABLED", False)
+
+    messages = _clinical_messages(
+        query="Sepsis: antibiotico inicial",
+        snippet="Antibiotico de amplio espectro en la primera hora.",
+        specialty="emergency",
+    )
+
+    assert "Especialidad: emergency." in messages[0]["content"]
+    assert messages[-1]["content"].startswith("### CONSULTA")
+
+
+def test_llama_cpp_requests_cache_prompt_and_trace_reused_tokens(monkeypatch):
+    captured: list[dict] = []
+
+    def fake_request(*, endpoint, payload, timeout_seconds=None):  # noqa: ARG001
+        captured.append(payload)
+        return {
+            "choices": [{"message": {"content": "Plan operativo."}, "finish_reason": "stop"}],
+            "timings": {"prompt_n": 12, "cache_n": 180, "prompt_ms": 95.5},
+        }
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_PROVIDER", "llama_cpp")
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_STABLE_PROMPT_PREFIX_ENABLED", True)
+    monkeypatch.setattr(LLMChatProvider, "_request_llama_cpp_json", staticmethod(fake_request))
+
+    answer, trace = LLMChatProvider.generate_answer(
+        query="resume el plan",
+        response_mode="clinical",
+        effective_specialty="emergency",
+        tool_mode="chat",
+        matched_domains=[],
+        matched_endpoints=[],
+        memory_facts_used=[],
+        patient_summary=None,
+        patient_history_facts_used=[],
+        knowledge_sources=[],
+        web_sources=[],
+        recent_dialogue=[],
+        endpoint_results=[],
+    )
+
+    assert answer == "Plan operativo."
+    assert captured[0]["cache_prompt"] is True
+    assert trace["llm_prompt_layout"] == "stable_prefix"
+    assert trace["llm_prompt_tokens_evaluated"] == "12"
+    assert trace["llm_prompt_tokens_reused"] == "180"
+    assert trace["llm_prompt_reuse_source"] == "server"
+    assert trace["llm_prompt_prefill_ms"] == "95.5"
+
+
+def test_ollama_reuse_is_estimated_from_prompt_eval_count():
+    trace: dict[str, str] = {}
+    payload = {"prompt": " ".join(["sepsis"] * 100)}
+
+    LLMChatProvider._accumulate_prompt_reuse_trace(
+        trace,
+        payload,
+        {"prompt_eval_count": 10, "prompt_eval_duration": 40_000_000},
+    )
+
+    assert trace["llm_prompt_tokens_evaluated"] == "10"
+    estimated = LLMChatProvider._estimate_token_count(payload["prompt"])
+    assert int(trace["llm_prompt_tokens_reused"]) == estimated - 10
+    assert trace["llm_prompt_reuse_source"] == "estimated"
+    assert trace["llm_prompt_prefill_ms"] == "40.0"
@@ -0,0 +1,117 @@
+import random
+import re
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_chat_provider import LLMChatProvider
+from app.services.llm_token_budget import (
+    count_tokens,
+    token_count_cache_stats,
+    tokenizer_mode,
+    truncate_to_token_budget,
+)
+
+_LEGACY_PATTERN = re.compile(r"\w+|[^\w\s]", flags=re.UNICODE)
+
+
+def _legacy_count(text: str) -> int:
+    compact = text.strip()
+    if not compact:
+        return 0
+    return max(len(_LEGACY_PATTERN.findall(compact)), max(1, len(compact) // 4))
+
+
+def _legacy_truncate(text: str, token_budget: int) -> str:
+    if _legacy_count(text) <= token_budget:
+        return text
+    kept: list[str] = []
+    for word in text.split():
+        candidate = f"{' '.join(kept)} {word}".strip()
+        if _legacy_count(candidate) > token_budget:
+            break
+        kept.append(word)
+    return " ".join(kept).strip()
+
+
+def _sample_text(rng: random.Random, words: int) -> str:
+    vocabulary = [
+        "sepsis",
+        "noradrenalina",
+        "0.05-0.5",
+        "mcg/kg/min",
+        "(PAM",
+        ">=",
+        "65)",
+        "lactato,",
+        "ECG;",
+        "a",
+        "reevaluar!!",
+        "x",
+    ]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def test_heuristic_truncation_matches_legacy_algorithm():
+    rng = random.Random(7)
+    for _ in range(60):
+        text = _sample_text(rng, rng.randint(1, 80))
+        for budget in (1, 2, 5, 17, 40, 200):
+            assert truncate_to_token_budget(text, budget) == _legacy_truncate(text, budget)
+            assert count_tokens(text) == _legacy_count(text)
+    assert tokenizer_mode() == "heuristic"
+
+
+def test_truncation_is_linear_on_long_prompts():
+    text = _sample_text(random.Random(11), 40_000)
+
+    started_at = time.perf_counter()
+    truncated = LLMChatProvider._truncate_text_to_token_budget(text, 30_000)
+    elapsed = time.perf_counter() - started_at
+
+    assert 0 < count_tokens(truncated) <= 30_000
+    assert text.startswith(truncated)
+    # El algoritmo anterior tardaba minutos con este tamano.
+    assert elapsed < 2.0
+
+
+def test_counts_are_memoised_across_callers():
+    snippet = "Noradrenalina si PAM < 65 tras fluidoterapia."
+
+    LLMChatProvider._estimate_token_count(snippet)
+    before = token_count_cache_stats()
+    count_tokens(snippet)
+    after = token_count_cache_stats()
+
+    assert after["hits"] == before["hits"] + 1
+    assert after["entries"] == before["entries"]
+
+
+def test_missing_tokenizer_file_falls_back_to_heuristic(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        settings, "CLINICAL_CHAT_LLM_TOKENIZER_PATH", str(tmp_path / "no-existe.json")
+    )
+
+    assert tokenizer_mode() == "heuristic"
+    assert count_tokens("sepsis grave") == _legacy_count("sepsis grave")
+
+
+def test_exact_tokenizer_cuts_on_word_boundary(monkeypatch, tmp_path):
+    tokenizers = pytest.importorskip("tokenizers")
+    from tokenizers.models import WordPiece
+    from tokenizers.pre_tokenizers import Whitespace
+
+    vocab = {"[UNK]": 0, "sepsis": 1, "grave": 2, "shock": 3, "##ico": 4, "lactato": 5}
+    tokenizer = tokenizers.Tokenizer(WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    path = tmp_path / "tokenizer.json"
+    tokenizer.save(str(path))
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_TOKENIZER_PATH", str(path))
+
+    text = "sepsis shockico grave lactato"
+
+    assert tokenizer_mode() == "exact"
+    assert count_tokens(text) == 5
+    assert truncate_to_token_budget(text, 2) == "sepsis"
+    assert truncate_to_token_budget(text, 3) == "sepsis shockico"
@@ -0,0 +1,77 @@
+from array import array
+
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_candidate_rows import (
+    CandidateChunk,
+    hydrate_chunks,
+    load_candidate_rows,
+    prefetch_embeddings,
+)
+from app.services.rag_retriever import HybridRetriever
+
+
+@pytest.fixture()
+def chunks(add_chunks) -> list[DocumentChunk]:
+    return add_chunks(
+        [
+            {
+                "text": "sepsis con hipotension y lactato elevado",
+                "vector": [1.0, 0.0],
+                "keywords": ["sepsis"],
+            },
+            {"text": "shock septico con vasopresores", "vector": [0.8, 0.2]},
+            {
+                "text": "neutropenia febril tras quimioterapia",
+                "vector": [0.0, 1.0],
+                "specialty": "oncology",
+            },
+        ],
+        title="Motor operativo sepsis",
+        source_file="docs/47_sepsis.md",
+        specialty="sepsis",
+        section_path="Sepsis > Pasos",
+    )
+
+
+def test_light_rows_defer_embeddings_and_hydrate_top_k(db_session, chunks):
+    chunk_ids = [chunk.id for chunk in chunks]
+    db_session.expunge_all()
+
+    rows = load_candidate_rows(db_session, specialty_filter="sepsis")
+
+    assert [row.id for row in rows] == chunk_ids[:2]
+    assert all(isinstance(row, CandidateChunk) for row in rows)
+    assert rows[0].document is rows[1].document
+    assert rows[0].document.title == "Motor operativo sepsis"
+    assert rows[0].keywords == ["sepsis"]
+    assert all(row._embedding is None for row in rows)
+
+    assert prefetch_embeddings(rows) == 2
+    assert array("f", rows[1].chunk_embedding).tolist() == pytest.approx([0.8, 0.2])
+
+    setattr(rows[1], "_rag_score", 0.7)
+    hydrated = hydrate_chunks([rows[1]])
+    assert isinstance(hydrated[0], DocumentChunk)
+    assert hydrated[0].document.source_file == "docs/47_sepsis.md"
+    assert hydrated[0]._rag_score == 0.7
+
+
+@pytest.mark.usefixtures("chunks")
+def test_search_results_match_orm_candidates(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_TERM_STATS_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_POSTINGS_STORE_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FTS_CANDIDATE_ENABLED", False)
+    retriever = HybridRetriever()
+
+    light_results, _trace = retriever.search_keyword("sepsis lactato", db_session, k=2)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_LIGHT_CANDIDATES_ENABLED", False)
+    orm_results, _trace = retriever.search_keyword("sepsis lactato", db_session, k=2)
+
+    assert all(isinstance(chunk, DocumentChunk) for chunk in light_results)
+    assert [chunk.id for chunk in light_results] == [chunk.id for chunk in orm_results]
+    for light, orm in zip(light_results, orm_results):
+        assert light._rag_score == pytest.approx(orm._rag_score)
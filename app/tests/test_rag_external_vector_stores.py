@@ -0,0 +1,121 @@
+from array import array
+
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.scripts.ingest_clinical_docs import sync_external_vector_store
+from app.services.chroma_retriever import ChromaRetriever, chunk_row_checksum
+from app.services.llamaindex_retriever import LlamaIndexRetriever
+
+_VECTORS = {
+    "neutropenia febril tras quimioterapia": [1.0, 0.0, 0.0],
+    "sepsis con hipotension": [0.0, 1.0, 0.0],
+    "shock septico refractario": [0.1, 0.9, 0.0],
+}
+
+
+class _FixedEmbeddingService:
+    model = "test-embed"
+
+    def embed_text(self, text: str):
+        return [0.0, 1.0, 0.05], {"embedding_model": self.model}
+
+
+@pytest.fixture(autouse=True)
+def _persist_dirs(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(
+        settings, "CLINICAL_CHAT_RAG_LLAMAINDEX_PERSIST_DIR", str(tmp_path / "llamaindex")
+    )
+    ChromaRetriever.reset_shared()
+    LlamaIndexRetriever.reset_shared()
+    yield
+    ChromaRetriever.reset_shared()
+    LlamaIndexRetriever.reset_shared()
+
+
+@pytest.fixture()
+def chunks(add_chunks) -> list[DocumentChunk]:
+    return add_chunks(
+        [
+            {
+                "text": text_value,
+                "vector": vector,
+                "specialty": "oncology" if index == 0 else "emergency",
+            }
+            for index, (text_value, vector) in enumerate(_VECTORS.items())
+        ]
+    )
+
+
+def test_chunk_row_checksum_tracks_embedding_and_filter_metadata():
+    blob = array("f", [1.0, 0.0]).tobytes()
+    baseline = chunk_row_checksum(blob, "sepsis", "Manejo")
+
+    assert chunk_row_checksum(blob, "sepsis", "Manejo") == baseline
+    assert chunk_row_checksum(array("f", [0.0, 1.0]).tobytes(), "sepsis", "Manejo") != baseline
+    assert chunk_row_checksum(blob, "oncology", "Manejo") != baseline
+    assert chunk_row_checksum(blob, "sepsis", None) != baseline
+
+
+def test_sync_is_disabled_for_backends_without_persistent_store(db_session):
+    stats = sync_external_vector_store(db=db_session, backend="legacy")
+
+    assert stats["disabled"] == 1
+
+
+@pytest.mark.parametrize(
+    ("retriever_cls", "module_name", "prefix"),
+    [
+        (ChromaRetriever, "chromadb", "chroma"),
+        (LlamaIndexRetriever, "llama_index.core", "llamaindex"),
+    ],
+)
+def test_persistent_store_sync_and_search(db_session, chunks, retriever_cls, module_name, prefix):
+    pytest.importorskip(module_name)
+
+    first = retriever_cls.sync_from_db(db_session, model="test-embed")
+    assert first["rows_added"] == 3
+    second = retriever_cls.sync_from_db(db_session, model="test-embed")
+    assert second["rows_added"] == second["rows_removed"] == 0
+
+    retriever = retriever_cls(embedding_service=_FixedEmbeddingService())
+    found, trace = retriever.search("hipotension", db_session, k=2)
+    assert [chunk.id for chunk in found] == [chunks[1].id, chunks[2].id]
+    assert f"{prefix}_error" not in trace
+
+    found, _trace = retriever.search("hipotension", db_session, k=2, specialty_filter="oncology")
+    assert [chunk.id for chunk in found] == [chunks[0].id]
+
+    db_session.delete(chunks[1])
+    db_session.commit()
+    third = retriever_cls.sync_from_db(db_session, model="test-embed")
+    assert third["rows_removed"] == 1
+    assert third["rows_total"] == 2
+
+
+@pytest.mark.parametrize(
+    ("retriever_cls", "module_name"),
+    [
+        (ChromaRetriever, "chromadb"),
+        (LlamaIndexRetriever, "llama_index.core"),
+    ],
+)
+def test_persistent_store_sync_replaces_changed_chunk_with_same_id(
+    db_session, chunks, retriever_cls, module_name
+):
+    pytest.importorskip(module_name)
+    retriever_cls.sync_from_db(db_session, model="test-embed")
+
+    # Mismo id con otro embedding: SQLite reutiliza ids tras re-ingestar un documento.
+    chunks[1].chunk_embedding = array("f", [1.0, 0.0, 0.0]).tobytes()
+    db_session.commit()
+    stats = retriever_cls.sync_from_db(db_session, model="test-embed")
+    assert stats["rows_added"] == stats["rows_removed"] == 0
+    assert stats["rows_updated"] == 1
+    assert stats["rows_total"] == 3
+
+    retriever = retriever_cls(embedding_service=_FixedEmbeddingService())
+    found, _trace = retriever.search("hipotension", db_session, k=1)
+    assert [chunk.id for chunk in found] == [chunks[2].id]
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.services.rag_fts_index import FTSIndexManager
+from app.services.rag_retriever import HybridRetriever
+
+
+@pytest.fixture(autouse=True)
+def _fts_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FTS_CANDIDATE_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FTS_REBUILD_ON_REQUEST", False)
+    FTSIndexManager.reset_state()
+    yield
+    FTSIndexManager.reset_state()
+
+
+def _match_count(db_session, term: str) -> int:
+    return int(
+        db_session.execute(
+            text("SELECT COUNT(*) FROM document_chunks_fts WHERE document_chunks_fts MATCH :q"),
+            {"q": term},
+        ).scalar()
+    )
+
+
+def test_index_is_built_once_and_reused_after_restart(db_session, add_chunks):
+    add_chunks(["sepsis con hipotension", "shock septico"])
+    bind = db_session.get_bind()
+
+    ready, trace = FTSIndexManager.ensure(bind, allow_rebuild=True)
+    assert ready
+    assert trace["fts_index_rebuilt"] == "missing_objects"
+    assert FTSIndexManager.describe(bind)["watermark"] == {"rows": 2, "max_id": 2}
+
+    # Un worker nuevo solo valida version y marca de agua.
+    FTSIndexManager.reset_state()
+    add_chunks(["sepsis grave"])
+    ready, trace = FTSIndexManager.ensure(bind, allow_rebuild=False)
+    assert ready
+    assert "fts_index_rebuilt" not in trace
+    assert _match_count(db_session, "sepsis") == 2
+
+
+def test_schema_version_change_and_watermark_drift_trigger_rebuild(
+    db_session, add_chunks, monkeypatch
+):
+    add_chunks(["sepsis con hipotension", "shock septico"])
+    bind = db_session.get_bind()
+    FTSIndexManager.ensure(bind, allow_rebuild=True)
+
+    FTSIndexManager.reset_state()
+    monkeypatch.setattr(FTSIndexManager, "SCHEMA_VERSION", 2)
+    _ready, trace = FTSIndexManager.ensure(bind, allow_rebuild=True)
+    assert trace["fts_index_rebuilt"] == "version_changed"
+
+    db_session.execute(text("DELETE FROM document_chunks_fts_docsize WHERE id = 1"))
+    db_session.commit()
+    FTSIndexManager.reset_state()
+    _ready, trace = FTSIndexManager.ensure(bind, allow_rebuild=True)
+    assert trace["fts_index_rebuilt"] == "watermark_mismatch"
+
+
+def test_request_path_defers_large_rebuilds_to_background(db_session, add_chunks, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FTS_INLINE_REBUILD_MAX_ROWS", 1)
+    add_chunks(["sepsis con hipotension", "shock septico"])
+    bind = db_session.get_bind()
+
+    ready, trace = HybridRetriever._ensure_sqlite_fts_index(db_session)
+    assert not ready
+    assert trace["fts_candidate_reason"] == "rebuild_pending"
+    assert trace["fts_index_rebuild_pending"] == "missing_objects"
+
+    FTSIndexManager._builders[FTSIndexManager._key(bind)].join(timeout=30)
+    ready, trace = HybridRetriever._ensure_sqlite_fts_index(db_session)
+    assert ready
+    assert _match_count(db_session, "septico") == 1
@@ -0,0 +1,124 @@
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_lsi_model import GLOBAL_SCOPE, LSIModel, merge_zone_weights
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_term_stats_index import count_zone_terms, extract_chunk_zone_texts
+
+np = pytest.importorskip("numpy")
+
+_TEXTS = [
+    "neutropenia febril tras quimioterapia con fiebre persistente",
+    "fiebre en paciente oncologico con neutropenia profunda",
+    "sepsis con hipotension y lactato elevado",
+    "shock septico con lactato elevado y vasopresores",
+    "hiperkalemia con oliguria y creatinina en ascenso",
+    "oliguria y creatinina elevada en fracaso renal agudo",
+]
+
+
+@pytest.fixture(autouse=True)
+def _lsi_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_LSI_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_LSI_MODEL_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_LSI_MODEL_DIR", str(tmp_path / "lsi"))
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_TERM_STATS_ENABLED", False)
+    LSIModel.reset_shared()
+    yield
+    LSIModel.reset_shared()
+
+
+@pytest.fixture()
+def chunks(add_chunks) -> list[DocumentChunk]:
+    return add_chunks(
+        _TEXTS,
+        title="Protocolo urgencias",
+        source_file="docs/90_urgencias.md",
+    )
+
+
+def _fit(db_session, zone_weights, **kwargs):
+    return LSIModel.get_shared().fit_from_db(
+        db_session, zone_weights=zone_weights, min_df=1, **kwargs
+    )
+
+
+def test_fold_in_of_training_docs_matches_full_svd(db_session, chunks):
+    zone_weights = HybridRetriever()._build_zone_weights()
+    summary = _fit(db_session, zone_weights, k=3)
+    assert summary["scopes"][GLOBAL_SCOPE]["docs"] == len(_TEXTS)
+
+    _scope, model = LSIModel.get_shared().resolve(scopes=[GLOBAL_SCOPE], zone_weights=zone_weights)
+    term_weights = [
+        merge_zone_weights(count_zone_terms(extract_chunk_zone_texts(chunk)), zone_weights)
+        for chunk in chunks
+    ]
+    dense = np.zeros((len(chunks), len(model["col_by_term"])), dtype=np.float64)
+    for row, weights in enumerate(term_weights):
+        cols, values = LSIModel._weighted_vector(model, weights)
+        dense[row, cols] = values
+    u, singular, _vt = np.linalg.svd(dense, full_matrices=False)
+    reference = u[:, :3]
+    folded = np.vstack([LSIModel.fold_in(model, weights) for weights in term_weights])
+
+    def _cosines(matrix):
+        normed = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return normed @ normed.T
+
+    np.testing.assert_allclose(_cosines(folded), _cosines(reference), atol=1e-4)
+    np.testing.assert_allclose(1.0 / model["inv_singular"], singular[:3], rtol=1e-4)
+
+
+def test_retriever_uses_persisted_model_and_falls_back_when_incompatible(
+    db_session, chunks, monkeypatch
+):
+    retriever = HybridRetriever()
+    summary = _fit(db_session, retriever._build_zone_weights(), k=4)
+
+    _scored, trace = retriever._score_keyword_candidates(
+        query="fiebre neutropenia", chunks=chunks[:3], k=3
+    )
+    assert trace["keyword_search_lsi_mode"] == "model"
+    assert trace["keyword_search_lsi_model_version"] == (
+        summary["scopes"][GLOBAL_SCOPE]["model_version"]
+    )
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_ZONE_WEIGHT_BODY", 0.9)
+    _scored, trace = retriever._score_keyword_candidates(
+        query="fiebre neutropenia", chunks=chunks, k=3
+    )
+    assert trace["keyword_search_lsi_mode"] == "pool"
+
+
+def test_latent_scores_do_not_depend_on_candidate_pool(db_session, chunks):
+    zone_weights = HybridRetriever()._build_zone_weights()
+    _fit(db_session, zone_weights, k=3)
+    _scope, model = LSIModel.get_shared().resolve(scopes=[GLOBAL_SCOPE], zone_weights=zone_weights)
+    documents = [
+        (
+            int(chunk.id),
+            merge_zone_weights(count_zone_terms(extract_chunk_zone_texts(chunk)), zone_weights),
+        )
+        for chunk in chunks
+    ]
+    query = count_zone_terms({"body": "lactato elevado"})["body"]
+
+    full_pool, _ = LSIModel.score(model, query_term_counts=query, documents=documents)
+    small_pool, _ = LSIModel.score(model, query_term_counts=query, documents=documents[2:4])
+
+    for chunk_id, value in small_pool.items():
+        assert value == pytest.approx(full_pool[chunk_id])
+
+
+@pytest.mark.usefixtures("chunks")
+def test_refit_publishes_new_model_version(db_session):
+    zone_weights = HybridRetriever()._build_zone_weights()
+    first = _fit(db_session, zone_weights, k=3)
+    second = _fit(db_session, zone_weights, k=3)
+
+    _scope, model = LSIModel.get_shared().resolve(scopes=[GLOBAL_SCOPE], zone_weights=zone_weights)
+    assert first["scopes"][GLOBAL_SCOPE]["model_version"] != (
+        second["scopes"][GLOBAL_SCOPE]["model_version"]
+    )
+    assert model["meta"]["model_version"] == second["scopes"][GLOBAL_SCOPE]["model_version"]
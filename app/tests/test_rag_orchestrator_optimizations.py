@@ -1,8 +1,11 @@
 from array import array
 from types import SimpleNamespace
 
+from sqlalchemy import and_, event, or_
+
 from app.models.clinical_document import ClinicalDocument
 from app.models.document_chunk import DocumentChunk
+from app.services.rag_neighbor_window_cache import reset_shared_neighbor_cache
 from app.services.rag_orchestrator import RAGOrchestrator
 from app.services.rag_prompt_builder import RAGContextAssembler
 
@@ -233,8 +236,8 @@ def test_context_packs_expand_neighbor_chunks_and_keep_order(monkeypatch):
     ]
     monkeypatch.setattr(
         orchestrator,
-        "_load_context_pack_neighbors",
-        lambda **kwargs: neighbor_chunks,
+        "_load_context_pack_windows",
+        lambda windows: ({window: neighbor_chunks for window in windows}, {}),
     )
 
     packed_chunks, trace = orchestrator._expand_chunks_to_context_packs([seed_chunk])
@@ -310,8 +313,8 @@ def test_context_packs_deduplicate_overlapping_neighbor_windows(monkeypatch):
     ]
     monkeypatch.setattr(
         orchestrator,
-        "_load_context_pack_neighbors",
-        lambda **kwargs: shared_neighbors,
+        "_load_context_pack_windows",
+        lambda windows: ({window: shared_neighbors for window in windows}, {}),
     )
 
     packed_chunks, trace = orchestrator._expand_chunks_to_context_packs([seed_a, seed_b])
@@ -320,6 +323,92 @@ def test_context_packs_deduplicate_overlapping_neighbor_windows(monkeypatch):
     assert trace["rag_context_packs_deduped"] == "1"
 
 
+def test_context_pack_windows_load_in_one_query_and_reuse_hot_documents(
+    db_session, monkeypatch
+):
+    monkeypatch.setattr(
+        "app.services.rag_orchestrator.settings.CLINICAL_CHAT_RAG_CONTEXT_PACKS_ENABLED",
+        True,
+    )
+    monkeypatch.setattr(
+        "app.services.rag_orchestrator.settings.CLINICAL_CHAT_RAG_CONTEXT_PACK_RADIUS",
+        1,
+    )
+    reset_shared_neighbor_cache()
+    documents = []
+    for doc_number in range(2):
+        doc = ClinicalDocument(
+            title=f"Motor {doc_number}",
+            source_file=f"docs/9{doc_number}_motor.md",
+            specialty="sepsis",
+            content_hash=str(doc_number) * 64,
+        )
+        db_session.add(doc)
+        db_session.flush()
+        for index in range(6):
+            db_session.add(
+                DocumentChunk(
+                    document_id=doc.id,
+                    chunk_text=f"Paso {doc_number}.{index}.",
+                    chunk_index=index,
+                    section_path="Sepsis > Bundle",
+                    tokens_count=3,
+                    chunk_embedding=b"",
+                    keywords=[],
+                    custom_questions=[],
+                    specialty="sepsis",
+                    content_type="paragraph",
+                )
+            )
+        documents.append(doc)
+    db_session.commit()
+    seeds = (
+        db_session.query(DocumentChunk)
+        .filter(
+            or_(
+                and_(
+                    DocumentChunk.document_id == documents[0].id,
+                    DocumentChunk.chunk_index.in_([1, 2, 5]),
+                ),
+                and_(
+                    DocumentChunk.document_id == documents[1].id,
+                    DocumentChunk.chunk_index == 0,
+                ),
+            )
+        )
+        .order_by(DocumentChunk.document_id, DocumentChunk.chunk_index)
+        .all()
+    )
+    orchestrator = RAGOrchestrator(db=db_session)
+    statements: list[str] = []
+
+    def _count_selects(_conn, _cursor, statement, *_args):
+        if "FROM document_chunks" in statement:
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _count_selects)
+    try:
+        packed_chunks, trace = orchestrator._expand_chunks_to_context_packs(seeds)
+        assert len(statements) == 1
+        assert trace["rag_context_pack_db_round_trips"] == "1"
+        assert trace["rag_context_pack_db_round_trips_saved"] == "3"
+        assert [chunk.chunk_text for chunk in packed_chunks] == [
+            "Paso 0.0.\nPaso 0.1.\nPaso 0.2.",
+            "Paso 0.1.\nPaso 0.2.\nPaso 0.3.",
+            "Paso 0.4.\nPaso 0.5.",
+            "Paso 1.0.\nPaso 1.1.",
+        ]
+
+        _packed, second_trace = orchestrator._expand_chunks_to_context_packs(seeds)
+        assert len(statements) == 1
+        assert second_trace["rag_context_pack_windows_cached"] == "4"
+        assert second_trace["rag_context_pack_db_round_trips_saved"] == "4"
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_selects)
+        reset_shared_neighbor_cache()
+
+
 def test_extractive_answer_filters_non_clinical_noise():
     answer = RAGOrchestrator._build_extractive_answer(
         query="Oliguria con hiperkalemia y QRS ancho",
@@ -1932,6 +2021,87 @@ def test_multi_intent_search_merges_chunks_from_each_segment():
     assert trace["rag_multi_intent_segment_2_hits"] == "1"
 
 
+
+def test_multi_intent_search_batches_legacy_segments_in_one_call(db_session, monkeypatch):
+    monkeypatch.setattr(
+        "app.services.rag_orchestrator.settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND",
+        "legacy",
+    )
+    orchestrator = RAGOrchestrator(db=db_session)
+    shared = SimpleNamespace(id=401)
+    calls: list[list[tuple[str, str | None]]] = []
+
+    def fake_multi(queries, db, *, k, keyword_only):  # noqa: ARG001
+        calls.append(list(queries))
+        return (
+            [
+                ([(shared, 0.30)], {"hybrid_search_chunks_found": "1"}),
+                ([(shared, 0.60), (SimpleNamespace(id=402), 0.20)], {}),
+            ],
+            {"hybrid_multi_candidate_union": "7", "hybrid_multi_db_loads": "1"},
+        )
+
+    def fail_single(**kwargs):  # noqa: ARG001
+        raise AssertionError("no debe buscar segmento a segmento")
+
+    orchestrator.legacy_retriever.search_hybrid_multi = fake_multi  # type: ignore[method-assign]
+    orchestrator._search_with_configured_backend = fail_single  # type: ignore[method-assign]
+
+    selected, trace = orchestrator._search_multi_intent_segments(
+        segment_plan=[
+            {"segment": "neutropenia febril", "specialty_filter": "oncology"},
+            {"segment": "sepsis con hipotension", "specialty_filter": "", "top_probability": 0.5},
+        ],
+        k=3,
+        keyword_only=False,
+    )
+
+    assert calls == [[("neutropenia febril", "oncology"), ("sepsis con hipotension", None)]]
+    assert [chunk.id for chunk in selected] == [401, 402]
+    assert selected[0]._rag_score == 0.65
+    assert trace["rag_multi_intent_multi_query"] == "1"
+    assert trace["rag_multi_intent_hybrid_multi_db_loads"] == "1"
+    assert trace["rag_multi_intent_segment_2_hits"] == "2"
+
+
+def test_multi_intent_search_runs_external_backends_with_worker_sessions(
+    db_session, monkeypatch
+):
+    monkeypatch.setattr(
+        "app.services.rag_orchestrator.settings.CLINICAL_CHAT_RAG_RETRIEVER_BACKEND",
+        "elastic",
+    )
+    orchestrator = RAGOrchestrator(db=db_session)
+    sessions: list[object] = []
+
+    def fake_search(*, query, k, specialty_filter, keyword_only=False, db=None):  # noqa: ARG001
+        sessions.append(db)
+        chunk = SimpleNamespace(id=len(query), _rag_score=0.4)
+        return [chunk], {"rag_retriever_backend": "elastic"}, "elastic"
+
+    orchestrator._search_with_configured_backend = fake_search  # type: ignore[method-assign]
+
+    selected, trace = orchestrator._search_multi_intent_segments(
+        segment_plan=[
+            {
+                "segment": "neutropenia febril en paciente oncologico tras quimioterapia",
+                "specialty_filter": "oncology",
+            },
+            {
+                "segment": "sepsis con hipotension refractaria pese a fluidos iniciales",
+                "specialty_filter": "sepsis",
+            },
+        ],
+        k=3,
+        keyword_only=False,
+    )
+
+    assert len(selected) == 2
+    assert trace["rag_multi_intent_parallel_workers"] == "2"
+    assert len(sessions) == 2
+    assert all(session is not None and session is not db_session for session in sessions)
+
+
 def test_extractive_answer_prioritizes_actionable_sentences_over_aux_noise():
     answer = RAGOrchestrator._build_extractive_answer(
         query="Sepsis con hipotension: acciones iniciales",
@@ -0,0 +1,128 @@
+import pytest
+
+from app.core.config import settings
+from app.services.rag_postings_store import PostingsStore, tokenize_fts_text
+from app.services.rag_retriever import HybridRetriever
+
+
+@pytest.fixture(autouse=True)
+def _postings_store_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_POSTINGS_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_POSTINGS_STORE_DIR", str(tmp_path / "pst"))
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_POSTINGS_STORE_BLOCK_SIZE", 16)
+    PostingsStore.reset_shared()
+    yield
+    PostingsStore.reset_shared()
+
+
+def _add_rows(add_chunks, rows: list[tuple[str, str, str]]) -> list[int]:
+    chunks = add_chunks(
+        [
+            {"text": text_value, "section_path": section, "specialty": specialty}
+            for text_value, section, specialty in rows
+        ]
+    )
+    return [int(chunk.id) for chunk in chunks]
+
+
+def _build(db_session) -> PostingsStore:
+    store = PostingsStore.get_shared()
+    store.build_from_db(db_session)
+    assert store.is_ready(db_session)
+    return store
+
+
+def test_tokenizer_strips_diacritics_like_fts5():
+    assert tokenize_fts_text("Sepsis: Lactato > 4 mmol/L, fiebre-alta Pediátrica") == [
+        "sepsis",
+        "lactato",
+        "4",
+        "mmol",
+        "l",
+        "fiebre",
+        "alta",
+        "pediatrica",
+    ]
+
+
+def test_terms_phrases_and_specialty_filter(db_session, add_chunks):
+    ids = _add_rows(
+        add_chunks,
+        [
+            ("shock septico con lactato elevado", "Sepsis", "emergency"),
+            ("lactato normal sin shock", "Sepsis", "emergency"),
+            ("shock septico refractario", "Sepsis", "icu"),
+        ],
+    )
+    store = _build(db_session)
+
+    assert store.match("shock") == ids
+    assert store.match("shock septico") == [ids[0], ids[2]]
+    assert store.match("shock septico", specialty_filter="ICU") == [ids[2]]
+    assert store.match("shock", limit=2) == ids[:2]
+    assert store.match("inexistente") == []
+    assert store.doc_ids(specialty_filter="emergency") == ids[:2]
+
+
+def test_near_respects_distance_order_and_columns(db_session, add_chunks):
+    ids = _add_rows(
+        add_chunks,
+        [
+            ("fiebre alta y neutropenia", "General", "oncology"),
+            ("neutropenia tras tres ciclos con fiebre", "General", "oncology"),
+            ("fiebre", "Neutropenia", "oncology"),
+        ],
+    )
+    store = _build(db_session)
+
+    assert store.near("fiebre", "neutropenia", 2) == [ids[0]]
+    assert store.near("fiebre", "neutropenia", 4) == [ids[0], ids[1]]
+    # Terminos en columnas distintas (texto y seccion) nunca estan "cerca".
+    assert ids[2] not in store.near("fiebre", "neutropenia", 50)
+
+
+def test_skip_tables_jump_blocks_on_selective_intersections(db_session, add_chunks):
+    rows = [
+        (f"control rutinario numero {index}", "Seguimiento", "emergency") for index in range(200)
+    ]
+    rows[150] = ("control rutinario con anafilaxia", "Seguimiento", "emergency")
+    ids = _add_rows(add_chunks, rows)
+    store = _build(db_session)
+    stats: dict[str, int] = {}
+
+    assert store.match("rutinario con anafilaxia", stats=stats) == [ids[150]]
+    assert stats["blocks_skipped"] > 0
+    assert stats["blocks_decoded"] < 200 // 16
+
+
+def test_candidate_generation_runs_on_store_without_fts(db_session, add_chunks, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FTS_CANDIDATE_ENABLED", False)
+    ids = _add_rows(
+        add_chunks,
+        [
+            ("neutropenia febril tras quimioterapia", "Oncologia", "oncology"),
+            ("sepsis con hipotension", "Sepsis", "emergency"),
+        ],
+    )
+    _build(db_session)
+
+    chunks, trace = HybridRetriever()._fetch_candidate_chunks(
+        query="neutropenia AND febril",
+        db=db_session,
+        specialty_filter=None,
+        candidate_pool=10,
+    )
+
+    assert trace["candidate_postings_backend"] == "store"
+    assert trace["candidate_strategy"] == "fts_postings_boolean"
+    assert [chunk.id for chunk in chunks] == [ids[0]]
+
+
+def test_store_is_not_used_once_corpus_changes(db_session, add_chunks, monkeypatch):
+    monkeypatch.setattr(PostingsStore, "READY_CHECK_SECONDS", 0.0)
+    _add_rows(add_chunks, [("sepsis con hipotension", "Sepsis", "emergency")])
+    store = _build(db_session)
+
+    _add_rows(add_chunks, [("sepsis grave", "Sepsis", "emergency")])
+
+    assert not store.is_ready(db_session)
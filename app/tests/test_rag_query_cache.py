@@ -0,0 +1,372 @@
+import time
+from array import array
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.metrics.rag_cache_metrics import (
+    RAG_QUERY_CACHE_HITS_TOTAL,
+    RAG_QUERY_CACHE_MISSES_TOTAL,
+    register_rag_cache_metrics,
+)
+from app.models.clinical_document import ClinicalDocument
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_orchestrator import RAGOrchestrator
+from app.services.rag_query_cache import (
+    InMemoryQueryCacheBackend,
+    RAGQueryCache,
+    RedisQueryCacheBackend,
+    get_shared_query_cache,
+)
+
+
+def _entry(namespace: str, tokens: list[str], *, answer: str = "ok", ttl: float = 60.0):
+    now = time.time()
+    return {
+        "answer": answer,
+        "trace": {"rag_status": "success"},
+        "query_tokens": sorted(tokens),
+        "namespace": namespace,
+        "created_at": now,
+        "expires_at": now + ttl,
+    }
+
+
+class _FakeRedis:
+    """Subconjunto minimo de comandos Redis usados por el backend."""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):  # noqa: ARG002
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key) or 0) + 1)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    def sinter(self, keys):
+        result = None
+        for key in keys:
+            members = self.sets.get(key, set())
+            result = set(members) if result is None else result & members
+        return result or set()
+
+    def expire(self, key, ttl):  # noqa: ARG002
+        return True
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zpopmin(self, key, count):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])[:count]
+        for member, _score in items:
+            self.zsets[key].pop(member, None)
+        return items
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return _queue
+
+    def execute(self):
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+def test_memory_backend_subset_lookup_uses_inverted_index_and_namespace():
+    backend = InMemoryQueryCacheBackend(max_entries=16)
+    backend.put("a", _entry("clinical::sepsis", ["shock", "lactato", "bundle", "hemocultivos"]))
+    backend.put("b", _entry("clinical::sepsis", ["shock", "lactato", "bundle"], answer="b"))
+    backend.put("c", _entry("clinical::cardio", ["shock", "lactato"], answer="c"))
+
+    hit = backend.find_subset("clinical::sepsis", {"shock", "lactato"})
+
+    assert hit is not None and hit["answer"] == "b"
+    assert backend.find_subset("clinical::sepsis", {"shock", "troponina"}) is None
+    assert backend.find_subset("clinical::neuro", {"shock"}) is None
+
+
+def test_memory_backend_expires_and_evicts_least_recently_used():
+    backend = InMemoryQueryCacheBackend(max_entries=2)
+    backend.put("old", _entry("ns", ["a"], ttl=-1.0))
+    assert backend.get("old") is None
+    assert backend.expirations == 1
+
+    backend.put("k1", _entry("ns", ["x"]))
+    backend.put("k2", _entry("ns", ["y"]))
+    backend.get("k1")
+    backend.put("k3", _entry("ns", ["z"]))
+
+    assert backend.get("k2") is None
+    assert backend.get("k1") is not None
+    assert backend.evictions == 1
+    assert backend.find_subset("ns", {"y"}) is None
+
+
+def test_query_cache_is_shared_across_orchestrator_instances():
+    first = RAGOrchestrator(db=SimpleNamespace())
+    second = RAGOrchestrator(db=SimpleNamespace())
+    key = first._build_query_cache_key(
+        query="Hiperkalemia con QRS ancho",
+        response_mode="clinical",
+        effective_specialty="nephrology",
+        matched_domains=[],
+    )
+
+    first._store_cached_result(
+        cache_key=key,
+        answer="calcio IV",
+        trace={"rag_status": "success"},
+        query_tokens={"hiperkalemia", "qrs", "ancho"},
+        response_mode="clinical",
+        effective_specialty="nephrology",
+    )
+    answer, trace, kind = second._lookup_cached_result(
+        cache_key=key,
+        query_tokens={"hiperkalemia", "qrs", "ancho"},
+        response_mode="clinical",
+        effective_specialty="nephrology",
+    )
+
+    assert answer == "calcio IV"
+    assert kind == "exact"
+    assert trace["rag_query_cache_backend"] == "memory"
+    assert get_shared_query_cache().stats()["hits_exact"] == 1
+
+
+def test_query_cache_is_not_shared_between_care_tasks_with_different_patients(monkeypatch):
+    orchestrator = RAGOrchestrator(db=SimpleNamespace())
+
+    def _stop_before_retrieval(query):  # noqa: ARG001
+        raise RuntimeError("sin recuperacion en el test")
+
+    monkeypatch.setattr(orchestrator, "_resolve_adaptive_k", _stop_before_retrieval)
+    query = "Dosis de amoxicilina en neumonia"
+    first_patient = {"age": 34, "sex": "M", "allergies": []}
+    second_patient = {"age": 81, "sex": "F", "allergies": ["penicilina"]}
+    context_fingerprint = orchestrator._build_query_cache_context_fingerprint(
+        matched_endpoints=[],
+        memory_facts_used=[],
+        patient_summary=first_patient,
+        patient_history_facts_used=[],
+        knowledge_sources=[],
+        web_sources=[],
+        recent_dialogue=[],
+        endpoint_results=[],
+    )
+    orchestrator._store_cached_result(
+        cache_key=orchestrator._build_query_cache_key(
+            query=query,
+            response_mode="clinical",
+            effective_specialty="general",
+            matched_domains=[],
+            context_fingerprint=context_fingerprint,
+        ),
+        answer="amoxicilina 1 g cada 8 horas",
+        trace={"rag_status": "success"},
+        query_tokens=set(orchestrator._tokenize_for_relevance(query)),
+        response_mode="clinical",
+        effective_specialty="general",
+        context_fingerprint=context_fingerprint,
+    )
+
+    answer, trace = orchestrator.process_query_with_rag(
+        query=query, patient_summary=first_patient, care_task_id=None
+    )
+    assert answer == "amoxicilina 1 g cada 8 horas"
+    assert trace["rag_query_cache_hit"] == "1"
+
+    answer, trace = orchestrator.process_query_with_rag(
+        query=query, patient_summary=second_patient, care_task_id=None
+    )
+    assert answer is None
+    assert trace["rag_query_cache_hit"] == "0"
+    assert trace["rag_status"] == "failed_exception"
+    assert get_shared_query_cache().stats()["hits_subset"] == 0
+
+
+def _insert_chunk(db_session) -> None:
+    document = ClinicalDocument(
+        title="Doc",
+        source_file="docs/x.md",
+        specialty="sepsis",
+        content_hash="d" * 64,
+    )
+    db_session.add(document)
+    db_session.flush()
+    db_session.add(
+        DocumentChunk(
+            document_id=document.id,
+            chunk_text="texto",
+            chunk_index=0,
+            tokens_count=1,
+            chunk_embedding=array("f", [1.0]).tobytes(),
+            keywords=[],
+            custom_questions=[],
+            content_type="paragraph",
+        )
+    )
+    db_session.commit()
+
+
+def test_query_cache_invalidates_when_document_chunks_change(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS", 0)
+    cache = RAGQueryCache(InMemoryQueryCacheBackend(max_entries=16))
+    cache.store(
+        cache_key="k",
+        namespace="clinical::sepsis",
+        answer="a",
+        trace={},
+        query_tokens={"sepsis"},
+        ttl_seconds=60,
+        db=db_session,
+    )
+    assert cache.lookup(cache_key="k", namespace="clinical::sepsis", query_tokens=set())[1] == (
+        "exact"
+    )
+
+    # Insercion fuera del ORM (p. ej. ingesta en otro proceso): la detecta la firma del corpus.
+    _insert_chunk(db_session)
+    db_session.execute(
+        text(
+            "INSERT INTO document_chunks (document_id, chunk_text, chunk_index, tokens_count, "
+            "chunk_embedding, keywords, custom_questions, content_type) "
+            "VALUES (1, 'b', 1, 1, x'00', '[]', '[]', 'paragraph')"
+        )
+    )
+    db_session.commit()
+
+    entry, kind = cache.lookup(
+        cache_key="k",
+        namespace="clinical::sepsis",
+        query_tokens={"sepsis"},
+        db=db_session,
+    )
+
+    assert entry is None
+    assert kind == "miss"
+    assert cache.stats()["invalidations"] >= 1
+
+
+def test_query_cache_invalidates_when_a_chunk_is_replaced_with_the_same_id(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_QUERY_CACHE_CORPUS_CHECK_SECONDS", 0)
+    _insert_chunk(db_session)
+    cache = RAGQueryCache(InMemoryQueryCacheBackend(max_entries=16))
+    cache.store(
+        cache_key="k",
+        namespace="clinical::sepsis",
+        answer="a",
+        trace={},
+        query_tokens={"sepsis"},
+        ttl_seconds=60,
+        db=db_session,
+    )
+
+    # Otro proceso borra el ultimo chunk y lo reinserta con el mismo id:
+    # COUNT y MAX(id) no cambian, el contenido si.
+    chunk_id = db_session.execute(text("SELECT MAX(id) FROM document_chunks")).scalar()
+    db_session.execute(text("DELETE FROM document_chunks WHERE id = :id"), {"id": chunk_id})
+    db_session.execute(
+        text(
+            "INSERT INTO document_chunks (id, document_id, chunk_text, chunk_index, "
+            "tokens_count, chunk_embedding, keywords, custom_questions, content_type) "
+            "VALUES (:id, 1, 'texto sustituido', 0, 2, x'00', '[]', '[]', 'paragraph')"
+        ),
+        {"id": chunk_id},
+    )
+    db_session.commit()
+
+    entry, kind = cache.lookup(
+        cache_key="k",
+        namespace="clinical::sepsis",
+        query_tokens={"sepsis"},
+        db=db_session,
+    )
+
+    assert entry is None
+    assert kind == "miss"
+
+
+def test_orm_chunk_events_mark_shared_cache_dirty(db_session):
+    cache = get_shared_query_cache()
+    cache.store(
+        cache_key="k",
+        namespace="clinical::sepsis",
+        answer="a",
+        trace={},
+        query_tokens={"sepsis"},
+        ttl_seconds=60,
+    )
+
+    _insert_chunk(db_session)
+
+    assert cache.lookup(cache_key="k", namespace="clinical::sepsis", query_tokens=set())[0] is None
+
+
+def test_redis_backend_round_trip_subset_and_generation_invalidation():
+    backend = RedisQueryCacheBackend(_FakeRedis(), max_entries=2)
+    backend.put("k1", _entry("clinical::sepsis", ["shock", "lactato", "bundle"]))
+    backend.put("k2", _entry("clinical::sepsis", ["shock", "lactato"], answer="mas especifica"))
+
+    assert backend.get("k1")["answer"] == "ok"
+    subset = backend.find_subset("clinical::sepsis", {"shock"})
+    assert subset is not None and subset["answer"] == "mas especifica"
+
+    backend.put("k3", _entry("clinical::sepsis", ["sepsis"]))
+    assert backend.evictions == 1
+    assert backend.size() == 2
+
+    backend.clear()
+    assert backend.get("k3") is None
+    assert backend.find_subset("clinical::sepsis", {"sepsis"}) is None
+
+
+def test_rag_cache_metrics_read_shared_counters():
+    register_rag_cache_metrics()
+    cache = get_shared_query_cache()
+    cache.lookup(cache_key="nada", namespace="clinical::general", query_tokens={"x"})
+    cache.store(
+        cache_key="k",
+        namespace="clinical::general",
+        answer="a",
+        trace={},
+        query_tokens={"x"},
+        ttl_seconds=60,
+    )
+    cache.lookup(cache_key="k", namespace="clinical::general", query_tokens={"x"})
+
+    assert RAG_QUERY_CACHE_HITS_TOTAL.collect()[0].samples[0].value == 1
+    assert RAG_QUERY_CACHE_MISSES_TOTAL.collect()[0].samples[0].value == 1
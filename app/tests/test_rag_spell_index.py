@@ -0,0 +1,129 @@
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_spell_index import BigramTable, SpellCorrectionIndex
+
+_VOCAB = {
+    "hipotension": 40,
+    "hipertension": 55,
+    "hipotermia": 12,
+    "sepsis": 80,
+    "septico": 30,
+    "lactato": 25,
+    "lactancia": 9,
+    "shock": 60,
+}
+
+
+@pytest.fixture()
+def chunks(add_chunks) -> list[DocumentChunk]:
+    return add_chunks(
+        [
+            "shock septico con lactato elevado",
+            "shock septico refractario",
+            "shock hipovolemico tras hemorragia",
+        ],
+        title="Motor operativo sepsis",
+        source_file="docs/47_sepsis.md",
+        specialty="sepsis",
+        section_path="Sepsis > Pasos",
+    )
+
+
+@pytest.fixture
+def vocab_cache(monkeypatch):
+    terms = tuple(sorted(_VOCAB))
+    monkeypatch.setattr(HybridRetriever, "_fts_vocab_cache_terms", terms)
+    monkeypatch.setattr(HybridRetriever, "_fts_vocab_cache_doc_freq", dict(_VOCAB))
+    monkeypatch.setattr(HybridRetriever, "_spell_index", None)
+    monkeypatch.setattr(
+        HybridRetriever, "_ensure_fts_vocab_cache", classmethod(lambda cls, db: True)
+    )
+    return terms
+
+
+@pytest.mark.parametrize("typo", ["hipotensoin", "xhipotension", "hiptension", "laktato"])
+def test_delete_index_finds_every_term_within_edit_distance(typo):
+    index = SpellCorrectionIndex.build(_VOCAB, _VOCAB, max_distance=2, prefix_length=7)
+
+    candidates = {term for term, _ in index.edit_candidates(typo)}
+    expected = {
+        term
+        for term in _VOCAB
+        if HybridRetriever._levenshtein_distance(typo, term, max_distance=2) <= 2
+    }
+
+    assert expected <= candidates
+
+
+@pytest.mark.usefixtures("chunks")
+def test_bigram_table_counts_chunks_per_specialty(db_session):
+    table = BigramTable.build_from_db(db_session, max_entries=1000)
+
+    assert table.complete
+    assert table.count("shock", "septico") == 2
+    assert table.count("shock", "septico", "sepsis") == 2
+    assert table.count("shock", "septico", "oncology") == 0
+    assert table.count("post-op", "shock") is None
+
+
+@pytest.mark.usefixtures("chunks")
+def test_correction_uses_index_without_database(db_session, monkeypatch, vocab_cache):
+    retriever = HybridRetriever()
+    retriever._get_spell_index(db_session)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("no debe consultar la BD")
+
+    monkeypatch.setattr(retriever, "_query_vocab_rows", _fail)
+    monkeypatch.setattr(retriever, "_bigram_phrase_count", _fail)
+    monkeypatch.setattr(db_session, "execute", _fail)
+    stats: dict[str, int] = {}
+
+    assert (
+        retriever._suggest_term_correction(
+            db=db_session,
+            term="hipotensoin",
+            max_distance=2,
+            vocab_stats=stats,
+        )
+        == "hipotension"
+    )
+    assert (
+        retriever._suggest_term_correction(
+            db=db_session,
+            term="septco",
+            max_distance=2,
+            left_context="shock",
+        )
+        == "septico"
+    )
+    assert stats == {"index_hits": 1}
+
+
+def test_index_refreshes_with_vocab_and_falls_back_when_disabled(
+    db_session, monkeypatch, vocab_cache
+):
+    first = HybridRetriever._get_spell_index(db_session)
+    assert HybridRetriever._get_spell_index(db_session) is first
+
+    monkeypatch.setattr(HybridRetriever, "_spell_index", None)
+    assert HybridRetriever._get_spell_index(db_session) is not first
+
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_SPELL_INDEX_ENABLED", False)
+    calls: list[str] = []
+
+    def _vocab_rows(**kwargs):
+        calls.append(kwargs["glob_pattern"])
+        return [("hipotension", 40)], "cache"
+
+    retriever = HybridRetriever()
+    monkeypatch.setattr(retriever, "_query_vocab_rows", _vocab_rows)
+    suggestion = retriever._suggest_term_correction(
+        db=db_session, term="hipotensoin", max_distance=2
+    )
+
+    assert suggestion == "hipotension"
+    assert calls == ["h*"]
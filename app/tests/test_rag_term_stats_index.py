@@ -0,0 +1,107 @@
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_term_stats_index import TermStatsIndex
+
+_TEXTS = [
+    "neutropenia febril tras quimioterapia con fiebre persistente",
+    "sepsis con hipotension y lactato elevado",
+    "fiebre en paciente oncologico con neutropenia profunda",
+]
+
+
+@pytest.fixture(autouse=True)
+def _term_stats_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        settings, "CLINICAL_CHAT_RAG_TERM_STATS_PATH", str(tmp_path / "term_stats.sqlite3")
+    )
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_TERM_STATS_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_TERM_STATS_GLOBAL_ENABLED", False)
+    TermStatsIndex.reset_shared()
+    yield
+    TermStatsIndex.reset_shared()
+
+
+@pytest.fixture()
+def chunks(add_chunks) -> list[DocumentChunk]:
+    return add_chunks(
+        [
+            {"text": text_value, "keywords": ["neutropenia"] if index == 0 else []}
+            for index, text_value in enumerate(_TEXTS)
+        ],
+        title="Protocolo oncologia urgencias",
+        source_file="docs/80_oncologia_urgencias.md",
+        specialty="oncology",
+        section_path="Oncologia > Urgencias",
+    )
+
+
+def test_sync_is_incremental_and_keeps_global_counts(db_session, chunks):
+    index = TermStatsIndex.get_shared()
+
+    first = index.sync_from_db(db_session)
+    assert first["rows_added"] == 3
+    assert index.is_ready(db_session)
+    n_chunks, df, cf, _total = index.global_stats(["neutropenia", "fiebre", "sepsis"])
+    assert n_chunks == 3
+    assert df == {"neutropenia": 2, "fiebre": 2, "sepsis": 1}
+    # El chunk 0 repite "neutropenia" en cuerpo y en keywords.
+    assert cf["neutropenia"] == 3
+
+    second = index.sync_from_db(db_session)
+    assert second["rows_added"] == second["rows_updated"] == second["rows_removed"] == 0
+
+    db_session.delete(chunks[1])
+    chunks[2].chunk_text = "fiebre aislada sin foco"
+    db_session.commit()
+    third = index.sync_from_db(db_session)
+    assert third["rows_removed"] == 1
+    assert third["rows_updated"] == 1
+    n_chunks, df, _cf, _total = index.global_stats(["neutropenia", "sepsis", "foco"])
+    assert n_chunks == 2
+    assert df == {"neutropenia": 1, "sepsis": 0, "foco": 1}
+
+
+def test_stale_rows_fall_back_to_tokenization(db_session, chunks):
+    index = TermStatsIndex.get_shared()
+    index.sync_from_db(db_session)
+
+    chunks[0].chunk_text = "texto editado sin resincronizar"
+    db_session.commit()
+
+    _scored, trace = HybridRetriever()._score_keyword_candidates(
+        query="neutropenia febril", chunks=chunks, k=3
+    )
+    assert trace["keyword_search_term_stats"] == "partial"
+    assert trace["keyword_search_term_stats_hits"] == "2"
+    assert trace["keyword_search_term_stats_stale"] == "1"
+
+
+@pytest.mark.usefixtures("chunks")
+def test_index_for_another_tokenizer_is_not_ready(db_session, monkeypatch):
+    TermStatsIndex.get_shared().sync_from_db(db_session)
+    TermStatsIndex.reset_shared()
+
+    monkeypatch.setattr(TermStatsIndex, "TOKENIZER_SIGNATURE", "otro-tokenizador")
+
+    assert not TermStatsIndex.get_shared().is_ready(db_session)
+
+
+def test_indexed_scores_match_inline_tokenization(db_session, chunks):
+    retriever = HybridRetriever()
+    inline_scored, inline_trace = retriever._score_keyword_candidates(
+        query="fiebre neutropenia oncologia", chunks=chunks, k=3
+    )
+    assert inline_trace["keyword_search_term_stats"] == "tokenized"
+
+    TermStatsIndex.get_shared().sync_from_db(db_session)
+    indexed_scored, indexed_trace = retriever._score_keyword_candidates(
+        query="fiebre neutropenia oncologia", chunks=chunks, k=3
+    )
+
+    assert indexed_trace["keyword_search_term_stats"] == "index"
+    assert [chunk.id for chunk, _ in indexed_scored] == [chunk.id for chunk, _ in inline_scored]
+    for (_, indexed_score), (_, inline_score) in zip(indexed_scored, inline_scored):
+        assert indexed_score == pytest.approx(inline_score)
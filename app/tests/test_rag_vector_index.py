@@ -0,0 +1,233 @@
+from array import array
+
+import pytest
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services import embedding_similarity
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_vector_index import ChunkVectorIndex
+
+
+def _add_vectors(add_chunks, vectors: list[list[float]]) -> list[int]:
+    chunks = add_chunks(
+        [
+            {"text": f"fragmento {index}", "vector": vector, "tokens_count": 3}
+            for index, vector in enumerate(vectors)
+        ],
+        title="Protocolo sepsis",
+        source_file="docs/47_motor_sepsis_urgencias.md",
+        specialty="sepsis",
+        section_path="Sepsis > Manejo",
+    )
+    return [int(chunk.id) for chunk in chunks]
+
+
+class _FixedEmbeddingService:
+    model = "test-embed"
+
+    def __init__(self, vector: list[float]):
+        self._vector = vector
+
+    def embed_text(self, text: str):
+        return list(self._vector), {"embedding_source": "test"}
+
+    @staticmethod
+    def batch_cosine_similarity(query_vec, candidate_vecs):
+        return [0.0 for _ in candidate_vecs]
+
+
+def test_vector_index_sync_is_incremental_and_tombstones_deleted_chunks(
+    db_session, add_chunks, tmp_path
+):
+    pytest.importorskip("numpy")
+    index = ChunkVectorIndex(index_dir=tmp_path, model="test-embed")
+    ids = _add_vectors(add_chunks, [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.6, 0.8, 0.0]])
+
+    first = index.sync_from_db(db_session)
+    assert first["rows_added"] == 3
+    second = index.sync_from_db(db_session)
+    assert second["rows_added"] == 0
+
+    db_session.query(DocumentChunk).filter(DocumentChunk.id == ids[0]).delete()
+    db_session.commit()
+    third = index.sync_from_db(db_session)
+    assert third["rows_removed"] == 1
+    assert third["rows_total"] == 2
+
+    scored, missing, trace = index.search([1.0, 0.0, 0.0], k=2, allowed_ids=ids)
+    assert trace["vector_index_ready"] == "1"
+    assert missing == [ids[0]]
+    assert [chunk_id for chunk_id, _score in scored] == [ids[2], ids[1]]
+    assert scored[0][1] == pytest.approx(0.6, abs=1e-5)
+
+
+def test_vector_index_sync_replaces_rows_whose_embedding_changed(db_session, add_chunks, tmp_path):
+    pytest.importorskip("numpy")
+    index = ChunkVectorIndex(index_dir=tmp_path, model="test-embed")
+    ids = _add_vectors(add_chunks, [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    index.sync_from_db(db_session)
+
+    # Mismo id con otro contenido: SQLite reutiliza ids tras re-ingestar un documento.
+    chunk = db_session.get(DocumentChunk, ids[1])
+    chunk.chunk_embedding = array("f", [0.0, 0.0, 1.0]).tobytes()
+    db_session.commit()
+    stats = index.sync_from_db(db_session)
+
+    assert stats["rows_added"] == stats["rows_removed"] == 0
+    assert stats["rows_updated"] == 1
+    assert stats["rows_total"] == 2
+    scored, missing, _trace = index.search([0.0, 0.0, 1.0], k=1, allowed_ids=ids)
+    assert missing == []
+    assert scored[0][0] == ids[1]
+    assert scored[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_vector_index_skips_embeddings_with_mismatched_dimension(db_session, add_chunks, tmp_path):
+    pytest.importorskip("numpy")
+    index = ChunkVectorIndex(index_dir=tmp_path, model="test-embed")
+    _add_vectors(add_chunks, [[1.0, 0.0, 0.0], [1.0, 0.0]])
+
+    stats = index.sync_from_db(db_session)
+
+    assert stats["rows_added"] == 1
+    assert stats["rows_skipped"] == 1
+
+
+def test_vector_index_ivf_search_returns_nearest_rows(
+    db_session, add_chunks, tmp_path, monkeypatch
+):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_ANN_MIN_CANDIDATES", 16)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NLIST", 4)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_IVF_NPROBE", 4)
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(64, 8)).astype("float32").tolist()
+    ids = _add_vectors(add_chunks, vectors)
+    index = ChunkVectorIndex(index_dir=tmp_path, model="test-embed")
+
+    stats = index.sync_from_db(db_session)
+    exact, _missing, _trace = index.search(vectors[5], k=3)
+    approx, _missing, trace = index.search(vectors[5], k=3, approximate=True)
+
+    assert stats["ivf_nlist"] == 4
+    assert trace["vector_index_mode"] == "ivf"
+    assert approx[0][0] == exact[0][0] == ids[5]
+
+
+def test_score_vector_candidates_uses_index_and_decodes_only_missing(
+    db_session,
+    add_chunks,
+    tmp_path,
+    monkeypatch,
+):
+    pytest.importorskip("numpy")
+    ChunkVectorIndex.reset_shared()
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR", str(tmp_path))
+    ids = _add_vectors(add_chunks, [[1.0, 0.0], [0.0, 1.0]])
+    ChunkVectorIndex.get_shared("test-embed").sync_from_db(db_session)
+    retriever = HybridRetriever(embedding_service=_FixedEmbeddingService([0.0, 1.0]))
+    chunks = db_session.query(DocumentChunk).order_by(DocumentChunk.id).all()
+
+    scored, trace = retriever._score_vector_candidates(query="shock", chunks=chunks, k=1)
+
+    assert [int(chunk.id) for chunk, _score in scored] == [ids[1]]
+    assert trace["vector_search_method"] == "cosine_similarity_index_exact"
+    assert trace["vector_search_fallback_decoded"] == "0"
+    ChunkVectorIndex.reset_shared()
+
+
+def test_score_vector_candidates_falls_back_without_index(
+    db_session, add_chunks, tmp_path, monkeypatch
+):
+    ChunkVectorIndex.reset_shared()
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR", str(tmp_path / "empty"))
+    _add_vectors(add_chunks, [[1.0, 0.0], [0.0, 1.0]])
+    embedding_service = _FixedEmbeddingService([0.0, 1.0])
+    embedding_service.batch_cosine_similarity = lambda query_vec, candidate_vecs: [0.1, 0.9]
+    retriever = HybridRetriever(embedding_service=embedding_service)
+    chunks = db_session.query(DocumentChunk).order_by(DocumentChunk.id).all()
+
+    scored, trace = retriever._score_vector_candidates(query="shock", chunks=chunks, k=2)
+
+    assert trace["vector_search_method"] == "cosine_similarity"
+    assert trace["vector_search_fallback_decoded"] == "2"
+    assert scored[0][1] == pytest.approx(0.9)
+    ChunkVectorIndex.reset_shared()
+
+
+def test_vector_index_search_many_matches_single_query_search(db_session, add_chunks, tmp_path):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(24, 6)).astype("float32").tolist()
+    ids = _add_vectors(add_chunks, vectors)
+    index = ChunkVectorIndex(index_dir=tmp_path, model="test-embed")
+    index.sync_from_db(db_session)
+    allowed = [ids[:10], ids[6:] + [10_000], ids]
+
+    batch = index.search_many([vectors[2], vectors[15], vectors[7]], k=4, allowed_ids=allowed)
+
+    for (scored, missing, trace), query, allowed_ids in zip(
+        batch, [vectors[2], vectors[15], vectors[7]], allowed, strict=True
+    ):
+        expected, expected_missing, _trace = index.search(query, k=4, allowed_ids=allowed_ids)
+        assert [chunk_id for chunk_id, _ in scored] == [chunk_id for chunk_id, _ in expected]
+        assert [score for _, score in scored] == pytest.approx([score for _, score in expected])
+        assert missing == expected_missing
+        assert trace["vector_index_mode"] == "exact_batched"
+        assert trace["vector_index_batch_union_rows"] == "24"
+
+
+class _BatchEmbeddingService(_FixedEmbeddingService):
+    def __init__(self, vectors: dict[str, list[float]]):
+        super().__init__([0.0, 0.0])
+        self._vectors = vectors
+        self.batch_calls = 0
+
+    def embed_text(self, text: str):
+        return list(self._vectors.get(text, [0.0, 0.0])), {"embedding_source": "test"}
+
+    def embed_batch(self, texts: list[str]):
+        self.batch_calls += 1
+        return [self.embed_text(text)[0] for text in texts], {"embedding_source": "test"}
+
+    @staticmethod
+    def batch_cosine_similarity(query_vec, candidate_vecs):
+        return embedding_similarity.cosine_scores(query_vec, candidate_vecs)
+
+
+def test_search_hybrid_multi_matches_single_queries_with_one_candidate_load(
+    db_session, add_chunks, tmp_path, monkeypatch
+):
+    ChunkVectorIndex.reset_shared()
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_VECTOR_INDEX_DIR", str(tmp_path / "empty"))
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_PARALLEL_HYBRID_ENABLED", False)
+    _add_vectors(add_chunks, [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8], [0.8, 0.6]])
+    embedding_service = _BatchEmbeddingService({"fragmento 1": [0.0, 1.0], "manejo": [1.0, 0.0]})
+    retriever = HybridRetriever(embedding_service=embedding_service)
+    queries = [("fragmento 1", "sepsis"), ("manejo", None)]
+    expected = []
+    for query, specialty in queries:
+        chunks, _trace = retriever.search_hybrid(query, db_session, k=3, specialty_filter=specialty)
+        expected.append([(int(chunk.id), float(chunk._rag_score)) for chunk in chunks])
+    loads: list[object] = []
+    original_load = HybridRetriever._load_candidate_rows
+
+    def _counting_load(db, **kwargs):
+        loads.append(kwargs.get("ids"))
+        return original_load(db, **kwargs)
+
+    monkeypatch.setattr(HybridRetriever, "_load_candidate_rows", staticmethod(_counting_load))
+
+    results, shared_trace = retriever.search_hybrid_multi(queries, db_session, k=3)
+
+    assert [[(int(chunk.id), score) for chunk, score in scored] for scored, _trace in results] == [
+        [(chunk_id, pytest.approx(score)) for chunk_id, score in rows] for rows in expected
+    ]
+    assert len(loads) == 1
+    assert shared_trace["hybrid_multi_db_loads"] == "1"
+    assert shared_trace["hybrid_multi_queries"] == "2"
+    assert embedding_service.batch_calls == 1
+    assert all(trace["vector_search_batched_queries"] == "2" for _scored, trace in results)
+    ChunkVectorIndex.reset_shared()
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.services.rag_retriever import HybridRetriever
+from app.services.rag_wildcard_index import WildcardIndex
+
+_VOCAB = {
+    "hipotension": 40,
+    "hipertension": 55,
+    "hipotermia": 12,
+    "hipoxemia": 18,
+    "anemia": 33,
+    "bacteriemia": 7,
+    "nefritis": 5,
+    "pancreatitis": 21,
+    "sepsis": 80,
+    "x": 3,
+}
+
+
+@pytest.fixture
+def vocab_cache(monkeypatch):
+    terms = tuple(sorted(_VOCAB))
+    monkeypatch.setattr(HybridRetriever, "_fts_vocab_cache_terms", terms)
+    monkeypatch.setattr(HybridRetriever, "_fts_vocab_cache_doc_freq", dict(_VOCAB))
+    monkeypatch.setattr(HybridRetriever, "_wildcard_index", None)
+    monkeypatch.setattr(HybridRetriever, "_resolve_postings_store", staticmethod(lambda db: None))
+    monkeypatch.setattr(
+        HybridRetriever, "_ensure_fts_vocab_cache", classmethod(lambda cls, db: True)
+    )
+    return terms
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    ["hipo*", "*emia", "hip*sion", "*ten*", "*e*i*", "h*", "*s", "*x*", "zz*", "*itis", "x*"],
+)
+def test_lookup_matches_regex_scan_in_doc_freq_order(pattern):
+    index = WildcardIndex.build(_VOCAB, _VOCAB, k=3)
+    regex = re.compile("^" + pattern.replace("*", ".*") + "$")
+    expected = sorted(
+        ((term, df) for term, df in _VOCAB.items() if regex.match(term)),
+        key=lambda item: (-item[1], item[0]),
+    )
+
+    assert index.lookup(pattern, limit=100) == expected
+    assert index.lookup(pattern, limit=2) == expected[:2]
+
+
+def test_lookup_applies_length_bounds_and_reports_stats():
+    index = WildcardIndex.build(_VOCAB, _VOCAB, k=3)
+    stats: dict[str, int] = {}
+
+    rows = index.lookup("h*", limit=10, min_len=10, max_len=11, stats=stats)
+
+    assert rows == [("hipotension", 40), ("hipotermia", 12)]
+    assert stats["matched"] == 2
+    assert stats["scanned"] <= 4
+
+
+def test_wildcard_expansion_uses_index_and_builds_in_background(
+    db_session, monkeypatch, vocab_cache
+):
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_WILDCARD_INDEX_INLINE_MAX_TERMS", 0)
+    retriever = HybridRetriever()
+    vocab_stats: dict[str, int] = {}
+
+    first = retriever._expand_wildcard_term(
+        db=db_session, term="hipo*", limit=8, vocab_stats=vocab_stats
+    )
+    HybridRetriever._wildcard_index_builder.join(timeout=5)
+    lookup_stats: dict[str, int] = {}
+    second = retriever._expand_wildcard_term(
+        db=db_session,
+        term="hipo*",
+        limit=8,
+        vocab_stats=vocab_stats,
+        lookup_stats=lookup_stats,
+    )
+
+    assert first == second == ["hipotension", "hipoxemia", "hipotermia"]
+    assert vocab_stats == {"cache_hits": 1, "kgram_hits": 1}
+    assert lookup_stats["matched"] == 3
+    assert HybridRetriever._wildcard_index is not None
@@ -0,0 +1,184 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.agent_run import AgentRun, AgentStep
+from app.models.clinical_chat_job import ClinicalChatJob
+from app.services.clinical_chat_async_service import ClinicalChatAsyncService
+from app.services.rag_orchestrator import RAGOrchestrator
+
+_EXTRACTIVE = "Bundle de sepsis: lactato, hemocultivos y antibiotico en la primera hora."
+_REFINED = (
+    "Prioridad inmediata en sospecha de sepsis con lactato 4 "
+    "(bundle de sepsis, 47_motor_sepsis_urgencias):\n"
+    "1) Extraer hemocultivos antes del antibiotico.\n"
+    "2) Iniciar antibiotico empirico en la primera hora.\n"
+    "3) Fluidos guiados por lactato y control hemodinamico con reevaluacion seriada."
+)
+
+
+@pytest.fixture
+def speculative_chat(client, db_session, monkeypatch):
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+    monkeypatch.setattr(ClinicalChatAsyncService, "_session_factory", factory)
+    monkeypatch.setattr(ClinicalChatAsyncService, "_stats", {})
+    monkeypatch.setattr(
+        ClinicalChatAsyncService, "_ensure_workers_started", classmethod(lambda cls: None)
+    )
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FORCE_EXTRACTIVE_ONLY", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_RAG_FACT_ONLY_MODE_ENABLED", False)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_SPECULATIVE_ANSWER_ENABLED", True)
+    calls: list[bool] = []
+    llm_available = {"value": True, "answer": _REFINED}
+
+    def fake_process(self, **kwargs):
+        speculative = bool(kwargs.get("speculative_extractive"))
+        calls.append(speculative)
+        source = {
+            "type": "rag_chunk",
+            "title": "Motor sepsis",
+            "source": "docs/47_motor_sepsis_urgencias.md",
+            "snippet": "Bundle de una hora con control hemodinamico.",
+        }
+        trace = {"rag_status": "success", "rag_sources": [source]}
+        if speculative or not llm_available["value"]:
+            trace.update(
+                {
+                    "rag_generation_mode": "extractive_forced_mode",
+                    "rag_llm_skipped_reason": (
+                        "speculative_extractive_phase" if speculative else "llm_unavailable"
+                    ),
+                    "llm_used": "false",
+                    "llm_error": "ForcedExtractiveMode" if speculative else "URLError",
+                }
+            )
+            return _EXTRACTIVE, trace
+        trace.update(
+            {
+                "rag_generation_mode": "llm",
+                "llm_used": "true",
+                "llm_provider": settings.CLINICAL_CHAT_LLM_PROVIDER,
+            }
+        )
+        return llm_available["answer"], trace
+
+    monkeypatch.setattr(RAGOrchestrator, "process_query_with_rag", fake_process)
+    task = client.post(
+        "/api/v1/care-tasks/",
+        json={"title": "Caso sepsis", "clinical_priority": "high", "completed": False},
+    )
+    yield client, task.json()["id"], calls, llm_available
+    ClinicalChatAsyncService.shutdown(timeout=5.0)
+
+
+def _send(client, task_id: int) -> dict:
+    response = client.post(
+        f"/api/v1/care-tasks/{task_id}/chat/messages",
+        json={"query": "Sospecha de sepsis con lactato 4", "session_id": "session-spec"},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _run_refinement(job_id: str) -> None:
+    claimed = ClinicalChatAsyncService._claim_next_job(worker_id="w1")
+    assert claimed == job_id
+    ClinicalChatAsyncService._execute_job(job_id=job_id)
+
+
+def test_speculative_turn_answers_extractive_then_refines_same_message(speculative_chat):
+    client, task_id, calls, _ = speculative_chat
+
+    first = _send(client, task_id)
+
+    assert calls == [True]
+    assert first["answer_status"] == "provisional"
+    assert first["answer_revision"] == 1
+    assert first["refinement_job_id"]
+    assert "answer_strategy=speculative_extractive" in first["interpretability_trace"]
+
+    _run_refinement(first["refinement_job_id"])
+    message = client.get(f"/api/v1/care-tasks/{task_id}/chat/messages/{first['message_id']}")
+    history = client.get(f"/api/v1/care-tasks/{task_id}/chat/messages")
+    job = ClinicalChatAsyncService.get_job_status(job_id=first["refinement_job_id"])
+
+    assert calls == [True, False]
+    assert message.status_code == 200
+    assert message.json()["answer_status"] == "refined"
+    assert message.json()["answer_revision"] == 2
+    assert message.json()["assistant_answer"] == _REFINED
+    assert len(history.json()) == 1
+    assert job["status"] == "completed"
+    assert job["message_id"] == first["message_id"]
+    assert job["llm_used"] is True
+
+
+def test_refinement_extends_the_original_run_instead_of_replaying_the_turn(
+    speculative_chat, db_session
+):
+    client, task_id, _, _ = speculative_chat
+    first = _send(client, task_id)
+
+    _run_refinement(first["refinement_job_id"])
+    job = ClinicalChatAsyncService.get_job_status(job_id=first["refinement_job_id"])
+
+    db_session.expire_all()
+    run = db_session.query(AgentRun).one()
+    steps = (
+        db_session.query(AgentStep)
+        .filter(AgentStep.run_id == run.id)
+        .order_by(AgentStep.step_order.asc())
+        .all()
+    )
+    assert job["agent_run_id"] == run.id
+    assert [step.step_name for step in steps] == [
+        "clinical_chat_assessment",
+        "clinical_chat_answer_refinement",
+    ]
+    assert steps[-1].decision == "llm_refined"
+    assert run.run_output["clinical_chat"]["answer"] == _REFINED
+    assert run.run_output["clinical_chat"]["answer_refinement"]["answer_revision"] == 2
+
+
+def test_refinement_without_llm_keeps_extractive_answer_as_final(speculative_chat):
+    client, task_id, _, llm_available = speculative_chat
+    first = _send(client, task_id)
+    llm_available["value"] = False
+
+    _run_refinement(first["refinement_job_id"])
+    message = client.get(f"/api/v1/care-tasks/{task_id}/chat/messages/{first['message_id']}")
+
+    assert message.json()["answer_status"] == "final"
+    assert message.json()["answer_revision"] == 1
+    assert message.json()["assistant_answer"] == first["answer"]
+
+
+def test_refinement_keeps_extractive_answer_when_llm_answer_fails_verification(
+    speculative_chat,
+):
+    client, task_id, _, llm_available = speculative_chat
+    first = _send(client, task_id)
+    llm_available["answer"] = "Valorar sepsis."
+
+    _run_refinement(first["refinement_job_id"])
+    message = client.get(f"/api/v1/care-tasks/{task_id}/chat/messages/{first['message_id']}")
+
+    assert message.json()["answer_status"] == "final"
+    assert message.json()["answer_revision"] == 1
+    assert message.json()["assistant_answer"] == first["answer"]
+
+
+def test_speculative_mode_is_skipped_when_llm_is_disabled(
+    speculative_chat, db_session, monkeypatch
+):
+    client, task_id, calls, _ = speculative_chat
+    monkeypatch.setattr(settings, "CLINICAL_CHAT_LLM_ENABLED", False)
+
+    payload = _send(client, task_id)
+
+    assert calls == [False]
+    assert payload["answer_status"] == "final"
+    assert payload["refinement_job_id"] is None
+    assert db_session.query(ClinicalChatJob).count() == 0